@@ -0,0 +1,95 @@
+"""
+Analysis Cache Module
+解析結果をラップデータの識別番号・版数と設定値をキーにしてキャッシュするモジュールです。
+"""
+import itertools
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Tuple
+
+
+class LapDataVersions:
+    """ラップデータのリストごとの識別番号と版数
+
+    ラップの内容をハッシュする代わりに、リストの同一性と編集のたびに増やす版数をキャッシュキーにします。
+    キーの計算はラップ数によらずO(1)です。リストをその場で変更した場合は mark_modified で版数を増やします。
+    登録したリストへの参照を保持するため、破棄されたリストのidが再利用されても別のリストと混同しません
+    （上限を超えた場合は最も長く参照されていないリストから登録を外し、次回は新しい識別番号で登録する）。
+    保持するリストが増えすぎないよう、上限は解析結果のキャッシュと同じにします。
+    """
+
+    def __init__(self, max_entries: int = 32):
+        self.max_entries = max(1, int(max_entries))
+        self._entries = OrderedDict()  # id(laps) -> [laps, 識別番号, 版数]
+        self._serials = itertools.count(1)
+
+    def key(self, laps: List[Dict]) -> Tuple[int, int, int]:
+        """ラップデータの (識別番号, 版数, ラップ数)"""
+        entry = self._entries.get(id(laps))
+        if entry is None:
+            entry = [laps, next(self._serials), 0]
+            self._entries[id(laps)] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        else:
+            self._entries.move_to_end(id(laps))
+        return entry[1], entry[2], len(laps)
+
+    def mark_modified(self, laps: List[Dict]) -> None:
+        """ラップデータがその場で変更されたことを記録する（以前のキーのキャッシュは使われなくなる）"""
+        entry = self._entries.get(id(laps))
+        if entry is not None:
+            entry[2] += 1
+
+    def clear(self) -> None:
+        """登録したリストを全て外す"""
+        self._entries.clear()
+
+    def resize(self, max_entries: int) -> None:
+        """登録するリストの上限を変更する（超えた分は古いものから外す）"""
+        self.max_entries = max(1, int(max_entries))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class AnalysisCache:
+    """上限付きのLRUキャッシュ
+
+    上限を超えた場合は最も長く参照されていないエントリから破棄します。
+    """
+
+    def __init__(self, max_entries: int = 32):
+        self.max_entries = max(1, int(max_entries))
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Any:
+        """キャッシュから値を取得する（存在しない場合はNone）"""
+        if key is None or key not in self._entries:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return self._entries[key]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """キャッシュに値を格納する"""
+        if key is None:
+            return
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """キャッシュを全て破棄する"""
+        self._entries.clear()
+
+    def resize(self, max_entries: int) -> None:
+        """最大エントリ数を変更する（超えた分は古いものから破棄する）"""
+        self.max_entries = max(1, int(max_entries))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -1,7 +1,22 @@
+import copy
 import numpy as np
 from typing import Dict, List, Optional, Union
 from utils.time_converter import TimeConverter
 from app.config_manager import ConfigManager
+from app.lap_columns import LapColumns
+from app.head_to_head import HeadToHeadMatrix, build_head_to_head
+from app.analysis_cache import AnalysisCache, LapDataVersions
+from app.micro_sectors import MicroSectorStats, compute_micro_sector_stats, recent_window_stats
+from app.lap_similarity import LapSimilarityIndex, build_similarity_index
+from app.bootstrap import BootstrapIntervals, bootstrap_intervals
+from app.change_points import ChangePointResult, detect_change_points
+from app.condition_normalization import ConditionModel, fit_condition_model, normalize_laps
+from app.quantile_sketch import LapQuantileSketches, build_quantile_sketches
+from app.distribution_stats import DistributionStats, compute_distribution_stats
+from app.leaderboard import LeaderboardIndex, build_leaderboard
+from app.lap_filter import FilterContext, compile_filter
+from app.pivot import DEFAULT_TEMP_BIN, PivotTable, build_pivot
+from app.consistency import ConsistencyScores, build_consistency_scores
 
 class LapTimeAnalyzer:
     def __init__(self, data_loader, config_manager: ConfigManager):
@@ -14,8 +29,116 @@ class LapTimeAnalyzer:
         self.time_converter = TimeConverter()
         self.config_manager = config_manager
         self.window_size = 3  # 移動平均のウィンドウサイズ
+        
+        # 解析結果のキャッシュ（ラップデータの識別番号・版数と設定値をキーにする）
+        cache_size = self.config_manager.get_setting("app_settings", "analysis_cache_size") or 32
+        self.cache = AnalysisCache(cache_size)
+        self.versions = LapDataVersions(cache_size)
+        self.config_manager.subscribe(self._on_app_settings_changed, "app_settings")
+
+    def _cache_key(self, kind: str, laps: List[Dict], *settings):
+        """キャッシュキーを生成する（ラップデータの内容は読まないためO(1)）"""
+        return (kind,) + self.versions.key(laps) + (self.config_manager.get_num_sectors(),) + settings
+
+    def mark_modified(self, laps: List[Dict], rows: Optional[List[int]] = None) -> None:
+        """ラップデータのリストをその場で変更（編集・追加・削除）した後に呼び出す
+
+        以前の内容に対するキャッシュは以降使われなくなります。セルの編集のようにラップ数を変えずに
+        一部の行のみを変更した場合はrowsを指定すると、キャッシュ済みの列指向データはその行のみ
+        解析し直して引き継ぎます。
+
+        Args:
+            laps: 変更したラップデータ
+            rows: 変更した行（ラップ数が変わらない場合のみ）
+        """
+        previous = self.cache.get(self._cache_key('columns', laps)) if rows is not None else None
+        self.versions.mark_modified(laps)
+        if previous is not None and len(previous) == len(laps):
+            num_sectors = self.config_manager.get_num_sectors()
+            replacement = LapColumns.from_laps([laps[row] for row in rows], num_sectors, self.time_converter)
+            self.set_lap_columns(laps, previous.replace_rows(rows, replacement))
+
+    def clear_cache(self):
+        """解析結果のキャッシュを破棄する"""
+        self.cache.clear()
+        self.versions.clear()
+
+    def start_dataset(self, laps: List[Dict]) -> None:
+        """新しいデータセットを読み込んだときに呼び出す
+
+        以前のデータセットや、その絞り込み・補正の結果のリストへの参照とキャッシュを破棄します。
+        読み込み時に登録した laps の列指向データ（set_lap_columns）は引き継ぎます。
+
+        Args:
+            laps: 読み込んだラップデータ
+        """
+        columns = self.cache.get(self._cache_key('columns', laps))
+        self.clear_cache()
+        if columns is not None:
+            self.set_lap_columns(laps, columns)
+
+    def _on_app_settings_changed(self, event):
+        """解析に影響するアプリケーション設定が変更されたときの処理"""
+        if event.key in ("num_sectors", "micro_sector_threshold"):
+            # 以前のセクター数・集計方式の結果は再利用されないので破棄する
+            self.clear_cache()
+        elif event.key == "analysis_cache_size" and event.new_value:
+            self.cache.resize(event.new_value)
+            self.versions.resize(event.new_value)
 
     def analyze_laps(self, laps: List[Dict]) -> Dict:
+        """ラップデータを分析する（同じデータ・設定の場合はキャッシュを返す）"""
+        key = self._cache_key('analyze', laps)
+        result = self.cache.get(key)
+        if result is None:
+            result = self._analyze_laps(laps)
+            self.cache.put(key, result)
+        # 呼び出し側での変更がキャッシュに影響しないように入れ子の統計も含めてコピーを返す
+        return copy.deepcopy(result)
+
+    def update_analysis(self, laps: List[Dict], previous: Optional[Dict], riders: List[str]) -> Dict:
+        """指定したライダーの統計のみを再計算して分析結果を更新する
+
+        セルの編集などで変更されたライダーが分かっている場合に使用します。
+        他のライダーの統計は前回の分析結果をそのまま使います。
+
+        Args:
+            laps: 変更後のラップデータ
+            previous: 変更前のデータに対する分析結果（Noneの場合は全体を分析）
+            riders: 再計算するライダー
+
+        Returns:
+            Dict: analyze_lapsと同じ形式の分析結果
+        """
+        if not previous or previous.get('num_sectors') != self.config_manager.get_num_sectors():
+            return self.analyze_laps(laps)
+        try:
+            riders = set(riders)
+            partial = self._analyze_laps([lap for lap in laps if lap.get('Rider') in riders])
+
+            rider_stats = {rider: stats for rider, stats in previous['rider_stats'].items() if rider not in riders}
+            rider_stats.update(partial['rider_stats'])
+            sector_stats = {rider: stats for rider, stats in previous['sector_stats'].items() if rider not in riders}
+            sector_stats.update(partial['sector_stats'])
+
+            result = self._create_empty_analysis()
+            result['rider_stats'] = rider_stats
+            result['sector_stats'] = sector_stats
+            if 'micro_sectors' in previous and 'micro_sectors' in partial:
+                result['micro_sectors'] = previous['micro_sectors'].replace_riders(partial['micro_sectors'], riders)
+            if rider_stats:
+                # 最速/最遅ラップは各ライダーのベスト/ワーストから求める
+                result['fastest_lap'] = min((s['best_lap'] for s in rider_stats.values()), key=lambda x: x['time'])
+                result['slowest_lap'] = max((s['worst_lap'] for s in rider_stats.values()), key=lambda x: x['time'])
+                result['total_laps'] = sum(s['lap_count'] for s in rider_stats.values())
+
+            self.cache.put(self._cache_key('analyze', laps), result)
+            return copy.deepcopy(result)
+        except Exception as e:
+            print(f"Error in update_analysis: {str(e)}")
+            return self.analyze_laps(laps)
+
+    def _analyze_laps(self, laps: List[Dict]) -> Dict:
         """ラップデータを分析する"""
         try:
             if not laps:
@@ -23,6 +146,8 @@ class LapTimeAnalyzer:
 
             # セクター数を取得
             num_sectors = self.config_manager.get_num_sectors()
+            if self.config_manager.is_micro_sector_mode():
+                return self._analyze_micro_sector_laps(laps, num_sectors)
 
             # 時間データを数値に変換
             processed_laps = []
@@ -81,6 +206,71 @@ class LapTimeAnalyzer:
             print(f"Error in analyze_laps: {str(e)}")
             return self._create_empty_analysis()
 
+    def _analyze_micro_sector_laps(self, laps: List[Dict], num_sectors: int) -> Dict:
+        """ミニセクターモードでラップデータを分析する
+
+        セクタータイムはラップ数×セクター数の配列にまとめ、統計は配列の集約で計算します。
+        結果の形式はanalyze_lapsと同じで、'micro_sectors'に統計行列を追加します。
+        """
+        columns = self.get_lap_columns(laps)
+        valid = columns.valid
+        rows = np.flatnonzero(valid)
+        if not rows.size:
+            return self._create_empty_analysis()
+
+        def processed(index):
+            lap = laps[index].copy()
+            lap['time'] = float(columns.lap_times[index])
+            return lap
+
+        lap_times = columns.lap_times[rows]
+        rider_stats = {}
+        for code, rider in enumerate(columns.riders):
+            rider_rows = rows[columns.rider_codes[rows] == code]
+            if not rider_rows.size:
+                continue
+            times = columns.lap_times[rider_rows]
+            rider_stats[rider] = {
+                'best_lap': processed(rider_rows[np.argmin(times)]),
+                'worst_lap': processed(rider_rows[np.argmax(times)]),
+                'avg_time': np.mean(times),
+                'std_dev': np.std(times) if len(times) > 1 else 0,
+                'lap_count': len(rider_rows)
+            }
+
+        micro_stats = compute_micro_sector_stats(columns, valid)
+        return {
+            'fastest_lap': processed(rows[np.argmin(lap_times)]),
+            'slowest_lap': processed(rows[np.argmax(lap_times)]),
+            'rider_stats': rider_stats,
+            'sector_stats': micro_stats.to_sector_stats(),
+            'micro_sectors': micro_stats,
+            'total_laps': int(rows.size),
+            'num_sectors': num_sectors
+        }
+
+    def get_micro_sector_stats(self, laps: List[Dict]) -> Optional[MicroSectorStats]:
+        """ライダー × セクター の統計行列を取得する
+
+        Args:
+            laps: ラップデータのリスト
+
+        Returns:
+            Optional[MicroSectorStats]: 統計行列（データがない場合はNone）
+        """
+        try:
+            if not laps:
+                return None
+            key = self._cache_key('micro_sectors', laps)
+            stats = self.cache.get(key)
+            if stats is None:
+                stats = compute_micro_sector_stats(self.get_lap_columns(laps))
+                self.cache.put(key, stats)
+            return stats
+        except Exception as e:
+            print(f"Error in get_micro_sector_stats: {str(e)}")
+            return None
+
     def _calculate_sector_stats(self, laps: List[Dict]) -> Dict:
         """セクターごとの統計を計算する"""
         try:
@@ -189,6 +379,34 @@ class LapTimeAnalyzer:
             return {}
 
     def calculate_moving_statistics(self, laps: List[Dict]) -> Dict:
+        """移動統計を計算する（同じデータ・設定の場合はキャッシュを返す）"""
+        key = self._cache_key('moving', laps, self.window_size)
+        result = self.cache.get(key)
+        if result is None:
+            result = self._calculate_moving_statistics(laps)
+            self.cache.put(key, result)
+        return copy.deepcopy(result)
+
+    def update_moving_statistics(self, laps: List[Dict], previous: Optional[Dict], riders: List[str]) -> Dict:
+        """指定したライダーの移動統計のみを再計算して結果を更新する
+
+        Args:
+            laps: 変更後のラップデータ
+            previous: 変更前のデータに対する移動統計（Noneの場合は全体を計算）
+            riders: 再計算するライダー
+
+        Returns:
+            Dict: calculate_moving_statisticsと同じ形式の結果
+        """
+        if previous is None:
+            return self.calculate_moving_statistics(laps)
+        riders = set(riders)
+        result = {rider: stats for rider, stats in previous.items() if rider not in riders}
+        result.update(self._calculate_moving_statistics([lap for lap in laps if lap.get('Rider') in riders]))
+        self.cache.put(self._cache_key('moving', laps, self.window_size), result)
+        return copy.deepcopy(result)
+
+    def _calculate_moving_statistics(self, laps: List[Dict]) -> Dict:
         """移動平均と標準偏差を含む詳細な統計情報を計算（既存の分析機能に影響を与えない追加機能）
 
         Args:
@@ -217,6 +435,9 @@ class LapTimeAnalyzer:
 
             # セクター数を取得
             num_sectors = self.config_manager.get_num_sectors()
+            if self.config_manager.is_micro_sector_mode():
+                # ミニセクターは配列の集約で計算する（全セクターが有効なラップのみ対象）
+                return recent_window_stats(self.get_lap_columns(laps), self.window_size)
             
             stats = {}
             riders = set(lap['Rider'] for lap in laps)
@@ -286,4 +507,575 @@ class LapTimeAnalyzer:
             size: ウィンドウサイズ（正の整数）
         """
         if size > 0:
-            self.window_size = size
\ No newline at end of file
+            self.window_size = size  # ウィンドウサイズはキャッシュキーに含まれる
+
+    def get_lap_columns(self, laps: List[Dict]) -> LapColumns:
+        """ラップデータを列指向形式に変換する
+
+        Args:
+            laps: ラップデータのリスト
+
+        Returns:
+            LapColumns: 列指向のラップデータ
+        """
+        key = self._cache_key('columns', laps)
+        columns = self.cache.get(key)
+        if columns is None:
+            columns = LapColumns.from_laps(laps, self.config_manager.get_num_sectors(), self.time_converter)
+            self.cache.put(key, columns)
+        return columns
+
+    def set_lap_columns(self, laps: List[Dict], columns: LapColumns) -> None:
+        """読み込み時に作成した列指向データをラップデータの変換結果として登録する（get_lap_columnsで再変換しない）
+
+        Args:
+            laps: ラップデータのリスト（columns.to_laps()で作成したもの）
+            columns: 列指向のラップデータ
+        """
+        self.cache.put(self._cache_key('columns', laps), columns)
+
+    def compare_riders(self, laps: List[Dict]) -> Optional[HeadToHeadMatrix]:
+        """全ライダーの総当たり比較行列を計算する
+
+        Args:
+            laps: ラップデータのリスト
+
+        Returns:
+            Optional[HeadToHeadMatrix]: 比較行列（データがない場合はNone）
+        """
+        try:
+            if not laps:
+                return None
+            key = self._cache_key('head_to_head', laps)
+            matrix = self.cache.get(key)
+            if matrix is None:
+                matrix = build_head_to_head(self.get_lap_columns(laps))
+                self.cache.put(key, matrix)
+            return matrix
+        except Exception as e:
+            print(f"Error in compare_riders: {str(e)}")
+            return None
+
+    def get_bootstrap_intervals(self, laps: List[Dict]) -> Optional[BootstrapIntervals]:
+        """ライダーごとのラップタイム・セクタータイム統計の信頼区間を取得する
+
+        リサンプル数と信頼水準は app_settings の bootstrap_resamples / bootstrap_confidence を使用します。
+
+        Args:
+            laps: ラップデータのリスト
+
+        Returns:
+            Optional[BootstrapIntervals]: 信頼区間（データがない場合はNone）
+        """
+        try:
+            if not laps:
+                return None
+            resamples, confidence = self._bootstrap_settings()
+            key = self._cache_key('bootstrap', laps, resamples, confidence)
+            intervals = self.cache.get(key)
+            if intervals is None:
+                intervals = bootstrap_intervals(self.get_lap_columns(laps), resamples, confidence)
+                self.cache.put(key, intervals)
+            return intervals
+        except Exception as e:
+            print(f"Error in get_bootstrap_intervals: {str(e)}")
+            return None
+
+    def update_bootstrap_intervals(self, laps: List[Dict], previous: Optional[BootstrapIntervals],
+                                   riders: List[str]) -> Optional[BootstrapIntervals]:
+        """変更されたライダーの信頼区間のみを計算し直す
+
+        Args:
+            laps: 変更後の全ラップデータ
+            previous: 変更前の信頼区間
+            riders: ラップが変更されたライダー（変更前後の両方を含む）
+
+        Returns:
+            Optional[BootstrapIntervals]: 更新後の信頼区間
+        """
+        try:
+            if previous is None or not laps:
+                return self.get_bootstrap_intervals(laps)
+            resamples, confidence = self._bootstrap_settings()
+            if (previous.resamples, previous.confidence) != (resamples, confidence):
+                return self.get_bootstrap_intervals(laps)
+            partial = bootstrap_intervals(self.get_lap_columns(laps), resamples, confidence, riders=riders)
+            intervals = previous.replace_riders(partial, riders)
+            self.cache.put(self._cache_key('bootstrap', laps, resamples, confidence), intervals)
+            return intervals
+        except Exception as e:
+            print(f"Error in update_bootstrap_intervals: {str(e)}")
+            return self.get_bootstrap_intervals(laps)
+
+    def _bootstrap_settings(self):
+        """ブートストラップの (リサンプル数, 信頼水準)"""
+        resamples = self.config_manager.get_setting("app_settings", "bootstrap_resamples") or 1000
+        confidence = self.config_manager.get_setting("app_settings", "bootstrap_confidence") or 0.95
+        return int(resamples), float(confidence)
+
+    def get_change_points(self, laps: List[Dict], penalty_scale: float = 1.0) -> Optional[ChangePointResult]:
+        """全ライダーのラップタイム・セクタータイムの系列からペースの変化点を検出する
+
+        Args:
+            laps: ラップデータのリスト
+            penalty_scale: ペナルティの倍率（大きいほど変化点が少なくなる）
+
+        Returns:
+            Optional[ChangePointResult]: ライダー × 系列ごとの区間と区間平均（データがない場合はNone）
+        """
+        try:
+            if not laps:
+                return None
+            key = self._cache_key('change_points', laps, penalty_scale)
+            result = self.cache.get(key)
+            if result is None:
+                result = detect_change_points(self.get_lap_columns(laps), penalty_scale)
+                self.cache.put(key, result)
+            return result
+        except Exception as e:
+            print(f"Error in get_change_points: {str(e)}")
+            return None
+
+    def get_quantile_sketches(self, laps: List[Dict]) -> Optional[LapQuantileSketches]:
+        """ライダー × 系列（ラップタイム・各セクター）ごとのパーセンタイルのスケッチを取得する
+
+        Args:
+            laps: ラップデータのリスト
+
+        Returns:
+            Optional[LapQuantileSketches]: スケッチ（データがない場合はNone）
+        """
+        try:
+            if not laps:
+                return None
+            key = self._cache_key('quantile_sketches', laps)
+            sketches = self.cache.get(key)
+            if sketches is None:
+                sketches = build_quantile_sketches(self.get_lap_columns(laps))
+                self.cache.put(key, sketches)
+            return sketches
+        except Exception as e:
+            print(f"Error in get_quantile_sketches: {str(e)}")
+            return None
+
+    def update_quantile_sketches(self, laps: List[Dict], previous: Optional[LapQuantileSketches],
+                                 riders: List[str]) -> Optional[LapQuantileSketches]:
+        """変更されたライダーのスケッチのみを作り直す
+
+        Args:
+            laps: 変更後の全ラップデータ
+            previous: 変更前のスケッチ（変更せずにコピーを更新する）
+            riders: ラップが変更されたライダー（変更前後の両方を含む）
+
+        Returns:
+            Optional[LapQuantileSketches]: 更新したスケッチ
+        """
+        try:
+            columns = self.get_lap_columns(laps) if laps else None
+            if previous is None or columns is None or len(previous.series) != columns.num_sectors + 1:
+                return self.get_quantile_sketches(laps)
+            sketches = previous.copy()
+            sketches.replace_riders(columns, riders)
+            self.cache.put(self._cache_key('quantile_sketches', laps), sketches)
+            return sketches
+        except Exception as e:
+            print(f"Error in update_quantile_sketches: {str(e)}")
+            return self.get_quantile_sketches(laps)
+
+    def append_to_quantile_sketches(self, laps: List[Dict],
+                                    previous: Optional[LapQuantileSketches]) -> Optional[LapQuantileSketches]:
+        """末尾に追加されたラップのみをスケッチに1件ずつ取り込む
+
+        previousがない場合やラップが減った・セクター数が変わった場合は作り直します。
+
+        Args:
+            laps: ラップを追加した後のラップデータ（previousを作成したラップデータの末尾に追加したもの）
+            previous: 追加前のスケッチ（変更せずにコピーを更新する）
+
+        Returns:
+            Optional[LapQuantileSketches]: 更新したスケッチ
+        """
+        try:
+            num_sectors = self.config_manager.get_num_sectors()
+            if (previous is None or not laps or len(laps) < previous.num_laps
+                    or len(previous.series) != num_sectors + 1):
+                return self.get_quantile_sketches(laps)
+            sketches = previous.copy()
+            appended = LapColumns.from_laps(laps[previous.num_laps:], num_sectors, self.time_converter)
+            for row in range(len(appended)):
+                times = {'LapTime': appended.lap_times[row]}
+                for i in range(num_sectors):
+                    times[f'Sector{i + 1}'] = appended.sector_times[row, i]
+                sketches.add_lap(appended.riders[appended.rider_codes[row]], times)
+            return sketches
+        except Exception as e:
+            print(f"Error in append_to_quantile_sketches: {str(e)}")
+            return self.get_quantile_sketches(laps)
+
+    def get_distribution_stats(self, laps: List[Dict]) -> Optional[DistributionStats]:
+        """ライダーごとのラップタイム・セクタータイムの分布（分位点と密度）を取得する
+
+        Args:
+            laps: ラップデータのリスト
+
+        Returns:
+            Optional[DistributionStats]: 分布（データがない場合はNone）
+        """
+        try:
+            if not laps:
+                return None
+            key = self._cache_key('distribution', laps)
+            stats = self.cache.get(key)
+            if stats is None:
+                stats = compute_distribution_stats(self.get_lap_columns(laps))
+                self.cache.put(key, stats)
+            return stats
+        except Exception as e:
+            print(f"Error in get_distribution_stats: {str(e)}")
+            return None
+
+    def get_leaderboard(self, laps: List[Dict], expression: str = '') -> Optional[LeaderboardIndex]:
+        """全体・ライダー別・タイヤ別・セクター別の速いラップ上位K件を取得する
+
+        Args:
+            laps: ラップデータのリスト
+            expression: 対象とするラップの条件式（インデックスはlaps内の位置のまま）
+
+        Returns:
+            Optional[LeaderboardIndex]: リーダーボード（データがない場合はNone）
+        """
+        try:
+            if not laps:
+                return None
+            key = self._cache_key('leaderboard', laps, expression)
+            leaderboard = self.cache.get(key)
+            if leaderboard is None:
+                mask = self.get_filter_mask(laps, expression) if expression else None
+                leaderboard = build_leaderboard(self.get_lap_columns(laps), mask=mask)
+                self.cache.put(key, leaderboard)
+            return leaderboard
+        except Exception as e:
+            print(f"Error in get_leaderboard: {str(e)}")
+            return None
+
+    def append_to_leaderboard(self, laps: List[Dict], previous: Optional[LeaderboardIndex],
+                              expression: str = '') -> Optional[LeaderboardIndex]:
+        """末尾に追加されたラップのみを取り込んでリーダーボードを更新する
+
+        previousが取り込んだラップより後ろのラップのみを解析し、1ラップあたりO(log K)で更新するため、
+        ライブ計測でラップが追加されるたびに呼び出せます。
+        previousがない場合やラップが減った・セクター数が変わった場合は作り直します。
+        条件式で絞り込んでいる場合も、outlier のように他のラップに依存する条件があるため作り直します。
+
+        Args:
+            laps: ラップを追加した後のラップデータ（previousを作成したラップデータの末尾に追加したもの）
+            previous: 追加前のリーダーボード（変更せずにコピーを更新する）
+            expression: 対象とするラップの条件式
+
+        Returns:
+            Optional[LeaderboardIndex]: 更新したリーダーボード
+        """
+        try:
+            num_sectors = self.config_manager.get_num_sectors()
+            if (expression or previous is None or previous.num_laps > len(laps) or
+                    previous.num_sectors != num_sectors):
+                return self.get_leaderboard(laps, expression)
+            leaderboard = previous.copy()
+            appended = LapColumns.from_laps(laps[previous.num_laps:], num_sectors, self.time_converter)
+            leaderboard.add_columns(appended, previous.num_laps)
+            return leaderboard
+        except Exception as e:
+            print(f"Error in append_to_leaderboard: {str(e)}")
+            return self.get_leaderboard(laps, expression)
+
+    def update_leaderboard(self, laps: List[Dict], previous: Optional[LeaderboardIndex],
+                           rows: List[int]) -> Optional[LeaderboardIndex]:
+        """編集されたラップのみを置き換えてリーダーボードを更新する
+
+        置き換えるラップを保持していたリーダーボードのみ選び直し、それ以外には変更後の値を追加します。
+        previousがない場合やラップ数・セクター数が変わった場合は作り直します（絞り込み中は使わない）。
+
+        Args:
+            laps: 変更後のラップデータ
+            previous: 変更前のリーダーボード（変更せずにコピーを更新する）
+            rows: 編集されたラップのインデックス
+
+        Returns:
+            Optional[LeaderboardIndex]: 更新したリーダーボード
+        """
+        try:
+            if (previous is None or previous.num_laps != len(laps) or
+                    previous.num_sectors != self.config_manager.get_num_sectors()):
+                return self.get_leaderboard(laps)
+            leaderboard = previous.copy()
+            leaderboard.replace_laps(self.get_lap_columns(laps), rows)
+            self.cache.put(self._cache_key('leaderboard', laps, ''), leaderboard)
+            return leaderboard
+        except Exception as e:
+            print(f"Error in update_leaderboard: {str(e)}")
+            return self.get_leaderboard(laps)
+
+    def get_filter_mask(self, laps: List[Dict], expression: str) -> np.ndarray:
+        """条件式に一致するラップのブールマスクを取得する
+
+        条件式のコンパイル結果は条件式ごと、マスクは (ラップデータ, 条件式) ごとにキャッシュします。
+        outlier などのフラグは同じラップデータの条件式間で共有します。
+
+        Args:
+            laps: ラップデータのリスト
+            expression: 条件式（空の場合は全ラップ）
+
+        Returns:
+            np.ndarray: ラップ数の長さのブールマスク
+
+        Raises:
+            ValueError: 条件式が解析・評価できない場合
+        """
+        compiled = compile_filter(expression)
+        if compiled.is_empty or not laps:
+            return np.ones(len(laps), dtype=bool)
+        key = self._cache_key('filter_mask', laps, compiled.expression)
+        mask = self.cache.get(key)
+        if mask is None:
+            context_key = self._cache_key('filter_context', laps)
+            context = self.cache.get(context_key)
+            if context is None:
+                context = FilterContext(self.get_lap_columns(laps))
+                self.cache.put(context_key, context)
+            mask = compiled.mask(context.columns, context)
+            mask.flags.writeable = False  # キャッシュしたマスクが変更されないようにする
+            self.cache.put(key, mask)
+        return mask
+
+    def filter_laps(self, laps: List[Dict], expression: str) -> List[Dict]:
+        """条件式に一致するラップのみのラップデータを取得する（条件式が空の場合はlapsをそのまま返す）
+
+        Raises:
+            ValueError: 条件式が解析・評価できない場合
+        """
+        if compile_filter(expression).is_empty:
+            return laps
+        key = self._cache_key('filtered_laps', laps, expression.strip())
+        filtered = self.cache.get(key)
+        if filtered is None:
+            mask = self.get_filter_mask(laps, expression)
+            rows = np.flatnonzero(mask)
+            filtered = [laps[i] for i in rows]
+            self.cache.put(key, filtered)
+            # 絞り込んだラップの列指向データは元の列指向データから行を選んで作る（時間文字列を再変換しない）
+            self.set_lap_columns(filtered, self.get_lap_columns(laps).take(rows))
+        return filtered
+
+    def get_pivot(self, laps: List[Dict], keys: List[str],
+                  temp_bin: float = DEFAULT_TEMP_BIN) -> Optional[PivotTable]:
+        """項目の組み合わせごとのラップタイムの集計（ピボット）を取得する
+
+        Args:
+            laps: ラップデータのリスト
+            keys: グループ化の項目（app.pivot.GROUP_KEYSのいずれか）
+            temp_bin: 路面温度帯の幅（℃）
+
+        Returns:
+            Optional[PivotTable]: 集計結果（データがない場合はNone）
+        """
+        try:
+            if not laps:
+                return None
+            key = self._cache_key('pivot', laps, tuple(keys), float(temp_bin))
+            pivot = self.cache.get(key)
+            if pivot is None:
+                pivot = build_pivot(self.get_lap_columns(laps), keys, temp_bin)
+                self.cache.put(key, pivot)
+            return pivot
+        except Exception as e:
+            print(f"Error in get_pivot: {str(e)}")
+            return None
+
+    def get_consistency_scores(self, laps: List[Dict]) -> Optional[ConsistencyScores]:
+        """ライダーごとの安定性のスコア（一貫性指数・ベスト付近の割合・セクターのばらつきの順位）を取得する
+
+        ウィンドウのラップ数と範囲は app_settings の consistency_window / consistency_within_percent を使用します。
+
+        Args:
+            laps: ラップデータのリスト
+
+        Returns:
+            Optional[ConsistencyScores]: スコア（データがない場合はNone）
+        """
+        try:
+            if not laps:
+                return None
+            window, within_percent = self._consistency_settings()
+            key = self._cache_key('consistency', laps, window, within_percent)
+            scores = self.cache.get(key)
+            if scores is None:
+                scores = build_consistency_scores(self.get_lap_columns(laps), window, within_percent)
+                self.cache.put(key, scores)
+            return scores
+        except Exception as e:
+            print(f"Error in get_consistency_scores: {str(e)}")
+            return None
+
+    def append_to_consistency(self, laps: List[Dict],
+                              previous: Optional[ConsistencyScores]) -> Optional[ConsistencyScores]:
+        """末尾に追加されたラップのみを取り込んで安定性のスコアを更新する
+
+        追加されたラップのライダーの累積値のみを更新するため、ライブ計測でラップが追加されるたびに
+        呼び出せます。previousがない場合やラップが減った・
+        セクター数や設定が変わった場合は作り直します。
+
+        Args:
+            laps: ラップを追加した後のラップデータ（previousを作成したラップデータの末尾に追加したもの）
+            previous: 追加前のスコア（変更せずにコピーを更新する）
+
+        Returns:
+            Optional[ConsistencyScores]: 更新したスコア
+        """
+        try:
+            num_sectors = self.config_manager.get_num_sectors()
+            if (previous is None or not laps or len(laps) < previous.num_laps
+                    or previous.num_sectors != num_sectors
+                    or (previous.window, previous.within_percent) != self._consistency_settings()):
+                return self.get_consistency_scores(laps)
+            scores = previous.copy()
+            scores.add_columns(LapColumns.from_laps(laps[previous.num_laps:], num_sectors, self.time_converter))
+            return scores
+        except Exception as e:
+            print(f"Error in append_to_consistency: {str(e)}")
+            return self.get_consistency_scores(laps)
+
+    def update_consistency(self, laps: List[Dict], previous: Optional[ConsistencyScores],
+                           riders: List[str]) -> Optional[ConsistencyScores]:
+        """変更されたライダーの安定性のスコアのみを計算し直す
+
+        Args:
+            laps: 変更後の全ラップデータ（ラップ数は変わらないこと）
+            previous: 変更前のスコア（変更せずにコピーを更新する）
+            riders: ラップが変更されたライダー（変更前後の両方を含む）
+
+        Returns:
+            Optional[ConsistencyScores]: 更新したスコア
+        """
+        try:
+            if (previous is None or not laps or previous.num_laps != len(laps)
+                    or previous.num_sectors != self.config_manager.get_num_sectors()
+                    or (previous.window, previous.within_percent) != self._consistency_settings()):
+                return self.get_consistency_scores(laps)
+            scores = previous.copy()
+            scores.replace_riders(self.get_lap_columns(laps), riders)
+            self.cache.put(self._cache_key('consistency', laps, previous.window, previous.within_percent), scores)
+            return scores
+        except Exception as e:
+            print(f"Error in update_consistency: {str(e)}")
+            return self.get_consistency_scores(laps)
+
+    def _consistency_settings(self):
+        """一貫性スコアの (ウィンドウのラップ数, ベスト付近とみなす範囲%)"""
+        window = self.config_manager.get_setting("app_settings", "consistency_window") or 5
+        within_percent = self.config_manager.get_setting("app_settings", "consistency_within_percent") or 1.0
+        return int(window), float(within_percent)
+
+    def merge_session_sketches(self, sessions: List[List[Dict]], laps: List[Dict]) -> Optional[LapQuantileSketches]:
+        """複数セッションのスケッチをマージし、連結したラップデータのスケッチとしてキャッシュする
+
+        セッションごとのスケッチはキャッシュされるため、セッションの組み合わせを変えても
+        各セッションのラップを読み直さずに済みます。
+
+        Args:
+            sessions: セッションごとのラップデータのリスト
+            laps: sessionsを連結したラップデータ（以降の解析で使うリスト）
+
+        Returns:
+            Optional[LapQuantileSketches]: マージしたスケッチ（データがない場合はNone）
+        """
+        try:
+            merged = None
+            for session_laps in sessions:
+                sketches = self.get_quantile_sketches(session_laps)
+                if sketches is None:
+                    continue
+                if merged is None:
+                    merged = LapQuantileSketches(sketches.series, sketches.k)
+                merged.merge(sketches)
+            if merged is not None:
+                self.cache.put(self._cache_key('quantile_sketches', laps), merged)
+            return merged
+        except Exception as e:
+            print(f"Error in merge_session_sketches: {str(e)}")
+            return None
+
+    def get_condition_model(self, laps: List[Dict]) -> Optional[ConditionModel]:
+        """路面温度・天候・タイヤがラップタイムに与える影響を推定する
+
+        Args:
+            laps: ラップデータのリスト
+
+        Returns:
+            Optional[ConditionModel]: 推定したモデル（有効なラップがない場合はNone）
+        """
+        try:
+            if not laps:
+                return None
+            key = self._cache_key('condition_model', laps)
+            model = self.cache.get(key)
+            if model is None:
+                model = fit_condition_model(self.get_lap_columns(laps))
+                self.cache.put(key, model)
+            return model
+        except Exception as e:
+            print(f"Error in get_condition_model: {str(e)}")
+            return None
+
+    def get_normalized_laps(self, laps: List[Dict]) -> List[Dict]:
+        """ラップタイム・セクタータイムを基準条件に補正したラップデータを取得する
+
+        Args:
+            laps: ラップデータのリスト
+
+        Returns:
+            List[Dict]: 補正後のラップデータ（モデルが推定できない場合は元のラップデータ）
+        """
+        try:
+            model = self.get_condition_model(laps)
+            if model is None:
+                return laps
+            key = self._cache_key('normalized_laps', laps)
+            normalized = self.cache.get(key)
+            if normalized is None:
+                normalized, columns = normalize_laps(laps, self.get_lap_columns(laps), model, self.time_converter)
+                self.cache.put(key, normalized)
+                # 補正後の列指向データは補正した配列から作ったものを使う（時間文字列を再変換しない）
+                self.set_lap_columns(normalized, columns)
+            return normalized
+        except Exception as e:
+            print(f"Error in get_normalized_laps: {str(e)}")
+            return laps
+
+    def prepare_laps(self, laps: List[Dict]) -> List[Dict]:
+        """解析に使うラップデータ（app_settings の normalize_conditions が有効な場合は条件補正後のデータ）"""
+        if laps and self.config_manager.get_setting("app_settings", "normalize_conditions"):
+            return self.get_normalized_laps(laps)
+        return laps
+
+    def get_similarity_index(self, laps: List[Dict], include_conditions: bool = False) -> Optional[LapSimilarityIndex]:
+        """似たラップを検索するための近傍探索インデックスを取得する
+
+        Args:
+            laps: ラップデータのリスト
+            include_conditions: 路面温度・タイヤ・天候を特徴量に含めるかどうか
+
+        Returns:
+            Optional[LapSimilarityIndex]: インデックス（有効なラップがない場合はNone）
+        """
+        try:
+            if not laps:
+                return None
+            key = self._cache_key('similarity', laps, include_conditions)
+            index = self.cache.get(key)
+            if index is None:
+                index = build_similarity_index(self.get_lap_columns(laps), include_conditions)
+                self.cache.put(key, index)
+            return index
+        except Exception as e:
+            print(f"Error in get_similarity_index: {str(e)}")
+            return None
@@ -0,0 +1,169 @@
+"""
+Bootstrap Module
+ブートストラップ法（復元抽出の繰り返し）で、ライダーごとのラップタイム・セクタータイム統計の
+信頼区間を求めるモジュールです。
+"""
+import os
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional, Sequence, Tuple
+from app.lap_columns import LapColumns
+
+# 1チャンクで扱う抽出値の数の上限（リサンプル数 × ラップ数 × (セクター数 + 1)）
+_CHUNK_ELEMENTS = 4_000_000
+
+# 区間の列: 推定値, 下限, 上限
+ESTIMATE, LOW, HIGH = 0, 1, 2
+
+
+class BootstrapIntervals:
+    """ライダーごとの統計量の信頼区間
+
+    mean, median, best は (ライダー数, 3) の配列で、各行は [推定値, 下限, 上限] です。
+    sector_means は (ライダー数, セクター数, 3) の配列です。
+    有効なラップが2周未満のライダーの区間はNaNです。
+    """
+
+    STATISTICS = ('mean', 'median', 'best')
+
+    def __init__(self, riders: List[str], counts: np.ndarray, mean: np.ndarray, median: np.ndarray,
+                 best: np.ndarray, sector_means: np.ndarray, confidence: float, resamples: int):
+        self.riders = list(riders)
+        self.counts = counts
+        self.mean = mean
+        self.median = median
+        self.best = best
+        self.sector_means = sector_means
+        self.confidence = confidence
+        self.resamples = resamples
+        self._rider_lookup = {name: i for i, name in enumerate(self.riders)}
+
+    def interval(self, rider: str, statistic: str) -> Optional[Tuple[float, float, float]]:
+        """ライダーの統計量の (推定値, 下限, 上限)（ライダーがいない場合はNone）"""
+        row = self._rider_lookup.get(rider)
+        if row is None:
+            return None
+        return tuple(float(value) for value in getattr(self, statistic)[row])
+
+    def replace_riders(self, partial: 'BootstrapIntervals', riders: Iterable[str]) -> 'BootstrapIntervals':
+        """指定ライダーの行をpartialの行で置き換えた信頼区間を返す
+
+        差分再解析で、変更されたライダーの区間のみを計算し直した場合に使用します。
+
+        Args:
+            partial: 指定ライダーについて計算した信頼区間
+            riders: 置き換えるライダー（partialでラップがないライダーは削除される）
+        """
+        riders = set(riders)
+        rows = {rider: (self, i) for i, rider in enumerate(self.riders) if rider not in riders}
+        rows.update({rider: (partial, i) for i, rider in enumerate(partial.riders)
+                     if rider in riders and partial.counts[i] > 0})
+        names = sorted(rows)
+
+        def stack(attr, shape):
+            if not names:
+                return np.zeros((0,) + shape)
+            return np.stack([getattr(source, attr)[i] for source, i in (rows[name] for name in names)])
+
+        counts = np.array([rows[name][0].counts[rows[name][1]] for name in names], dtype=np.int64)
+        return BootstrapIntervals(names, counts, stack('mean', (3,)), stack('median', (3,)), stack('best', (3,)),
+                                  stack('sector_means', self.sector_means.shape[1:]),
+                                  self.confidence, self.resamples)
+
+    def sector_errors(self, rider: str) -> Optional[np.ndarray]:
+        """セクター平均の推定値から下限・上限までの距離（matplotlibのyerr形式, (2, セクター数)）"""
+        row = self._rider_lookup.get(rider)
+        if row is None:
+            return None
+        values = self.sector_means[row]
+        return np.vstack((values[:, ESTIMATE] - values[:, LOW], values[:, HIGH] - values[:, ESTIMATE]))
+
+
+def bootstrap_intervals(columns: LapColumns, resamples: int = 1000, confidence: float = 0.95,
+                        seed: Optional[int] = 0, workers: Optional[int] = None,
+                        riders: Optional[Sequence[str]] = None) -> BootstrapIntervals:
+    """全ライダーの平均・中央値・ベスト・セクター平均の信頼区間を求める
+
+    ライダーごとに (リサンプル数, ラップ数) のインデックス行列を1つ作り、同じ行列から
+    全ての統計量を計算します。メモリ使用量を抑えるためリサンプルはチャンクに分け、
+    ライダーはスレッドプールで並列に処理します（NumPyの演算中はGILが解放される）。
+    区間はパーセンタイル法で求めます。
+
+    Args:
+        columns: 列指向のラップデータ（ラップタイムと全セクタータイムが有効なラップのみ使用）
+        resamples: リサンプル数
+        confidence: 信頼水準（0〜1）
+        seed: 乱数のシード（ライダーごとに独立な乱数列を作る。Noneの場合は毎回異なる結果）
+        workers: スレッド数（Noneの場合はCPUコア数）
+        riders: 計算するライダー（省略時は全ライダー。それ以外のライダーの区間はNaN）
+
+    Returns:
+        BootstrapIntervals: 信頼区間
+    """
+    num_riders, num_sectors = columns.num_riders, columns.num_sectors
+    valid = columns.valid
+    alpha = (1.0 - confidence) / 2.0
+    quantiles = np.array([alpha, 1.0 - alpha])
+    seeds = np.random.SeedSequence(seed).spawn(num_riders)
+
+    counts = np.zeros(num_riders, dtype=np.int64)
+    mean = np.full((num_riders, 3), np.nan)
+    median = np.full((num_riders, 3), np.nan)
+    best = np.full((num_riders, 3), np.nan)
+    sector_means = np.full((num_riders, num_sectors, 3), np.nan)
+
+    def run(code: int) -> None:
+        rows = np.flatnonzero(valid & (columns.rider_codes == code))
+        counts[code] = rows.size
+        if rows.size == 0:
+            return
+        lap_times = columns.lap_times[rows]
+        sectors = columns.sector_times[rows]
+        mean[code, ESTIMATE] = lap_times.mean()
+        median[code, ESTIMATE] = np.median(lap_times)
+        best[code, ESTIMATE] = lap_times.min()
+        sector_means[code, :, ESTIMATE] = sectors.mean(axis=0)
+        if rows.size < 2:
+            return
+        samples = _resample_rider(lap_times, sectors, resamples, np.random.default_rng(seeds[code]))
+        mean[code, LOW:] = np.quantile(samples['mean'], quantiles)
+        median[code, LOW:] = np.quantile(samples['median'], quantiles)
+        best[code, LOW:] = np.quantile(samples['best'], quantiles)
+        sector_means[code, :, LOW:] = np.quantile(samples['sector_means'], quantiles, axis=0).T
+
+    if riders is None:
+        codes = list(range(num_riders))
+    else:
+        codes = [code for code in map(columns.rider_index, riders) if code is not None]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(codes) <= 1:
+        for code in codes:
+            run(code)
+    else:
+        with ThreadPoolExecutor(max_workers=min(workers, len(codes))) as executor:
+            list(executor.map(run, codes))
+    return BootstrapIntervals(columns.riders, counts, mean, median, best, sector_means, confidence, resamples)
+
+
+def _resample_rider(lap_times: np.ndarray, sectors: np.ndarray, resamples: int,
+                    rng: np.random.Generator) -> dict:
+    """1ライダー分のリサンプルを行い、統計量ごとのブートストラップ分布を返す"""
+    count = lap_times.size
+    chunk = max(1, _CHUNK_ELEMENTS // (count * (sectors.shape[1] + 1)))
+    samples = {
+        'mean': np.empty(resamples),
+        'median': np.empty(resamples),
+        'best': np.empty(resamples),
+        'sector_means': np.empty((resamples, sectors.shape[1])),
+    }
+    for start in range(0, resamples, chunk):
+        stop = min(start + chunk, resamples)
+        # (リサンプル数, ラップ数) のインデックス行列から全ての統計量を求める
+        indices = rng.integers(0, count, size=(stop - start, count))
+        values = lap_times[indices]
+        samples['mean'][start:stop] = values.mean(axis=1)
+        samples['median'][start:stop] = np.median(values, axis=1)
+        samples['best'][start:stop] = values.min(axis=1)
+        if sectors.shape[1]:
+            samples['sector_means'][start:stop] = sectors[indices].mean(axis=1)
+    return samples
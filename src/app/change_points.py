@@ -0,0 +1,164 @@
+"""
+Change Points Module
+ラップタイム・セクタータイムの系列から、ペースが変わった位置（セッティング変更・雨・タイヤの垂れなど）を
+検出するモジュールです。
+"""
+import numpy as np
+from typing import Dict, List, Optional
+from app.lap_columns import LapColumns
+
+# 区間の最小ラップ数（1周だけの外れ値を区間として切り出さないため）
+DEFAULT_MIN_SIZE = 3
+
+# 標準偏差の頑健な推定に使う係数（正規分布でMAD / 0.6745 = 標準偏差）
+_MAD_SCALE = 0.6745
+
+
+class Segment:
+    """ペースが一定とみなせる区間"""
+
+    def __init__(self, first_lap: int, last_lap: int, mean: float, count: int):
+        self.first_lap = int(first_lap)
+        self.last_lap = int(last_lap)
+        self.mean = float(mean)
+        self.count = int(count)
+
+    def to_dict(self) -> Dict:
+        return {'first_lap': self.first_lap, 'last_lap': self.last_lap, 'mean': self.mean, 'count': self.count}
+
+    def __repr__(self) -> str:
+        return f"Segment({self.first_lap}-{self.last_lap}, mean={self.mean:.3f}, n={self.count})"
+
+
+class ChangePointResult:
+    """ライダー × 系列（LapTime, Sector1..N）ごとの区間"""
+
+    def __init__(self, segments: Dict[str, Dict[str, List[Segment]]]):
+        self.segments = segments
+
+    @property
+    def riders(self) -> List[str]:
+        return list(self.segments)
+
+    def rider_segments(self, rider: str, series: str = 'LapTime') -> List[Segment]:
+        """ライダーの系列の区間（データがない場合は空のリスト）"""
+        return self.segments.get(rider, {}).get(series, [])
+
+    def segment_means(self, rider: str, series: str = 'LapTime') -> List[float]:
+        """区間ごとの平均タイム"""
+        return [segment.mean for segment in self.rider_segments(rider, series)]
+
+    def change_laps(self, rider: str, series: str = 'LapTime') -> List[int]:
+        """ペースが変わったラップ番号（新しい区間の最初のラップ）"""
+        return [segment.first_lap for segment in self.rider_segments(rider, series)[1:]]
+
+
+def robust_sigma(values: np.ndarray) -> float:
+    """隣接する値の差のMADから標準偏差を推定する（ペースの段差の影響を受けにくい）"""
+    if values.size < 3:
+        return 0.0
+    diffs = np.diff(values)
+    return float(np.median(np.abs(diffs - np.median(diffs))) / _MAD_SCALE / np.sqrt(2.0))
+
+
+def binary_segmentation(values: np.ndarray, penalty: float, min_size: int = DEFAULT_MIN_SIZE) -> List[int]:
+    """平均の変化点を二分割法で検出する
+
+    区間のコストは二乗誤差の和で、累積和から O(1) で求めます。各区間について全ての分割位置の
+    コストの減少量をまとめて計算し、最大の減少量がpenaltyを超える場合に分割します。
+    分割の深さは通常 O(log n) なので、全体で O(n log n) です。
+
+    Args:
+        values: 時系列の値（NaNを含まないこと）
+        penalty: 変化点1つあたりのペナルティ（二乗誤差の単位）
+        min_size: 区間の最小の長さ
+
+    Returns:
+        List[int]: 変化点の位置（新しい区間の先頭のインデックス）の昇順のリスト
+    """
+    count = values.size
+    if count < 2 * min_size:
+        return []
+    # 桁落ちを防ぐため中央値を引いてから累積和をとる
+    centered = values - np.median(values)
+    s1 = np.concatenate(([0.0], np.cumsum(centered)))
+    s2 = np.concatenate(([0.0], np.cumsum(centered * centered)))
+
+    def cost(start, stop):
+        return s2[stop] - s2[start] - (s1[stop] - s1[start]) ** 2 / (stop - start)
+
+    change_points = []
+    stack = [(0, count)]
+    while stack:
+        start, stop = stack.pop()
+        if stop - start < 2 * min_size:
+            continue
+        splits = np.arange(start + min_size, stop - min_size + 1)
+        gains = cost(start, stop) - cost(start, splits) - cost(splits, stop)
+        best = int(np.argmax(gains))
+        if gains[best] > penalty:
+            split = int(splits[best])
+            change_points.append(split)
+            stack.append((start, split))
+            stack.append((split, stop))
+    return sorted(change_points)
+
+
+def series_segments(lap_numbers: np.ndarray, values: np.ndarray, penalty_scale: float = 1.0,
+                    min_size: int = DEFAULT_MIN_SIZE) -> List[Segment]:
+    """ラップ番号順の1系列を区間に分割する
+
+    ペナルティはBICに相当する 2 * σ^2 * log(n) に penalty_scale を掛けたものです（σは頑健な推定値）。
+    NaNのラップは除外して検出します。
+
+    Args:
+        lap_numbers: ラップ番号（昇順）
+        values: ラップごとの値
+        penalty_scale: ペナルティの倍率（大きいほど変化点が少なくなる）
+        min_size: 区間の最小ラップ数
+
+    Returns:
+        List[Segment]: 区間のリスト
+    """
+    finite = np.isfinite(values)
+    laps, values = lap_numbers[finite], values[finite]
+    if not values.size:
+        return []
+    sigma = robust_sigma(values)
+    penalty = penalty_scale * 2.0 * max(sigma, 1e-6) ** 2 * np.log(max(values.size, 2))
+    bounds = [0] + binary_segmentation(values, penalty, min_size) + [values.size]
+    sums = np.add.reduceat(values, bounds[:-1])
+    return [Segment(laps[start], laps[stop - 1], total / (stop - start), stop - start)
+            for start, stop, total in zip(bounds[:-1], bounds[1:], sums)]
+
+
+def detect_change_points(columns: LapColumns, penalty_scale: float = 1.0, min_size: int = DEFAULT_MIN_SIZE,
+                         series: Optional[List[str]] = None) -> ChangePointResult:
+    """全ライダーのラップタイムと各セクタータイムの系列から変化点を検出する
+
+    Args:
+        columns: 列指向のラップデータ
+        penalty_scale: ペナルティの倍率
+        min_size: 区間の最小ラップ数
+        series: 対象の系列名（省略時は 'LapTime' と全セクター）
+
+    Returns:
+        ChangePointResult: ライダー × 系列ごとの区間
+    """
+    all_series = {'LapTime': columns.lap_times}
+    all_series.update({f'Sector{i + 1}': columns.sector_times[:, i] for i in range(columns.num_sectors)})
+    names = series if series is not None else list(all_series)
+
+    # ライダーごとにラップ番号順に並べる
+    order = np.lexsort((columns.lap_numbers, columns.rider_codes))
+    codes = columns.rider_codes[order]
+    bounds = np.flatnonzero(np.diff(codes)) + 1
+    segments = {}
+    for rows in np.split(order, bounds):
+        if not rows.size:
+            continue
+        rider = columns.riders[columns.rider_codes[rows[0]]]
+        lap_numbers = columns.lap_numbers[rows]
+        segments[rider] = {name: series_segments(lap_numbers, all_series[name][rows], penalty_scale, min_size)
+                           for name in names if name in all_series}
+    return ChangePointResult(segments)
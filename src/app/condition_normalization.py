@@ -0,0 +1,239 @@
+"""
+Condition Normalization Module
+路面温度・天候・タイヤの影響を最小二乗法で推定し、ラップタイムを基準条件に補正するモジュールです。
+"""
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+from utils.time_converter import TimeConverter
+from app.lap_columns import LapColumns, format_seconds
+
+# 頑健な標準偏差の推定に使う係数（正規分布でMAD × 1.4826 = 標準偏差）
+_MAD_SCALE = 1.4826
+
+
+class ConditionModel:
+    """ラップタイム ~ 路面温度 + 天候 + タイヤ + ライダー の線形モデル
+
+    天候・タイヤの効果は最も多いカテゴリ（基準）との差、路面温度の効果は1℃あたりの秒数です。
+    ライダーの効果は条件の影響とライダーの速さを分けるためにのみ使い、補正には使いません。
+    """
+
+    def __init__(self, riders: List[str], rider_effects: np.ndarray,
+                 tire_effects: Dict[str, float], weather_effects: Dict[str, float],
+                 temp_coefficient: float, reference_temp: float,
+                 reference_tire: str, reference_weather: str,
+                 residual_std: float, num_laps: int):
+        self.riders = list(riders)
+        self.rider_effects = rider_effects
+        self.tire_effects = tire_effects
+        self.weather_effects = weather_effects
+        self.temp_coefficient = temp_coefficient
+        self.reference_temp = reference_temp
+        self.reference_tire = reference_tire
+        self.reference_weather = reference_weather
+        self.residual_std = residual_std
+        self.num_laps = num_laps
+
+    def condition_offsets(self, columns: LapColumns) -> np.ndarray:
+        """各ラップの条件による基準条件からのタイム差（秒）
+
+        モデルにないタイヤ・天候と、路面温度が不明なラップは補正しません（差は0）。
+        """
+        tires = np.array([self.tire_effects.get(name, 0.0) for name in columns.tires])
+        weathers = np.array([self.weather_effects.get(name, 0.0) for name in columns.weathers])
+        offsets = np.zeros(len(columns))
+        if tires.size:
+            offsets += tires[columns.tire_codes]
+        if weathers.size:
+            offsets += weathers[columns.weather_codes]
+        if np.isfinite(self.reference_temp):
+            temp_delta = columns.track_temps - self.reference_temp
+            offsets += np.where(np.isfinite(temp_delta), self.temp_coefficient * temp_delta, 0.0)
+        return offsets
+
+    def corrected_times(self, columns: LapColumns) -> np.ndarray:
+        """基準条件に補正したラップタイム"""
+        return columns.lap_times - self.condition_offsets(columns)
+
+    def corrected_sector_times(self, columns: LapColumns) -> np.ndarray:
+        """基準条件に補正したセクタータイム（ラップタイムの補正比率で各セクターを伸縮する）"""
+        lap_times = columns.lap_times
+        corrected = self.corrected_times(columns)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            ratio = np.where(lap_times > 0, corrected / lap_times, 1.0)
+        ratio = np.where(np.isfinite(ratio), ratio, 1.0)
+        return columns.sector_times * ratio[:, None]
+
+    def summary(self) -> List[Tuple[str, float]]:
+        """条件ごとの効果（項目名, 秒）のリスト"""
+        terms = []
+        if np.isfinite(self.reference_temp):
+            terms.append((f"Track Temp (per °C, ref {self.reference_temp:.1f})", self.temp_coefficient))
+        terms.extend((f"Weather: {name}", effect) for name, effect in sorted(self.weather_effects.items())
+                     if name != self.reference_weather)
+        terms.extend((f"Tire: {name}", effect) for name, effect in sorted(self.tire_effects.items())
+                     if name != self.reference_tire)
+        return terms
+
+
+def fit_condition_model(columns: LapColumns, outlier_sigma: Optional[float] = 3.0,
+                        reference_temp: Optional[float] = None) -> Optional[ConditionModel]:
+    """全ラップから条件の効果を推定する
+
+    ライダー・タイヤ・天候のダミー変数と路面温度を説明変数とする最小二乗法を、正規方程式
+    (X^T X) b = X^T y で解きます。ダミー変数の積和はbincountでまとめて求めるため、計画行列を作らず
+    O(ラップ数) で集計でき、解く連立方程式はカテゴリ数の大きさで済みます。
+    外れ値（ピットイン・転倒など）の影響を避けるため、残差が大きいラップを除いてもう一度推定します。
+
+    Args:
+        columns: 列指向のラップデータ
+        outlier_sigma: 外れ値とみなす残差（頑健な標準偏差の倍数、Noneの場合は除外しない）
+        reference_temp: 補正の基準とする路面温度（省略時は推定に使ったラップの平均）
+
+    Returns:
+        Optional[ConditionModel]: 推定したモデル（有効なラップがない場合はNone）
+    """
+    y = columns.lap_times
+    used = np.isfinite(y)
+    if not used.any():
+        return None
+
+    model = _fit(columns, used, reference_temp)
+    if outlier_sigma is not None:
+        residuals = y - model.rider_effects[columns.rider_codes] - model.condition_offsets(columns)
+        sigma = _MAD_SCALE * np.median(np.abs(residuals[used] - np.median(residuals[used])))
+        if sigma > 0:
+            inliers = used & (np.abs(residuals) <= outlier_sigma * sigma)
+            if inliers.any() and inliers.sum() < used.sum():
+                model = _fit(columns, inliers, reference_temp)
+    return model
+
+
+def _fit(columns: LapColumns, used: np.ndarray, reference_temp: Optional[float]) -> ConditionModel:
+    """usedのラップで正規方程式を組み立てて解く"""
+    y = columns.lap_times[used]
+    riders, tires, weathers = columns.rider_codes[used], columns.tire_codes[used], columns.weather_codes[used]
+    temps = columns.track_temps[used]
+
+    # 基準は最も多いタイヤ・天候（そのダミー変数は除く）
+    reference_tire = int(np.argmax(np.bincount(tires, minlength=len(columns.tires))))
+    reference_weather = int(np.argmax(np.bincount(weathers, minlength=len(columns.weathers))))
+
+    # 路面温度は平均を引いて使い、不明なラップは平均として扱い別のダミー変数で吸収する
+    known = np.isfinite(temps)
+    continuous = []
+    if known.any():
+        center = float(temps[known].mean()) if reference_temp is None else float(reference_temp)
+        continuous.append(np.where(known, temps - center, 0.0))
+        if not known.all():
+            continuous.append((~known).astype(np.float64))
+    else:
+        center = np.nan
+    continuous = np.column_stack(continuous) if continuous else np.zeros((len(y), 0))
+
+    # 桁落ちを防ぐため中央値を引いてから解き、ライダーの効果に戻す
+    offset = float(np.median(y))
+    blocks = [(riders, columns.num_riders), (tires, len(columns.tires)), (weathers, len(columns.weathers))]
+    xtx, xty = _normal_equations(blocks, continuous, y - offset)
+
+    sizes = [size for _, size in blocks]
+    starts = np.concatenate(([0], np.cumsum(sizes)))
+    keep = np.ones(len(xty), dtype=bool)
+    keep[starts[1] + reference_tire] = False
+    keep[starts[2] + reference_weather] = False
+    coefficients = np.zeros(len(xty))
+    # ライダーとタイヤが完全に重なる場合などの特異な行列では最小ノルム解になる
+    coefficients[keep] = np.linalg.lstsq(xtx[np.ix_(keep, keep)], xty[keep], rcond=None)[0]
+
+    rider_effects = coefficients[:starts[1]] + offset
+    tire_effects = coefficients[starts[1]:starts[2]]
+    weather_effects = coefficients[starts[2]:starts[3]]
+    temp_coefficient = float(coefficients[starts[3]]) if continuous.shape[1] else 0.0
+
+    predicted = rider_effects[riders] + tire_effects[tires] + weather_effects[weathers]
+    if continuous.shape[1]:
+        predicted += continuous @ coefficients[starts[3]:]
+    residuals = y - predicted
+    residual_std = float(np.sqrt(np.mean(residuals ** 2))) if residuals.size else 0.0
+
+    return ConditionModel(
+        columns.riders, rider_effects,
+        {name: float(effect) for name, effect in zip(columns.tires, tire_effects)},
+        {name: float(effect) for name, effect in zip(columns.weathers, weather_effects)},
+        temp_coefficient, center, columns.tires[reference_tire], columns.weathers[reference_weather],
+        residual_std, int(y.size))
+
+
+def _normal_equations(blocks: List[Tuple[np.ndarray, int]], continuous: np.ndarray,
+                      y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """ダミー変数のブロック（コード, カテゴリ数）と連続変数から X^T X と X^T y を求める"""
+    sizes = [size for _, size in blocks]
+    starts = np.concatenate(([0], np.cumsum(sizes)))
+    num_continuous = continuous.shape[1]
+    total = int(starts[-1]) + num_continuous
+    xtx = np.zeros((total, total))
+    xty = np.zeros(total)
+
+    for i, (codes_i, size_i) in enumerate(blocks):
+        rows = slice(starts[i], starts[i + 1])
+        xty[rows] = np.bincount(codes_i, weights=y, minlength=size_i)
+        xtx[rows, rows] = np.diag(np.bincount(codes_i, minlength=size_i).astype(np.float64))
+        for j in range(i + 1, len(blocks)):
+            codes_j, size_j = blocks[j]
+            pair = np.bincount(codes_i.astype(np.int64) * size_j + codes_j, minlength=size_i * size_j)
+            xtx[rows, starts[j]:starts[j + 1]] = pair.reshape(size_i, size_j)
+            xtx[starts[j]:starts[j + 1], rows] = pair.reshape(size_i, size_j).T
+        for k in range(num_continuous):
+            column = int(starts[-1]) + k
+            sums = np.bincount(codes_i, weights=continuous[:, k], minlength=size_i)
+            xtx[rows, column] = sums
+            xtx[column, rows] = sums
+
+    if num_continuous:
+        tail = slice(int(starts[-1]), total)
+        xtx[tail, tail] = continuous.T @ continuous
+        xty[tail] = continuous.T @ y
+    return xtx, xty
+
+
+def normalize_laps(laps: List[Dict], columns: LapColumns, model: ConditionModel,
+                   time_converter: Optional[TimeConverter] = None) -> Tuple[List[Dict], LapColumns]:
+    """ラップタイムとセクタータイムを基準条件に補正したラップデータと列指向データを作成する
+
+    補正後の値で 'LapTime' / 'SectorN' を置き換え、元の値は 'RawLapTime' / 'RawSectorN' に残します。
+    既存の統計・グラフはそのまま補正後のタイムで計算されます。列指向データは補正後の配列から
+    直接作るため、補正後の時間文字列を解析し直す必要はありません（時間文字列と同じミリ秒に丸める）。
+
+    Args:
+        laps: ラップデータのリスト
+        columns: lapsから作成した列指向データ（同じ順序）
+        model: 条件のモデル
+        time_converter: 時間の文字列への変換に使用するTimeConverter
+
+    Returns:
+        Tuple[List[Dict], LapColumns]: 補正後のラップデータ（元のラップデータは変更しない）と列指向データ
+    """
+    converter = time_converter or TimeConverter()
+    lap_times = np.round(model.corrected_times(columns), 3)
+    sector_times = np.round(model.corrected_sector_times(columns), 3)
+    # 補正できないラップ・セクターは元の値のまま
+    corrected_laps = np.isfinite(lap_times)
+    corrected_sectors = corrected_laps[:, None] & np.isfinite(sector_times)
+    lap_times = np.where(corrected_laps, lap_times, columns.lap_times)
+    sector_times = np.where(corrected_sectors, sector_times, columns.sector_times)
+    keys = [f'Sector{i + 1}' for i in range(columns.num_sectors)]
+    normalized = []
+    for i, lap in enumerate(laps):
+        lap = dict(lap)
+        if corrected_laps[i]:
+            lap['RawLapTime'] = lap.get('LapTime', '')
+            lap['LapTime'] = format_seconds(lap_times[i], converter)
+            for j, key in enumerate(keys):
+                if corrected_sectors[i, j]:
+                    lap[f'Raw{key}'] = lap.get(key, '')
+                    lap[key] = format_seconds(sector_times[i, j], converter)
+        normalized.append(lap)
+    normalized_columns = LapColumns(columns.riders, columns.rider_codes, columns.lap_numbers, lap_times,
+                                    sector_times, columns.tires, columns.tire_codes, columns.weathers,
+                                    columns.weather_codes, columns.track_temps)
+    return normalized, normalized_columns
@@ -1,11 +1,61 @@
+import atexit
 import json
 import os
-from typing import Dict, Any
+import threading
+import weakref
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+from app.item_registry import ItemRegistry
+from utils.atomic_io import atomic_write_text
+
+LEGACY_RIDER_COLOR_PREFIX = "rider_color_"
+
+# 終了時に未保存の変更を書き出すConfigManager（弱参照のため、破棄されたインスタンスは保持しない）
+_live_managers = weakref.WeakSet()
+
+
+def _flush_live_managers() -> None:
+    """残っている全てのConfigManagerの未保存の変更を書き出す（終了時に呼び出される）"""
+    for manager in list(_live_managers):
+        manager.flush()
+
+
+atexit.register(_flush_live_managers)
+
+
+class ConfigChangeEvent:
+    """設定の変更を表すイベント
+
+    Attributes:
+        section: 変更された設定のセクション
+        key: 変更された設定のキー
+        old_value: 変更前の値（新規の場合はNone）
+        new_value: 変更後の値（削除の場合はNone）
+        item_id: ライダー・タイヤの追加・更新・削除の場合は対象のID
+            （keyは"riders_list"/"tires_list"、値は変更前後の項目）
+    """
+
+    def __init__(self, section: str, key: str, old_value: Any = None, new_value: Any = None,
+                 item_id: Optional[str] = None):
+        self.section = section
+        self.key = key
+        self.old_value = old_value
+        self.new_value = new_value
+        self.item_id = item_id
+
+    def matches(self, section: Optional[str] = None, key: Optional[str] = None) -> bool:
+        """指定したセクション・キーの変更か（Noneは全てに一致）"""
+        return (section is None or section == self.section) and (key is None or key == self.key)
+
+    def __repr__(self):
+        return f"ConfigChangeEvent({self.section!r}, {self.key!r}, item_id={self.item_id!r})"
+
 
 class ConfigManager:
-    def __init__(self, config_file: str = "config.json"):
+    def __init__(self, config_file: str = "config.json", save_delay: float = 0.5):
         # configディレクトリのパスを取得
         base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        self.base_dir = base_dir
         config_dir = os.path.join(base_dir, "config")
         
         # configディレクトリが存在しない場合は作成
@@ -16,6 +66,19 @@ class ConfigManager:
         self.config_file = os.path.join(config_dir, config_file)
         self.config = self._load_default_config()
         self._load_config()
+        self._build_registries()
+        
+        # 変更の保存はsave_delay秒の間まとめてから行う（終了時には未保存分を書き出す）
+        self.save_delay = save_delay
+        self._lock = threading.RLock()
+        self._dirty = False
+        self._save_timer = None
+        self._batch_depth = 0
+        _live_managers.add(self)
+        
+        # 変更通知の購読者 (コールバック, セクション, キー) と、batch_update中に保留したイベント
+        self._subscribers = []
+        self._pending_events = {}
 
     def _load_default_config(self) -> Dict[str, Any]:
         return {
@@ -28,7 +91,20 @@ class ConfigManager:
             },
             "app_settings": {
                 "show_graph_window": True,  # グラフウィンドウを表示するかどうか
-                "num_sectors": 3  # セクター数のデフォルト値
+                "num_sectors": 3,  # セクター数のデフォルト値
+                "micro_sector_threshold": 20,  # このセクター数を超えるとミニセクターモード（列を隠しヒートマップで表示）
+                "analysis_cache_size": 32,  # 解析結果キャッシュの最大エントリ数
+                "bootstrap_resamples": 1000,  # 信頼区間を求めるブートストラップのリサンプル数
+                "bootstrap_confidence": 0.95,  # 信頼区間の信頼水準
+                "normalize_conditions": False,  # 路面温度・天候・タイヤの影響を補正したタイムで解析するかどうか
+                "consistency_window": 5,  # 一貫性スコアのローリングウィンドウのラップ数
+                "consistency_within_percent": 1.0,  # ベスト付近とみなす範囲（ベストに対する%）
+                "lap_store_path": "",  # ラップストア(SQLite)のパス（空の場合はdata/lap_store.sqlite）
+                "data_directory": "",  # セッションファイルのディレクトリ（空の場合はdata）
+                "session_catalog_path": "",  # セッションカタログのパス（空の場合はconfig/session_catalog.json）
+                "autosave_journal_path": "",  # 自動保存ジャーナルのパス（空の場合はconfig/autosave.jsonl）
+                "telemetry_directory": "",  # テレメトリストアの保存先（空の場合はdata/telemetry）
+                "telemetry_sample_rate": 100  # テレメトリCSVのサンプリング周波数（Hz）
             },
             "graph_settings": {
                 "line_color": "#1f77b4",
@@ -42,7 +118,9 @@ class ConfigManager:
                 "show_grid": True,
                 "lap_trend_window_size": 3,  # ラップタイムトレンドの移動平均ウィンドウサイズ
                 "radar_window_size": 3,      # レーダーチャートの移動平均ウィンドウサイズ
-                "radar_alpha": 0.2           # レーダーチャートの標準偏差表示の透明度
+                "radar_alpha": 0.2,          # レーダーチャートの標準偏差表示の透明度
+                "show_change_points": True,  # トレンドグラフにペースの変化点と区間平均を表示するかどうか
+                "change_point_penalty": 1.0  # 変化点検出のペナルティの倍率（大きいほど変化点が少なくなる）
             },
             "color_settings": {
                 "fastest_lap": "#00ff00",
@@ -113,189 +191,330 @@ class ConfigManager:
         except Exception as e:
             print(f"Error loading config: {e}")
 
+    def _build_registries(self) -> None:
+        """ライダー・タイヤの索引と旧形式のライダー色の索引を作成する"""
+        self.rider_registry = ItemRegistry("rider", self.config.get("riders_settings", {}).get("riders_list") or [])
+        self.tire_registry = ItemRegistry("tire", self.config.get("tires_settings", {}).get("tires_list") or [])
+        self._sync_registry_lists()
+        
+        # 旧形式（graph.rider_color_<名前>）の色は一度だけ走査して索引にする
+        graph = self.config.get("graph", {})
+        self.legacy_rider_colors = {
+            key[len(LEGACY_RIDER_COLOR_PREFIX):]: value
+            for key, value in graph.items() if key.startswith(LEGACY_RIDER_COLOR_PREFIX)
+        } if isinstance(graph, dict) else {}
+        
+        # 色が未設定のライダーには旧形式の色を引き継ぐ
+        for rider in self.rider_registry.to_list():
+            if not rider.get("color") and rider.get("name") in self.legacy_rider_colors:
+                rider["color"] = self.legacy_rider_colors[rider["name"]]
+
+    def _sync_registry_lists(self) -> None:
+        """索引の内容を設定のリストに反映する（変更がない場合は同じリストを使う）"""
+        self.config.setdefault("riders_settings", {})["riders_list"] = self.rider_registry.to_list()
+        self.config.setdefault("tires_settings", {})["tires_list"] = self.tire_registry.to_list()
+
     def save_config(self) -> bool:
+        """設定ファイルを直ちに保存する（一時ファイルに書き込んでから置き換える）"""
+        with self._lock:
+            self._cancel_save_timer()
+            try:
+                self._sync_registry_lists()
+                text = json.dumps(self.config, indent=4)
+                atomic_write_text(self.config_file, text)
+                self._dirty = False
+                return True
+            except Exception as e:
+                print(f"Error saving config: {e}")
+                return False
+
+    def schedule_save(self) -> None:
+        """設定を変更済みとして記録し、一定時間後にまとめて保存する
+
+        save_delay秒以内の変更は1回の書き込みにまとめます。batch_update中は
+        ブロックを抜けるまで保存を予約しません。
+        """
+        with self._lock:
+            self._dirty = True
+            if self._batch_depth > 0 or self._save_timer is not None:
+                return
+            self._save_timer = threading.Timer(self.save_delay, self._on_save_timer)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def _on_save_timer(self) -> None:
+        with self._lock:
+            self._save_timer = None
+            if self._dirty and self._batch_depth == 0:
+                self.save_config()
+
+    def _cancel_save_timer(self) -> None:
+        if self._save_timer is not None:
+            self._save_timer.cancel()
+            self._save_timer = None
+
+    def flush(self) -> bool:
+        """未保存の変更があれば直ちに保存する（アプリケーション終了時に呼び出す）"""
+        with self._lock:
+            self._cancel_save_timer()
+            if not self._dirty:
+                return True
+            return self.save_config()
+
+    def is_dirty(self) -> bool:
+        """未保存の変更があるか"""
+        return self._dirty
+
+    @contextmanager
+    def batch_update(self):
+        """複数の変更をまとめて1回の保存にするコンテキストマネージャ
+
+        使用例:
+            with config_manager.batch_update():
+                for rider_id, data in riders.items():
+                    config_manager.update_rider(rider_id, data)
+        """
+        with self._lock:
+            self._batch_depth += 1
         try:
-            with open(self.config_file, 'w') as f:
-                json.dump(self.config, f, indent=4)
-            return True
-        except Exception as e:
-            print(f"Error saving config: {e}")
-            return False
+            yield self
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+                finished = self._batch_depth == 0
+                if finished and self._dirty:
+                    self.schedule_save()
+            if finished:
+                self._dispatch_pending_events()
+
+    def subscribe(self, callback: Callable[[ConfigChangeEvent], None], section: Optional[str] = None,
+                  key: Optional[str] = None):
+        """設定の変更通知を購読する
+
+        Args:
+            callback: ConfigChangeEventを受け取るコールバック
+            section: 通知を受けるセクション（Noneの場合は全て）
+            key: 通知を受けるキー（Noneの場合はセクション内の全て）
+
+        Returns:
+            unsubscribeに渡すハンドル
+        """
+        handle = (callback, section, key)
+        self._subscribers.append(handle)
+        return handle
+
+    def unsubscribe(self, handle) -> None:
+        """変更通知の購読を解除する"""
+        try:
+            self._subscribers.remove(handle)
+        except ValueError:
+            pass
+
+    def _notify(self, event: ConfigChangeEvent) -> None:
+        """変更を購読者に通知する（batch_update中はブロックを抜けるまで保留する）"""
+        with self._lock:
+            if self._batch_depth > 0:
+                # 同じ設定（項目）への変更は最初の変更前の値と最後の変更後の値にまとめる
+                pending_key = (event.section, event.key, event.item_id)
+                pending = self._pending_events.get(pending_key)
+                if pending is not None:
+                    event.old_value = pending.old_value
+                self._pending_events[pending_key] = event
+                return
+        self._dispatch(event)
+
+    def _dispatch_pending_events(self) -> None:
+        with self._lock:
+            events = list(self._pending_events.values())
+            self._pending_events = {}
+        for event in events:
+            self._dispatch(event)
+
+    def _dispatch(self, event: ConfigChangeEvent) -> None:
+        for callback, section, key in list(self._subscribers):
+            if event.matches(section, key):
+                try:
+                    callback(event)
+                except Exception as e:
+                    print(f"Error in config change handler: {e}")
 
     def get_setting(self, section: str, key: str) -> Any:
+        if (section, key) == ("riders_settings", "riders_list"):
+            return list(self.rider_registry.to_list())
+        if (section, key) == ("tires_settings", "tires_list"):
+            return list(self.tire_registry.to_list())
         return self.config.get(section, {}).get(key)
 
     def update_setting(self, section: str, key: str, value: Any) -> None:
-        if section not in self.config:
-            self.config[section] = {}
-        self.config[section][key] = value
+        with self._lock:
+            if section not in self.config:
+                self.config[section] = {}
+            old_value = self.config[section].get(key)
+            self.config[section][key] = value
+            
+            # 索引の対象となる設定は索引も更新する
+            if (section, key) == ("riders_settings", "riders_list"):
+                self.rider_registry.load(value or [])
+            elif (section, key) == ("tires_settings", "tires_list"):
+                self.tire_registry.load(value or [])
+            elif section == "graph" and key.startswith(LEGACY_RIDER_COLOR_PREFIX):
+                self.legacy_rider_colors[key[len(LEGACY_RIDER_COLOR_PREFIX):]] = value
+        
+        if old_value != value:
+            self._notify(ConfigChangeEvent(section, key, old_value, value))
 
     def set_setting(self, section: str, key: str, value: Any) -> None:
         """update_settingのエイリアス（後方互換性のため）"""
         self.update_setting(section, key, value)
 
     def reset_to_default(self) -> None:
-        self.config = self._load_default_config()
+        with self._lock:
+            self.config = self._load_default_config()
+            self._build_registries()
         
     # ライダー管理用のメソッド
     def get_riders_list(self):
-        """登録済みのライダーリストを取得"""
-        return self.get_setting("riders_settings", "riders_list") or []
+        """登録済みのライダーリストを取得（コピーを返すため、変更しても登録内容は変わらない）"""
+        return list(self.rider_registry.to_list())
+
+    def get_rider(self, rider_id):
+        """IDでライダーを取得"""
+        return self.rider_registry.get(rider_id)
+
+    def find_rider_by_name(self, rider_name):
+        """名前でライダーを取得"""
+        return self.rider_registry.find_by_name(rider_name)
 
     def add_rider(self, rider_data):
         """新しいライダーを追加"""
-        riders_list = self.get_riders_list()
-        
-        # IDの生成（既存のIDとの重複を避ける）
-        existing_ids = set(rider.get("id") for rider in riders_list)
-        new_id = f"rider{len(riders_list) + 1}"
-        while new_id in existing_ids:
-            new_id = f"rider{int(new_id[5:]) + 1}"
-        
-        rider_data["id"] = new_id
-        riders_list.append(rider_data)
-        
-        self.update_setting("riders_settings", "riders_list", riders_list)
-        self.save_config()
-        
-        # 後方互換性のため、古い形式でも色を保存
-        if "name" in rider_data and "color" in rider_data:
-            self.set_setting("graph", f"rider_color_{rider_data['name']}", rider_data["color"])
+        with self._lock:
+            # IDは索引の連番から払い出す（既存のIDとは重複しない）
+            new_id = self.rider_registry.add(rider_data)
+            
+            # 後方互換性のため、古い形式でも色を保存
+            if "name" in rider_data and "color" in rider_data:
+                self.set_setting("graph", f"rider_color_{rider_data['name']}", rider_data["color"])
         
+        self._notify(ConfigChangeEvent("riders_settings", "riders_list", None, rider_data, new_id))
+        self.schedule_save()
         return new_id
 
     def update_rider(self, rider_id, rider_data):
         """既存のライダー情報を更新"""
-        riders_list = self.get_riders_list()
-        
-        # 指定されたIDのライダーを検索
-        for i, rider in enumerate(riders_list):
-            if rider.get("id") == rider_id:
-                # 古い名前を取得（後方互換性のため）
-                old_name = rider.get("name")
-                
-                # データを更新（IDは変更しない）
-                rider_data["id"] = rider_id
-                riders_list[i] = rider_data
-                
-                self.update_setting("riders_settings", "riders_list", riders_list)
-                self.save_config()
-                
-                # 後方互換性のため、古い形式での色設定も更新
-                if "name" in rider_data and "color" in rider_data:
-                    # 名前が変わった場合は古い設定を削除
-                    if old_name != rider_data["name"] and old_name:
-                        self.remove_setting("graph", f"rider_color_{old_name}")
-                    # 新しい名前で設定
-                    self.set_setting("graph", f"rider_color_{rider_data['name']}", rider_data["color"])
-                
-                return True
-        
-        return False  # ライダーが見つからない
+        with self._lock:
+            # データを更新（IDは変更しない）
+            old_rider = self.rider_registry.update(rider_id, rider_data)
+            if old_rider is None:
+                return False  # ライダーが見つからない
+            
+            # 古い名前を取得（後方互換性のため）
+            old_name = old_rider.get("name")
+            
+            # 後方互換性のため、古い形式での色設定も更新
+            if "name" in rider_data and "color" in rider_data:
+                # 名前が変わった場合は古い設定を削除
+                if old_name != rider_data["name"] and old_name:
+                    self.remove_setting("graph", f"rider_color_{old_name}")
+                # 新しい名前で設定
+                self.set_setting("graph", f"rider_color_{rider_data['name']}", rider_data["color"])
+        
+        if old_rider != rider_data:
+            self._notify(ConfigChangeEvent("riders_settings", "riders_list", old_rider, rider_data, rider_id))
+        self.schedule_save()
+        return True
 
     def delete_rider(self, rider_id):
         """ライダーを削除"""
-        riders_list = self.get_riders_list()
-        
-        # 指定されたIDのライダーを検索
-        for i, rider in enumerate(riders_list):
-            if rider.get("id") == rider_id:
-                # 後方互換性のため、古い形式の設定も削除
-                name = rider.get("name")
-                if name:
-                    self.remove_setting("graph", f"rider_color_{name}")
-                
-                # リストから削除
-                riders_list.pop(i)
-                
-                self.update_setting("riders_settings", "riders_list", riders_list)
-                self.save_config()
-                return True
-        
-        return False  # ライダーが見つからない
+        with self._lock:
+            rider = self.rider_registry.remove(rider_id)
+            if rider is None:
+                return False  # ライダーが見つからない
+            
+            # 後方互換性のため、古い形式の設定も削除
+            name = rider.get("name")
+            if name:
+                self.remove_setting("graph", f"rider_color_{name}")
+        
+        self._notify(ConfigChangeEvent("riders_settings", "riders_list", rider, None, rider_id))
+        self.schedule_save()
+        return True
 
     # タイヤ管理用のメソッド
     def get_tires_list(self):
-        """登録済みのタイヤリストを取得"""
-        return self.get_setting("tires_settings", "tires_list") or []
+        """登録済みのタイヤリストを取得（コピーを返すため、変更しても登録内容は変わらない）"""
+        return list(self.tire_registry.to_list())
+
+    def get_tire(self, tire_id):
+        """IDでタイヤを取得"""
+        return self.tire_registry.get(tire_id)
 
     def add_tire(self, tire_data):
         """新しいタイヤを追加"""
-        tires_list = self.get_tires_list()
-        
-        # IDの生成
-        existing_ids = set(tire.get("id") for tire in tires_list)
-        new_id = f"tire{len(tires_list) + 1}"
-        while new_id in existing_ids:
-            new_id = f"tire{int(new_id[4:]) + 1}"
-        
-        tire_data["id"] = new_id
-        tires_list.append(tire_data)
-        
-        self.update_setting("tires_settings", "tires_list", tires_list)
-        self.save_config()
+        with self._lock:
+            new_id = self.tire_registry.add(tire_data)
+        self._notify(ConfigChangeEvent("tires_settings", "tires_list", None, tire_data, new_id))
+        self.schedule_save()
         return new_id
 
     def update_tire(self, tire_id, tire_data):
         """既存のタイヤ情報を更新"""
-        tires_list = self.get_tires_list()
-        
-        for i, tire in enumerate(tires_list):
-            if tire.get("id") == tire_id:
-                # データを更新（IDは変更しない）
-                tire_data["id"] = tire_id
-                tires_list[i] = tire_data
-                
-                self.update_setting("tires_settings", "tires_list", tires_list)
-                self.save_config()
-                return True
-        
-        return False  # タイヤが見つからない
+        with self._lock:
+            # データを更新（IDは変更しない）
+            old_tire = self.tire_registry.update(tire_id, tire_data)
+            if old_tire is None:
+                return False  # タイヤが見つからない
+        if old_tire != tire_data:
+            self._notify(ConfigChangeEvent("tires_settings", "tires_list", old_tire, tire_data, tire_id))
+        self.schedule_save()
+        return True
 
     def delete_tire(self, tire_id):
         """タイヤを削除"""
-        tires_list = self.get_tires_list()
-        
-        for i, tire in enumerate(tires_list):
-            if tire.get("id") == tire_id:
-                tires_list.pop(i)
-                
-                self.update_setting("tires_settings", "tires_list", tires_list)
-                self.save_config()
-                return True
-        
-        return False  # タイヤが見つからない
+        with self._lock:
+            tire = self.tire_registry.remove(tire_id)
+            if tire is None:
+                return False  # タイヤが見つからない
+        self._notify(ConfigChangeEvent("tires_settings", "tires_list", tire, None, tire_id))
+        self.schedule_save()
+        return True
 
     def get_rider_color(self, rider_name):
         """ライダーの色を取得するメソッド（新旧両方の設定に対応）"""
         # 1. 新しい設定形式から探す
-        riders_list = self.get_setting("riders_settings", "riders_list") or []
-        for rider in riders_list:
-            if rider.get("name") == rider_name:
-                return rider.get("color")
+        rider = self.rider_registry.find_by_name(rider_name)
+        if rider is not None:
+            return rider.get("color")
         
         # 2. 古い設定形式から探す（後方互換性）
-        return self.get_setting("graph", f"rider_color_{rider_name}")
+        return self.legacy_rider_colors.get(rider_name)
 
     def remove_setting(self, section, key):
         """設定を削除する"""
-        if section in self.config and key in self.config[section]:
-            del self.config[section][key]
+        with self._lock:
+            if section not in self.config or key not in self.config[section]:
+                return
+            old_value = self.config[section].pop(key)
+            if section == "graph" and key.startswith(LEGACY_RIDER_COLOR_PREFIX):
+                self.legacy_rider_colors.pop(key[len(LEGACY_RIDER_COLOR_PREFIX):], None)
+        self._notify(ConfigChangeEvent(section, key, old_value, None))
             
     def migrate_to_new_format(self):
         """既存の設定を新しい形式に移行する"""
+        with self.batch_update():
+            self._migrate_riders()
+
+    def _migrate_riders(self):
+        """セッション設定とknown_ridersのライダーを新形式のリストに追加する"""
         # 既存のライダー情報を確認
         current_session = self.get_setting("session", "settings")
         known_riders = self.get_setting("graph", "known_riders") or []
         
-        riders_list = self.get_riders_list()
-        
         # 既存のライダーが新形式に存在しない場合は追加
         if current_session and isinstance(current_session, dict):
             rider_info = current_session.get("rider", {})
             rider_name = rider_info.get("name")
             
-            if rider_name and not any(r.get("name") == rider_name for r in riders_list):
+            if rider_name and self.rider_registry.find_by_name(rider_name) is None:
                 # 既存のライダー色を取得
                 rider_color = self.get_setting("graph", f"rider_color_{rider_name}")
                 
@@ -310,7 +529,7 @@ class ConfigManager:
         
         # known_ridersにあるライダーも追加
         for rider_name in known_riders:
-            if not any(r.get("name") == rider_name for r in self.get_riders_list()):
+            if self.rider_registry.find_by_name(rider_name) is None:
                 rider_color = self.get_setting("graph", f"rider_color_{rider_name}")
                 
                 new_rider = {
@@ -399,6 +618,21 @@ class ConfigManager:
             return 3
         return num_sectors
 
+    def get_micro_sector_threshold(self) -> int:
+        """ミニセクターモードに切り替えるセクター数の閾値を取得する"""
+        threshold = self.get_setting("app_settings", "micro_sector_threshold")
+        if not isinstance(threshold, int) or threshold < 1:
+            return 20
+        return threshold
+
+    def is_micro_sector_mode(self) -> bool:
+        """ミニセクターモード（セクター数が閾値を超える）かどうか
+
+        ミニセクターモードではセクターごとの列・グラフ要素を作らず、
+        ラップ数×セクター数の配列で集計してヒートマップで表示します。
+        """
+        return self.get_num_sectors() > self.get_micro_sector_threshold()
+
     def set_num_sectors(self, num_sectors: int) -> None:
         """セクター数を設定する
 
@@ -408,4 +642,43 @@ class ConfigManager:
         if not isinstance(num_sectors, int) or num_sectors < 1:
             raise ValueError("Number of sectors must be a positive integer")
         self.update_setting("app_settings", "num_sectors", num_sectors)
-        self.save_config()
\ No newline at end of file
+        self.schedule_save()
+
+    def get_lap_store_path(self) -> str:
+        """ラップストア(SQLite)のファイルパスを取得する
+
+        Returns:
+            str: 設定されたパス（未設定の場合はdataディレクトリ内のlap_store.sqlite）
+        """
+        path = self.get_setting("app_settings", "lap_store_path")
+        if not path:
+            path = os.path.join(self.base_dir, "data", "lap_store.sqlite")
+        return path
+
+    def get_data_directory(self) -> str:
+        """セッションファイルを格納するディレクトリを取得する"""
+        path = self.get_setting("app_settings", "data_directory")
+        if not path:
+            path = os.path.join(self.base_dir, "data")
+        return path
+
+    def get_session_catalog_path(self) -> str:
+        """セッションカタログ（インデックス）のファイルパスを取得する"""
+        path = self.get_setting("app_settings", "session_catalog_path")
+        if not path:
+            path = os.path.join(os.path.dirname(self.config_file), "session_catalog.json")
+        return path
+
+    def get_journal_path(self) -> str:
+        """自動保存ジャーナルのファイルパスを取得する"""
+        path = self.get_setting("app_settings", "autosave_journal_path")
+        if not path:
+            path = os.path.join(os.path.dirname(self.config_file), "autosave.jsonl")
+        return path
+
+    def get_telemetry_directory(self) -> str:
+        """テレメトリストアを保存するディレクトリを取得する"""
+        path = self.get_setting("app_settings", "telemetry_directory")
+        if not path:
+            path = os.path.join(self.base_dir, "data", "telemetry")
+        return path
@@ -0,0 +1,240 @@
+"""
+Consistency Module
+ライダーごとのラップタイムの安定性（一貫性指数・ベスト付近のラップの割合・ローリングウィンドウの
+標準偏差・セクターのばらつきの順位）を求めるモジュールです。
+
+ライダー・系列ごとに累積値を保持し、ラップの追加時は追加されたラップのみを取り込みます。
+ベストが更新された系列のみ、そのライダーの全タイムから配列演算で計算し直します。
+"""
+import numpy as np
+from typing import Dict, List, Optional
+from app.lap_columns import LapColumns
+
+# ローリングウィンドウのラップ数
+DEFAULT_WINDOW = 5
+# ベスト付近とみなす範囲（ベストに対する%）
+DEFAULT_WITHIN_PERCENT = 1.0
+# 一貫性の計算に含めるラップ（ベストに対する比率、これより遅いラップはピットイン等として除く）
+CLEAN_RATIO = 1.07
+
+
+def window_stds(values: np.ndarray, window: int) -> np.ndarray:
+    """連続するwindow個の値の標準偏差（ウィンドウごと、値がwindow個未満の場合は空）"""
+    values = np.asarray(values, dtype=np.float64)
+    if window < 1 or values.size < window:
+        return np.zeros(0)
+    return np.lib.stride_tricks.sliding_window_view(values, window).std(axis=1)
+
+
+def consistency_index(cv_percent: float) -> float:
+    """変動係数（%）から一貫性指数を求める（ばらつきがない場合100、CV 1%で50）"""
+    if cv_percent != cv_percent:
+        return float('nan')
+    return 100.0 / (1.0 + cv_percent)
+
+
+class _SeriesStats:
+    """1ライダーの1系列（ラップタイムまたはセクタータイム）の累積値
+
+    ベストを基準にした差の和・二乗和で、ベストの CLEAN_RATIO 倍以内のラップの平均と
+    標準偏差を保持します（ベストが変わった場合は全タイムから計算し直す）。
+    """
+
+    def __init__(self):
+        self.values: List[float] = []  # 追記のみのためコピー間で共有する（countまでが自身のタイム）
+        self.count = 0
+        self.best = float('inf')
+        self.clean_count = 0
+        self.clean_sum = 0.0  # ベストとの差の和
+        self.clean_sq = 0.0  # ベストとの差の二乗和
+        self.within_count = 0
+        self.best_window_std = float('nan')
+
+    def copy(self) -> '_SeriesStats':
+        stats = _SeriesStats()
+        stats.__dict__.update(self.__dict__)
+        return stats
+
+    def extend(self, values: np.ndarray, window: int, within_ratio: float) -> None:
+        """タイム（秒）を追加する（0以下・NaNのタイムは除く）"""
+        values = values[np.isfinite(values) & (values > 0)]
+        if not values.size:
+            return
+        if len(self.values) != self.count:
+            # 共有しているリストに別のコピーのタイムが追記されている場合は自身の分を複製する
+            self.values = self.values[:self.count]
+        previous = self.count
+        self.values.extend(values.tolist())
+        self.count = len(self.values)
+        best = float(values.min())
+        if best < self.best:
+            self.best = best
+            self._accumulate(np.asarray(self.values), within_ratio, reset=True)
+        else:
+            self._accumulate(values, within_ratio)
+        # 追加したタイムで終わるウィンドウのみ計算する
+        tail = self.values[max(previous - window + 1, 0):self.count]
+        stds = window_stds(tail, window)
+        if stds.size:
+            self.best_window_std = float(np.fmin(self.best_window_std, stds.min()))
+
+    def _accumulate(self, values: np.ndarray, within_ratio: float, reset: bool = False) -> None:
+        if reset:
+            self.clean_count, self.clean_sum, self.clean_sq, self.within_count = 0, 0.0, 0.0, 0
+        deltas = values[values <= self.best * CLEAN_RATIO] - self.best
+        self.clean_count += int(deltas.size)
+        self.clean_sum += float(deltas.sum())
+        self.clean_sq += float(np.square(deltas).sum())
+        self.within_count += int(np.count_nonzero(values <= self.best * within_ratio))
+
+    @property
+    def mean(self) -> float:
+        if not self.clean_count:
+            return float('nan')
+        return self.best + self.clean_sum / self.clean_count
+
+    @property
+    def std(self) -> float:
+        if not self.clean_count:
+            return float('nan')
+        mean_delta = self.clean_sum / self.clean_count
+        return float(np.sqrt(max(self.clean_sq / self.clean_count - mean_delta ** 2, 0.0)))
+
+    @property
+    def cv(self) -> float:
+        """ベストの CLEAN_RATIO 倍以内のラップの変動係数（%、対象のラップが2つ未満の場合はNaN）"""
+        if self.clean_count < 2:
+            return float('nan')
+        return 100.0 * self.std / self.mean
+
+
+class ConsistencyScores:
+    """ライダーごとの安定性のスコア
+
+    ライダーごとに、ラップタイムと各セクタータイムの累積値（_SeriesStats）を保持します。
+    セクターのばらつきの順位は、セクターごとに変動係数の小さい順に全ライダーを並べたものです。
+    """
+
+    def __init__(self, num_sectors: int, window: int = DEFAULT_WINDOW,
+                 within_percent: float = DEFAULT_WITHIN_PERCENT):
+        self.num_sectors = num_sectors
+        self.window = max(1, int(window))
+        self.within_percent = float(within_percent)
+        self.num_laps = 0  # 取り込んだラップの数
+        self.lap_times: Dict[str, _SeriesStats] = {}
+        self.sector_times: Dict[str, List[_SeriesStats]] = {}
+        self._ranks: Optional[Dict[str, List[float]]] = None
+
+    @property
+    def riders(self) -> List[str]:
+        return sorted(self.lap_times)
+
+    def copy(self) -> 'ConsistencyScores':
+        """同じ内容のスコアを作成する（キャッシュした結果を変更しないため）"""
+        scores = ConsistencyScores(self.num_sectors, self.window, self.within_percent)
+        scores.num_laps = self.num_laps
+        scores.lap_times = {rider: stats.copy() for rider, stats in self.lap_times.items()}
+        scores.sector_times = {rider: [stats.copy() for stats in sectors]
+                               for rider, sectors in self.sector_times.items()}
+        return scores
+
+    def add_columns(self, columns: LapColumns) -> None:
+        """列指向のラップデータを追加する（ライダーごとに読み込み順で取り込む）"""
+        within_ratio = 1.0 + self.within_percent / 100.0
+        order = np.argsort(columns.rider_codes, kind='stable')
+        codes = columns.rider_codes[order]
+        bounds = np.flatnonzero(np.diff(codes)) + 1
+        for rows in np.split(order, bounds) if order.size else []:
+            self._extend_rider(columns.riders[columns.rider_codes[rows[0]]], columns, rows, within_ratio)
+        self.num_laps += len(columns)
+        self._ranks = None
+
+    def replace_riders(self, columns: LapColumns, riders) -> None:
+        """指定したライダーの累積値をcolumnsのラップから作り直す（セルの編集用、ラップ数は変わらないこと）
+
+        Args:
+            columns: 変更後の全ラップの列指向データ
+            riders: ラップが変更されたライダー（変更前後の両方を含む）
+        """
+        within_ratio = 1.0 + self.within_percent / 100.0
+        for rider in riders:
+            self.lap_times.pop(rider, None)
+            self.sector_times.pop(rider, None)
+            rows = np.flatnonzero(columns.rider_mask(rider))
+            if rows.size:
+                self._extend_rider(rider, columns, rows, within_ratio)
+        self._ranks = None
+
+    def _extend_rider(self, rider: str, columns: LapColumns, rows: np.ndarray, within_ratio: float) -> None:
+        """ライダーのラップ（columnsの行rows、読み込み順）を取り込む"""
+        if rider not in self.lap_times:
+            self.lap_times[rider] = _SeriesStats()
+            self.sector_times[rider] = [_SeriesStats() for _ in range(self.num_sectors)]
+        self.lap_times[rider].extend(columns.lap_times[rows], self.window, within_ratio)
+        for i, stats in enumerate(self.sector_times[rider][:columns.num_sectors]):
+            stats.extend(columns.sector_times[rows, i], self.window, within_ratio)
+
+    def sector_ranks(self) -> Dict[str, List[float]]:
+        """ライダーごとの各セクターのばらつきの順位（1が最も安定、タイムのないセクターはNaN）"""
+        if self._ranks is None:
+            riders = self.riders
+            cvs = np.array([[stats.cv for stats in self.sector_times[rider]] for rider in riders],
+                           dtype=np.float64).reshape(len(riders), self.num_sectors)
+            ranks = np.full(cvs.shape, np.nan)
+            for i in range(self.num_sectors):
+                known = np.flatnonzero(np.isfinite(cvs[:, i]))
+                ranks[known[np.argsort(cvs[known, i], kind='stable')], i] = np.arange(1, known.size + 1)
+            self._ranks = {rider: ranks[row].tolist() for row, rider in enumerate(riders)}
+        return self._ranks
+
+    def score(self, rider: str) -> Optional[Dict]:
+        """ライダーのスコア（ラップがない場合はNone）
+
+        Returns:
+            Optional[Dict]: {
+                'consistency': 一貫性指数（100 / (1 + 変動係数%)）,
+                'lap_time_cv': ラップタイムの変動係数（%）,
+                'within_best': ベストの within_percent % 以内のラップの割合（%）,
+                'recent_within_best': 直近windowラップのうちベストの within_percent % 以内の割合（%）,
+                'recent_std': 直近windowラップの標準偏差,
+                'best_window_std': 連続するwindowラップの標準偏差の最小値,
+                'sector_cv': 各セクターの変動係数（%）,
+                'sector_ranks': 各セクターのばらつきの順位,
+                'sector_rank': セクターのばらつきの順位の平均,
+            }
+        """
+        stats = self.lap_times.get(rider)
+        if stats is None or not stats.count:
+            return None
+        recent = np.asarray(stats.values[max(stats.count - self.window, 0):stats.count])
+        within_ratio = 1.0 + self.within_percent / 100.0
+        ranks = self.sector_ranks().get(rider, [])
+        known_ranks = [rank for rank in ranks if rank == rank]
+        return {
+            'consistency': consistency_index(stats.cv),
+            'lap_time_cv': stats.cv,
+            'within_best': 100.0 * stats.within_count / stats.count,
+            'recent_within_best': 100.0 * int(np.count_nonzero(recent <= stats.best * within_ratio)) / recent.size,
+            'recent_std': float(recent.std()) if recent.size > 1 else 0.0,
+            'best_window_std': stats.best_window_std,
+            'sector_cv': [sector.cv for sector in self.sector_times[rider]],
+            'sector_ranks': ranks,
+            'sector_rank': float(np.mean(known_ranks)) if known_ranks else float('nan'),
+        }
+
+
+def build_consistency_scores(columns: LapColumns, window: int = DEFAULT_WINDOW,
+                             within_percent: float = DEFAULT_WITHIN_PERCENT) -> ConsistencyScores:
+    """全ラップから安定性のスコアを作成する
+
+    Args:
+        columns: 列指向のラップデータ
+        window: ローリングウィンドウのラップ数
+        within_percent: ベスト付近とみなす範囲（ベストに対する%）
+
+    Returns:
+        ConsistencyScores: スコア
+    """
+    scores = ConsistencyScores(columns.num_sectors, window, within_percent)
+    scores.add_columns(columns)
+    return scores
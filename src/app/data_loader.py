@@ -1,8 +1,10 @@
 import json
 import pandas as pd
-from typing import Dict, List, Union
+from typing import Dict, List, Optional, Union
 from app.config_manager import ConfigManager
+from app.lap_columns import LapColumnsBuilder
 from utils.time_converter import TimeConverter
+from utils.json_stream import JsonArrayStream
 
 class DataLoader:
     def __init__(self, config_manager: ConfigManager):
@@ -10,17 +12,88 @@ class DataLoader:
         self.time_converter = TimeConverter()
 
     def load_json(self, file_path: str) -> Dict:
-        """JSONファイルを読み込み、データを処理する"""
+        """JSONファイルを読み込み、データを処理する
+
+        lap_dataは要素ごとにストリーミングで読み込み、読み込んだ要素から順に
+        標準形式へ変換するため、ファイル全体のオブジェクトツリーは作成しません。
+        """
+        try:
+            num_sectors = self.config.get_num_sectors()
+            processed_laps = []
+            with open(file_path, 'r', encoding='utf-8') as f:
+                stream = JsonArrayStream(f, 'lap_data')
+                for i, lap in enumerate(stream.items()):
+                    processed_lap = self._process_json_lap(lap, i, num_sectors)
+                    if processed_lap is not None:
+                        processed_laps.append(processed_lap)
+            session_info = self._check_stream_fields(stream)
+
+            if not processed_laps:
+                error_details = "Please check if:\n" \
+                               "1. The file contains valid lap data with required fields (Rider, Lap, LapTime, Sector1, Sector2, Sector3)\n" \
+                               "2. The time format is valid (e.g. 1:23.456, 83.456, 1:23, or 83)"
+                raise ValueError(f"No valid lap data found. {error_details}")
+
+            return {
+                'session_info': session_info,
+                'lap_data': processed_laps
+            }
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON format: {str(e)}")
+        except Exception as e:
+            print(f"Error loading JSON file: {e}")
+            raise ValueError(f"Failed to load JSON file: {str(e)}")
+
+    def load_json_columnar(self, file_path: str, batch_size: int = 10000) -> Dict:
+        """JSONファイルをストリーミングで読み込み、列指向データに変換する
+
+        ラップdictはbatch_size件ごとにNumPy配列へ変換して破棄するため、
+        巨大なファイルでもメモリ使用量はおおよそ最終的な配列のサイズに抑えられます。
+
+        Args:
+            file_path: JSONファイルのパス
+            batch_size: 配列へ変換するラップの件数単位
+
+        Returns:
+            Dict: {'session_info': セッション情報, 'columns': LapColumns}
+        """
         try:
+            num_sectors = self.config.get_num_sectors()
+            builder = LapColumnsBuilder(num_sectors, batch_size, self.time_converter)
             with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            return self._process_json_data(data)
+                stream = JsonArrayStream(f, 'lap_data')
+                for i, lap in enumerate(stream.items()):
+                    processed_lap = self._process_json_lap(lap, i, num_sectors)
+                    if processed_lap is not None:
+                        builder.add(processed_lap)
+            session_info = self._check_stream_fields(stream)
+
+            if builder.count == 0:
+                error_details = "Please check if:\n" \
+                               "1. The file contains valid lap data with required fields (Rider, Lap, LapTime, Sector1, Sector2, Sector3)\n" \
+                               "2. The time format is valid (e.g. 1:23.456, 83.456, 1:23, or 83)"
+                raise ValueError(f"No valid lap data found. {error_details}")
+
+            return {
+                'session_info': session_info,
+                'columns': builder.build()
+            }
         except json.JSONDecodeError as e:
             raise ValueError(f"Invalid JSON format: {str(e)}")
         except Exception as e:
             print(f"Error loading JSON file: {e}")
             raise ValueError(f"Failed to load JSON file: {str(e)}")
 
+    def _check_stream_fields(self, stream: JsonArrayStream) -> Dict:
+        """ストリーム読み込み後にlap_dataとsession_infoの形式を確認する"""
+        if not stream.found_array:
+            if 'lap_data' in stream.fields:
+                raise ValueError("Invalid lap_data format: must be an array")
+        session_info = stream.fields.get('session_info', {})
+        if not isinstance(session_info, dict):
+            raise ValueError("Invalid session_info format")
+        return session_info
+
     def load_csv(self, file_path: str) -> Dict:
         """CSVファイルを読み込み、データを処理する"""
         try:
@@ -31,95 +104,72 @@ class DataLoader:
         except Exception as e:
             raise ValueError(f"Failed to load CSV file: {str(e)}")
 
-    def _process_json_data(self, data: Dict) -> Dict:
-        """JSONデータを処理して標準形式に変換する"""
-        try:
-            if not isinstance(data, dict):
-                raise ValueError("Invalid JSON data format: root must be an object")
-
-            # セッション情報の取得
-            session_info = data.get('session_info', {})
-            if not isinstance(session_info, dict):
-                raise ValueError("Invalid session_info format")
-
-            lap_data = data.get('lap_data', [])
-            if not isinstance(lap_data, list):
-                raise ValueError("Invalid lap_data format: must be an array")
-
-            # セクター数を取得
-            num_sectors = self.config.get_num_sectors()
+    def _process_json_lap(self, lap, index: int, num_sectors: int) -> Optional[Dict]:
+        """JSONのラップ要素を1件検証し、標準形式のdictに変換する
 
-            # ラップデータの処理
-            processed_laps = []
-            for i, lap in enumerate(lap_data):
-                if not isinstance(lap, dict):
-                    print(f"Warning: Skipping invalid lap data at index {i}")
-                    continue
-
-                try:
-                    # 必須フィールドを動的に構築
-                    required_fields = ['Rider', 'Lap', 'LapTime']
-                    for j in range(1, num_sectors + 1):
-                        required_fields.append(f'Sector{j}')
-                    
-                    # 必須フィールドの存在チェック
-                    missing_fields = [field for field in required_fields if field not in lap]
-                    if missing_fields:
-                        print(f"Warning: Missing required fields in lap data at index {i}: {', '.join(missing_fields)}")
-                        continue
+        Args:
+            lap: lap_dataの要素
+            index: lap_data内のインデックス（警告表示用）
+            num_sectors: セクター数
 
-                    # 基本データの処理
-                    processed_lap = {
-                        'Rider': str(lap['Rider']),
-                        'Lap': int(lap['Lap']),
-                        'LapTime': str(lap['LapTime']),
-                    }
-                    
-                    # セクターデータの処理（動的）
-                    for j in range(1, num_sectors + 1):
-                        sector_key = f'Sector{j}'
-                        processed_lap[sector_key] = str(lap.get(sector_key, ''))
+        Returns:
+            Optional[Dict]: 変換したラップ（無効なラップの場合はNone）
+        """
+        if not isinstance(lap, dict):
+            print(f"Warning: Skipping invalid lap data at index {index}")
+            return None
 
-                    # タイムデータの検証
-                    invalid_time_fields = []
-                    time_fields = ['LapTime']
-                    for j in range(1, num_sectors + 1):
-                        time_fields.append(f'Sector{j}')
-                        
-                    for field in time_fields:
-                        if not self.time_converter.is_valid_time_string(processed_lap[field]):
-                            invalid_time_fields.append(f"{field}={processed_lap[field]}")
-                    
-                    if invalid_time_fields:
-                        print(f"Warning: Invalid time format in lap data at index {i}: {', '.join(invalid_time_fields)}")
-                        continue
+        try:
+            # 必須フィールドを動的に構築
+            required_fields = ['Rider', 'Lap', 'LapTime']
+            for j in range(1, num_sectors + 1):
+                required_fields.append(f'Sector{j}')
+            
+            # 必須フィールドの存在チェック
+            missing_fields = [field for field in required_fields if field not in lap]
+            if missing_fields:
+                print(f"Warning: Missing required fields in lap data at index {index}: {', '.join(missing_fields)}")
+                return None
 
-                    # コンディション情報の処理
-                    conditions = lap.get('conditions', {})
-                    if isinstance(conditions, dict):
-                        processed_lap.update({
-                            'TireType': str(conditions.get('tire', '')),
-                            'Weather': str(conditions.get('weather', '')),
-                            'TrackTemp': str(conditions.get('track_temp', ''))
-                        })
+            # 基本データの処理
+            processed_lap = {
+                'Rider': str(lap['Rider']),
+                'Lap': int(lap['Lap']),
+                'LapTime': str(lap['LapTime']),
+            }
+            
+            # セクターデータの処理（動的）
+            for j in range(1, num_sectors + 1):
+                sector_key = f'Sector{j}'
+                processed_lap[sector_key] = str(lap.get(sector_key, ''))
 
-                    processed_laps.append(processed_lap)
-                except (ValueError, TypeError) as e:
-                    print(f"Warning: Error processing lap data at index {i}: {str(e)}")
-                    continue
+            # タイムデータの検証
+            invalid_time_fields = []
+            time_fields = ['LapTime']
+            for j in range(1, num_sectors + 1):
+                time_fields.append(f'Sector{j}')
+                
+            for field in time_fields:
+                if not self.time_converter.is_valid_time_string(processed_lap[field]):
+                    invalid_time_fields.append(f"{field}={processed_lap[field]}")
+            
+            if invalid_time_fields:
+                print(f"Warning: Invalid time format in lap data at index {index}: {', '.join(invalid_time_fields)}")
+                return None
 
-            if not processed_laps:
-                error_details = "Please check if:\n" \
-                               "1. The file contains valid lap data with required fields (Rider, Lap, LapTime, Sector1, Sector2, Sector3)\n" \
-                               "2. The time format is valid (e.g. 1:23.456, 83.456, 1:23, or 83)"
-                raise ValueError(f"No valid lap data found. {error_details}")
+            # コンディション情報の処理
+            conditions = lap.get('conditions', {})
+            if isinstance(conditions, dict):
+                processed_lap.update({
+                    'TireType': str(conditions.get('tire', '')),
+                    'Weather': str(conditions.get('weather', '')),
+                    'TrackTemp': str(conditions.get('track_temp', ''))
+                })
 
-            return {
-                'session_info': session_info,
-                'lap_data': processed_laps
-            }
-        except Exception as e:
-            raise ValueError(f"Failed to process JSON data: {str(e)}")
+            return processed_lap
+        except (ValueError, TypeError) as e:
+            print(f"Warning: Error processing lap data at index {index}: {str(e)}")
+            return None
 
     def _process_csv_data(self, df: pd.DataFrame) -> Dict:
         """CSVデータを処理して標準形式に変換する"""
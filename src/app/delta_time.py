@@ -0,0 +1,108 @@
+"""
+Delta Time Module
+テレメトリから、基準ラップに対する距離ごとのタイム差（デルタタイム）を計算するモジュールです。
+"""
+import numpy as np
+from typing import List, Optional, Sequence, Tuple
+from app.telemetry_store import TelemetryLap, TelemetryStore
+
+# 速度チャンネルの単位換算（km/h -> m/s）
+_KMH_TO_MS = 1.0 / 3.6
+
+# (距離[m], 経過時間[s]) の組
+LapTrace = Tuple[np.ndarray, np.ndarray]
+
+
+class DeltaTimeResult:
+    """基準ラップに対するデルタタイム
+
+    全ラップを共通の距離グリッドに再サンプリングした (ラップ数, グリッド点数) の行列で保持します。
+    デルタは「比較ラップ - 基準ラップ」の秒数で、正の値は基準より遅れていることを意味します。
+    ラップが届いていない距離はNaNです。
+    """
+
+    def __init__(self, distance: np.ndarray, reference: np.ndarray, times: np.ndarray):
+        self.distance = distance
+        self.reference = reference
+        self.times = times
+        self.deltas = times - reference[None, :]
+
+    def __len__(self) -> int:
+        return self.times.shape[0]
+
+    @property
+    def final_deltas(self) -> np.ndarray:
+        """各ラップの最後の有効な距離でのデルタ"""
+        if not len(self):
+            return np.zeros(0)
+        finite = np.isfinite(self.deltas)
+        last = finite.shape[1] - 1 - np.argmax(finite[:, ::-1], axis=1)
+        values = self.deltas[np.arange(len(self)), last]
+        return np.where(finite.any(axis=1), values, np.nan)
+
+
+def lap_trace(store: TelemetryStore, telemetry_lap: TelemetryLap,
+              distance_channel: str = 'Distance', speed_channel: str = 'Speed') -> Optional[LapTrace]:
+    """1ラップ分の (距離, 経過時間) を取得する
+
+    距離チャンネルがあればラップ開始位置からの差分を、なければ速度（km/h）を積分して距離を求めます。
+    GPSの揺らぎなどで距離が減少する箇所は直前の値で補い、単調増加にします。
+
+    Returns:
+        Optional[LapTrace]: (距離, 経過時間)。距離を求められない場合はNone
+    """
+    if len(telemetry_lap) < 2:
+        return None
+    time = store.lap_time_axis(telemetry_lap)
+    if store.has_channel(distance_channel):
+        distance = np.asarray(store.lap_channel(telemetry_lap, distance_channel), dtype=np.float64)
+        distance = distance - distance[0]
+    elif store.has_channel(speed_channel):
+        speed = np.asarray(store.lap_channel(telemetry_lap, speed_channel), dtype=np.float64) * _KMH_TO_MS
+        # 台形則で積分する
+        steps = (speed[1:] + speed[:-1]) * 0.5 / store.sample_rate
+        distance = np.concatenate(([0.0], np.cumsum(steps)))
+    else:
+        return None
+    valid = np.isfinite(distance)
+    if valid.sum() < 2:
+        return None
+    distance, time = distance[valid], time[valid]
+    return np.maximum.accumulate(distance), time
+
+
+def compute_delta_times(reference: LapTrace, traces: Sequence[LapTrace],
+                        num_points: int = 1000) -> DeltaTimeResult:
+    """基準ラップに対する全ラップのデルタタイムをまとめて計算する
+
+    各ラップの経過時間を基準ラップの距離範囲の共通グリッドにnp.interpで再サンプリングし、
+    (ラップ数, グリッド点数) の行列から基準ラップの行を一度に引きます。
+
+    Args:
+        reference: 基準ラップの (距離, 経過時間)
+        traces: 比較するラップの (距離, 経過時間) のリスト
+        num_points: 距離グリッドの点数
+
+    Returns:
+        DeltaTimeResult: デルタタイム
+    """
+    grid = np.linspace(0.0, float(reference[0][-1]), num_points)
+    reference_time = _resample(reference, grid)
+    times = np.full((len(traces), num_points), np.nan)
+    for i, trace in enumerate(traces):
+        times[i] = _resample(trace, grid)
+    return DeltaTimeResult(grid, reference_time, times)
+
+
+def _resample(trace: LapTrace, grid: np.ndarray) -> np.ndarray:
+    """経過時間を距離グリッド上に線形補間する（ラップの距離を超える点はNaN）"""
+    distance, time = trace
+    # 停止中など距離が変わらないサンプルは最初の1点のみ使う
+    keep = np.concatenate(([True], np.diff(distance) > 0))
+    return np.interp(grid, distance[keep], time[keep], right=np.nan)
+
+
+def lap_traces(store: TelemetryStore, telemetry_laps: List[TelemetryLap],
+               distance_channel: str = 'Distance', speed_channel: str = 'Speed') -> List[Optional[LapTrace]]:
+    """複数ラップの (距離, 経過時間) を取得する"""
+    return [lap_trace(store, telemetry_lap, distance_channel, speed_channel) for telemetry_lap in telemetry_laps]
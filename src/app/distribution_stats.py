@@ -0,0 +1,187 @@
+"""
+Distribution Stats Module
+ライダーごとのラップタイム・セクタータイムの分布（分位点とカーネル密度推定）を、
+解析ごとに1回まとめて計算するモジュールです。箱ひげ図・バイオリン図・リッジラインの描画に使います。
+"""
+import numpy as np
+from typing import Dict, List, Optional, Sequence
+from app.lap_columns import LapColumns
+
+# 計算する分位点（箱ひげ図の箱は25%〜75%、中央値は50%）
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+# 密度を評価する格子点の数
+DEFAULT_GRID_SIZE = 256
+
+# 箱ひげ図のひげの長さ（四分位範囲の倍数）
+WHISKER = 1.5
+
+
+class SeriesDistribution:
+    """1系列（'LapTime' または 'SectorN'）のライダーごとの分布
+
+    grid は全ライダー共通の格子点、densities は (ライダー数, 格子点数) の密度（各行の積分が1）、
+    quantiles は (ライダー数, len(QUANTILES)) の分位点、whiskers は (ライダー数, 2) のひげの端です。
+    ラップがないライダーの行はNaN（密度は0）です。
+    """
+
+    def __init__(self, name: str, grid: np.ndarray, densities: np.ndarray, quantiles: np.ndarray,
+                 whiskers: np.ndarray, means: np.ndarray, counts: np.ndarray):
+        self.name = name
+        self.grid = grid
+        self.densities = densities
+        self.quantiles = quantiles
+        self.whiskers = whiskers
+        self.means = means
+        self.counts = counts
+
+    def quantile(self, row: int, q: float) -> float:
+        """QUANTILESに含まれる分位点の値"""
+        return float(self.quantiles[row, QUANTILES.index(q)])
+
+    def box_stats(self, row: int, label: str) -> Optional[Dict]:
+        """箱ひげ図の統計量（matplotlibのAxes.bxpの形式、ラップがない場合はNone）"""
+        if not self.counts[row]:
+            return None
+        return {'label': label, 'q1': self.quantile(row, 0.25), 'med': self.quantile(row, 0.5),
+                'q3': self.quantile(row, 0.75), 'mean': float(self.means[row]),
+                'whislo': float(self.whiskers[row, 0]), 'whishi': float(self.whiskers[row, 1]), 'fliers': []}
+
+
+class DistributionStats:
+    """全ライダー × 系列の分布"""
+
+    def __init__(self, riders: List[str], series: Dict[str, SeriesDistribution]):
+        self.riders = list(riders)
+        self.series = series
+        self._rider_lookup = {name: i for i, name in enumerate(self.riders)}
+
+    def rider_row(self, rider: str) -> Optional[int]:
+        """ライダーの行（存在しない場合はNone）"""
+        return self._rider_lookup.get(rider)
+
+    def riders_by_median(self, series: str = 'LapTime') -> List[str]:
+        """ラップがあるライダーを中央値の速い順に並べたリスト"""
+        distribution = self.series[series]
+        medians = distribution.quantiles[:, QUANTILES.index(0.5)]
+        order = np.argsort(np.where(np.isnan(medians), np.inf, medians), kind='stable')
+        return [self.riders[row] for row in order if distribution.counts[row]]
+
+
+def series_distribution(name: str, codes: np.ndarray, values: np.ndarray, num_riders: int,
+                        grid_size: int = DEFAULT_GRID_SIZE) -> SeriesDistribution:
+    """1系列の全ライダーの分位点と密度をまとめて求める
+
+    分位点は (ライダー, 値) で1回ソートし、各ライダーの区間の位置から線形補間で求めます。
+    密度は全ライダー共通の格子へ線形ビニングした度数 (ライダー数, 格子点数) を、FFTで
+    ライダーごとの帯域幅（Silvermanの方法）のガウスカーネルと畳み込んで求めます。
+
+    Args:
+        name: 系列名
+        codes: 各ラップのライダーコード
+        values: 各ラップの値（NaN・0以下は除外する）
+        num_riders: ライダー数
+        grid_size: 密度を評価する格子点の数
+
+    Returns:
+        SeriesDistribution: 系列の分布
+    """
+    valid = np.isfinite(values) & (values > 0)
+    codes, values = codes[valid], values[valid]
+    order = np.lexsort((values, codes))
+    codes, values = codes[order], values[order]
+    counts = np.bincount(codes, minlength=num_riders)
+    starts = np.cumsum(counts) - counts
+    has_laps = counts > 0
+
+    def grouped_quantile(q):
+        position = starts + q * np.maximum(counts - 1, 0)
+        low = np.floor(position).astype(np.int64)
+        high = np.minimum(low + 1, starts + counts - 1)
+        fraction = position - low
+        result = np.full(num_riders, np.nan)
+        result[has_laps] = (values[low[has_laps]] * (1 - fraction[has_laps]) +
+                            values[np.maximum(high, low)[has_laps]] * fraction[has_laps])
+        return result
+
+    quantiles = np.column_stack([grouped_quantile(q) for q in QUANTILES]) if QUANTILES else np.zeros((num_riders, 0))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = np.bincount(codes, weights=values, minlength=num_riders) / counts
+        variances = np.bincount(codes, weights=values ** 2, minlength=num_riders) / counts - means ** 2
+
+    # ひげの端は箱から四分位範囲の1.5倍以内にある最も外側の値
+    q1, q3 = grouped_quantile(0.25), grouped_quantile(0.75)
+    iqr = q3 - q1
+    whiskers = np.full((num_riders, 2), np.nan)
+    for row in np.flatnonzero(has_laps):
+        rider_values = values[starts[row]:starts[row] + counts[row]]
+        low = np.searchsorted(rider_values, q1[row] - WHISKER * iqr[row], side='left')
+        high = np.searchsorted(rider_values, q3[row] + WHISKER * iqr[row], side='right') - 1
+        whiskers[row] = rider_values[min(low, counts[row] - 1)], rider_values[max(high, 0)]
+
+    grid, densities = _kernel_densities(codes, values, counts, np.sqrt(np.maximum(variances, 0.0)), iqr,
+                                        num_riders, grid_size)
+    return SeriesDistribution(name, grid, densities, quantiles, whiskers, means, counts)
+
+
+def _kernel_densities(codes, values, counts, stds, iqr, num_riders, grid_size):
+    """線形ビニングとFFTによるガウスカーネル密度推定"""
+    if not values.size:
+        return np.zeros(grid_size), np.zeros((num_riders, grid_size))
+
+    # Silvermanの経験則による帯域幅（四分位範囲で外れ値の影響を抑える）
+    with np.errstate(invalid='ignore', divide='ignore'):
+        spread = np.where(iqr > 0, np.minimum(stds, iqr / 1.34), stds)
+        bandwidths = 0.9 * spread * np.power(np.maximum(counts, 1), -0.2)
+
+    # 格子は全体の0.5%〜99.5%の範囲の両側に幅の半分までの値を含め、帯域幅の3倍の余白を加える
+    # （転倒・ピットインなどの極端な外れ値で格子が粗くならないように）
+    low, high = np.percentile(values, [0.5, 99.5])
+    span = high - low
+    low, high = max(values.min(), low - 0.5 * span), min(values.max(), high + 0.5 * span)
+    typical = np.nanmedian(bandwidths[counts > 1]) if (counts > 1).any() else 0.0
+    padding = 3.0 * (typical if np.isfinite(typical) and typical > 0 else max(high - low, 1.0) * 0.05)
+    low, high = low - padding, high + padding
+    grid = np.linspace(low, high, grid_size)
+    step = grid[1] - grid[0]
+    bandwidths = np.where(np.isfinite(bandwidths) & (bandwidths > 0), np.maximum(bandwidths, step), step)
+
+    # 線形ビニング（隣り合う2つの格子点に距離に応じて重みを分ける）
+    position = (values - low) / step
+    inside = (position >= 0) & (position < grid_size - 1)
+    index = np.floor(position[inside]).astype(np.int64)
+    weight = position[inside] - index
+    flat = codes[inside].astype(np.int64) * grid_size + index
+    binned = (np.bincount(flat, weights=1.0 - weight, minlength=num_riders * grid_size) +
+              np.bincount(flat + 1, weights=weight, minlength=num_riders * grid_size))
+    binned = binned.reshape(num_riders, grid_size)
+
+    # ガウスカーネルのフーリエ変換は exp(-2 (π f σ)^2)（0埋めで循環畳み込みの折り返しを防ぐ）
+    size = 2 * grid_size
+    frequencies = np.fft.rfftfreq(size, d=step)
+    transfer = np.exp(-2.0 * (np.pi * frequencies[None, :] * bandwidths[:, None]) ** 2)
+    densities = np.fft.irfft(np.fft.rfft(binned, n=size, axis=1) * transfer, n=size, axis=1)[:, :grid_size]
+    densities = np.maximum(densities, 0.0)
+    totals = densities.sum(axis=1, keepdims=True) * step
+    densities = np.divide(densities, totals, out=np.zeros_like(densities), where=totals > 0)
+    return grid, densities
+
+
+def compute_distribution_stats(columns: LapColumns, grid_size: int = DEFAULT_GRID_SIZE,
+                               series: Optional[Sequence[str]] = None) -> DistributionStats:
+    """全ライダーのラップタイムと各セクタータイムの分布を求める
+
+    Args:
+        columns: 列指向のラップデータ
+        grid_size: 密度を評価する格子点の数
+        series: 対象の系列名（省略時は 'LapTime' と全セクター）
+
+    Returns:
+        DistributionStats: 分布
+    """
+    all_series = {'LapTime': columns.lap_times}
+    all_series.update({f'Sector{i + 1}': columns.sector_times[:, i] for i in range(columns.num_sectors)})
+    names = list(all_series) if series is None else [name for name in series if name in all_series]
+    return DistributionStats(columns.riders, {
+        name: series_distribution(name, columns.rider_codes, all_series[name], columns.num_riders, grid_size)
+        for name in names})
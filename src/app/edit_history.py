@@ -0,0 +1,118 @@
+"""
+Edit History Module
+ラップデータの編集をコマンドとして記録し、元に戻す・やり直すためのモジュールです。
+"""
+from typing import Any, Dict, List, Optional, Set
+
+
+class EditCommand:
+    """1セルの編集（行番号・フィールド・変更前後の値のみを保持）"""
+
+    def __init__(self, row: int, field: str, old_value: Any, new_value: Any):
+        self.row = row
+        self.field = field
+        self.old_value = old_value
+        self.new_value = new_value
+
+    def apply(self, laps: List[Dict]) -> None:
+        laps[self.row][self.field] = self.new_value
+
+    def revert(self, laps: List[Dict]) -> None:
+        laps[self.row][self.field] = self.old_value
+
+    def affected_riders(self, laps: List[Dict]) -> Set[str]:
+        """再解析が必要なライダー（ライダー名の変更では変更前後の両方）"""
+        if self.field == 'Rider':
+            return {str(self.old_value), str(self.new_value)}
+        return {laps[self.row].get('Rider', '')}
+
+
+class AddLapCommand:
+    """ラップの追加"""
+
+    def __init__(self, row: int, lap: Dict):
+        self.row = row
+        self.lap = lap
+
+    def apply(self, laps: List[Dict]) -> None:
+        laps.insert(self.row, self.lap)
+
+    def revert(self, laps: List[Dict]) -> None:
+        del laps[self.row]
+
+    def affected_riders(self, laps: List[Dict]) -> Set[str]:
+        return {self.lap.get('Rider', '')}
+
+
+class DeleteLapsCommand:
+    """複数ラップの削除（削除前の行番号の昇順と削除したラップを保持）"""
+
+    def __init__(self, rows: List[int], laps: List[Dict]):
+        order = sorted(range(len(rows)), key=lambda i: rows[i])
+        self.rows = [rows[i] for i in order]
+        self.laps = [laps[i] for i in order]
+
+    @classmethod
+    def from_laps(cls, laps: List[Dict], rows: List[int]) -> 'DeleteLapsCommand':
+        """削除前のラップデータと行番号からコマンドを作成する"""
+        return cls(list(rows), [laps[row] for row in rows])
+
+    def apply(self, laps: List[Dict]) -> None:
+        for row in reversed(self.rows):
+            del laps[row]
+
+    def revert(self, laps: List[Dict]) -> None:
+        for row, lap in zip(self.rows, self.laps):
+            laps.insert(row, lap)
+
+    def affected_riders(self, laps: List[Dict]) -> Set[str]:
+        return {lap.get('Rider', '') for lap in self.laps}
+
+
+class UndoStack:
+    """元に戻す・やり直すためのコマンドスタック
+
+    コマンドは実行済みの状態でpushします。新しいコマンドをpushすると
+    やり直し可能なコマンドは破棄されます。
+    """
+
+    def __init__(self, limit: int = 1000):
+        self.limit = limit
+        self._undo = []
+        self._redo = []
+
+    def push(self, command) -> None:
+        """実行済みのコマンドを記録する"""
+        self._undo.append(command)
+        if len(self._undo) > self.limit:
+            del self._undo[0]
+        self._redo.clear()
+
+    def undo(self, laps: List[Dict]) -> Optional[object]:
+        """直前のコマンドを取り消す（取り消したコマンドを返す）"""
+        if not self._undo:
+            return None
+        command = self._undo.pop()
+        command.revert(laps)
+        self._redo.append(command)
+        return command
+
+    def redo(self, laps: List[Dict]) -> Optional[object]:
+        """取り消したコマンドをやり直す（やり直したコマンドを返す）"""
+        if not self._redo:
+            return None
+        command = self._redo.pop()
+        command.apply(laps)
+        self._undo.append(command)
+        return command
+
+    def can_undo(self) -> bool:
+        return bool(self._undo)
+
+    def can_redo(self) -> bool:
+        return bool(self._redo)
+
+    def clear(self) -> None:
+        """履歴を全て破棄する"""
+        self._undo.clear()
+        self._redo.clear()
@@ -0,0 +1,213 @@
+"""
+Edit Journal Module
+データ入力の追加・編集・削除を追記専用のジャーナルに記録し、異常終了後に復元するモジュールです。
+"""
+import json
+import os
+import time
+from typing import Dict, List, Optional
+from utils.atomic_io import atomic_write_text
+
+JOURNAL_VERSION = 1
+
+
+class EditJournal:
+    """追記専用の編集ジャーナル
+
+    編集操作は1操作1行のJSON（JSON Lines）としてジャーナルファイルに追記します。
+    書き込みは操作ごとにOSへフラッシュし、fsyncは一定件数または一定時間ごとに
+    まとめて行います。操作数がラップ数（最低compact_threshold）を超えると
+    スナップショットを書き出してジャーナルを空にするため、1操作あたりの
+    コストはセッションの大きさに依存しません。
+
+    各操作には連番を付け、スナップショットには取り込み済みの連番を記録します。
+    スナップショット書き出し後、ジャーナルを空にする前に異常終了しても、
+    復元時に取り込み済みの操作は読み飛ばされます。
+
+    ファイルの読み込みなどでデータ全体が置き換わった場合（reset）は、最初の編集まで
+    スナップショットを書き出しません（編集しないデータを読み込むたびに全体を書き出さない）。
+    """
+
+    def __init__(self, journal_path: str, sync_every: int = 50, sync_interval: float = 1.0,
+                 compact_threshold: int = 1000):
+        self.journal_path = journal_path
+        self.snapshot_path = journal_path + '.snapshot'
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.compact_threshold = compact_threshold
+        self._file = None
+        self._seq = 0
+        self._ops_since_snapshot = 0
+        self._pending_sync = 0
+        self._last_sync = time.monotonic()
+        self._snapshot_pending = False  # 次の操作の記録時にスナップショットから始め直すか
+        self._saved_seq = 0  # ファイルに保存済みの操作の連番
+
+    def has_recovery(self) -> bool:
+        """復元可能なジャーナルまたはスナップショットが存在するか"""
+        return os.path.exists(self.snapshot_path) or (
+            os.path.exists(self.journal_path) and os.path.getsize(self.journal_path) > 0)
+
+    def recover(self) -> List[Dict]:
+        """スナップショットにジャーナルの操作を適用してラップデータを復元する
+
+        Returns:
+            List[Dict]: 復元したラップデータ
+        """
+        laps = []
+        snapshot_seq = 0
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            laps = snapshot.get('laps', [])
+            snapshot_seq = snapshot.get('seq', 0)
+
+        seq = snapshot_seq
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        op = json.loads(line)
+                    except ValueError:
+                        # 書き込み途中で終了した最後の行
+                        print("Warning: Skipping incomplete journal entry")
+                        break
+                    if op.get('seq', 0) <= snapshot_seq:
+                        continue
+                    apply_operation(laps, op)
+                    seq = op['seq']
+        self._seq = seq
+        return laps
+
+    def reset(self, laps: List[Dict]) -> None:
+        """ファイルの読み込みなどでデータ全体が置き換わったときに呼び出す
+
+        以前のジャーナルとスナップショットを削除します。置き換わったデータはファイルから
+        読み直せるため、スナップショットは最初の編集を記録するときに書き出します。
+        """
+        self.close(discard=True)
+        self._snapshot_pending = True
+
+    def checkpoint(self, laps: List[Dict]) -> None:
+        """現在のラップデータをすぐにスナップショットとして保存し、ジャーナルを空にする
+
+        ジャーナルから復元したデータなど、ファイルに保存されていないデータに使います。
+        """
+        self._snapshot_pending = False
+        self._write_snapshot(laps)
+
+    def has_unsaved_edits(self) -> bool:
+        """ファイルに保存されていない編集が記録されているか"""
+        return self._seq > self._saved_seq
+
+    def mark_saved(self, seq: Optional[int] = None) -> None:
+        """連番seqまでの操作がファイルに保存されたことを記録する（省略時は記録済みの全操作）"""
+        self._saved_seq = max(self._saved_seq, self._seq if seq is None else seq)
+
+    @property
+    def seq(self) -> int:
+        """最後に記録した操作の連番"""
+        return self._seq
+
+    def record_add(self, laps: List[Dict], row: int) -> None:
+        """ラップの追加を記録する（lapsは追加後のデータ）"""
+        self._append({'op': 'add', 'row': row, 'lap': laps[row]}, laps)
+
+    def record_edit(self, laps: List[Dict], row: int, field: str) -> None:
+        """セルの編集を記録する（lapsは編集後のデータ）"""
+        self._append({'op': 'edit', 'row': row, 'field': field, 'value': laps[row].get(field)}, laps)
+
+    def record_delete(self, laps: List[Dict], rows: List[int]) -> None:
+        """ラップの削除を記録する（rowsは削除前の行番号）"""
+        self._append({'op': 'delete', 'rows': sorted(rows)}, laps)
+
+    def _append(self, op: Dict, laps: List[Dict]) -> None:
+        """操作をジャーナルに追記する"""
+        try:
+            if self._snapshot_pending:
+                # データの置き換え後の最初の操作は、操作後のデータのスナップショットとして記録する
+                self._seq += 1
+                self._snapshot_pending = False
+                self._write_snapshot(laps)
+                return
+            if self._file is None:
+                self._file = open(self.journal_path, 'a', encoding='utf-8')
+            self._seq += 1
+            op['seq'] = self._seq
+            self._file.write(json.dumps(op, ensure_ascii=False) + '\n')
+            # OSへのフラッシュは毎回行い、プロセスが異常終了しても失われないようにする
+            self._file.flush()
+            self._pending_sync += 1
+            self._ops_since_snapshot += 1
+
+            if self._ops_since_snapshot >= max(self.compact_threshold, len(laps)):
+                self._write_snapshot(laps)
+            elif (self._pending_sync >= self.sync_every or
+                  time.monotonic() - self._last_sync >= self.sync_interval):
+                self.sync()
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Error writing edit journal: {e}")
+
+    def sync(self) -> None:
+        """未同期の操作をディスクに書き込む（fsync）"""
+        if self._file is not None and self._pending_sync:
+            try:
+                os.fsync(self._file.fileno())
+            except OSError as e:
+                print(f"Error syncing edit journal: {e}")
+        self._pending_sync = 0
+        self._last_sync = time.monotonic()
+
+    def _write_snapshot(self, laps: List[Dict]) -> None:
+        """スナップショットを書き出し、ジャーナルを空にする"""
+        try:
+            directory = os.path.dirname(os.path.abspath(self.snapshot_path))
+            if not os.path.exists(directory):
+                os.makedirs(directory)
+            atomic_write_text(self.snapshot_path, json.dumps(
+                {'version': JOURNAL_VERSION, 'seq': self._seq, 'laps': laps}, ensure_ascii=False))
+            if self._file is not None:
+                self._file.close()
+            self._file = open(self.journal_path, 'w', encoding='utf-8')
+            self._ops_since_snapshot = 0
+            self._pending_sync = 0
+            self._last_sync = time.monotonic()
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Error writing journal snapshot: {e}")
+
+    def close(self, discard: bool = False) -> None:
+        """ジャーナルを閉じる
+
+        Args:
+            discard: Trueの場合はジャーナルとスナップショットを削除する（正常終了時）
+        """
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+        if discard:
+            for path in (self.journal_path, self.snapshot_path):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    print(f"Error removing journal file: {e}")
+            self._seq = 0
+            self._saved_seq = 0
+            self._ops_since_snapshot = 0
+
+
+def apply_operation(laps: List[Dict], op: Dict) -> None:
+    """ジャーナルの操作1件をラップデータに適用する"""
+    kind = op.get('op')
+    if kind == 'add':
+        laps.insert(op['row'], op['lap'])
+    elif kind == 'edit':
+        laps[op['row']][op['field']] = op['value']
+    elif kind == 'delete':
+        for row in sorted(op['rows'], reverse=True):
+            if row < len(laps):
+                del laps[row]
+    else:
+        print(f"Warning: Unknown journal operation: {kind}")
@@ -0,0 +1,134 @@
+"""
+Head-to-Head Module
+全ライダー間の総当たり比較行列を計算するモジュールです。
+"""
+import numpy as np
+from typing import List, Optional
+from app.lap_columns import LapColumns
+
+# 勝率計算時に一度に展開する要素数の上限（ライダー数×ライダー数×ラップ数）
+_WIN_RATE_BLOCK_ELEMENTS = 4_000_000
+
+
+class HeadToHeadMatrix:
+    """ライダー間の比較行列
+
+    各行列は (行ライダー, 列ライダー) の順で、デルタは「行 - 列」の秒数です。
+    負の値は行ライダーの方が速いことを意味します。
+    """
+
+    # 表示名とキーの対応
+    METRICS = {
+        'best_delta': 'Best Lap Delta',
+        'median_delta': 'Median Lap Delta',
+        'win_rate': 'Win Rate',
+    }
+
+    def __init__(self, riders: List[str], best_delta: np.ndarray, median_delta: np.ndarray,
+                 sector_best_delta: np.ndarray, win_rate: np.ndarray, matched_laps: np.ndarray):
+        self.riders = riders
+        self.best_delta = best_delta
+        self.median_delta = median_delta
+        self.sector_best_delta = sector_best_delta  # (セクター数, N, N)
+        self.win_rate = win_rate
+        self.matched_laps = matched_laps
+
+    @property
+    def num_sectors(self) -> int:
+        """セクター数"""
+        return self.sector_best_delta.shape[0]
+
+    def metric_names(self) -> List[str]:
+        """選択可能な指標の表示名を返す"""
+        names = list(self.METRICS.values())
+        names.extend(f'Sector{i + 1} Best Delta' for i in range(self.num_sectors))
+        return names
+
+    def get_matrix(self, metric_name: str) -> Optional[np.ndarray]:
+        """表示名から対応する行列を取得する"""
+        for key, name in self.METRICS.items():
+            if name == metric_name:
+                return getattr(self, key)
+        for i in range(self.num_sectors):
+            if metric_name == f'Sector{i + 1} Best Delta':
+                return self.sector_best_delta[i]
+        return None
+
+
+def build_head_to_head(columns: LapColumns) -> HeadToHeadMatrix:
+    """全ライダーの総当たり比較行列を構築する
+
+    ライダー単位の集約値をブロードキャストで差分化するため、
+    ライダーの組み合わせに対するPythonループは発生しません。
+
+    Args:
+        columns: 列指向のラップデータ
+
+    Returns:
+        HeadToHeadMatrix: 比較行列
+    """
+    valid = columns.valid
+    n_riders = columns.num_riders
+
+    # ライダーごとのベスト/中央値/セクターベスト
+    best = columns.group_reduce(columns.lap_times, np.fmin, valid)
+    median = _group_median(columns.rider_codes[valid], columns.lap_times[valid], n_riders)
+    sector_best = columns.group_reduce(columns.sector_times, np.fmin, valid)  # (N, S)
+
+    best_delta = best[:, None] - best[None, :]
+    median_delta = median[:, None] - median[None, :]
+    sector_t = sector_best.T
+    sector_best_delta = sector_t[:, :, None] - sector_t[:, None, :]
+
+    win_rate, matched = _matched_lap_win_rate(columns, valid)
+
+    return HeadToHeadMatrix(columns.riders, best_delta, median_delta,
+                            sector_best_delta, win_rate, matched)
+
+
+def _group_median(codes: np.ndarray, values: np.ndarray, n_groups: int) -> np.ndarray:
+    """グループごとの中央値をソート1回で計算する"""
+    result = np.full(n_groups, np.nan)
+    if len(values) == 0:
+        return result
+    order = np.lexsort((values, codes))
+    sorted_values = values[order]
+    counts = np.bincount(codes, minlength=n_groups)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    present = counts > 0
+    lo = starts[present] + (counts[present] - 1) // 2
+    hi = starts[present] + counts[present] // 2
+    result[present] = (sorted_values[lo] + sorted_values[hi]) / 2
+    return result
+
+
+def _matched_lap_win_rate(columns: LapColumns, valid: np.ndarray):
+    """同じラップ番号同士で比較した勝率行列を計算する
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (勝率行列, 比較できたラップ数の行列)
+    """
+    n_riders = columns.num_riders
+    wins = np.zeros((n_riders, n_riders))
+    matched = np.zeros((n_riders, n_riders))
+    if n_riders == 0 or not valid.any():
+        return np.full((n_riders, n_riders), np.nan), matched
+
+    # ライダー × ラップ番号 の行列（同一ラップ番号が複数ある場合は速い方を採用）
+    lap_values, lap_index = np.unique(columns.lap_numbers[valid], return_inverse=True)
+    table = np.full((n_riders, len(lap_values)), np.nan)
+    np.fmin.at(table, (columns.rider_codes[valid], lap_index), columns.lap_times[valid])
+
+    block = max(1, _WIN_RATE_BLOCK_ELEMENTS // (n_riders * n_riders))
+    for start in range(0, table.shape[1], block):
+        chunk = table[:, start:start + block]
+        a = chunk[:, None, :]
+        b = chunk[None, :, :]
+        both = ~np.isnan(a) & ~np.isnan(b)
+        wins += ((a < b) & both).sum(axis=2) + 0.5 * ((a == b) & both).sum(axis=2)
+        matched += both.sum(axis=2)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        win_rate = np.where(matched > 0, wins / matched, np.nan)
+    return win_rate, matched
+
@@ -0,0 +1,129 @@
+"""
+Item Registry Module
+ライダーやタイヤなどの登録項目をIDと名前で索引付けして管理するモジュールです。
+"""
+import re
+from typing import Dict, List, Optional
+
+
+class ItemRegistry:
+    """IDと名前の索引を持つ登録項目のコレクション
+
+    項目はID順ではなく登録順に保持します。IDと名前による検索、追加・更新・削除は
+    いずれも項目数に依存しない時間で行えます。設定ファイルに保存するリストは
+    変更があったときにのみ作り直します。
+    """
+
+    def __init__(self, id_prefix: str, items: Optional[List[Dict]] = None):
+        self.id_prefix = id_prefix
+        self._id_pattern = re.compile(rf'^{re.escape(id_prefix)}(\d+)$')
+        self.load(items or [])
+
+    def load(self, items: List[Dict]) -> None:
+        """リストから索引を作り直す"""
+        self._by_id = {}
+        self._by_name = {}
+        self._list = None
+        items = [item for item in items if isinstance(item, dict)]
+        # 読み込んだIDの最大の番号の次から払い出す
+        self._next_number = max((self._id_number(item.get("id")) for item in items), default=0) + 1
+        for item in items:
+            item_id = item.get("id") or self.next_id()
+            item["id"] = item_id
+            if item_id in self._by_id:
+                print(f"Warning: Duplicate {self.id_prefix} id: {item_id}")
+                continue
+            self._insert(item_id, item)
+
+    def next_id(self) -> str:
+        """未使用のIDを払い出す（番号は増える一方で、削除された項目のIDは再利用しない）"""
+        item_id = f"{self.id_prefix}{self._next_number}"
+        self._next_number += 1
+        return item_id
+
+    def add(self, item: Dict) -> str:
+        """項目を追加してIDを返す"""
+        item_id = self.next_id()
+        item["id"] = item_id
+        self._insert(item_id, item)
+        return item_id
+
+    def update(self, item_id: str, item: Dict) -> Optional[Dict]:
+        """項目を置き換える（位置は変えない）
+
+        Returns:
+            Optional[Dict]: 置き換え前の項目（IDが存在しない場合はNone）
+        """
+        old = self._by_id.get(item_id)
+        if old is None:
+            return None
+        item["id"] = item_id
+        self._unindex_name(old)
+        self._by_id[item_id] = item
+        self._index_name(item)
+        self._list = None
+        return old
+
+    def remove(self, item_id: str) -> Optional[Dict]:
+        """項目を削除する
+
+        Returns:
+            Optional[Dict]: 削除した項目（IDが存在しない場合はNone）
+        """
+        item = self._by_id.pop(item_id, None)
+        if item is None:
+            return None
+        self._unindex_name(item)
+        self._list = None
+        return item
+
+    def get(self, item_id: str) -> Optional[Dict]:
+        """IDで項目を取得する"""
+        return self._by_id.get(item_id)
+
+    def find_by_name(self, name: str) -> Optional[Dict]:
+        """名前で項目を取得する（同名の項目がある場合は先に登録されたもの）"""
+        ids = self._by_name.get(name)
+        return self._by_id[ids[0]] if ids else None
+
+    def to_list(self) -> List[Dict]:
+        """登録順の項目リストを取得する（保持しているリストをそのまま返すため、呼び出し側で変更しないこと）"""
+        if self._list is None:
+            self._list = list(self._by_id.values())
+        return self._list
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __contains__(self, item_id) -> bool:
+        return item_id in self._by_id
+
+    def _id_number(self, item_id) -> int:
+        """IDの番号（プレフィックス+番号の形式でない場合は0）"""
+        match = self._id_pattern.match(str(item_id)) if item_id else None
+        return int(match.group(1)) if match else 0
+
+    def _insert(self, item_id: str, item: Dict) -> None:
+        self._by_id[item_id] = item
+        self._index_name(item)
+        self._list = None
+
+    def _index_name(self, item: Dict) -> None:
+        name = item.get("name")
+        if name is None:
+            return
+        ids = self._by_name.setdefault(name, [])
+        ids.append(item["id"])
+        if len(ids) > 1:
+            # 同名の項目は登録順に並べる（先頭が検索結果になる）
+            order = {item_id: i for i, item_id in enumerate(self._by_id)}
+            ids.sort(key=lambda item_id: order.get(item_id, len(order)))
+
+    def _unindex_name(self, item: Dict) -> None:
+        name = item.get("name")
+        ids = self._by_name.get(name)
+        if not ids:
+            return
+        ids.remove(item["id"])
+        if not ids:
+            del self._by_name[name]
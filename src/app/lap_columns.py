@@ -0,0 +1,381 @@
+"""
+Lap Columns Module
+ラップデータを列指向（NumPy配列）で保持するためのモジュールです。
+"""
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple
+from utils.time_converter import TimeConverter
+
+
+def encode_categories(values: Sequence[str]) -> Tuple[List[str], np.ndarray]:
+    """文字列の列をカテゴリ名リストとコード配列に変換する
+
+    Args:
+        values: 文字列のシーケンス
+
+    Returns:
+        Tuple[List[str], np.ndarray]: (ソート済みカテゴリ名, 各要素のコード)
+    """
+    if len(values) == 0:
+        return [], np.zeros(0, dtype=np.int32)
+    names, codes = np.unique(np.asarray(values, dtype=object).astype(str), return_inverse=True)
+    return [str(name) for name in names], codes.astype(np.int32)
+
+
+def _merge_categories(names_list: List[List[str]]) -> Tuple[List[str], List[np.ndarray]]:
+    """複数のカテゴリ名リストを統合する
+
+    Returns:
+        Tuple[List[str], List[np.ndarray]]: (統合したソート済みカテゴリ名, 各リストのコードから統合後のコードへの変換表)
+    """
+    names = sorted(set().union(*names_list))
+    lookup = {name: i for i, name in enumerate(names)}
+    return names, [np.asarray([lookup[name] for name in part], dtype=np.int32) for part in names_list]
+
+
+def _drop_unused_categories(names: List[str], codes: np.ndarray) -> Tuple[List[str], np.ndarray]:
+    """使われていないカテゴリを除き、コードを付け替える（カテゴリ名の順序は保つ）"""
+    used = np.bincount(codes, minlength=len(names)) > 0
+    if used.all():
+        return list(names), codes
+    return [name for name, keep in zip(names, used) if keep], (np.cumsum(used) - 1).astype(np.int32)[codes]
+
+
+def format_seconds(seconds: float, converter: TimeConverter) -> str:
+    """秒数をラップデータの時間文字列に変換する（NaNは空文字列、1分未満はセクタータイムと同じ "ss.fff" 形式）"""
+    if np.isnan(seconds):
+        return ''
+    if seconds < 60:
+        return f"{seconds:.3f}"
+    return converter.seconds_to_string(float(seconds))
+
+
+class LapColumns:
+    """ラップデータの列指向表現
+
+    ラップごとのdictのリストを、ライダー・タイヤ・天候をカテゴリコード、
+    タイムを秒単位のfloat64配列（セクターは ラップ数×セクター数 の2次元配列）
+    として保持します。解析できなかったタイムはNaNになります。
+    """
+
+    def __init__(self, riders: List[str], rider_codes: np.ndarray, lap_numbers: np.ndarray,
+                 lap_times: np.ndarray, sector_times: np.ndarray,
+                 tires: Optional[List[str]] = None, tire_codes: Optional[np.ndarray] = None,
+                 weathers: Optional[List[str]] = None, weather_codes: Optional[np.ndarray] = None,
+                 track_temps: Optional[np.ndarray] = None):
+        n = len(lap_times)
+        self.riders = list(riders)
+        self.rider_codes = np.asarray(rider_codes, dtype=np.int32)
+        self.lap_numbers = np.asarray(lap_numbers, dtype=np.int64)
+        self.lap_times = np.asarray(lap_times, dtype=np.float64)
+        self.sector_times = np.asarray(sector_times, dtype=np.float64)
+        if self.sector_times.ndim != 2:
+            self.sector_times = self.sector_times.reshape(n, -1)
+        self.tires = list(tires) if tires is not None else ['']
+        self.tire_codes = (np.asarray(tire_codes, dtype=np.int32) if tire_codes is not None
+                           else np.zeros(n, dtype=np.int32))
+        self.weathers = list(weathers) if weathers is not None else ['']
+        self.weather_codes = (np.asarray(weather_codes, dtype=np.int32) if weather_codes is not None
+                              else np.zeros(n, dtype=np.int32))
+        self.track_temps = (np.asarray(track_temps, dtype=np.float64) if track_temps is not None
+                            else np.full(n, np.nan))
+        self._rider_lookup = {name: i for i, name in enumerate(self.riders)}
+
+    @classmethod
+    def from_laps(cls, laps: List[Dict], num_sectors: int,
+                  time_converter: Optional[TimeConverter] = None) -> 'LapColumns':
+        """ラップdictのリストから列指向データを構築する
+
+        Args:
+            laps: ラップデータのリスト（'Rider', 'Lap', 'LapTime', 'SectorN' など）
+            num_sectors: セクター数
+            time_converter: 時間変換に使用するTimeConverter（省略時は新規作成）
+
+        Returns:
+            LapColumns: 列指向データ
+        """
+        converter = time_converter or TimeConverter()
+        parse = _TimeParser(converter)
+        n = len(laps)
+
+        riders, rider_codes = encode_categories([lap.get('Rider', '') for lap in laps])
+        tires, tire_codes = encode_categories([lap.get('TireType', '') for lap in laps])
+        weathers, weather_codes = encode_categories([lap.get('Weather', '') for lap in laps])
+
+        lap_numbers = np.fromiter((_to_int(lap.get('Lap')) for lap in laps), dtype=np.int64, count=n)
+        lap_times = np.fromiter((parse(lap.get('LapTime')) for lap in laps), dtype=np.float64, count=n)
+        # セクターは ラップ×セクター の順に1次元で集めてまとめて変換する（ミニセクターで数百列になるため）
+        keys = [f'Sector{i + 1}' for i in range(num_sectors)]
+        sector_values = [lap.get(key) for lap in laps for key in keys]
+        sector_times = parse.parse_many(sector_values).reshape(n, num_sectors)
+        track_temps = np.fromiter((_to_float(lap.get('TrackTemp')) for lap in laps),
+                                  dtype=np.float64, count=n)
+
+        return cls(riders, rider_codes, lap_numbers, lap_times, sector_times,
+                   tires, tire_codes, weathers, weather_codes, track_temps)
+
+    @classmethod
+    def concatenate(cls, parts: List['LapColumns']) -> 'LapColumns':
+        """複数の列指向データを連結する
+
+        カテゴリ（ライダー・タイヤ・天候）は全体で統合し、各部分のコードを付け替えます。
+
+        Args:
+            parts: 同じセクター数を持つLapColumnsのリスト
+
+        Returns:
+            LapColumns: 連結した列指向データ
+        """
+        parts = [part for part in parts if len(part)]
+        if not parts:
+            return cls([], [], [], [], np.zeros((0, 0)))
+        if len(parts) == 1:
+            return parts[0]
+
+        def merge(names_list, codes_list):
+            names, remaps = _merge_categories(names_list)
+            codes = np.concatenate([remap[part_codes] if len(part_codes) else part_codes
+                                    for remap, part_codes in zip(remaps, codes_list)])
+            return names, codes
+
+        riders, rider_codes = merge([p.riders for p in parts], [p.rider_codes for p in parts])
+        tires, tire_codes = merge([p.tires for p in parts], [p.tire_codes for p in parts])
+        weathers, weather_codes = merge([p.weathers for p in parts], [p.weather_codes for p in parts])
+        return cls(riders, rider_codes,
+                   np.concatenate([p.lap_numbers for p in parts]),
+                   np.concatenate([p.lap_times for p in parts]),
+                   np.concatenate([p.sector_times for p in parts]),
+                   tires, tire_codes, weathers, weather_codes,
+                   np.concatenate([p.track_temps for p in parts]))
+
+    def replace_rows(self, rows: Sequence[int], replacement: 'LapColumns') -> 'LapColumns':
+        """指定した行をreplacementの各行に置き換えた列指向データを作成する（自身は変更しない）
+
+        セルの編集で一部のラップのみが変わった場合に、全ラップを解析し直さずに列指向データを更新します。
+        カテゴリは変更後に使われているもののみをソートして持つため、from_lapsで作り直した場合と同じになります。
+
+        Args:
+            rows: 置き換える行のインデックス
+            replacement: 置き換え後の行（rowsと同じ順・同じセクター数）
+
+        Returns:
+            LapColumns: 置き換えた列指向データ
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        if len(replacement) != rows.size or replacement.num_sectors != self.num_sectors:
+            raise ValueError("Replacement rows do not match the lap columns")
+
+        def replace(values, new_values):
+            values = values.copy()
+            values[rows] = new_values
+            return values
+
+        def replace_codes(names, codes, new_names, new_codes):
+            merged, (remap, new_remap) = _merge_categories([names, new_names])
+            codes = remap[codes] if len(codes) else codes.copy()
+            codes[rows] = new_remap[new_codes]
+            # 置き換えで使われなくなったカテゴリを除く
+            return _drop_unused_categories(merged, codes)
+
+        riders, rider_codes = replace_codes(self.riders, self.rider_codes,
+                                            replacement.riders, replacement.rider_codes)
+        tires, tire_codes = replace_codes(self.tires, self.tire_codes,
+                                          replacement.tires, replacement.tire_codes)
+        weathers, weather_codes = replace_codes(self.weathers, self.weather_codes,
+                                                replacement.weathers, replacement.weather_codes)
+        return LapColumns(riders, rider_codes,
+                          replace(self.lap_numbers, replacement.lap_numbers),
+                          replace(self.lap_times, replacement.lap_times),
+                          replace(self.sector_times, replacement.sector_times),
+                          tires, tire_codes, weathers, weather_codes,
+                          replace(self.track_temps, replacement.track_temps))
+
+    def take(self, rows) -> 'LapColumns':
+        """指定した行のみの列指向データを作成する（絞り込み用、自身は変更しない）
+
+        カテゴリは選んだ行で使われているもののみを持つため、from_lapsで作り直した場合と同じになります。
+
+        Args:
+            rows: 行のインデックスまたはラップ数の長さのブールマスク
+
+        Returns:
+            LapColumns: 選んだ行の列指向データ
+        """
+        rows = np.asarray(rows)
+        if rows.dtype == bool:
+            rows = np.flatnonzero(rows)
+        riders, rider_codes = _drop_unused_categories(self.riders, self.rider_codes[rows])
+        tires, tire_codes = _drop_unused_categories(self.tires, self.tire_codes[rows])
+        weathers, weather_codes = _drop_unused_categories(self.weathers, self.weather_codes[rows])
+        return LapColumns(riders, rider_codes, self.lap_numbers[rows], self.lap_times[rows],
+                          self.sector_times[rows], tires, tire_codes, weathers, weather_codes,
+                          self.track_temps[rows])
+
+    def __len__(self) -> int:
+        return len(self.lap_times)
+
+    @property
+    def num_sectors(self) -> int:
+        """セクター数"""
+        return self.sector_times.shape[1]
+
+    @property
+    def num_riders(self) -> int:
+        """ライダー数"""
+        return len(self.riders)
+
+    @property
+    def valid(self) -> np.ndarray:
+        """ラップタイムと全セクタータイムが有効なラップのマスク"""
+        return ~np.isnan(self.lap_times) & ~np.isnan(self.sector_times).any(axis=1)
+
+    def rider_index(self, rider: str) -> Optional[int]:
+        """ライダー名からコードを取得する（存在しない場合はNone）"""
+        return self._rider_lookup.get(rider)
+
+    def rider_mask(self, rider: str) -> np.ndarray:
+        """指定ライダーのラップを示すブールマスクを返す"""
+        code = self.rider_index(rider)
+        if code is None:
+            return np.zeros(len(self), dtype=bool)
+        return self.rider_codes == code
+
+    def to_laps(self, time_converter: Optional[TimeConverter] = None) -> List[Dict]:
+        """列指向データをラップdictのリストに戻す
+
+        Args:
+            time_converter: 時間変換に使用するTimeConverter（省略時は新規作成）
+
+        Returns:
+            List[Dict]: DataLoaderが返す形式と同じラップデータのリスト
+        """
+        converter = time_converter or TimeConverter()
+
+        def format_time(seconds: float) -> str:
+            return format_seconds(seconds, converter)
+
+        def format_temp(value: float) -> str:
+            return '' if np.isnan(value) else f"{value:g}"
+
+        laps = []
+        for i in range(len(self)):
+            lap = {
+                'Rider': self.riders[self.rider_codes[i]],
+                'Lap': int(self.lap_numbers[i]),
+                'LapTime': format_time(self.lap_times[i]),
+            }
+            for j in range(self.num_sectors):
+                lap[f'Sector{j + 1}'] = format_time(self.sector_times[i, j])
+            lap['TireType'] = self.tires[self.tire_codes[i]]
+            lap['Weather'] = self.weathers[self.weather_codes[i]]
+            lap['TrackTemp'] = format_temp(self.track_temps[i])
+            laps.append(lap)
+        return laps
+
+    def group_reduce(self, values: np.ndarray, func: np.ufunc, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """ライダー単位でufuncによる集約を行う
+
+        Args:
+            values: ラップ数を先頭次元に持つ配列（1次元または2次元）
+            func: np.fmin / np.fmax / np.add などの集約ufunc
+            mask: 集約対象のラップを示すマスク（省略時は全ラップ）
+
+        Returns:
+            np.ndarray: (ライダー数, ...) の集約結果。対象ラップがない場合はNaN
+        """
+        values = np.asarray(values, dtype=np.float64)
+        out = np.full((self.num_riders,) + values.shape[1:], np.nan)
+        if func is np.add:
+            out[...] = 0.0
+        codes = self.rider_codes
+        if mask is not None:
+            codes = codes[mask]
+            values = values[mask]
+        func.at(out, codes, values)
+        return out
+
+
+class LapColumnsBuilder:
+    """ラップdictを逐次受け取り、一定件数ごとに列指向データへ変換するビルダー
+
+    ラップdictはバッチサイズ分だけ保持し、バッチごとに配列へ変換して破棄するため、
+    全ラップ分のdictを同時にメモリに置く必要がありません。
+    """
+
+    def __init__(self, num_sectors: int, batch_size: int = 10000,
+                 time_converter: Optional[TimeConverter] = None):
+        self.num_sectors = num_sectors
+        self.batch_size = max(1, int(batch_size))
+        self.time_converter = time_converter or TimeConverter()
+        self._batch = []
+        self._parts = []
+        self.count = 0
+
+    def add(self, lap: Dict) -> None:
+        """ラップを1件追加する"""
+        self._batch.append(lap)
+        self.count += 1
+        if len(self._batch) >= self.batch_size:
+            self._flush()
+
+    def _flush(self) -> None:
+        """保持しているバッチを列指向データに変換する"""
+        if self._batch:
+            self._parts.append(LapColumns.from_laps(self._batch, self.num_sectors, self.time_converter))
+            self._batch = []
+
+    def build(self) -> LapColumns:
+        """追加された全ラップの列指向データを作成する"""
+        self._flush()
+        if not self._parts:
+            return LapColumns([], [], [], [], np.zeros((0, self.num_sectors)))
+        columns = LapColumns.concatenate(self._parts)
+        self._parts = [columns]
+        return columns
+
+
+class _TimeParser:
+    """時間文字列を秒に変換する（同じ文字列の再解析を避けるためキャッシュする）"""
+
+    def __init__(self, time_converter: TimeConverter):
+        self.time_converter = time_converter
+        self.cache = {}
+
+    def __call__(self, value) -> float:
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return float(value)
+        if not isinstance(value, str):
+            return np.nan
+        seconds = self.cache.get(value)
+        if seconds is None:
+            try:
+                seconds = self.time_converter.string_to_seconds(value)
+            except ValueError:
+                seconds = np.nan
+            self.cache[value] = seconds
+        return seconds
+
+    def parse_many(self, values: List) -> np.ndarray:
+        """値のリストを秒の配列に変換する（異なる値ごとに1回だけ解析する）"""
+        try:
+            seconds = {value: self(value) for value in set(values)}
+        except TypeError:
+            # ハッシュできない値を含む場合は1つずつ変換する
+            return np.fromiter(map(self, values), dtype=np.float64, count=len(values))
+        return np.fromiter(map(seconds.__getitem__, values), dtype=np.float64, count=len(values))
+
+
+def _to_int(value) -> int:
+    """ラップ番号を整数に変換する（変換できない場合は0）"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _to_float(value) -> float:
+    """数値文字列をfloatに変換する（変換できない場合はNaN）"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
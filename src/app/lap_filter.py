@@ -0,0 +1,324 @@
+"""
+Lap Filter Module
+ラップを絞り込む条件式を解析し、列指向のラップデータに対するブールマスクを求めるモジュールです。
+
+条件式の例:
+    Rider in ("藤田", "佐藤") and TireType == "KR410" and LapTime < 2:26.0 and not outlier
+
+- 項目: Rider, TireType (Tire), Weather, Lap, LapTime, Sector1..N, TrackTemp (Temp)
+- 比較: == (=), !=, <, <=, >, >=（大小比較は数値の項目のみ）, in (...), not in (...)
+- 論理演算: and, or, not, 括弧
+- フラグ: outlier（ライダーのベストの OUTLIER_RATIO 倍より遅い、またはタイムのないラップ）,
+  valid（ラップタイムと全セクタータイムが有効なラップ）
+- 値: "文字列" / '文字列'、数値、時間（1:23.456 など）、引用符のない単語（文字列として扱う）
+"""
+import re
+import numpy as np
+from typing import Callable, List, Optional, Tuple
+from utils.time_converter import TimeConverter
+from app.analysis_cache import AnalysisCache
+from app.lap_columns import LapColumns
+
+# outlier とみなすラップタイム（ライダーのベストラップに対する比率）
+OUTLIER_RATIO = 1.07
+
+# コンパイル済みの条件式のキャッシュの大きさ
+_COMPILED_CACHE_SIZE = 128
+
+_TOKEN_PATTERN = re.compile(r"""
+    \s*(?:
+      (?P<string>"[^"]*"|'[^']*')
+    | (?P<time>\d+(?::\d+)+(?:\.\d+)?)
+    | (?P<number>-?\d+(?:\.\d+)?)
+    | (?P<op>==|!=|<=|>=|=|<|>|\(|\)|,)
+    | (?P<word>[^\s"'=!<>(),]+)
+    )""", re.VERBOSE)
+
+# カテゴリの項目（LapColumnsのカテゴリ名とコードの属性）
+_CATEGORY_FIELDS = {
+    'rider': ('riders', 'rider_codes'),
+    'tiretype': ('tires', 'tire_codes'),
+    'tire': ('tires', 'tire_codes'),
+    'weather': ('weathers', 'weather_codes'),
+}
+
+# 数値の項目（LapColumnsの属性）
+_NUMERIC_FIELDS = {
+    'lap': 'lap_numbers',
+    'laptime': 'lap_times',
+    'tracktemp': 'track_temps',
+    'temp': 'track_temps',
+}
+
+_KEYWORDS = ('and', 'or', 'not', 'in')
+
+_COMPARISONS = {
+    '==': np.equal, '=': np.equal, '!=': np.not_equal,
+    '<': np.less, '<=': np.less_equal, '>': np.greater, '>=': np.greater_equal,
+}
+
+
+class FilterContext:
+    """条件式を評価する列指向データと、フラグのマスクの遅延計算結果"""
+
+    def __init__(self, columns: LapColumns):
+        self.columns = columns
+        self._outliers = None
+
+    @property
+    def outliers(self) -> np.ndarray:
+        """ライダーのベストの OUTLIER_RATIO 倍より遅い、またはタイムのないラップのマスク"""
+        if self._outliers is None:
+            times = self.columns.lap_times
+            best = self.columns.group_reduce(times, np.fmin) if len(times) else np.zeros(0)
+            with np.errstate(invalid='ignore'):
+                self._outliers = ~(times <= best[self.columns.rider_codes] * OUTLIER_RATIO)
+        return self._outliers
+
+
+class CompiledFilter:
+    """コンパイル済みの条件式
+
+    条件式は1回だけ解析し、列指向データの配列に対するNumPyの比較・論理演算の組み合わせに
+    変換します。評価はラップ数nに対してO(n)のベクトル演算のみです。
+    """
+
+    def __init__(self, expression: str, evaluate: Optional[Callable[[FilterContext], np.ndarray]]):
+        self.expression = expression
+        self._evaluate = evaluate
+
+    @property
+    def is_empty(self) -> bool:
+        """条件のない（全ラップに一致する）条件式かどうか"""
+        return self._evaluate is None
+
+    def mask(self, columns: LapColumns, context: Optional[FilterContext] = None) -> np.ndarray:
+        """条件に一致するラップのブールマスク"""
+        if self._evaluate is None:
+            return np.ones(len(columns), dtype=bool)
+        result = self._evaluate(context or FilterContext(columns))
+        return np.broadcast_to(np.asarray(result, dtype=bool), (len(columns),)).copy()
+
+
+_compiled = AnalysisCache(_COMPILED_CACHE_SIZE)
+
+
+def compile_filter(expression: str) -> CompiledFilter:
+    """条件式をコンパイルする（同じ条件式はキャッシュを返す）
+
+    Args:
+        expression: 条件式（空の場合は全ラップに一致する）
+
+    Returns:
+        CompiledFilter: コンパイル済みの条件式
+
+    Raises:
+        ValueError: 条件式が解析できない場合
+    """
+    expression = (expression or '').strip()
+    compiled = _compiled.get(expression)
+    if compiled is None:
+        evaluate = _Parser(expression).parse() if expression else None
+        compiled = CompiledFilter(expression, evaluate)
+        _compiled.put(expression, compiled)
+    return compiled
+
+
+def _tokenize(expression: str) -> List[Tuple[str, str, int]]:
+    """条件式を (種類, 文字列, 位置) のトークンに分割する"""
+    tokens = []
+    position = 0
+    expression = expression.rstrip()
+    while position < len(expression):
+        match = _TOKEN_PATTERN.match(expression, position)
+        if match is None or match.end() == position:
+            raise ValueError(f"Unexpected character at position {position + 1}: "
+                             f"{expression[position:position + 10]!r}")
+        kind = match.lastgroup
+        text, start = match.group(kind), match.start(kind)
+        if kind == 'word' and text.lower() in _KEYWORDS:
+            kind, text = 'keyword', text.lower()
+        tokens.append((kind, text, start))
+        position = match.end()
+    return tokens
+
+
+class _Parser:
+    """再帰下降による条件式の解析
+
+    expression := or_expr
+    or_expr    := and_expr ('or' and_expr)*
+    and_expr   := not_expr ('and' not_expr)*
+    not_expr   := 'not' not_expr | '(' or_expr ')' | comparison | flag
+    comparison := field op value | field ['not'] 'in' '(' value (',' value)* ')'
+    """
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        self.tokens = _tokenize(expression)
+        self.position = 0
+        self.time_converter = TimeConverter()
+
+    def parse(self) -> Callable[[FilterContext], np.ndarray]:
+        node = self._or()
+        if self.position < len(self.tokens):
+            self._error("Unexpected", self.tokens[self.position])
+        return node
+
+    def _peek(self, kind: Optional[str] = None, text: Optional[str] = None):
+        if self.position >= len(self.tokens):
+            return None
+        token = self.tokens[self.position]
+        if (kind is not None and token[0] != kind) or (text is not None and token[1] != text):
+            return None
+        return token
+
+    def _take(self, kind: Optional[str] = None, text: Optional[str] = None, expected: str = ''):
+        token = self._peek(kind, text)
+        if token is None:
+            if self.position >= len(self.tokens):
+                raise ValueError(f"Unexpected end of filter, expected {expected or text or kind}")
+            self._error(f"Expected {expected or text or kind} but found", self.tokens[self.position])
+        self.position += 1
+        return token
+
+    def _error(self, message: str, token):
+        raise ValueError(f"{message} '{token[1]}' at position {token[2] + 1}")
+
+    def _or(self):
+        nodes = [self._and()]
+        while self._peek('keyword', 'or'):
+            self.position += 1
+            nodes.append(self._and())
+        if len(nodes) == 1:
+            return nodes[0]
+        return lambda context: np.logical_or.reduce([node(context) for node in nodes])
+
+    def _and(self):
+        nodes = [self._not()]
+        while self._peek('keyword', 'and'):
+            self.position += 1
+            nodes.append(self._not())
+        if len(nodes) == 1:
+            return nodes[0]
+        return lambda context: np.logical_and.reduce([node(context) for node in nodes])
+
+    def _not(self):
+        if self._peek('keyword', 'not'):
+            self.position += 1
+            node = self._not()
+            return lambda context: ~node(context)
+        if self._peek('op', '('):
+            self.position += 1
+            node = self._or()
+            self._take('op', ')')
+            return node
+        return self._comparison()
+
+    def _comparison(self):
+        field = self._take('word', expected='field name')
+        name = field[1].lower()
+        if name == 'outlier':
+            return lambda context: context.outliers
+        if name == 'valid':
+            return lambda context: context.columns.valid
+
+        negate = bool(self._peek('keyword', 'not'))
+        if negate:
+            self.position += 1
+            self._take('keyword', 'in')
+        if negate or self._peek('keyword', 'in'):
+            if not negate:
+                self.position += 1
+            self._take('op', '(')
+            values = [self._value()]
+            while self._peek('op', ','):
+                self.position += 1
+                values.append(self._value())
+            self._take('op', ')')
+            node = self._membership(field, values)
+            return (lambda context: ~node(context)) if negate else node
+
+        op = self._take('op', expected='comparison operator')
+        if op[1] not in _COMPARISONS:
+            self._error("Expected comparison operator but found", op)
+        return self._compare(field, op, self._value())
+
+    def _value(self):
+        token = self._take(expected='value')
+        if token[0] not in ('string', 'time', 'number', 'word'):
+            self._error("Expected value but found", token)
+        return token
+
+    def _numeric_accessor(self, field):
+        """数値の項目の配列を取り出す関数（数値の項目でない場合はNone）"""
+        name = field[1].lower()
+        if name in _NUMERIC_FIELDS:
+            attribute = _NUMERIC_FIELDS[name]
+            return lambda columns: getattr(columns, attribute)
+        match = re.fullmatch(r'sector(\d+)', name)
+        if match:
+            index = int(match.group(1)) - 1
+
+            def sector(columns):
+                if not 0 <= index < columns.num_sectors:
+                    raise ValueError(f"Unknown field: {field[1]}")
+                return columns.sector_times[:, index]
+            return sector
+        return None
+
+    def _seconds(self, token) -> float:
+        """値のトークンを数値（時間は秒）に変換する"""
+        kind, text = token[0], token[1]
+        if kind == 'number':
+            return float(text)
+        if kind == 'string':
+            text = text[1:-1]
+        try:
+            return float(self.time_converter.string_to_seconds(text))
+        except (TypeError, ValueError):
+            self._error("Expected number or time but found", token)
+
+    @staticmethod
+    def _text(token) -> str:
+        return token[1][1:-1] if token[0] == 'string' else token[1]
+
+    def _compare(self, field, op, value):
+        numeric = self._numeric_accessor(field)
+        compare = _COMPARISONS[op[1]]
+        if numeric is not None:
+            target = self._seconds(value)
+
+            def evaluate(context):
+                values = numeric(context.columns)
+                with np.errstate(invalid='ignore'):
+                    # タイムのない（NaN）ラップはどの比較にも一致しない
+                    return compare(values, target) & ~np.isnan(values)
+            return evaluate
+
+        category = _CATEGORY_FIELDS.get(field[1].lower())
+        if category is None:
+            self._error("Unknown field", field)
+        if op[1] not in ('==', '=', '!='):
+            self._error("Ordering comparison is not supported for text field", field)
+        node = self._membership(field, [value])
+        return (lambda context: ~node(context)) if op[1] == '!=' else node
+
+    def _membership(self, field, values):
+        numeric = self._numeric_accessor(field)
+        if numeric is not None:
+            targets = np.array([self._seconds(value) for value in values])
+            return lambda context: np.isin(numeric(context.columns), targets)
+
+        category = _CATEGORY_FIELDS.get(field[1].lower())
+        if category is None:
+            self._error("Unknown field", field)
+        names_attribute, codes_attribute = category
+        texts = {self._text(value) for value in values}
+
+        def evaluate(context):
+            # カテゴリごとの一致表を作り、コードで引く（文字列の比較はカテゴリ数のみ）
+            names = getattr(context.columns, names_attribute)
+            table = np.array([name in texts for name in names] + [False], dtype=bool)
+            return table[getattr(context.columns, codes_attribute)]
+        return evaluate
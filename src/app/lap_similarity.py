@@ -0,0 +1,176 @@
+"""
+Lap Similarity Module
+ラップタイムとセクタータイムのベクトルから、似た走りのラップを検索する近傍探索インデックスを提供するモジュールです。
+"""
+import numpy as np
+from typing import Optional, Tuple
+from app.lap_columns import LapColumns
+
+# 距離計算で一度に扱うラップ数（一時配列のメモリ使用量を抑える）
+_BLOCK_SIZE = 262144
+
+
+class LapSimilarityIndex:
+    """正規化したセクタータイムベクトルの近傍探索インデックス
+
+    各ラップを (LapTime, Sector1..N) のベクトルとし、列ごとに平均0・標準偏差1に正規化して
+    float32の行列として保持します。条件を含める場合は路面温度（正規化）と、
+    タイヤ・天候のone-hot列を加えます。
+
+    検索は全ラップとの総当たりで、距離の2乗を |x|^2 - 2 x・q + |q|^2 として
+    ブロックごとの行列積で求め、np.argpartitionで上位のみを取り出します。
+    ラップタイム・セクタータイムが欠けたラップはインデックスに含めません。
+    """
+
+    def __init__(self, columns: LapColumns, include_conditions: bool = False):
+        """
+        Args:
+            columns: 列指向のラップデータ
+            include_conditions: 路面温度・タイヤ・天候を特徴量に含めるかどうか
+        """
+        self.include_conditions = include_conditions
+        self.rows = np.flatnonzero(columns.valid)  # インデックスの行 -> ラップデータのインデックス
+        self._positions = np.full(len(columns), -1, dtype=np.int64)
+        self._positions[self.rows] = np.arange(self.rows.size)
+
+        features = np.column_stack((columns.lap_times, columns.sector_times))[self.rows]
+        self.mean = features.mean(axis=0) if self.rows.size else np.zeros(features.shape[1])
+        scale = features.std(axis=0) if self.rows.size else np.ones(features.shape[1])
+        self.scale = np.where(scale > 0, scale, 1.0)
+        vectors = (features - self.mean) / self.scale
+
+        if include_conditions:
+            temps = columns.track_temps[self.rows]
+            finite = np.isfinite(temps)
+            temp_mean = temps[finite].mean() if finite.any() else 0.0
+            temp_std = temps[finite].std() if finite.any() else 0.0
+            # 路面温度が未入力のラップは平均値として扱う
+            temp_z = np.where(finite, (temps - temp_mean) / (temp_std or 1.0), 0.0)
+            tires = np.eye(len(columns.tires))[columns.tire_codes[self.rows]]
+            weathers = np.eye(len(columns.weathers))[columns.weather_codes[self.rows]]
+            vectors = np.column_stack((vectors, temp_z, tires, weathers))
+
+        self.vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        self.norms = np.einsum('ij,ij->i', self.vectors, self.vectors)
+
+    def __len__(self) -> int:
+        """インデックスに含まれるラップ数"""
+        return self.rows.size
+
+    @property
+    def dimensions(self) -> int:
+        """特徴量の次元数"""
+        return self.vectors.shape[1]
+
+    def contains(self, lap_index: int) -> bool:
+        """ラップがインデックスに含まれているかどうか"""
+        return 0 <= lap_index < self._positions.size and self._positions[lap_index] >= 0
+
+    def vector(self, lap_index: int) -> np.ndarray:
+        """ラップの正規化済みベクトル
+
+        Raises:
+            KeyError: ラップがインデックスに含まれていない場合
+        """
+        if not self.contains(lap_index):
+            raise KeyError(f"Lap {lap_index} is not in the similarity index")
+        return self.vectors[self._positions[lap_index]]
+
+    def query(self, lap_index: int, k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """指定ラップに似たラップをk件検索する（指定ラップ自身は除く）
+
+        Args:
+            lap_index: ラップデータのインデックス
+            k: 取得する件数
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (ラップデータのインデックス, 距離)。距離の昇順
+
+        Raises:
+            KeyError: ラップがインデックスに含まれていない場合
+        """
+        indices, distances = self.query_vector(self.vector(lap_index), k + 1)
+        keep = indices != lap_index
+        return indices[keep][:k], distances[keep][:k]
+
+    def query_vector(self, vector: np.ndarray, k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """正規化済みベクトルに近いラップをk件検索する"""
+        indices, distances = self.query_many(np.asarray(vector, dtype=np.float32)[None, :], k)
+        return indices[0], distances[0]
+
+    def query_many(self, vectors: np.ndarray, k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """複数のベクトルそれぞれについて近いラップをk件検索する
+
+        Args:
+            vectors: (クエリ数, 次元数) の正規化済みベクトル
+            k: 取得する件数
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (クエリ数, k) のラップデータのインデックスと距離。
+            インデックスのラップ数がkより少ない場合は列数もそれに合わせて少なくなります。
+        """
+        queries = np.asarray(vectors, dtype=np.float32)
+        k = max(0, min(int(k), len(self)))
+        best_positions = np.zeros((len(queries), 0), dtype=np.int64)
+        best_distances = np.zeros((len(queries), 0), dtype=np.float32)
+        if k == 0:
+            return self.rows[best_positions], best_distances
+        for start, squared in self._blocks(queries):
+            # ブロック内の上位k件と、これまでの上位k件を合わせて上位k件を残す
+            block_k = min(k, squared.shape[1])
+            part = np.argpartition(squared, block_k - 1, axis=1)[:, :block_k]
+            candidates = np.concatenate((best_positions, part + start), axis=1)
+            candidate_distances = np.concatenate(
+                (best_distances, np.take_along_axis(squared, part, axis=1)), axis=1)
+            if candidates.shape[1] > k:
+                keep = np.argpartition(candidate_distances, k - 1, axis=1)[:, :k]
+                candidates = np.take_along_axis(candidates, keep, axis=1)
+                candidate_distances = np.take_along_axis(candidate_distances, keep, axis=1)
+            best_positions, best_distances = candidates, candidate_distances
+
+        order = np.argsort(best_distances, axis=1, kind='stable')
+        best_positions = np.take_along_axis(best_positions, order, axis=1)
+        best_distances = np.take_along_axis(best_distances, order, axis=1)
+        return self.rows[best_positions], np.sqrt(best_distances)
+
+    def radius(self, lap_index: int, radius: float) -> Tuple[np.ndarray, np.ndarray]:
+        """指定ラップから距離radius以内のラップを検索する（指定ラップ自身は除く）
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (ラップデータのインデックス, 距離)。距離の昇順
+
+        Raises:
+            KeyError: ラップがインデックスに含まれていない場合
+        """
+        indices, distances = self.radius_vector(self.vector(lap_index), radius)
+        keep = indices != lap_index
+        return indices[keep], distances[keep]
+
+    def radius_vector(self, vector: np.ndarray, radius: float) -> Tuple[np.ndarray, np.ndarray]:
+        """正規化済みベクトルから距離radius以内のラップを検索する"""
+        query = np.asarray(vector, dtype=np.float32)[None, :]
+        limit = float(radius) ** 2
+        positions, distances = [], []
+        for start, squared in self._blocks(query):
+            hits = np.flatnonzero(squared[0] <= limit)
+            positions.append(hits + start)
+            distances.append(squared[0, hits])
+        positions = np.concatenate(positions) if positions else np.zeros(0, dtype=np.int64)
+        distances = np.concatenate(distances) if distances else np.zeros(0, dtype=np.float32)
+        order = np.argsort(distances, kind='stable')
+        return self.rows[positions[order]], np.sqrt(distances[order])
+
+    def _blocks(self, queries: np.ndarray):
+        """ラップをブロックに分けて (ブロックの先頭位置, 距離の2乗の行列) を順に返す"""
+        query_norms = np.einsum('ij,ij->i', queries, queries)[:, None]
+        for start in range(0, len(self), _BLOCK_SIZE):
+            block = self.vectors[start:start + _BLOCK_SIZE]
+            squared = self.norms[None, start:start + _BLOCK_SIZE] - 2.0 * (queries @ block.T) + query_norms
+            # 丸め誤差で負になった値を0にする
+            yield start, np.maximum(squared, 0.0, out=squared)
+
+
+def build_similarity_index(columns: LapColumns, include_conditions: bool = False) -> Optional[LapSimilarityIndex]:
+    """ラップの近傍探索インデックスを作成する（有効なラップがない場合はNone）"""
+    index = LapSimilarityIndex(columns, include_conditions)
+    return index if len(index) else None
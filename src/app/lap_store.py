@@ -0,0 +1,281 @@
+"""
+Lap Store Module
+複数セッション・複数シーズンのラップデータをSQLiteに格納し、横断検索するモジュールです。
+"""
+import os
+import re
+import sqlite3
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+from app.lap_columns import LapColumns, encode_categories
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    track TEXT NOT NULL COLLATE NOCASE,
+    date TEXT NOT NULL,
+    session_type TEXT NOT NULL COLLATE NOCASE,
+    weather TEXT,
+    track_temp REAL,
+    source TEXT UNIQUE
+);
+CREATE TABLE IF NOT EXISTS riders (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS tires (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS laps (
+    id INTEGER PRIMARY KEY,
+    session_id INTEGER NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+    rider_id INTEGER NOT NULL REFERENCES riders(id),
+    tire_id INTEGER REFERENCES tires(id),
+    lap INTEGER NOT NULL,
+    lap_time_ms INTEGER NOT NULL,
+    weather TEXT,
+    track_temp REAL
+);
+CREATE TABLE IF NOT EXISTS lap_sectors (
+    lap_id INTEGER NOT NULL REFERENCES laps(id) ON DELETE CASCADE,
+    sector INTEGER NOT NULL,
+    time_ms INTEGER NOT NULL,
+    PRIMARY KEY (lap_id, sector)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_sessions_track_date ON sessions(track, date);
+CREATE INDEX IF NOT EXISTS idx_sessions_date ON sessions(date);
+CREATE INDEX IF NOT EXISTS idx_sessions_type ON sessions(session_type);
+CREATE INDEX IF NOT EXISTS idx_laps_session_tire ON laps(session_id, tire_id);
+CREATE INDEX IF NOT EXISTS idx_laps_rider ON laps(rider_id, session_id);
+CREATE INDEX IF NOT EXISTS idx_laps_tire ON laps(tire_id);
+CREATE INDEX IF NOT EXISTS idx_laps_rider_lap ON laps(rider_id, lap);
+CREATE INDEX IF NOT EXISTS idx_lap_sectors_sector_time ON lap_sectors(sector, time_ms);
+"""
+
+
+def normalize_date(date: str) -> str:
+    """日付文字列を YYYY-MM-DD 形式に揃える（"20250314" → "2025-03-14"）"""
+    digits = re.sub(r'\D', '', str(date or ''))
+    if len(digits) == 8:
+        return f"{digits[:4]}-{digits[4:6]}-{digits[6:]}"
+    return str(date or '')
+
+
+class LapStore:
+    """SQLiteによるラップデータストア
+
+    タイムは整数ミリ秒で保持し、ライダー・トラック・日付・タイヤ・
+    セッションタイプにインデックスを張ります。
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        db_dir = os.path.dirname(os.path.abspath(db_path))
+        if not os.path.exists(db_dir):
+            os.makedirs(db_dir)
+        self.connection = sqlite3.connect(db_path)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        self.connection.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        """データベース接続を閉じる"""
+        self.connection.close()
+
+    def import_session(self, session_info: Dict, columns: LapColumns, source: Optional[str] = None) -> int:
+        """1セッション分のラップデータを一括登録する
+
+        同じsourceのセッションが既に存在する場合は置き換えます。
+        無効なタイムを含むラップは登録しません。
+
+        Args:
+            session_info: セッション情報（track, date, session_type, Weather, TrackTemp）
+            columns: 列指向のラップデータ
+            source: 取り込み元ファイルのパスなど、セッションを一意に識別する文字列
+
+        Returns:
+            int: 登録したセッションのID
+        """
+        valid = columns.valid
+        lap_ms = np.round(columns.lap_times[valid] * 1000).astype(np.int64)
+        sector_ms = np.round(columns.sector_times[valid] * 1000).astype(np.int64)
+        rider_names = np.asarray(columns.riders, dtype=object)[columns.rider_codes[valid]]
+        tire_names = np.asarray(columns.tires, dtype=object)[columns.tire_codes[valid]]
+        weathers = np.asarray(columns.weathers, dtype=object)[columns.weather_codes[valid]]
+        temps = columns.track_temps[valid]
+        lap_numbers = columns.lap_numbers[valid]
+
+        with self.connection:
+            cursor = self.connection.cursor()
+            if source:
+                cursor.execute("DELETE FROM sessions WHERE source = ?", (source,))
+            cursor.execute(
+                "INSERT INTO sessions (track, date, session_type, weather, track_temp, source) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (str(session_info.get('track', '') or ''),
+                 normalize_date(session_info.get('date', '')),
+                 str(session_info.get('session_type', '') or ''),
+                 str(session_info.get('Weather', '') or ''),
+                 _optional_float(session_info.get('TrackTemp')),
+                 source))
+            session_id = cursor.lastrowid
+
+            rider_ids = self._ensure_names(cursor, 'riders', columns.riders)
+            tire_ids = self._ensure_names(cursor, 'tires', columns.tires)
+
+            # ラップIDを明示的に割り当てて、セクター行と対応付ける
+            first_id = cursor.execute("SELECT IFNULL(MAX(id), 0) + 1 FROM laps").fetchone()[0]
+            lap_ids = np.arange(first_id, first_id + len(lap_ms), dtype=np.int64)
+
+            cursor.executemany(
+                "INSERT INTO laps (id, session_id, rider_id, tire_id, lap, lap_time_ms, weather, track_temp) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                zip(lap_ids.tolist(),
+                    [session_id] * len(lap_ms),
+                    [rider_ids[name] for name in rider_names],
+                    [tire_ids[name] if name else None for name in tire_names],
+                    lap_numbers.tolist(),
+                    lap_ms.tolist(),
+                    weathers.tolist(),
+                    [None if np.isnan(t) else float(t) for t in temps]))
+
+            num_sectors = sector_ms.shape[1]
+            cursor.executemany(
+                "INSERT INTO lap_sectors (lap_id, sector, time_ms) VALUES (?, ?, ?)",
+                zip(np.repeat(lap_ids, num_sectors).tolist(),
+                    np.tile(np.arange(1, num_sectors + 1), len(lap_ids)).tolist(),
+                    sector_ms.ravel().tolist()))
+        return session_id
+
+    def _ensure_names(self, cursor, table: str, names: List[str]) -> Dict[str, int]:
+        """名前テーブルに未登録の名前を追加し、名前→IDの辞書を返す"""
+        names = [name for name in names if name]
+        cursor.executemany(f"INSERT OR IGNORE INTO {table} (name) VALUES (?)", [(name,) for name in names])
+        return dict((name, row_id) for row_id, name in cursor.execute(f"SELECT id, name FROM {table}"))
+
+    def _build_where(self, rider=None, track=None, tire=None, session_type=None,
+                     date_from=None, date_to=None) -> Tuple[str, List]:
+        """検索条件からWHERE句とパラメータを組み立てる"""
+        clauses = []
+        params = []
+        if rider:
+            clauses.append("l.rider_id = (SELECT id FROM riders WHERE name = ?)")
+            params.append(rider)
+        if tire:
+            clauses.append("l.tire_id = (SELECT id FROM tires WHERE name = ?)")
+            params.append(tire)
+        if track:
+            clauses.append("s.track = ?")
+            params.append(track)
+        if session_type:
+            clauses.append("s.session_type = ?")
+            params.append(session_type)
+        if date_from:
+            clauses.append("s.date >= ?")
+            params.append(normalize_date(date_from))
+        if date_to:
+            clauses.append("s.date <= ?")
+            params.append(normalize_date(date_to))
+        where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+        return where, params
+
+    def query_laps(self, **filters) -> LapColumns:
+        """条件に一致するラップを列指向データとして取得する
+
+        絞り込みとライダー名・タイヤ名の対応付けはSQLで行い、一致した行のみを取得します。
+
+        Args:
+            **filters: rider, track, tire, session_type, date_from, date_to
+
+        Returns:
+            LapColumns: 検索結果（ラップID順）
+        """
+        where, params = self._build_where(**filters)
+        rows = self.connection.execute(
+            "SELECT l.id, r.name, IFNULL(t.name, ''), l.lap, l.lap_time_ms, "
+            "IFNULL(l.weather, ''), l.track_temp "
+            "FROM laps l JOIN sessions s ON s.id = l.session_id JOIN riders r ON r.id = l.rider_id "
+            f"LEFT JOIN tires t ON t.id = l.tire_id {where} ORDER BY l.id",
+            params).fetchall()
+
+        if not rows:
+            return LapColumns([], [], [], [], np.zeros((0, 0)))
+
+        lap_ids, rider_names, tire_names, lap_numbers, lap_ms, weathers, temps = zip(*rows)
+        lap_ids = np.asarray(lap_ids, dtype=np.int64)
+
+        # セクタータイムを (ラップ, セクター) の2次元配列に展開
+        sector_rows = self.connection.execute(
+            "SELECT x.lap_id, x.sector, x.time_ms FROM lap_sectors x "
+            f"JOIN laps l ON l.id = x.lap_id JOIN sessions s ON s.id = l.session_id {where} "
+            "ORDER BY x.lap_id", params).fetchall()
+        sector_data = np.asarray(sector_rows, dtype=np.int64).reshape(-1, 3)
+        num_sectors = int(sector_data[:, 1].max()) if len(sector_data) else 0
+        sector_times = np.full((len(lap_ids), num_sectors), np.nan)
+        if len(sector_data):
+            positions = np.searchsorted(lap_ids, sector_data[:, 0])
+            sector_times[positions, sector_data[:, 1] - 1] = sector_data[:, 2] / 1000.0
+
+        riders, rider_codes = encode_categories(rider_names)
+        tires, tire_codes = encode_categories(tire_names)
+        weather_names, weather_codes = encode_categories(weathers)
+
+        return LapColumns(
+            riders, rider_codes,
+            np.asarray(lap_numbers), np.asarray(lap_ms, dtype=np.float64) / 1000.0, sector_times,
+            tires, tire_codes,
+            weather_names, weather_codes, np.array(temps, dtype=np.float64))  # NULLはNaNになる
+
+    def best_sector_time(self, sector: int, **filters) -> Optional[Dict]:
+        """条件に一致するラップの中で指定セクターのベストタイムを取得する
+
+        (sector, time_ms) のインデックスを使い、MINの集計をSQLで行います。
+
+        Args:
+            sector: セクター番号（1から開始）
+            **filters: rider, track, tire, session_type, date_from, date_to
+
+        Returns:
+            Optional[Dict]: {'rider', 'track', 'date', 'lap', 'time'}（該当なしの場合はNone）
+        """
+        where, params = self._build_where(**filters)
+        where = (where + " AND" if where else "WHERE") + " x.sector = ?"
+        # MIN()と同時に選択した列は、SQLiteでは最小値の行の値になる
+        row = self.connection.execute(
+            "SELECT r.name, s.track, s.date, l.lap, MIN(x.time_ms) FROM lap_sectors x "
+            "JOIN laps l ON l.id = x.lap_id JOIN sessions s ON s.id = l.session_id "
+            f"JOIN riders r ON r.id = l.rider_id {where}",
+            params + [sector]).fetchone()
+        if row is None or row[4] is None:
+            return None
+        return {'rider': row[0], 'track': row[1], 'date': row[2], 'lap': row[3], 'time': row[4] / 1000.0}
+
+    def list_sessions(self) -> List[Dict]:
+        """登録済みセッションの一覧を取得する"""
+        rows = self.connection.execute(
+            "SELECT s.id, s.track, s.date, s.session_type, s.weather, s.source, COUNT(l.id) "
+            "FROM sessions s LEFT JOIN laps l ON l.session_id = s.id GROUP BY s.id ORDER BY s.date")
+        keys = ('id', 'track', 'date', 'session_type', 'weather', 'source', 'lap_count')
+        return [dict(zip(keys, row)) for row in rows]
+
+    def distinct_values(self, field: str) -> List[str]:
+        """検索条件の候補（rider / tire / track / session_type）を取得する"""
+        queries = {
+            'rider': "SELECT name FROM riders ORDER BY name",
+            'tire': "SELECT name FROM tires ORDER BY name",
+            'track': "SELECT DISTINCT track FROM sessions ORDER BY track",
+            'session_type': "SELECT DISTINCT session_type FROM sessions ORDER BY session_type",
+        }
+        if field not in queries:
+            raise ValueError(f"Unknown field: {field}")
+        return [row[0] for row in self.connection.execute(queries[field])]
+
+
+def _optional_float(value) -> Optional[float]:
+    """数値に変換できる場合はfloat、それ以外はNone"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
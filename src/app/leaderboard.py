@@ -0,0 +1,275 @@
+"""
+Leaderboard Module
+全体・ライダー別・タイヤ別・セクター別の速いラップ上位K件を保持するモジュールです。
+読み込み時はnp.argpartitionでまとめて作成し、ラップの追加ごとにヒープでO(log K)で更新します。
+"""
+import heapq
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+from app.lap_columns import LapColumns
+
+# 各リーダーボードに保持する件数
+DEFAULT_K = 10
+
+# リーダーボードの種類（'Overall' の名前は空文字列、'Sector' の名前は 'Sector1' など）
+OVERALL = 'Overall'
+RIDER = 'Rider'
+TIRE = 'Tire'
+SECTOR = 'Sector'
+
+
+class TopK:
+    """値の小さい順に上位K件の (値, ラップのインデックス) を保持するヒープ
+
+    ヒープの先頭に保持している中で最も遅い（値が大きい）ラップを置き、追加されたラップと比較します。
+    同じ値の場合は先に追加された（インデックスが小さい）ラップを上位にします。
+    """
+
+    def __init__(self, k: int = DEFAULT_K):
+        self.k = max(1, int(k))
+        self._heap: List[Tuple[float, int]] = []  # (-値, -インデックス)
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    @classmethod
+    def from_arrays(cls, values: np.ndarray, indices: np.ndarray, k: int = DEFAULT_K) -> 'TopK':
+        """値とインデックスの配列から上位K件を選んで作成する（NaNは除く）"""
+        top = cls(k)
+        valid = np.isfinite(values)
+        values, indices = values[valid], indices[valid]
+        if values.size > top.k:
+            # K番目の値以下の候補のみを残し、同じ値の並びを決めるため候補内でソートする
+            kth = np.partition(values, top.k - 1)[top.k - 1]
+            candidates = np.flatnonzero(values <= kth)
+            values, indices = values[candidates], indices[candidates]
+        order = np.lexsort((indices, values))[:top.k]
+        top._heap = [(-float(values[i]), -int(indices[i])) for i in order]
+        heapq.heapify(top._heap)
+        return top
+
+    def push(self, value: float, index: int) -> bool:
+        """ラップを追加する（上位K件に入った場合はTrue）"""
+        if not np.isfinite(value):
+            return False
+        item = (-float(value), -int(index))
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, item)
+            return True
+        if item > self._heap[0]:
+            heapq.heapreplace(self._heap, item)
+            return True
+        return False
+
+    def entries(self) -> List[Tuple[float, int]]:
+        """速い順の (値, ラップのインデックス) のリスト"""
+        return sorted((-value, -index) for value, index in self._heap)
+
+    def best(self) -> Optional[int]:
+        """最も速いラップのインデックス（空の場合はNone）"""
+        if not self._heap:
+            return None
+        return -max(self._heap)[1]
+
+    def contains(self, indices) -> bool:
+        """いずれかのラップのインデックスを保持しているか"""
+        return any(-index in indices for _, index in self._heap)
+
+    def copy(self) -> 'TopK':
+        top = TopK(self.k)
+        top._heap = list(self._heap)
+        return top
+
+
+class LeaderboardIndex:
+    """全体・ライダー別・タイヤ別・セクター別のリーダーボード
+
+    各リーダーボードは (種類, 名前) をキーとするTopKです。表の強調表示に使うため、
+    全体とライダー別には最も遅いラップ（値の符号を反転したTopK）も保持します。
+    """
+
+    def __init__(self, k: int = DEFAULT_K, num_sectors: int = 0):
+        self.k = max(1, int(k))
+        self.num_sectors = num_sectors
+        self.num_laps = 0  # 取り込んだラップの数（次に追加するラップのインデックス）
+        self.boards: Dict[Tuple[str, str], TopK] = {}
+        self.slowest: Dict[str, TopK] = {}  # ライダー名（全体は空文字列） -> 最も遅いラップ
+
+    def keys(self) -> List[Tuple[str, str]]:
+        """空でないリーダーボードのキー（全体・ライダー・タイヤ・セクターの順）"""
+        order = {OVERALL: 0, RIDER: 1, TIRE: 2, SECTOR: 3}
+        return sorted((key for key, board in self.boards.items() if len(board)),
+                      key=lambda key: (order.get(key[0], 4), _natural_key(key[1])))
+
+    def top(self, kind: str = OVERALL, name: str = '') -> List[Tuple[float, int]]:
+        """リーダーボードの速い順の (秒, ラップのインデックス) のリスト"""
+        board = self.boards.get((kind, name))
+        return board.entries() if board is not None else []
+
+    def fastest(self, rider: Optional[str] = None) -> Optional[int]:
+        """最速ラップのインデックス（riderを省略した場合は全体）"""
+        board = self.boards.get((RIDER, rider) if rider else (OVERALL, ''))
+        return board.best() if board is not None else None
+
+    def slowest_lap(self, rider: Optional[str] = None) -> Optional[int]:
+        """最も遅いラップのインデックス（riderを省略した場合は全体）"""
+        board = self.slowest.get(rider or '')
+        return board.best() if board is not None else None
+
+    def add_lap(self, index: int, rider: str, tire: str, lap_time: float,
+                sector_times: Optional[np.ndarray] = None) -> bool:
+        """ラップを1つ追加する（いずれかのリーダーボードが変わった場合はTrue）
+
+        更新するリーダーボードはラップが属する全体・ライダー・タイヤ・各セクターのみで、
+        それぞれ O(log K) です。
+        """
+        self.num_laps = max(self.num_laps, index + 1)
+        changed = False
+        for boards, key, value in self._lap_entries(rider, tire, lap_time, sector_times):
+            changed |= self._board_in(boards, key).push(value, index)
+        return changed
+
+    def replace_laps(self, columns: LapColumns, rows) -> None:
+        """編集されたラップを変更後の値で置き換える（ラップ数は変わらないこと）
+
+        置き換えるラップを保持していたリーダーボードのみ、columnsからそのリーダーボードに属するラップを
+        選び直します（変更で上位から外れたラップの代わりを求めるため）。それ以外のリーダーボードには
+        変更後の値を O(log K) で追加します。
+
+        Args:
+            columns: 変更後の全ラップの列指向データ
+            rows: 編集されたラップのインデックス
+        """
+        rows = {int(row) for row in rows}
+        stale = set()
+        for boards in (self.boards, self.slowest):
+            for key, board in list(boards.items()):
+                if board.contains(rows):
+                    stale.add((id(boards), key))
+                    boards[key] = self._select(columns, boards, key)
+        for row in sorted(rows):
+            for boards, key, value in self._lap_entries(
+                    columns.riders[columns.rider_codes[row]], columns.tires[columns.tire_codes[row]],
+                    columns.lap_times[row], columns.sector_times[row]):
+                if (id(boards), key) not in stale:
+                    self._board_in(boards, key).push(value, row)
+
+    def _lap_entries(self, rider: str, tire: str, lap_time: float, sector_times: Optional[np.ndarray]):
+        """ラップが属するリーダーボードと値の (リーダーボードの辞書, キー, 値)"""
+        if np.isfinite(lap_time) and lap_time > 0:
+            yield self.boards, (OVERALL, ''), lap_time
+            yield self.boards, (RIDER, rider), lap_time
+            if tire:
+                yield self.boards, (TIRE, tire), lap_time
+            for key in ('', rider):
+                yield self.slowest, key, -lap_time
+        if sector_times is not None:
+            for i, value in enumerate(sector_times[:self.num_sectors]):
+                if np.isfinite(value) and value > 0:
+                    yield self.boards, (SECTOR, f'Sector{i + 1}'), value
+
+    def _select(self, columns: LapColumns, boards: Dict, key) -> TopK:
+        """リーダーボードに属するラップをcolumnsの全ラップから選び直す"""
+        if boards is self.slowest:
+            values, k = columns.lap_times, 1
+            selected = columns.rider_mask(key) if key else np.ones(len(columns), dtype=bool)
+        else:
+            kind, name = key
+            values, k = columns.lap_times, self.k
+            if kind == RIDER:
+                selected = columns.rider_mask(name)
+            elif kind == TIRE:
+                selected = (columns.tire_codes == columns.tires.index(name) if name in columns.tires
+                            else np.zeros(len(columns), dtype=bool))
+            elif kind == SECTOR:
+                values = columns.sector_times[:, int(name[len('Sector'):]) - 1]
+                selected = np.ones(len(columns), dtype=bool)
+            else:
+                selected = np.ones(len(columns), dtype=bool)
+        valid = np.isfinite(values) & (values > 0) & selected
+        indices = np.flatnonzero(valid)
+        values = values[valid]
+        return TopK.from_arrays(-values if boards is self.slowest else values, indices, k)
+
+    def add_columns(self, columns: LapColumns, start: int) -> bool:
+        """列指向のラップデータをインデックスstartから順に追加する"""
+        changed = False
+        for i in range(len(columns)):
+            changed |= self.add_lap(start + i, columns.riders[columns.rider_codes[i]],
+                                    columns.tires[columns.tire_codes[i]], columns.lap_times[i],
+                                    columns.sector_times[i])
+        return changed
+
+    def copy(self) -> 'LeaderboardIndex':
+        """同じ内容のリーダーボードを作成する（キャッシュした結果を変更しないため）"""
+        index = LeaderboardIndex(self.k, self.num_sectors)
+        index.num_laps = self.num_laps
+        index.boards = {key: board.copy() for key, board in self.boards.items()}
+        index.slowest = {key: board.copy() for key, board in self.slowest.items()}
+        return index
+
+    def _board_in(self, boards: Dict, key) -> TopK:
+        board = boards.get(key)
+        if board is None:
+            board = boards[key] = TopK(1 if boards is self.slowest else self.k)
+        return board
+
+
+def _natural_key(name: str):
+    """'Sector10' が 'Sector2' の後になるように数字部分を数値として比較するキー"""
+    digits = name.rstrip('0123456789')
+    suffix = name[len(digits):]
+    return (digits, int(suffix) if suffix else -1, name)
+
+
+def _grouped_top(values: np.ndarray, codes: np.ndarray, indices: np.ndarray, k: int):
+    """コードごとの上位K件 (コード, TopK) を求める（コードでソートしてグループごとにargpartitionする）"""
+    order = np.argsort(codes, kind='stable')
+    codes, values, indices = codes[order], values[order], indices[order]
+    bounds = np.flatnonzero(np.diff(codes)) + 1
+    for start, stop in zip(np.concatenate(([0], bounds)), np.concatenate((bounds, [codes.size]))):
+        if stop > start:
+            yield int(codes[start]), TopK.from_arrays(values[start:stop], indices[start:stop], k)
+
+
+def build_leaderboard(columns: LapColumns, k: int = DEFAULT_K,
+                      mask: Optional[np.ndarray] = None) -> LeaderboardIndex:
+    """全ラップからリーダーボードを作成する
+
+    全体・各セクターはラップ数nに対してO(n)のnp.argpartition、ライダー別・タイヤ別は
+    コードでソートしたグループごとにargpartitionで上位K件を選びます。
+
+    Args:
+        columns: 列指向のラップデータ
+        k: 各リーダーボードに保持する件数
+        mask: 対象とするラップのマスク（省略時は全ラップ、インデックスは全ラップでの位置のまま）
+
+    Returns:
+        LeaderboardIndex: リーダーボード
+    """
+    leaderboard = LeaderboardIndex(k, columns.num_sectors)
+    leaderboard.num_laps = len(columns)
+    selected = np.ones(len(columns), dtype=bool) if mask is None else np.asarray(mask, dtype=bool)
+    times = columns.lap_times
+    valid = np.isfinite(times) & (times > 0) & selected
+    indices = np.flatnonzero(valid)
+    if indices.size:
+        times = times[valid]
+        leaderboard.boards[(OVERALL, '')] = TopK.from_arrays(times, indices, k)
+        leaderboard.slowest[''] = TopK.from_arrays(-times, indices, 1)
+        rider_codes = columns.rider_codes[valid]
+        for code, board in _grouped_top(times, rider_codes, indices, k):
+            leaderboard.boards[(RIDER, columns.riders[code])] = board
+        for code, board in _grouped_top(-times, rider_codes, indices, 1):
+            leaderboard.slowest[columns.riders[code]] = board
+        for code, board in _grouped_top(times, columns.tire_codes[valid], indices, k):
+            if columns.tires[code]:
+                leaderboard.boards[(TIRE, columns.tires[code])] = board
+
+    for i in range(columns.num_sectors):
+        sectors = columns.sector_times[:, i]
+        valid = np.isfinite(sectors) & (sectors > 0) & selected
+        if valid.any():
+            leaderboard.boards[(SECTOR, f'Sector{i + 1}')] = TopK.from_arrays(
+                sectors[valid], np.flatnonzero(valid), k)
+    return leaderboard
@@ -0,0 +1,189 @@
+"""
+Micro Sectors Module
+GPS計測などによる多数のミニセクター（数十〜数百）の統計を計算するモジュールです。
+"""
+import numpy as np
+from typing import Dict, List, Optional
+from app.lap_columns import LapColumns
+
+
+class MicroSectorStats:
+    """ライダー × セクター の統計行列
+
+    各行列は (ライダー数, セクター数) の形で、行の順序はridersと同じです。
+    対象ラップがないライダーの行はNaNになります。
+    """
+
+    def __init__(self, riders: List[str], best: np.ndarray, worst: np.ndarray,
+                 avg: np.ndarray, std_dev: np.ndarray, counts: np.ndarray):
+        self.riders = riders
+        self.best = best
+        self.worst = worst
+        self.avg = avg
+        self.std_dev = std_dev
+        self.counts = counts  # ライダーごとの対象ラップ数
+
+    @property
+    def num_sectors(self) -> int:
+        """セクター数"""
+        return self.best.shape[1]
+
+    @property
+    def overall_best(self) -> np.ndarray:
+        """全ライダーを通したセクターごとのベストタイム"""
+        if not len(self.riders):
+            return np.full(self.num_sectors, np.nan)
+        with np.errstate(invalid='ignore'):
+            return np.nanmin(np.where(self.counts[:, None] > 0, self.best, np.nan), axis=0)
+
+    @property
+    def theoretical_best(self) -> np.ndarray:
+        """ライダーごとの理論ベスト（各セクターのベストの合計）"""
+        return np.where(self.counts > 0, self.best.sum(axis=1), np.nan)
+
+    def loss_matrix(self) -> np.ndarray:
+        """各ライダーの平均タイムと全体ベストとの差（秒）"""
+        return self.avg - self.overall_best[None, :]
+
+    def to_sector_stats(self) -> Dict[str, Dict]:
+        """LapTimeAnalyzerのsector_statsと同じ形式の辞書に変換する"""
+        stats = {}
+        keys = [f'sector{i + 1}' for i in range(self.num_sectors)]
+        for row, rider in enumerate(self.riders):
+            if self.counts[row] == 0:
+                continue
+            stats[rider] = {
+                key: {
+                    'best': float(self.best[row, i]),
+                    'worst': float(self.worst[row, i]),
+                    'avg': float(self.avg[row, i]),
+                    'std_dev': float(self.std_dev[row, i]),
+                }
+                for i, key in enumerate(keys)
+            }
+        return stats
+
+    def replace_riders(self, partial: 'MicroSectorStats', riders) -> 'MicroSectorStats':
+        """指定ライダーの行をpartialの行で置き換えた統計行列を返す
+
+        差分再解析で、変更されたライダーの統計のみを計算し直した場合に使用します。
+
+        Args:
+            partial: 指定ライダーのラップのみから計算した統計行列
+            riders: 置き換えるライダー（partialに含まれないライダーは削除される）
+        """
+        riders = set(riders)
+        rows = {rider: (self, i) for i, rider in enumerate(self.riders) if rider not in riders}
+        rows.update({rider: (partial, i) for i, rider in enumerate(partial.riders)
+                     if rider in riders and partial.counts[i] > 0})
+        names = sorted(rows)
+
+        def stack(attr):
+            if not names:
+                return np.zeros((0, self.num_sectors))
+            return np.vstack([getattr(source, attr)[i] for source, i in (rows[name] for name in names)])
+
+        counts = np.array([rows[name][0].counts[rows[name][1]] for name in names], dtype=np.int64)
+        return MicroSectorStats(names, stack('best'), stack('worst'), stack('avg'), stack('std_dev'), counts)
+
+
+def compute_micro_sector_stats(columns: LapColumns, mask: Optional[np.ndarray] = None) -> MicroSectorStats:
+    """ライダーごとのセクター統計を ラップ数×セクター数 の配列の集約で計算する
+
+    セクターに対するPythonループは発生しないため、セクター数が数百でも
+    計算量はラップ数×セクター数の配列演算1回分です。
+
+    Args:
+        columns: 列指向のラップデータ
+        mask: 集計対象のラップ（省略時は全セクターが有効なラップ）
+
+    Returns:
+        MicroSectorStats: 統計行列
+    """
+    if mask is None:
+        mask = columns.valid
+    sectors = columns.sector_times
+    counts = np.bincount(columns.rider_codes[mask], minlength=columns.num_riders).astype(np.float64)
+
+    best = columns.group_reduce(sectors, np.fmin, mask)
+    worst = columns.group_reduce(sectors, np.fmax, mask)
+    total = columns.group_reduce(sectors, np.add, mask)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        avg = total / counts[:, None]
+        # 平均との差の二乗和から母標準偏差を求める（ラップが1つの場合は0）
+        deviation = sectors[mask] - avg[columns.rider_codes[mask]]
+        squares = np.zeros_like(avg)
+        np.add.at(squares, columns.rider_codes[mask], deviation * deviation)
+        std_dev = np.sqrt(squares / counts[:, None])
+    avg[counts == 0] = np.nan
+    std_dev[counts == 0] = np.nan
+    return MicroSectorStats(columns.riders, best, worst, avg, std_dev, counts.astype(np.int64))
+
+
+def lap_loss_matrix(columns: LapColumns, rows: np.ndarray) -> np.ndarray:
+    """指定したラップの各セクターで、全体のセクターベストから失ったタイム（秒）
+
+    Args:
+        columns: 列指向のラップデータ
+        rows: 対象ラップのインデックス
+
+    Returns:
+        np.ndarray: (対象ラップ数, セクター数) の配列
+    """
+    valid = columns.valid
+    if not valid.any():
+        return np.full((len(rows), columns.num_sectors), np.nan)
+    sector_best = columns.sector_times[valid].min(axis=0)
+    return columns.sector_times[rows] - sector_best[None, :]
+
+
+def recent_window_stats(columns: LapColumns, window_size: int,
+                        mask: Optional[np.ndarray] = None) -> Dict[str, Dict]:
+    """ライダーごとに直近window_sizeラップのラップタイム・セクタータイムの平均と標準偏差を計算する
+
+    LapTimeAnalyzer.calculate_moving_statisticsと同じ形式の結果を返します。
+    ラップの順序は元データの並び順です。
+
+    Args:
+        columns: 列指向のラップデータ
+        window_size: 直近何ラップを対象にするか
+        mask: 対象ラップ（省略時は全セクターが有効なラップ）
+
+    Returns:
+        Dict: {ライダー名: {'lap_time': {...}, 'sectors': {'sector1': {...}, ...}}}
+    """
+    if mask is None:
+        mask = columns.valid
+    rows = np.flatnonzero(mask)
+    codes = columns.rider_codes[rows]
+    # ライダーごとに元の順序を保ったまま並べ、各ライダーの末尾window_size件を選ぶ
+    order = np.argsort(codes, kind='stable')
+    rows, codes = rows[order], codes[order]
+    counts = np.bincount(codes, minlength=columns.num_riders)
+    ends = np.cumsum(counts)
+    rank_from_end = ends[codes] - np.arange(len(rows))
+    recent = rank_from_end <= window_size
+    rows, codes = rows[recent], codes[recent]
+
+    n = np.bincount(codes, minlength=columns.num_riders).astype(np.float64)
+    values = np.column_stack([columns.lap_times[rows], columns.sector_times[rows]])
+    total = np.zeros((columns.num_riders, values.shape[1]))
+    np.add.at(total, codes, values)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / n[:, None]
+        deviation = values - mean[codes]
+        squares = np.zeros_like(total)
+        np.add.at(squares, codes, deviation * deviation)
+        std_dev = np.sqrt(squares / n[:, None])
+
+    stats = {}
+    keys = [f'sector{i + 1}' for i in range(columns.num_sectors)]
+    for code, rider in enumerate(columns.riders):
+        if n[code] == 0:
+            continue
+        stats[rider] = {
+            'lap_time': {'moving_avg': float(mean[code, 0]), 'std_dev': float(std_dev[code, 0])},
+            'sectors': {key: {'moving_avg': float(mean[code, i + 1]), 'std_dev': float(std_dev[code, i + 1])}
+                        for i, key in enumerate(keys)},
+        }
+    return stats
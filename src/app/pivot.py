@@ -0,0 +1,214 @@
+"""
+Pivot Module
+ラップデータを任意の項目（ライダー・タイヤ・天候・路面温度帯・セッション・スティント）の組み合わせで
+グループ化し、ラップタイムを集計するモジュールです。
+"""
+import numpy as np
+from typing import Dict, List, Sequence, Tuple
+from app.lap_columns import LapColumns
+
+# グループ化の項目
+RIDER = 'Rider'
+TIRE = 'TireType'
+WEATHER = 'Weather'
+TEMP_BIN = 'TrackTemp'
+SESSION = 'Session'
+STINT = 'Stint'
+GROUP_KEYS = (RIDER, TIRE, WEATHER, TEMP_BIN, SESSION, STINT)
+
+# 集計の種類
+MIN = 'min'
+MEAN = 'mean'
+MEDIAN = 'median'
+STD = 'std'
+COUNT = 'count'
+IDEAL = 'ideal'
+AGGREGATIONS = (MIN, MEAN, MEDIAN, STD, COUNT, IDEAL)
+
+# 路面温度帯の幅（℃）
+DEFAULT_TEMP_BIN = 5.0
+
+
+class PivotTable:
+    """グループごとの集計結果
+
+    labels[i] はグループ i の各項目の値（keysの順）、values[集計の種類][i] はその集計値です。
+    ラップタイムのないグループの min / mean / median / std はNaN、ideal は全セクターの
+    タイムがそろわない場合にNaNになります。
+    """
+
+    def __init__(self, keys: Sequence[str], labels: List[Tuple[str, ...]], values: Dict[str, np.ndarray]):
+        self.keys = list(keys)
+        self.labels = labels
+        self.values = values
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def row(self, index: int) -> Dict:
+        """グループ i の項目の値と集計値のdict"""
+        row = dict(zip(self.keys, self.labels[index]))
+        for aggregation, values in self.values.items():
+            row[aggregation] = int(values[index]) if aggregation == COUNT else float(values[index])
+        return row
+
+    def find(self, *labels: str) -> int:
+        """項目の値がlabelsと一致するグループのインデックス（ない場合は-1）"""
+        try:
+            return self.labels.index(tuple(labels))
+        except ValueError:
+            return -1
+
+
+def session_stint_numbers(columns: LapColumns) -> Tuple[np.ndarray, np.ndarray]:
+    """各ラップのセッション番号とスティント番号（いずれも1始まり）を求める
+
+    ライダーごとに読み込み順に並べ、ラップ番号が前のラップ以下に戻った位置で新しいセッション、
+    さらにタイヤが変わった位置またはラップ番号が連続しない位置で新しいスティントが始まるものとします。
+    スティント番号はセッションごとに1から数えます。
+    """
+    count = len(columns)
+    sessions = np.ones(count, dtype=np.int64)
+    stints = np.ones(count, dtype=np.int64)
+    if not count:
+        return sessions, stints
+    order = np.argsort(columns.rider_codes, kind='stable')
+    riders = columns.rider_codes[order]
+    laps = columns.lap_numbers[order]
+    tires = columns.tire_codes[order]
+    first = np.ones(count, dtype=bool)
+    first[1:] = riders[1:] != riders[:-1]
+    new_session = first.copy()
+    new_session[1:] |= laps[1:] <= laps[:-1]
+    new_stint = new_session.copy()
+    new_stint[1:] |= (tires[1:] != tires[:-1]) | (laps[1:] != laps[:-1] + 1)
+    sessions[order] = _restart_numbering(new_session, first)
+    stints[order] = _restart_numbering(new_stint, new_session)
+    return sessions, stints
+
+
+def _restart_numbering(starts: np.ndarray, restarts: np.ndarray) -> np.ndarray:
+    """startsの位置で1つ増え、restartsの位置で1に戻る通し番号（restartsはstartsに含まれる）"""
+    total = np.cumsum(starts)
+    return total - total[restarts][np.cumsum(restarts) - 1] + 1
+
+
+def _key_codes(columns: LapColumns, key: str, temp_bin: float,
+               session_stints: Tuple[np.ndarray, np.ndarray]) -> Tuple[List[str], np.ndarray]:
+    """項目の値の名前リストと各ラップのコード"""
+    if key == RIDER:
+        return columns.riders, columns.rider_codes
+    if key == TIRE:
+        return columns.tires, columns.tire_codes
+    if key == WEATHER:
+        return columns.weathers, columns.weather_codes
+    if key in (SESSION, STINT):
+        numbers = session_stints[0] if key == SESSION else session_stints[1]
+        top = int(numbers.max()) if numbers.size else 0
+        return [str(number) for number in range(1, top + 1)], numbers - 1
+    if key == TEMP_BIN:
+        temps = columns.track_temps
+        known = np.isfinite(temps)
+        bins = np.where(known, np.floor(np.where(known, temps, 0.0) / temp_bin), 0.0)
+        values, codes = np.unique(bins[known], return_inverse=True)
+        names = [f"{value * temp_bin:g}-{(value + 1) * temp_bin:g}" for value in values]
+        # 路面温度のないラップは末尾の空の名前にまとめる
+        all_codes = np.full(len(temps), len(names), dtype=np.int64)
+        all_codes[known] = codes
+        return names + [''], all_codes
+    raise ValueError(f"Unknown group key: {key}")
+
+
+def _group_order(groups: np.ndarray, times: np.ndarray, capacity: int) -> np.ndarray:
+    """グループ番号順、グループ内はタイムの速い順（NaNは末尾）に並べるインデックス
+
+    タイムの順位をグループ番号の下の桁とした整数を1回ソートします（np.lexsortより速い）。
+    整数があふれる組み合わせの場合のみnp.lexsortを使います。
+    """
+    count = len(times)
+    if capacity * count >= 2 ** 62:
+        return np.lexsort((times, groups))
+    ranks = np.empty(count, dtype=np.int64)
+    ranks[np.argsort(times)] = np.arange(count)
+    return np.argsort(groups * count + ranks)
+
+
+def build_pivot(columns: LapColumns, keys: Sequence[str],
+                temp_bin: float = DEFAULT_TEMP_BIN) -> PivotTable:
+    """ラップデータを項目の組み合わせでグループ化して集計する
+
+    各項目のコードを1つの整数のグループ番号にまとめ、(グループ番号, ラップタイム) の順のソートで
+    グループを連続させます。min・median はソート順の位置から、mean・std・count・ideal は
+    np.ufunc.reduceat でグループごとに求めるため、全体でO(n log n)です。
+
+    Args:
+        columns: 列指向のラップデータ
+        keys: グループ化の項目（GROUP_KEYSのいずれか、空の場合は全ラップを1グループにする）
+        temp_bin: 路面温度帯の幅（℃）
+
+    Returns:
+        PivotTable: 集計結果（グループは項目の値の順）
+
+    Raises:
+        ValueError: 項目名や温度帯の幅が正しくない場合
+    """
+    keys = list(keys)
+    if len(set(keys)) != len(keys):
+        raise ValueError("Group keys must not be repeated")
+    if not temp_bin > 0:
+        raise ValueError(f"Temperature bin width must be positive: {temp_bin}")
+    count = len(columns)
+    session_stints = session_stint_numbers(columns) if {SESSION, STINT} & set(keys) else (None, None)
+    key_names, key_codes = [], []
+    for key in keys:
+        names, codes = _key_codes(columns, key, temp_bin, session_stints)
+        key_names.append(names)
+        key_codes.append(np.asarray(codes, dtype=np.int64))
+
+    # 項目ごとのコードを桁とみなして1つのグループ番号にする
+    groups = np.zeros(count, dtype=np.int64)
+    capacity = 1  # グループ番号の取りうる数
+    for names, codes in zip(key_names, key_codes):
+        groups = groups * max(len(names), 1) + codes
+        capacity *= max(len(names), 1)
+
+    if not count:
+        empty = {aggregation: np.zeros(0) for aggregation in AGGREGATIONS}
+        empty[COUNT] = np.zeros(0, dtype=np.int64)
+        return PivotTable(keys, [], empty)
+
+    times = np.where(columns.lap_times > 0, columns.lap_times, np.nan)
+    order = _group_order(groups, times, capacity)
+    groups, times = groups[order], times[order]
+    starts = np.flatnonzero(np.concatenate(([True], groups[1:] != groups[:-1])))
+    members = np.repeat(np.arange(starts.size), np.diff(np.append(starts, count)))
+
+    finite = np.isfinite(times)
+    filled = np.where(finite, times, 0.0)
+    counts = np.add.reduceat(finite.astype(np.int64), starts)
+    has_times = counts > 0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = np.where(has_times, np.add.reduceat(filled, starts) / counts, np.nan)
+        deviations = np.where(finite, filled - means[members], 0.0)
+        variances = np.add.reduceat(deviations ** 2, starts) / counts
+    stds = np.where(counts > 1, np.sqrt(np.where(has_times, variances, 0.0)), 0.0)
+    stds[~has_times] = np.nan
+
+    # ソート済みのため、最速はグループの先頭、中央値はタイムのあるラップの中央の位置
+    last = np.maximum(counts - 1, 0)
+    mins = np.where(has_times, times[starts], np.nan)
+    medians = np.where(has_times, (times[starts + last // 2] + times[starts + (last + 1) // 2]) / 2, np.nan)
+
+    # 理想ラップはグループ内の各セクターのベストの合計
+    ideals = np.full(starts.size, np.nan)
+    if columns.num_sectors:
+        sectors = columns.sector_times[order]
+        sectors = np.where(sectors > 0, sectors, np.nan)
+        ideals = np.fmin.reduceat(sectors, starts, axis=0).sum(axis=1)
+
+    first_laps = order[starts]
+    label_columns = [np.asarray(names, dtype=object)[codes[first_laps]]
+                     for names, codes in zip(key_names, key_codes)]
+    labels = list(zip(*label_columns)) if label_columns else [()] * starts.size
+    values = {MIN: mins, MEAN: means, MEDIAN: medians, STD: stds, COUNT: counts, IDEAL: ideals}
+    return PivotTable(keys, labels, values)
@@ -0,0 +1,284 @@
+"""
+Quantile Sketch Module
+全ラップを保持・ソートせずにパーセンタイルを近似するKLLスケッチと、
+ライダー × 系列（LapTime, Sector1..N）ごとのスケッチの集合を提供するモジュールです。
+"""
+import numpy as np
+from typing import Dict, Iterable, List, Optional, Sequence
+from app.lap_columns import LapColumns
+
+# 最上位の段の大きさ（順位の誤差はおよそ 1.7 / k）
+DEFAULT_K = 200
+
+# 下の段ほど容量を小さくする比率
+_CAPACITY_RATIO = 2.0 / 3.0
+
+# 段の容量の下限（段が多くなっても最下段のソートが数値ごとに起きないようにする）
+_MIN_CAPACITY = 16
+
+
+class KLLSketch:
+    """KLLスケッチ（Karnin, Lang, Liberty）
+
+    値を段ごとのバッファに保持し、段の容量を超えたらソートして1つおきに上の段へ送ります
+    （上の段の値は重みが2倍になる）。1値あたりの追加はならしO(1)、保持する値の数は O(k) で、
+    同じkのスケッチ同士は段ごとに連結してマージできます。
+    """
+
+    def __init__(self, k: int = DEFAULT_K, seed: Optional[int] = None):
+        self.k = max(8, int(k))
+        self.levels: List[np.ndarray] = [np.empty(0)]
+        self.count = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self._rng = np.random.default_rng(seed)
+        self._pending: List[float] = []  # 1値ずつ追加された値（配列の連結を避けるためまとめて最下段へ送る）
+        self._sorted = None  # (ソート済みの値, 累積の重み) のキャッシュ
+
+    def __len__(self) -> int:
+        return self.count
+
+    def update(self, value: float) -> None:
+        """値を1つ追加する（NaNは無視する）"""
+        value = float(value)
+        if value != value:
+            return
+        self.count += 1
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self._pending.append(value)
+        self._sorted = None
+        if len(self._pending) >= self._capacity(0):
+            self._flush()
+
+    def _flush(self) -> None:
+        """1値ずつ追加された値を最下段へ送る"""
+        if self._pending:
+            self.levels[0] = np.concatenate((self.levels[0], self._pending))
+            self._pending = []
+            self._compress()
+
+    def update_many(self, values: Iterable[float]) -> None:
+        """値をまとめて追加する（NaNは無視する）"""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if not values.size:
+            return
+        self.count += values.size
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self.levels[0] = np.concatenate((self.levels[0], values))
+        self._compress()
+
+    def merge(self, other: 'KLLSketch') -> 'KLLSketch':
+        """他のスケッチの値を取り込む（自身を返す）"""
+        if other.count == 0:
+            return self
+        other._flush()
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, values in enumerate(other.levels):
+            self.levels[h] = np.concatenate((self.levels[h], values))
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def copy(self) -> 'KLLSketch':
+        """同じ内容のスケッチを作成する"""
+        self._flush()
+        sketch = KLLSketch(self.k)
+        sketch.levels = [values.copy() for values in self.levels]
+        sketch.count, sketch.min, sketch.max = self.count, self.min, self.max
+        sketch._rng = np.random.default_rng(self._rng.integers(2 ** 63))
+        return sketch
+
+    def quantile(self, q: float) -> float:
+        """q分位点（0〜1）の近似値（空の場合はNaN）"""
+        return float(self.quantiles([q])[0])
+
+    def quantiles(self, qs: Sequence[float]) -> np.ndarray:
+        """複数の分位点の近似値（0と1はそれぞれ正確な最小値・最大値）"""
+        qs = np.clip(np.asarray(qs, dtype=np.float64), 0.0, 1.0)
+        if self.count == 0:
+            return np.full(qs.shape, np.nan)
+        values, cumulative = self._sorted_view()
+        indices = np.searchsorted(cumulative, qs * cumulative[-1], side='left')
+        result = values[np.minimum(indices, values.size - 1)]
+        result = np.where(qs <= 0.0, self.min, result)
+        return np.where(qs >= 1.0, self.max, result)
+
+    def rank(self, value: float) -> float:
+        """value以下の値の割合の近似値"""
+        if self.count == 0:
+            return np.nan
+        values, cumulative = self._sorted_view()
+        index = np.searchsorted(values, value, side='right')
+        return float(cumulative[index - 1] / cumulative[-1]) if index else 0.0
+
+    def range_within(self, low: float, high: float):
+        """[low, high] の範囲にある値の (最小, 最大) の近似値（範囲に値がない場合はNone）"""
+        if self.count == 0:
+            return None
+        values, _ = self._sorted_view()
+        inside = values[(values >= low) & (values <= high)]
+        if not inside.size:
+            return None
+        first = self.min if low <= self.min else float(inside[0])
+        last = self.max if self.max <= high else float(inside[-1])
+        return first, last
+
+    def _capacity(self, level: int) -> int:
+        """段の容量（最上位がk、下の段ほど2/3倍ずつ小さくなるが、_MIN_CAPACITY（kが小さい場合はk）を下回らない）"""
+        depth = len(self.levels) - level - 1
+        return max(min(_MIN_CAPACITY, self.k), int(np.ceil(self.k * _CAPACITY_RATIO ** depth)))
+
+    def _compress(self) -> None:
+        """容量を超えた段を上の段へ圧縮する"""
+        self._sorted = None
+        while sum(values.size for values in self.levels) > sum(map(self._capacity, range(len(self.levels)))):
+            for h in range(len(self.levels)):
+                if self.levels[h].size < self._capacity(h):
+                    continue
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                values = np.sort(self.levels[h])
+                # 奇数個の場合は最大の値をこの段に残す
+                keep = values[values.size - values.size % 2:]
+                promoted = values[int(self._rng.integers(2)):values.size - values.size % 2:2]
+                self.levels[h] = keep
+                self.levels[h + 1] = np.concatenate((self.levels[h + 1], promoted))
+                break
+
+    def _sorted_view(self):
+        """全段の値をソートし、重み（2^段）の累積を求める"""
+        if self._sorted is None:
+            self._flush()
+            values = np.concatenate(self.levels)
+            weights = np.concatenate([np.full(level.size, 2.0 ** h) for h, level in enumerate(self.levels)])
+            order = np.argsort(values, kind='stable')
+            self._sorted = (values[order], np.cumsum(weights[order]))
+        return self._sorted
+
+
+class LapQuantileSketches:
+    """ライダー × 系列（'LapTime', 'Sector1'..）ごとのKLLスケッチ
+
+    ラップを追加するたびに更新でき、別セッションのスケッチとマージできます。
+    """
+
+    def __init__(self, series: Sequence[str], k: int = DEFAULT_K, seed: Optional[int] = 0):
+        self.series = list(series)
+        self.k = k
+        self.sketches: Dict[str, Dict[str, KLLSketch]] = {}
+        self.num_laps = 0  # 取り込んだラップの数
+        self._seed = np.random.SeedSequence(seed)
+
+    @property
+    def riders(self) -> List[str]:
+        return sorted(self.sketches)
+
+    def _rider_sketches(self, rider: str) -> Dict[str, KLLSketch]:
+        """ライダーのスケッチ（なければ作成する）"""
+        sketches = self.sketches.get(rider)
+        if sketches is None:
+            seeds = self._seed.spawn(len(self.series))
+            sketches = {name: KLLSketch(self.k, seed) for name, seed in zip(self.series, seeds)}
+            self.sketches[rider] = sketches
+        return sketches
+
+    def add_columns(self, columns: LapColumns) -> None:
+        """列指向のラップデータをまとめて追加する（0秒以下・NaNのタイムは無視する）"""
+        order = np.argsort(columns.rider_codes, kind='stable')
+        bounds = np.flatnonzero(np.diff(columns.rider_codes[order])) + 1
+        for rows in np.split(order, bounds):
+            if rows.size:
+                self._add_rows(columns.riders[columns.rider_codes[rows[0]]], columns, rows)
+        self.num_laps += len(columns)
+
+    def _add_rows(self, rider: str, columns: LapColumns, rows: np.ndarray) -> None:
+        """ライダーのラップ（columnsの行rows）を追加する"""
+        sketches = self._rider_sketches(rider)
+        for name in self.series:
+            if name == 'LapTime':
+                values = columns.lap_times[rows]
+            elif name.startswith('Sector') and int(name[len('Sector'):]) <= columns.num_sectors:
+                values = columns.sector_times[rows, int(name[len('Sector'):]) - 1]
+            else:
+                continue
+            sketches[name].update_many(values[values > 0])
+
+    def replace_riders(self, columns: LapColumns, riders) -> None:
+        """指定したライダーのスケッチをcolumnsのラップから作り直す（セルの編集用）
+
+        スケッチからは値を取り除けないため、変更されたライダーのみそのライダーの全ラップで作り直します。
+
+        Args:
+            columns: 変更後の全ラップの列指向データ
+            riders: ラップが変更されたライダー（変更前後の両方を含む）
+        """
+        for rider in riders:
+            self.sketches.pop(rider, None)
+            rows = np.flatnonzero(columns.rider_mask(rider))
+            if rows.size:
+                self._add_rows(rider, columns, rows)
+
+    def copy(self) -> 'LapQuantileSketches':
+        """同じ内容のスケッチの集合を作成する（キャッシュした結果を変更しないため）"""
+        copied = LapQuantileSketches(self.series, self.k)
+        copied._seed = np.random.SeedSequence(self._seed.entropy,
+                                              n_children_spawned=self._seed.n_children_spawned)
+        copied.sketches = {rider: {name: sketch.copy() for name, sketch in sketches.items()}
+                           for rider, sketches in self.sketches.items()}
+        copied.num_laps = self.num_laps
+        return copied
+
+    def add_lap(self, rider: str, times: Dict[str, float]) -> None:
+        """1ラップ分のタイム（系列名 -> 秒）を追加する"""
+        sketches = self._rider_sketches(rider)
+        for name, value in times.items():
+            if name in sketches and value is not None and value > 0:
+                sketches[name].update(value)
+        self.num_laps += 1
+
+    def merge(self, other: 'LapQuantileSketches') -> 'LapQuantileSketches':
+        """別のセッションのスケッチを取り込む（自身を返す）"""
+        for rider, sketches in other.sketches.items():
+            own = self._rider_sketches(rider)
+            for name, sketch in sketches.items():
+                if name in own:
+                    own[name].merge(sketch)
+        self.num_laps += other.num_laps
+        return self
+
+    def sketch(self, rider: str, series: str = 'LapTime') -> Optional[KLLSketch]:
+        """ライダーの系列のスケッチ（ない場合はNone）"""
+        return self.sketches.get(rider, {}).get(series)
+
+    def quantile(self, rider: str, q: float, series: str = 'LapTime') -> float:
+        """ライダーの系列のq分位点（データがない場合はNaN）"""
+        sketch = self.sketch(rider, series)
+        return sketch.quantile(q) if sketch is not None else np.nan
+
+    def combined(self, series: Optional[Sequence[str]] = None,
+                 riders: Optional[Iterable[str]] = None) -> KLLSketch:
+        """指定したライダー・系列のスケッチをまとめた1つのスケッチ（省略時は全て）"""
+        combined = KLLSketch(self.k, 0)
+        names = self.series if series is None else series
+        for rider in (self.riders if riders is None else riders):
+            for name in names:
+                sketch = self.sketch(rider, name)
+                if sketch is not None:
+                    combined.merge(sketch)
+        return combined
+
+
+def build_quantile_sketches(columns: LapColumns, k: int = DEFAULT_K) -> LapQuantileSketches:
+    """全ライダーのラップタイムと各セクタータイムのスケッチを作成する"""
+    series = ['LapTime'] + [f'Sector{i + 1}' for i in range(columns.num_sectors)]
+    sketches = LapQuantileSketches(series, k)
+    sketches.add_columns(columns)
+    return sketches
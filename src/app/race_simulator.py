@@ -0,0 +1,351 @@
+"""
+Race Simulator Module
+練習走行のラップから、ライダーごとのラップタイム分布とタイヤの劣化を推定し、
+タイヤ戦略ごとのレース結果をモンテカルロ法でシミュレーションするモジュールです。
+"""
+import multiprocessing
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from app.lap_columns import LapColumns
+from app.quantile_sketch import KLLSketch
+
+# 1回の乱数生成でまとめて扱うシミュレーション回数
+# （ワーカー数に依存せずこの単位で乱数列を分けるため、同じシードなら結果は常に一致する）
+DEFAULT_CHUNK_SIZE = 20000
+
+# 最速ラップに対してこの比率より遅いラップ（アウトラップ・インラップなど）は推定に使わない
+DEFAULT_OUTLIER_RATIO = 1.07
+
+
+class TireModel:
+    """1ライダー・1タイヤのラップタイムモデル
+
+    ラップタイム = intercept + slope * タイヤの周回数 + 残差 とし、
+    残差は実際のラップの残差から復元抽出します（分布の形を仮定しない）。
+    """
+
+    def __init__(self, intercept: float, slope: float, residuals: np.ndarray):
+        self.intercept = float(intercept)
+        self.slope = float(slope)
+        self.residuals = np.asarray(residuals, dtype=np.float64)
+
+    def expected_times(self, ages: np.ndarray) -> np.ndarray:
+        """タイヤの周回数（0始まり）ごとの期待ラップタイム"""
+        return self.intercept + self.slope * ages
+
+
+class RaceModel:
+    """ライダー × タイヤのラップタイムモデル"""
+
+    def __init__(self, riders: List[str], models: Dict[Tuple[str, Optional[str]], TireModel]):
+        self.riders = list(riders)
+        self.models = models
+
+    @property
+    def tires(self) -> List[str]:
+        """モデルが推定されたタイヤ"""
+        return sorted({tire for _, tire in self.models if tire is not None})
+
+    def tire_model(self, rider: str, tire: str) -> Optional[TireModel]:
+        """ライダーとタイヤのモデル（そのタイヤのラップがない場合は全ラップから推定したモデル）"""
+        return self.models.get((rider, tire)) or self.models.get((rider, None))
+
+
+class Strategy:
+    """タイヤ戦略（スティントごとのタイヤと周回数）"""
+
+    def __init__(self, name: str, stints: Sequence[Tuple[str, int]], pit_loss: float = 25.0):
+        """
+        Args:
+            name: 戦略名
+            stints: (タイヤ, 周回数) のリスト
+            pit_loss: 1回のピットストップで失う時間（秒）
+        """
+        self.name = name
+        self.stints = [(tire, int(laps)) for tire, laps in stints]
+        self.pit_loss = float(pit_loss)
+
+    @classmethod
+    def parse(cls, name: str, text: str, pit_loss: float = 25.0) -> 'Strategy':
+        """"KR410:15, KR310:15" 形式の文字列から戦略を作成する
+
+        Raises:
+            ValueError: 形式が正しくない場合
+        """
+        stints = []
+        for part in text.split(','):
+            if not part.strip():
+                continue
+            tire, _, laps = part.rpartition(':')
+            if not tire.strip() or not laps.strip().isdigit() or int(laps) <= 0:
+                raise ValueError(f"Invalid stint '{part.strip()}' (expected TIRE:LAPS)")
+            stints.append((tire.strip(), int(laps)))
+        if not stints:
+            raise ValueError(f"Strategy '{name}' has no stints")
+        return cls(name, stints, pit_loss)
+
+    def to_text(self) -> str:
+        """parseで読み込める文字列に変換する"""
+        return ", ".join(f"{tire}:{laps}" for tire, laps in self.stints)
+
+    @property
+    def race_laps(self) -> int:
+        return sum(laps for _, laps in self.stints)
+
+    @property
+    def num_stops(self) -> int:
+        return max(0, len(self.stints) - 1)
+
+    def __repr__(self) -> str:
+        return f"Strategy({self.name!r}, {self.stints}, {self.pit_loss})"
+
+
+class StrategyResult:
+    """1つの戦略のシミュレーション結果
+
+    シミュレーションごとの総レースタイムと順位は保持せず、チャンクごとに集計したものを
+    mergeで足し合わせます（メモリはシミュレーション回数に依存しない）。
+    position_counts は (ライダー数, 順位数) の各順位になった回数、time_sums はライダーごとの
+    総タイムの和、time_sketches はライダーごとの総タイムの分布を近似するKLLスケッチです。
+    """
+
+    def __init__(self, strategy: Strategy, riders: List[str], num_simulations: int = 0,
+                 position_counts: Optional[np.ndarray] = None, time_sums: Optional[np.ndarray] = None,
+                 time_sketches: Optional[List[KLLSketch]] = None):
+        num_riders = len(riders)
+        self.strategy = strategy
+        self.riders = riders
+        self.num_simulations = int(num_simulations)
+        self.position_counts = (position_counts if position_counts is not None
+                                else np.zeros((num_riders, num_riders), dtype=np.int64))
+        self.time_sums = time_sums if time_sums is not None else np.zeros(num_riders)
+        # マージ時の圧縮も乱数を使うため、シードを固定して結果を再現できるようにする
+        self.time_sketches = (time_sketches if time_sketches is not None
+                              else [KLLSketch(seed=r) for r in range(num_riders)])
+
+    @classmethod
+    def from_race(cls, strategy: Strategy, riders: List[str], race: np.ndarray,
+                  seed: np.random.SeedSequence) -> 'StrategyResult':
+        """(ライダー数, シミュレーション回数) の総タイムを集計する"""
+        num_riders = len(riders)
+        positions = _rank(race) - 1
+        counts = np.stack([np.bincount(row, minlength=num_riders) for row in positions]).astype(np.int64)
+        sketches = []
+        for times, sketch_seed in zip(race, seed.spawn(num_riders)):
+            sketch = KLLSketch(seed=sketch_seed)
+            sketch.update_many(times)
+            sketches.append(sketch)
+        return cls(strategy, riders, race.shape[1], counts, race.sum(axis=1, dtype=np.float64), sketches)
+
+    def merge(self, other: 'StrategyResult') -> 'StrategyResult':
+        """別のチャンクの集計を取り込む（自身を返す）"""
+        self.num_simulations += other.num_simulations
+        self.position_counts += other.position_counts
+        self.time_sums += other.time_sums
+        for sketch, other_sketch in zip(self.time_sketches, other.time_sketches):
+            sketch.merge(other_sketch)
+        return self
+
+    def mean_times(self) -> np.ndarray:
+        """ライダーごとの平均総タイム"""
+        return self.time_sums / max(self.num_simulations, 1)
+
+    def time_percentiles(self, percentiles: Sequence[float] = (5, 50, 95)) -> np.ndarray:
+        """ライダーごとの総タイムのパーセンタイルの近似値（ライダー数, パーセンタイル数）"""
+        qs = np.asarray(percentiles, dtype=np.float64) / 100.0
+        return np.array([sketch.quantiles(qs) for sketch in self.time_sketches]).reshape(len(self.riders), qs.size)
+
+    def position_distribution(self) -> np.ndarray:
+        """順位の分布（ライダー数, 順位数）。各行は各順位になる確率"""
+        return self.position_counts / max(self.num_simulations, 1)
+
+    def expected_positions(self) -> np.ndarray:
+        """ライダーごとの平均順位"""
+        return self.position_distribution() @ np.arange(1, len(self.riders) + 1)
+
+
+def tire_ages(columns: LapColumns) -> np.ndarray:
+    """各ラップのタイヤの周回数（0始まり）を求める
+
+    ライダーごとにラップ番号順に並べ、タイヤが変わった位置またはラップ番号が連続しない位置で
+    スティントが始まるものとします。
+    """
+    count = len(columns)
+    ages = np.zeros(count, dtype=np.int64)
+    if not count:
+        return ages
+    order = np.lexsort((columns.lap_numbers, columns.rider_codes))
+    riders = columns.rider_codes[order]
+    tires = columns.tire_codes[order]
+    laps = columns.lap_numbers[order]
+    new_stint = np.ones(count, dtype=bool)
+    new_stint[1:] = (riders[1:] != riders[:-1]) | (tires[1:] != tires[:-1]) | (laps[1:] != laps[:-1] + 1)
+    stint_starts = np.flatnonzero(new_stint)
+    ages[order] = np.arange(count) - stint_starts[np.cumsum(new_stint) - 1]
+    return ages
+
+
+def fit_race_model(columns: LapColumns, outlier_ratio: float = DEFAULT_OUTLIER_RATIO,
+                   min_laps: int = 3) -> RaceModel:
+    """ラップデータからライダー × タイヤのラップタイムモデルを推定する
+
+    タイヤごとのモデルはラップタイムをタイヤの周回数に対して最小二乗で直線近似したものです。
+    ラップ数がmin_laps未満のタイヤは、そのライダーの全ラップから推定したモデルで代用します。
+
+    Args:
+        columns: 列指向のラップデータ
+        outlier_ratio: ライダーの最速ラップに対してこの比率より遅いラップは除外する
+        min_laps: モデルを推定するのに必要なラップ数
+
+    Returns:
+        RaceModel: 推定したモデル（ラップが足りないライダーは含まない）
+    """
+    ages = tire_ages(columns)
+    lap_times = columns.lap_times
+    usable = ~np.isnan(lap_times)
+    riders, models = [], {}
+    for code, rider in enumerate(columns.riders):
+        mask = usable & (columns.rider_codes == code)
+        if not mask.any():
+            continue
+        mask &= lap_times <= lap_times[mask].min() * outlier_ratio
+        if mask.sum() < min_laps:
+            continue
+        riders.append(rider)
+        models[(rider, None)] = _fit_linear(ages[mask], lap_times[mask])
+        for tire_code, tire in enumerate(columns.tires):
+            tire_mask = mask & (columns.tire_codes == tire_code)
+            if tire and tire_mask.sum() >= min_laps:
+                models[(rider, tire)] = _fit_linear(ages[tire_mask], lap_times[tire_mask])
+    return RaceModel(riders, models)
+
+
+def _fit_linear(ages: np.ndarray, lap_times: np.ndarray) -> TireModel:
+    """ラップタイムをタイヤの周回数に対して直線近似する（周回数が1種類の場合は傾き0）"""
+    ages = ages.astype(np.float64)
+    if np.ptp(ages) > 0:
+        slope, intercept = np.polyfit(ages, lap_times, 1)
+    else:
+        slope, intercept = 0.0, lap_times.mean()
+    return TireModel(intercept, slope, lap_times - (intercept + slope * ages))
+
+
+def _race_plan(model: RaceModel, strategy: Strategy) -> List[Tuple[float, List[Tuple[np.ndarray, int]]]]:
+    """戦略を、ライダーごとの (確定的な総タイム, [(残差, 周回数), ...]) に展開する"""
+    plan = []
+    for rider in model.riders:
+        base = strategy.num_stops * strategy.pit_loss
+        stints = []
+        for tire, laps in strategy.stints:
+            tire_model = model.tire_model(rider, tire)
+            base += tire_model.expected_times(np.arange(laps)).sum()
+            stints.append((tire_model.residuals, laps))
+        plan.append((base, stints))
+    return plan
+
+
+def _simulate_chunk(plans, strategies: List[Strategy], riders: List[str], num_simulations: int,
+                    seed: np.random.SeedSequence, focus: Optional[int], baseline: int) -> List[StrategyResult]:
+    """1チャンク分のシミュレーションを実行して戦略ごとに集計する（プロセスプールのワーカーで実行）
+
+    順位はチャンク内で求め、総タイムはチャンク内で集計して破棄するため、メモリはチャンクの大きさ分のみです。
+
+    Returns:
+        List[StrategyResult]: 戦略ごとのこのチャンクの集計
+    """
+    rng = np.random.default_rng(seed)
+    totals = np.empty((len(plans), len(plans[0]) if plans else 0, num_simulations), dtype=np.float32)
+    for s, plan in enumerate(plans):
+        for r, (base, stints) in enumerate(plan):
+            noise = np.zeros(num_simulations)
+            for residuals, laps in stints:
+                # 各周回の残差をまとめて復元抽出する
+                draws = rng.integers(0, residuals.size, size=(num_simulations, laps))
+                noise += residuals[draws].sum(axis=1)
+            totals[s, r] = base + noise
+
+    results = []
+    for s, (strategy, sketch_seed) in enumerate(zip(strategies, seed.spawn(len(strategies)))):
+        if focus is None:
+            race = totals[s]
+        else:
+            race = totals[baseline].copy()
+            race[focus] = totals[s, focus]
+        results.append(StrategyResult.from_race(strategy, riders, race, sketch_seed))
+    return results
+
+
+def _rank(times: np.ndarray) -> np.ndarray:
+    """(ライダー数, シミュレーション回数) の総タイムから順位（1始まり）を求める"""
+    return (np.argsort(np.argsort(times, axis=0, kind='stable'), axis=0, kind='stable') + 1).astype(np.int16)
+
+
+def simulate_race(model: RaceModel, strategies: Sequence[Strategy], num_simulations: int = 100000,
+                  seed: Optional[int] = None, focus_rider: Optional[str] = None, baseline: int = 0,
+                  workers: Optional[int] = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                  progress: Optional[Callable[[int, str], None]] = None) -> List[StrategyResult]:
+    """戦略ごとのレース結果をシミュレーションする
+
+    シミュレーションはchunk_size回ずつのチャンクに分け、SeedSequence.spawnで作った
+    チャンクごとの独立な乱数列でプロセスプールに割り振ります。チャンクの分け方は
+    ワーカー数に依存しないため、同じシードであればワーカー数に関係なく同じ結果になります。
+    各チャンクは順位の回数・総タイムの和と分布に集計してから返すため、シミュレーション回数を
+    増やしてもメモリは増えません。
+
+    順位は、focus_riderを指定した場合はそのライダーのみが各戦略を取り、他のライダーは
+    baselineの戦略を取ったレースで求めます。指定しない場合は全員が同じ戦略を取ったレースです。
+
+    Args:
+        model: ラップタイムモデル
+        strategies: 比較する戦略
+        num_simulations: シミュレーション回数
+        seed: 乱数のシード（Noneの場合は毎回異なる結果）
+        focus_rider: 戦略を比較するライダー
+        baseline: 他のライダーが取る戦略のインデックス
+        workers: プロセス数（Noneの場合はCPUコア数、1の場合はプロセスを使わない）
+        chunk_size: 1チャンクのシミュレーション回数
+        progress: 進捗を通知するコールバック (進捗率, メッセージ)
+
+    Returns:
+        List[StrategyResult]: 戦略ごとの結果
+
+    Raises:
+        ValueError: モデルにライダーがいない、または戦略がない場合
+    """
+    if not model.riders:
+        raise ValueError("No rider has enough laps to build a lap-time model")
+    if not strategies:
+        raise ValueError("No strategy to simulate")
+    if focus_rider is not None and focus_rider not in model.riders:
+        raise ValueError(f"Rider {focus_rider} has no lap-time model")
+
+    plans = [_race_plan(model, strategy) for strategy in strategies]
+    chunk_size = max(1, int(chunk_size))
+    sizes = [min(chunk_size, num_simulations - start) for start in range(0, num_simulations, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    workers = workers or os.cpu_count() or 1
+
+    focus = model.riders.index(focus_rider) if focus_rider is not None else None
+    arguments = (plans, list(strategies), model.riders)
+    results = [StrategyResult(strategy, model.riders) for strategy in strategies]
+
+    def merge(i, chunk):
+        for result, chunk_result in zip(results, chunk):
+            result.merge(chunk_result)
+        if progress:
+            progress(int((i + 1) * 100 / len(sizes)), f"Simulated {sum(sizes[:i + 1])} races")
+
+    if workers == 1 or len(sizes) == 1:
+        for i, (size, chunk_seed) in enumerate(zip(sizes, seeds)):
+            merge(i, _simulate_chunk(*arguments, size, chunk_seed, focus, baseline))
+    else:
+        # GUIのスレッドから起動しても安全なようにspawnでプロセスを作る
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=min(workers, len(sizes)), mp_context=context) as executor:
+            chunks = executor.map(_simulate_chunk, *[[argument] * len(sizes) for argument in arguments],
+                                  sizes, seeds, [focus] * len(sizes), [baseline] * len(sizes))
+            for i, chunk in enumerate(chunks):
+                merge(i, chunk)
+    return results
@@ -0,0 +1,304 @@
+"""
+Session Catalog Module
+データディレクトリ内のセッションファイルを走査し、概要をインデックスとして保持するモジュールです。
+"""
+import csv
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+from utils.time_converter import TimeConverter
+from utils.json_stream import JsonArrayStream
+from app.lap_store import normalize_date
+
+INDEX_VERSION = 1
+SESSION_FILE_EXTENSIONS = ('.json', '.csv')
+
+# この件数以下のファイルはプロセスを起動せずに逐次処理する
+_PARALLEL_THRESHOLD = 4
+
+
+def summarize_session_file(file_path: str) -> Dict:
+    """セッションファイルを1つ読み込み、カタログ用の概要を作成する
+
+    ProcessPoolExecutorのワーカーから呼び出されるため、モジュールレベルの関数にしています。
+
+    Args:
+        file_path: JSONまたはCSVファイルのパス
+
+    Returns:
+        Dict: セッション概要（読み込みに失敗した場合は'error'キーを含む）
+    """
+    entry = {
+        'path': file_path,
+        'mtime': None,
+        'size': None,
+        'format': os.path.splitext(file_path)[1].lstrip('.').lower(),
+        'track': '',
+        'date': '',
+        'session_type': '',
+        'weather': '',
+        'track_temp': '',
+        'riders': [],
+        'lap_count': 0,
+        'rider_lap_counts': {},
+        'rider_best_laps': {},
+        'best_lap_time': None,
+        'best_lap_rider': '',
+        'error': '',
+    }
+    summary = _LapSummary()
+    try:
+        # 走査後に削除・名前変更されたファイルも読み込めないファイルと同様にエラーとして記録する
+        stat = os.stat(file_path)
+        entry['mtime'] = stat.st_mtime_ns
+        entry['size'] = stat.st_size
+        if entry['format'] == 'json':
+            session_info = _summarize_json(file_path, summary)
+        else:
+            session_info = _summarize_csv(file_path, summary)
+    except Exception as e:
+        entry['error'] = str(e)
+        return entry
+
+    entry['track'] = str(session_info.get('track', '') or '')
+    entry['date'] = normalize_date(session_info.get('date', ''))
+    entry['session_type'] = str(session_info.get('session_type', '') or '')
+    entry['weather'] = str(session_info.get('Weather', '') or '') or summary.weather
+    entry['track_temp'] = str(session_info.get('TrackTemp', '') or '')
+
+    entry['riders'] = sorted(summary.lap_counts)
+    entry['lap_count'] = sum(summary.lap_counts.values())
+    entry['rider_lap_counts'] = summary.lap_counts
+    entry['rider_best_laps'] = summary.best_laps
+    if summary.best_laps:
+        rider = min(summary.best_laps, key=summary.best_laps.get)
+        entry['best_lap_rider'] = rider
+        entry['best_lap_time'] = summary.best_laps[rider]
+    return entry
+
+
+class _LapSummary:
+    """ラップを1件ずつ受け取り、ライダーごとのラップ数とベストラップを集計する"""
+
+    def __init__(self):
+        self.time_converter = TimeConverter()
+        self.lap_counts = {}
+        self.best_laps = {}
+        self.weather = ''
+
+    def add(self, rider, lap_time, weather='') -> None:
+        rider = str(rider or '')
+        if not rider:
+            return
+        self.lap_counts[rider] = self.lap_counts.get(rider, 0) + 1
+        if not self.weather and weather:
+            self.weather = str(weather)
+        try:
+            seconds = self.time_converter.string_to_seconds(str(lap_time))
+        except ValueError:
+            return
+        if rider not in self.best_laps or seconds < self.best_laps[rider]:
+            self.best_laps[rider] = seconds
+
+
+def _summarize_json(file_path: str, summary: _LapSummary) -> Dict:
+    """JSONファイルのラップをストリーミングで集計し、セッション情報を返す"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        stream = JsonArrayStream(f, 'lap_data')
+        for lap in stream.items():
+            if not isinstance(lap, dict):
+                continue
+            conditions = lap.get('conditions')
+            weather = conditions.get('weather', '') if isinstance(conditions, dict) else lap.get('Weather', '')
+            summary.add(lap.get('Rider'), lap.get('LapTime', ''), weather)
+    if not stream.found_array:
+        raise ValueError("Not a lap data file")
+    session_info = stream.fields.get('session_info', {})
+    return session_info if isinstance(session_info, dict) else {}
+
+
+def _summarize_csv(file_path: str, summary: _LapSummary) -> Dict:
+    """CSVファイルのラップを集計し、セッション情報を返す
+
+    CSVにはセッション情報が含まれないため、保存時のファイル名規則
+    （{名前}_{トラック}_{YYYYMMDD}.csv）からトラックと日付を推定します。
+    """
+    session_info = {}
+    with open(file_path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.DictReader(f)
+        if not reader.fieldnames or 'Rider' not in reader.fieldnames or 'LapTime' not in reader.fieldnames:
+            raise ValueError("Not a lap data file")
+        for row in reader:
+            if 'TrackTemp' not in session_info and row.get('TrackTemp'):
+                session_info['TrackTemp'] = row['TrackTemp']
+            summary.add(row.get('Rider'), row.get('LapTime', ''), row.get('Weather', ''))
+
+    match = re.search(r'_([^_]+)_(\d{8})$', os.path.splitext(os.path.basename(file_path))[0])
+    if match:
+        session_info['track'] = match.group(1).replace('_', ' ')
+        session_info['date'] = match.group(2)
+    return session_info
+
+
+class SessionCatalog:
+    """セッションファイルの概要インデックス
+
+    インデックスはJSONファイルに保存され、ファイルの更新時刻とサイズが
+    変わったものだけを再解析します。検索はインデックスのみを参照します。
+    """
+
+    def __init__(self, index_path: str):
+        self.index_path = index_path
+        self.entries = {}
+        self.load()
+
+    def load(self) -> None:
+        """インデックスファイルを読み込む"""
+        self.entries = {}
+        if not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == INDEX_VERSION:
+                self.entries = data.get('entries', {})
+        except (OSError, ValueError, AttributeError) as e:
+            print(f"Error loading session catalog: {e}")
+            self.entries = {}
+
+    def save(self) -> None:
+        """インデックスファイルを一時ファイル経由で書き込む"""
+        index_dir = os.path.dirname(os.path.abspath(self.index_path))
+        if not os.path.exists(index_dir):
+            os.makedirs(index_dir)
+        temp_path = self.index_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': INDEX_VERSION, 'entries': self.entries}, f, ensure_ascii=False)
+        os.replace(temp_path, self.index_path)
+
+    def scan_files(self, root_dirs: Iterable[str]) -> List[str]:
+        """ディレクトリツリーからセッションファイルの候補を列挙する"""
+        index_path = os.path.abspath(self.index_path)
+        files = []
+        for root_dir in root_dirs:
+            for dir_path, _, file_names in os.walk(root_dir):
+                for file_name in file_names:
+                    if not file_name.lower().endswith(SESSION_FILE_EXTENSIONS):
+                        continue
+                    file_path = os.path.abspath(os.path.join(dir_path, file_name))
+                    if file_path != index_path:
+                        files.append(file_path)
+        return sorted(files)
+
+    def refresh(self, root_dirs: Iterable[str], max_workers: Optional[int] = None) -> Tuple[int, int]:
+        """インデックスを更新する
+
+        更新時刻またはサイズが変わったファイルのみを複数プロセスで並列に解析し、
+        削除されたファイルのエントリを取り除きます。
+
+        Args:
+            root_dirs: 走査するディレクトリのリスト
+            max_workers: ワーカープロセス数（省略時はCPU数）
+
+        Returns:
+            Tuple[int, int]: (更新したエントリ数, 削除したエントリ数)
+        """
+        root_dirs = [os.path.abspath(d) for d in root_dirs]
+        files = self.scan_files(root_dirs)
+
+        stale = []
+        for file_path in files:
+            entry = self.entries.get(file_path)
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                continue
+            if entry is None or entry.get('mtime') != stat.st_mtime_ns or entry.get('size') != stat.st_size:
+                stale.append(file_path)
+
+        # 走査対象ディレクトリ内で存在しなくなったファイルを削除
+        existing = set(files)
+        removed = [path for path in self.entries
+                   if path not in existing and any(_is_under(path, d) for d in root_dirs)]
+        for path in removed:
+            del self.entries[path]
+
+        if len(stale) <= _PARALLEL_THRESHOLD:
+            summaries = [summarize_session_file(path) for path in stale]
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                summaries = list(executor.map(summarize_session_file, stale, chunksize=8))
+        for summary in summaries:
+            self.entries[summary['path']] = summary
+
+        if stale or removed:
+            self.save()
+        return len(stale), len(removed)
+
+    def search(self, text: str = '', track: Optional[str] = None, rider: Optional[str] = None,
+               session_type: Optional[str] = None, date_from: Optional[str] = None,
+               date_to: Optional[str] = None, include_errors: bool = False) -> List[Dict]:
+        """インデックスからセッションを検索する（ファイルの再解析は行わない）
+
+        Args:
+            text: トラック・日付・セッションタイプ・天候・ライダー・ファイル名に対する
+                  部分一致キーワード（空白区切りで全て一致するもの）
+            track: トラック名（完全一致、大文字小文字を区別しない）
+            rider: ライダー名（完全一致）
+            session_type: セッションタイプ（完全一致、大文字小文字を区別しない）
+            date_from: この日付以降（YYYY-MM-DD）
+            date_to: この日付以前（YYYY-MM-DD）
+            include_errors: 読み込みに失敗したファイルも含めるか
+
+        Returns:
+            List[Dict]: 日付・トラック順のセッション概要のリスト
+        """
+        keywords = text.lower().split()
+        date_from = normalize_date(date_from) if date_from else None
+        date_to = normalize_date(date_to) if date_to else None
+        results = []
+        for entry in self.entries.values():
+            if entry.get('error') and not include_errors:
+                continue
+            if track and entry['track'].lower() != track.lower():
+                continue
+            if session_type and entry['session_type'].lower() != session_type.lower():
+                continue
+            if rider and rider not in entry['riders']:
+                continue
+            if date_from and entry['date'] < date_from:
+                continue
+            if date_to and entry['date'] > date_to:
+                continue
+            if keywords:
+                haystack = _search_text(entry)
+                if not all(keyword in haystack for keyword in keywords):
+                    continue
+            results.append(entry)
+        results.sort(key=lambda e: (e['date'], e['track'], e['path']))
+        return results
+
+    def get_entry(self, file_path: str) -> Optional[Dict]:
+        """ファイルパスからセッション概要を取得する"""
+        return self.entries.get(os.path.abspath(file_path))
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+def _search_text(entry: Dict) -> str:
+    """キーワード検索の対象となる文字列を作成する"""
+    fields = [entry['track'], entry['date'], entry['session_type'], entry['weather'],
+              os.path.basename(entry['path'])] + list(entry['riders'])
+    return ' '.join(fields).lower()
+
+
+def _is_under(path: str, directory: str) -> bool:
+    """pathがdirectory配下にあるか"""
+    try:
+        return os.path.commonpath([path, directory]) == directory
+    except ValueError:
+        # ドライブが異なる場合など
+        return False
@@ -0,0 +1,130 @@
+"""
+Session Writer Module
+ラップデータをJSONとCSVの両形式で保存するモジュールです。
+"""
+import csv
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+from app.lap_columns import LapColumns
+from utils.atomic_io import atomic_write_text
+
+CONDITION_FIELDS = ['TireType', 'Weather', 'TrackTemp']
+
+
+class SessionWriter:
+    """ラップデータをJSONとCSVに保存するライター
+
+    ラップデータの文字列化は1回だけ行い、その結果からJSONとCSVの内容を
+    それぞれワーカースレッドで作成して、一時ファイル経由で書き込みます。
+    タイムの検証は正規表現による再検証ではなく、列指向データの
+    有効ラップマスク（LapColumns.valid）を使用します。
+    """
+
+    def __init__(self, num_sectors: int):
+        self.num_sectors = num_sectors
+
+    def save(self, laps: List[Dict], columns: LapColumns, session_info: Optional[Dict],
+             json_path: Optional[str], csv_path: Optional[str],
+             progress_callback: Optional[Callable[[int, str], None]] = None) -> Dict:
+        """JSONとCSVを並行して保存する
+
+        Args:
+            laps: ラップデータのリスト
+            columns: lapsから作成した列指向データ（有効ラップの判定に使用）
+            session_info: JSONに含めるセッション情報
+            json_path: JSONの保存先（Noneの場合は保存しない）
+            csv_path: CSVの保存先（Noneの場合は保存しない）
+            progress_callback: 進捗通知 (進捗率0-100, メッセージ)
+
+        Returns:
+            Dict: {'json': 保存したパスまたはNone, 'csv': 保存したパスまたはNone,
+                   'errors': {形式: エラーメッセージ}}
+        """
+        def report(percent, message):
+            if progress_callback:
+                progress_callback(percent, message)
+
+        report(0, "Preparing data")
+        fields = self._csv_fields(laps)
+        rows = [[_cell(lap.get(field)) for field in fields] for lap in laps]
+        report(20, "Writing files")
+
+        tasks = {}
+        if json_path:
+            tasks['json'] = (self._write_json, (json_path, fields, rows, columns, session_info))
+        if csv_path:
+            tasks['csv'] = (self._write_csv, (csv_path, fields, rows))
+
+        result = {'json': None, 'csv': None, 'errors': {}}
+        if not tasks:
+            report(100, "Nothing to save")
+            return result
+
+        step = 80 // len(tasks)
+        done = 20
+        with ThreadPoolExecutor(max_workers=len(tasks)) as executor:
+            futures = {name: executor.submit(func, *args) for name, (func, args) in tasks.items()}
+            for name, future in futures.items():
+                try:
+                    result[name] = future.result()
+                except Exception as e:
+                    print(f"Error saving {name.upper()} file: {e}")
+                    result['errors'][name] = str(e)
+                done += step
+                report(done, f"{name.upper()} finished")
+        report(100, "Save completed")
+        return result
+
+    def _csv_fields(self, laps: List[Dict]) -> List[str]:
+        """CSVの列を決定する（標準の列を先頭に、その他の列は出現順）"""
+        fields = ['Rider', 'Lap', 'LapTime'] + [f'Sector{i}' for i in range(1, self.num_sectors + 1)]
+        seen = set(fields)
+        for lap in laps:
+            for key in lap:
+                if key not in seen:
+                    seen.add(key)
+                    fields.append(key)
+        return fields
+
+    def _write_json(self, file_path: str, fields: List[str], rows: List[List[str]],
+                    columns: LapColumns, session_info: Optional[Dict]) -> str:
+        """有効なラップをJSON形式で書き込む"""
+        index = {field: i for i, field in enumerate(fields)}
+        time_fields = ['LapTime'] + [f'Sector{i}' for i in range(1, self.num_sectors + 1)]
+        condition_index = [index.get(field) for field in CONDITION_FIELDS]
+
+        lap_data = []
+        for i in columns.valid.nonzero()[0].tolist():
+            row = rows[i]
+            formatted_lap = {'Rider': row[index['Rider']], 'Lap': int(columns.lap_numbers[i])}
+            for field in time_fields:
+                formatted_lap[field] = row[index[field]]
+            tire, weather, track_temp = (row[j] if j is not None else '' for j in condition_index)
+            formatted_lap['conditions'] = {'tire': tire, 'weather': weather, 'track_temp': track_temp}
+            lap_data.append(formatted_lap)
+
+        if not lap_data:
+            raise ValueError("No valid lap data could be formatted for JSON output")
+
+        text = json.dumps({'session_info': session_info or {}, 'lap_data': lap_data},
+                          ensure_ascii=False, indent=2)
+        atomic_write_text(file_path, text)
+        return file_path
+
+    def _write_csv(self, file_path: str, fields: List[str], rows: List[List[str]]) -> str:
+        """全ラップをCSV形式で書き込む"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        writer.writerow(fields)
+        writer.writerows(rows)
+        atomic_write_text(file_path, buffer.getvalue(), newline='')
+        return file_path
+
+
+def _cell(value) -> str:
+    """セルの値を文字列に変換する（Noneは空文字）"""
+    if value is None or (isinstance(value, float) and value != value):
+        return ''
+    return value if isinstance(value, str) else str(value)
@@ -0,0 +1,322 @@
+"""
+Telemetry Store Module
+データロガーの高頻度テレメトリ（速度・回転数・スロットル・ブレーキ・GPSなど）を
+メモリマップ可能なバイナリ形式で保存し、ラップ単位で取り出すモジュールです。
+"""
+import csv
+import json
+import os
+import numpy as np
+from typing import Dict, Iterable, List, Optional, Sequence
+from utils.atomic_io import atomic_write_text
+
+# 保存するチャンネルのデータ型
+TELEMETRY_DTYPE = np.float32
+
+# CSV取り込み時に一度に変換する行数
+_IMPORT_CHUNK_ROWS = 65536
+
+_FORMAT_VERSION = 1
+
+
+class TelemetryLap:
+    """ラップの範囲（サンプル番号の半開区間 [start, stop)）"""
+
+    def __init__(self, rider: str, lap: int, start: int, stop: int):
+        self.rider = rider
+        self.lap = lap
+        self.start = start
+        self.stop = stop
+
+    def __len__(self) -> int:
+        return self.stop - self.start
+
+    def to_dict(self) -> Dict:
+        return {'rider': self.rider, 'lap': self.lap, 'start': self.start, 'stop': self.stop}
+
+    def __repr__(self) -> str:
+        return f"TelemetryLap({self.rider!r}, {self.lap}, {self.start}, {self.stop})"
+
+
+class TelemetryStore:
+    """メモリマップしたテレメトリチャンネルとラップ境界の索引
+
+    ストアはディレクトリで、以下の2ファイルからなります。
+
+    - channels.npy: (チャンネル数, サンプル数) のfloat32配列。チャンネルごとに連続して並ぶため、
+      1チャンネル・1ラップ分の取り出しはコピーなしのビューになります。
+    - index.json: チャンネル名、サンプリング周波数、ラップ境界の索引。
+
+    開く際はファイルをメモリマップするだけなので、数時間分のログでもすぐに開け、
+    実際に参照したラップの範囲だけがディスクから読み込まれます。
+    """
+
+    DATA_FILE = 'channels.npy'
+    INDEX_FILE = 'index.json'
+
+    def __init__(self, path: str):
+        """既存のストアを開く
+
+        Args:
+            path: ストアのディレクトリ
+
+        Raises:
+            OSError: ファイルが存在しない、または読み込めない場合
+            ValueError: 索引とデータの形式が一致しない場合
+        """
+        self.path = path
+        with open(os.path.join(path, self.INDEX_FILE), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        self.channels = list(index['channels'])
+        self.sample_rate = float(index['sample_rate'])
+        self.source = index.get('source', '')
+        self.data = np.load(os.path.join(path, self.DATA_FILE), mmap_mode='r')
+        if self.data.ndim != 2 or self.data.shape[0] != len(self.channels):
+            raise ValueError(f"Telemetry data does not match index: {path}")
+
+        self.laps = [TelemetryLap(entry['rider'], int(entry['lap']), int(entry['start']), int(entry['stop']))
+                     for entry in index.get('laps', [])]
+        self._channel_lookup = {name: i for i, name in enumerate(self.channels)}
+        self._lap_lookup = {}
+        for telemetry_lap in self.laps:
+            self._lap_lookup.setdefault((telemetry_lap.rider, telemetry_lap.lap), telemetry_lap)
+
+    @classmethod
+    def write(cls, path: str, channels: Dict[str, np.ndarray], laps: Iterable[TelemetryLap],
+              sample_rate: float, source: str = '') -> 'TelemetryStore':
+        """チャンネルの配列からストアを作成する
+
+        Args:
+            path: ストアのディレクトリ（存在しない場合は作成）
+            channels: チャンネル名 -> 全サンプルの配列（全て同じ長さ）
+            laps: ラップ境界
+            sample_rate: サンプリング周波数（Hz）
+            source: 取り込み元のファイル名
+
+        Returns:
+            TelemetryStore: 作成したストア
+        """
+        names = list(channels)
+        num_samples = len(next(iter(channels.values()))) if names else 0
+        writer = _StoreWriter(path, names, num_samples)
+        try:
+            for i, name in enumerate(names):
+                values = np.asarray(channels[name], dtype=TELEMETRY_DTYPE)
+                if len(values) != num_samples:
+                    raise ValueError(f"Channel {name} has {len(values)} samples, expected {num_samples}")
+                writer.data[i] = values
+        except BaseException:
+            writer.abort()
+            raise
+        writer.commit(list(laps), sample_rate, source)
+        return cls(path)
+
+    def close(self) -> None:
+        """メモリマップを解放する"""
+        self.data = None
+
+    def __len__(self) -> int:
+        """サンプル数"""
+        return self.data.shape[1]
+
+    @property
+    def duration(self) -> float:
+        """ログ全体の長さ（秒）"""
+        return len(self) / self.sample_rate if self.sample_rate else 0.0
+
+    def has_channel(self, name: str) -> bool:
+        return name in self._channel_lookup
+
+    def channel(self, name: str) -> np.ndarray:
+        """チャンネルの全サンプル（メモリマップのビュー）
+
+        Raises:
+            KeyError: チャンネルが存在しない場合
+        """
+        return self.data[self._channel_lookup[name]]
+
+    def get_lap(self, rider: str, lap) -> Optional[TelemetryLap]:
+        """ライダー名とラップ番号からラップ境界を取得する"""
+        try:
+            return self._lap_lookup.get((str(rider), int(lap)))
+        except (TypeError, ValueError):
+            return None
+
+    def lap_channel(self, telemetry_lap: TelemetryLap, name: str) -> np.ndarray:
+        """1ラップ分のチャンネル（コピーなしのビュー）"""
+        return self.channel(name)[telemetry_lap.start:telemetry_lap.stop]
+
+    def lap_channels(self, telemetry_lap: TelemetryLap,
+                     names: Optional[Sequence[str]] = None) -> Dict[str, np.ndarray]:
+        """1ラップ分の複数チャンネル（いずれもコピーなしのビュー）"""
+        names = self.channels if names is None else names
+        return {name: self.lap_channel(telemetry_lap, name) for name in names}
+
+    def lap_time_axis(self, telemetry_lap: TelemetryLap) -> np.ndarray:
+        """ラップ開始からの経過時間（秒）"""
+        return np.arange(len(telemetry_lap), dtype=np.float64) / self.sample_rate
+
+    def link_laps(self, laps: List[Dict]) -> Dict[int, TelemetryLap]:
+        """ラップデータの各行に対応するテレメトリのラップを対応付ける
+
+        Args:
+            laps: ラップデータのリスト（'Rider', 'Lap' を使用）
+
+        Returns:
+            Dict[int, TelemetryLap]: ラップデータのインデックス -> テレメトリのラップ
+        """
+        links = {}
+        for index, lap in enumerate(laps):
+            telemetry_lap = self.get_lap(lap.get('Rider', ''), lap.get('Lap'))
+            if telemetry_lap is not None:
+                links[index] = telemetry_lap
+        return links
+
+    @classmethod
+    def import_csv(cls, csv_path: str, path: str, sample_rate: float = 100.0,
+                   lap_column: str = 'Lap', rider_column: str = 'Rider', rider: str = '',
+                   channels: Optional[Sequence[str]] = None) -> 'TelemetryStore':
+        """データロガーのCSVログをストアに取り込む
+
+        ラップ番号（およびライダー名）の列の値が変わった位置をラップの境界とします。
+        ファイルは2回読み込み（1回目で行数とラップ境界を求め、2回目でチャンネルを書き込む）、
+        メモリに置くのは一定行数分のみです。数値に変換できない値はNaNになります。
+
+        Args:
+            csv_path: 取り込むCSVファイル
+            path: 作成するストアのディレクトリ
+            sample_rate: サンプリング周波数（Hz）
+            lap_column: ラップ番号の列名
+            rider_column: ライダー名の列名（列がない場合はriderを使用）
+            rider: ライダー名の列がない場合のライダー名
+            channels: 取り込むチャンネルの列名（省略時はラップ・ライダー以外の全列）
+
+        Returns:
+            TelemetryStore: 作成したストア
+
+        Raises:
+            ValueError: ラップ番号の列やチャンネルの列が見つからない場合
+        """
+        with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+            reader = csv.reader(f)
+            header = [name.strip() for name in next(reader, [])]
+            if lap_column not in header:
+                raise ValueError(f"Lap column '{lap_column}' not found in {csv_path}")
+            lap_index = header.index(lap_column)
+            rider_index = header.index(rider_column) if rider_column in header else None
+            if channels is None:
+                channels = [name for i, name in enumerate(header) if i not in (lap_index, rider_index)]
+            missing = [name for name in channels if name not in header]
+            if missing:
+                raise ValueError(f"Channels not found in {csv_path}: {', '.join(missing)}")
+            channel_indices = [header.index(name) for name in channels]
+            # ラップ番号（・ライダー名）の列まで値がない行（途中で切れた行など）は両方の読み込みで読み飛ばす
+            min_length = max(lap_index, -1 if rider_index is None else rider_index) + 1
+
+            # 1回目: 行数とラップ境界
+            laps = []
+            current = None
+            open_lap = None  # 境界を確定していないラップ
+            num_samples = 0
+            for row in reader:
+                if len(row) < min_length:
+                    continue
+                key = (row[rider_index] if rider_index is not None else rider, _to_lap_number(row[lap_index]))
+                if key != current:
+                    if open_lap is not None:
+                        open_lap.stop = num_samples
+                        open_lap = None
+                    if key[1] is not None:
+                        # ラップ番号のない区間（ピットなど）はラップとして扱わない
+                        open_lap = TelemetryLap(key[0], key[1], num_samples, num_samples)
+                        laps.append(open_lap)
+                    current = key
+                num_samples += 1
+            if open_lap is not None:
+                open_lap.stop = num_samples
+
+        writer = _StoreWriter(path, list(channels), num_samples)
+        try:
+            # 2回目: チャンネルを書き込む
+            with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+                reader = csv.reader(f)
+                next(reader, None)
+                position = 0
+                chunk = []
+                for row in reader:
+                    if len(row) < min_length:
+                        continue
+                    chunk.append([row[i] if i < len(row) else '' for i in channel_indices])
+                    if len(chunk) >= _IMPORT_CHUNK_ROWS:
+                        writer.data[:, position:position + len(chunk)] = _parse_chunk(chunk)
+                        position += len(chunk)
+                        chunk = []
+                if chunk:
+                    writer.data[:, position:position + len(chunk)] = _parse_chunk(chunk)
+        except BaseException:
+            writer.abort()
+            raise
+        writer.commit(laps, sample_rate, os.path.basename(csv_path))
+        return cls(path)
+
+
+class _StoreWriter:
+    """ストアの書き込み（完了するまでは一時ファイルに書き込む）"""
+
+    def __init__(self, path: str, channels: List[str], num_samples: int):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.channels = channels
+        self.data_path = os.path.join(path, TelemetryStore.DATA_FILE)
+        self.temp_path = f"{self.data_path}.{os.getpid()}.tmp"
+        self.data = np.lib.format.open_memmap(self.temp_path, mode='w+', dtype=TELEMETRY_DTYPE,
+                                              shape=(len(channels), num_samples))
+
+    def commit(self, laps: List[TelemetryLap], sample_rate: float, source: str) -> None:
+        """データを確定し、索引を書き込む"""
+        self.data.flush()
+        self.data = None
+        os.replace(self.temp_path, self.data_path)
+        index = {
+            'version': _FORMAT_VERSION,
+            'channels': self.channels,
+            'sample_rate': sample_rate,
+            'source': source,
+            'laps': [telemetry_lap.to_dict() for telemetry_lap in laps],
+        }
+        atomic_write_text(os.path.join(self.path, TelemetryStore.INDEX_FILE),
+                          json.dumps(index, ensure_ascii=False, indent=2))
+
+    def abort(self) -> None:
+        """書き込みを中止して一時ファイルを削除する"""
+        self.data = None
+        try:
+            os.remove(self.temp_path)
+        except OSError:
+            pass
+
+
+def _parse_chunk(rows: List[List[str]]) -> np.ndarray:
+    """CSVの行（文字列のリスト）を (チャンネル数, 行数) のfloat32配列に変換する"""
+    try:
+        return np.array(rows, dtype=np.float64).T.astype(TELEMETRY_DTYPE)
+    except ValueError:
+        # 空欄や数値以外を含む場合は値ごとに変換する
+        return np.array([[_to_float(value) for value in row] for row in rows],
+                        dtype=np.float64).T.astype(TELEMETRY_DTYPE)
+
+
+def _to_lap_number(value) -> Optional[int]:
+    """ラップ番号を整数に変換する（変換できない場合はNone）"""
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_float(value) -> float:
+    """数値文字列をfloatに変換する（変換できない場合はNaN）"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
@@ -2,8 +2,10 @@
 Lap Data Table Widget Module
 ラップデータ表示用のテーブルウィジェットを提供します。
 """
-from PyQt5.QtWidgets import (QComboBox, QLabel, QHBoxLayout, QTableWidgetItem)
-from PyQt5.QtGui import QColor
+from PyQt5.QtWidgets import (QComboBox, QLabel, QHBoxLayout, QTableWidgetItem, QMenu)
+from PyQt5.QtCore import Qt, pyqtSignal
+from PyQt5.QtGui import QBrush, QColor
+import numpy as np
 import pandas as pd
 
 from ui.base_widgets.base_table_widget import BaseTableWidget, TableColorUtils
@@ -11,13 +13,23 @@ from ui.base_widgets.base_table_widget import BaseTableWidget, TableColorUtils
 
 class LapDataTableWidget(BaseTableWidget):
     """ラップデータ表示用テーブルウィジェット"""
+    similar_laps_requested = pyqtSignal(int)  # 似たラップの検索リクエスト（ラップデータのインデックス）
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.current_rider = None
+        self.lap_data = []
         self.analysis_data = None
+        self.row_items = {}  # ラップデータのインデックス -> 行のRider列アイテム（ソート後も行を特定するため）
+        self.leaderboard = None  # 強調表示に使うリーダーボード（LeaderboardIndex）
+        self.highlight_indices = (None, None)  # 強調表示中の最速/最遅ラップのインデックス
+        self.filter_mask = None  # 条件式に一致するラップのマスク（Noneの場合は全ラップ）
+        self.lap_riders = np.empty(0, dtype=object)  # 各ラップのライダー名（ライダーでの絞り込みに使用）
         self.config_manager = parent.config_manager if hasattr(parent, 'config_manager') else None
         self.setup_rider_selector()
         self.configure_columns()
+        self.table.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.table.customContextMenuRequested.connect(self.show_context_menu)
         
     def setup_rider_selector(self):
         """ライダー選択UIを設定"""
@@ -44,8 +56,8 @@ class LapDataTableWidget(BaseTableWidget):
         for i in range(1, num_sectors + 1):
             headers.append(f"Sector{i}")
         
-        # 追加列
-        headers.extend(["Tire", "Weather", "Track Temp"])
+        # 追加列（Corrected Timeは条件補正したデータを表示する場合のみ表示）
+        headers.extend(["Tire", "Weather", "Track Temp", "Corrected Time"])
         
         resizable_columns = [0]  # Rider列のみリサイズ可能
         fixed_width_columns = {
@@ -62,13 +74,30 @@ class LapDataTableWidget(BaseTableWidget):
         fixed_width_columns[offset] = 80      # Tire
         fixed_width_columns[offset + 1] = 80  # Weather
         fixed_width_columns[offset + 2] = 80  # Track Temp
+        fixed_width_columns[offset + 3] = 100  # Corrected Time
         
         self.configure_header(headers, resizable_columns, fixed_width_columns)
+        
+        # ミニセクターモードではセクターの列を隠す（セルも作らない）
+        self.micro_sector_mode = self.config_manager.is_micro_sector_mode() if self.config_manager else False
+        for i in range(3, 3 + num_sectors):
+            self.table.setColumnHidden(i, self.micro_sector_mode)
+        self.table.setColumnHidden(offset + 3, True)
     
-    def update_data(self, laps, analysis_results=None):
-        """ラップデータを更新"""
+    def update_data(self, laps, analysis_results=None, leaderboard=None, filter_mask=None):
+        """ラップデータを更新
+
+        Args:
+            laps: ラップデータのリスト
+            analysis_results: 分析結果
+            leaderboard: 最速/最遅ラップの強調表示に使うリーダーボード
+            filter_mask: 表示するラップのマスク（条件式での絞り込み、Noneの場合は全ラップ）
+        """
         self.lap_data = laps
         self.analysis_data = analysis_results
+        self.leaderboard = leaderboard
+        self.filter_mask = filter_mask
+        self.lap_riders = np.array([lap.get('rider_name', lap.get('Rider', '')) for lap in laps or []], dtype=object)
         
         # ライダーリストを更新
         self.update_rider_list(laps)
@@ -92,6 +121,8 @@ class LapDataTableWidget(BaseTableWidget):
             self.analysis_data = analysis_data  # 分析結果を保存
             self.table.setSortingEnabled(False)  # ソートを一時的に無効化
             self.clear_table()  # テーブルをクリア
+            self.row_items = {}
+            self.highlight_indices = (None, None)
 
             if not lap_data:
                 return
@@ -100,133 +131,32 @@ class LapDataTableWidget(BaseTableWidget):
             num_sectors = self.config_manager.get_num_sectors() if self.config_manager else 3
             
             # テーブルの列数が変わっていれば再設定
-            total_columns = 6 + num_sectors  # Rider + Lap + LapTime + Sectors + Tire + Weather + TrackTemp
+            total_columns = 7 + num_sectors  # Rider + Lap + LapTime + Sectors + Tire + Weather + TrackTemp + Corrected
             if self.table.columnCount() != total_columns:
                 self.configure_columns()
+            # 条件補正したデータ（元のタイムを'RawLapTime'に持つ）の場合のみ補正後のタイムを表示する
+            self.table.setColumnHidden(total_columns - 1, not any('RawLapTime' in lap for lap in lap_data))
 
-            # 選択されたライダーでフィルタリング
-            filtered_data = lap_data
-            if self.current_rider and self.current_rider != "All Riders":
-                filtered_data = [lap for lap in lap_data if lap.get('rider_name', lap.get('Rider', '')) == self.current_rider]
+            # 条件式と選択されたライダーで絞り込む（元のインデックスと組にする）
+            visible = np.ones(len(lap_data), dtype=bool)
+            if self.filter_mask is not None and len(self.filter_mask) == len(lap_data):
+                visible &= self.filter_mask
+            if self.current_rider and self.current_rider != "All Riders" and len(self.lap_riders) == len(lap_data):
+                visible &= self.lap_riders == self.current_rider
+            filtered_data = [(int(i), lap_data[i]) for i in np.flatnonzero(visible)]
 
-            # 最速/最遅ラップの特定（分析結果がある場合）
-            fastest_lap = None
-            slowest_lap = None
-            
-            if analysis_data:
-                print(f"Debug - analysis_data keys: {analysis_data.keys()}")
-                
-                # 選択されたライダーの場合は個別の統計を使用
-                if self.current_rider and self.current_rider != "All Riders" and 'rider_stats' in analysis_data:
-                    rider_stats = analysis_data['rider_stats'].get(self.current_rider, {})
-                    print(f"Debug - rider_stats for {self.current_rider}: {rider_stats.keys() if rider_stats else 'None'}")
-                    
-                    if rider_stats:
-                        # fastest_lapキーを探す
-                        if 'fastest_lap' in rider_stats:
-                            fastest_lap = rider_stats['fastest_lap']
-                        elif 'best_lap' in rider_stats:
-                            fastest_lap = rider_stats['best_lap']
-                            
-                        # slowest_lapキーを探す
-                        if 'slowest_lap' in rider_stats:
-                            slowest_lap = rider_stats['slowest_lap']
-                        elif 'worst_lap' in rider_stats:
-                            slowest_lap = rider_stats['worst_lap']
-                
-                # 全体統計を使用
-                else:
-                    # 'overall_stats'キーがある場合
-                    if 'overall_stats' in analysis_data:
-                        overall_stats = analysis_data['overall_stats']
-                        print(f"Debug - overall_stats keys: {overall_stats.keys() if overall_stats else 'None'}")
-                        
-                        if overall_stats:
-                            # fastest_lapキーを探す
-                            if 'fastest_lap' in overall_stats:
-                                fastest_lap = overall_stats['fastest_lap']
-                            elif 'best_lap' in overall_stats:
-                                fastest_lap = overall_stats['best_lap']
-                                
-                            # slowest_lapキーを探す
-                            if 'slowest_lap' in overall_stats:
-                                slowest_lap = overall_stats['slowest_lap']
-                            elif 'worst_lap' in overall_stats:
-                                slowest_lap = overall_stats['worst_lap']
-                    
-                    # 直接ルートレベルで定義されている場合
-                    else:
-                        if 'fastest_lap' in analysis_data:
-                            fastest_lap = analysis_data['fastest_lap']
-                        elif 'best_lap' in analysis_data:
-                            fastest_lap = analysis_data['best_lap']
-                            
-                        if 'slowest_lap' in analysis_data:
-                            slowest_lap = analysis_data['slowest_lap']
-                        elif 'worst_lap' in analysis_data:
-                            slowest_lap = analysis_data['worst_lap']
-            
-            # デバッグ情報
-            if fastest_lap:
-                print(f"Debug - fastest_lap: {fastest_lap}")
-            if slowest_lap:
-                print(f"Debug - slowest_lap: {slowest_lap}")
+            # 最速/最遅ラップ（リーダーボードから求めたラップデータのインデックス）
+            self.highlight_indices = self.find_highlight_indices()
 
-            for lap in filtered_data:
+            for index, lap in filtered_data:
                 row = self.table.rowCount()
                 self.table.insertRow(row)
 
-                # ライダー名とラップ番号の取得
-                rider_name = lap.get('rider_name', lap.get('Rider', ''))
-                lap_number = lap.get('lap_number', lap.get('Lap', ''))
-                
-                # データ挿入
-                self.table.setItem(row, 0, QTableWidgetItem(rider_name))
-                self.table.setItem(row, 1, QTableWidgetItem(str(lap_number)))
-                self.table.setItem(row, 2, QTableWidgetItem(lap.get('LapTime', lap.get('lap_time', ''))))
-
-                # セクタータイム（動的に処理）
-                for i in range(1, num_sectors + 1):
-                    sector_key = f'sector{i}_time'
-                    sector_key_old = f'Sector{i}'
-                    if sector_key in lap:
-                        self.table.setItem(row, 2 + i, QTableWidgetItem(lap[sector_key]))
-                    elif sector_key_old in lap:
-                        self.table.setItem(row, 2 + i, QTableWidgetItem(lap[sector_key_old]))
-
-                # 追加データ
-                offset = 3 + num_sectors
-                self.table.setItem(row, offset, QTableWidgetItem(lap.get('TireType', lap.get('tire_type', ''))))
-                self.table.setItem(row, offset + 1, QTableWidgetItem(lap.get('Weather', lap.get('weather', ''))))
-                self.table.setItem(row, offset + 2, QTableWidgetItem(str(lap.get('TrackTemp', lap.get('track_temperature', '')))))
-
-                # 最速/最遅ラップの背景色設定
-                is_fastest = False
-                is_slowest = False
-                
-                # 最速ラップのチェック
-                if fastest_lap:
-                    fastest_rider = fastest_lap.get('rider_name', fastest_lap.get('Rider', ''))
-                    fastest_lap_num = fastest_lap.get('lap_number', fastest_lap.get('Lap', ''))
-                    
-                    if rider_name == fastest_rider and lap_number == fastest_lap_num:
-                        is_fastest = True
-                
-                # 最遅ラップのチェック
-                if slowest_lap:
-                    slowest_rider = slowest_lap.get('rider_name', slowest_lap.get('Rider', ''))
-                    slowest_lap_num = slowest_lap.get('lap_number', slowest_lap.get('Lap', ''))
-                    
-                    if rider_name == slowest_rider and lap_number == slowest_lap_num:
-                        is_slowest = True
-                
-                # 背景色を設定
-                if is_fastest:
-                    for col in range(self.table.columnCount()):
-                        self.table.item(row, col).setBackground(QColor(204, 255, 204))  # 薄緑
-                elif is_slowest:
-                    for col in range(self.table.columnCount()):
-                        self.table.item(row, col).setBackground(QColor(255, 204, 204))  # 薄赤
+                # データ挿入（Rider列にラップデータのインデックスを保持）
+                self.fill_row(row, lap, num_sectors)
+                self.table.item(row, 0).setData(Qt.UserRole, index)
+                self.row_items[index] = self.table.item(row, 0)
+                self.apply_highlight(index)
 
             self.table.setSortingEnabled(True)  # ソートを再有効化
 
@@ -235,6 +165,164 @@ class LapDataTableWidget(BaseTableWidget):
             import traceback
             traceback.print_exc()
 
+    def find_highlight_indices(self):
+        """強調表示する最速/最遅ラップのインデックスをリーダーボードから取得する"""
+        if self.leaderboard is None:
+            return (None, None)
+        rider = self.current_rider if self.current_rider and self.current_rider != "All Riders" else None
+        return (self.leaderboard.fastest(rider), self.leaderboard.slowest_lap(rider))
+
+    def apply_highlight(self, index):
+        """ラップの行に最速/最遅ラップの背景色を設定する（それ以外は背景色を戻す）"""
+        item = self.row_items.get(index)
+        if item is None or item.data(Qt.UserRole) != index:
+            return
+        if index == self.highlight_indices[0]:
+            self.apply_color_to_row(item.row(), QColor(204, 255, 204))  # 薄緑
+        elif index == self.highlight_indices[1]:
+            self.apply_color_to_row(item.row(), QColor(255, 204, 204))  # 薄赤
+        else:
+            self.apply_color_to_row(item.row(), QBrush())
+
+    def set_leaderboard(self, leaderboard):
+        """リーダーボードを設定し、強調表示が変わった行のみ背景色を更新する"""
+        self.leaderboard = leaderboard
+        previous = self.highlight_indices
+        self.highlight_indices = self.find_highlight_indices()
+        for index in set(previous) | set(self.highlight_indices):
+            if index is not None:
+                self.apply_highlight(index)
+
+    def fill_row(self, row, lap, num_sectors):
+        """テーブルの1行にラップデータを表示する"""
+        rider_name = lap.get('rider_name', lap.get('Rider', ''))
+        lap_number = lap.get('lap_number', lap.get('Lap', ''))
+        
+        self.table.setItem(row, 0, QTableWidgetItem(rider_name))
+        self.table.setItem(row, 1, QTableWidgetItem(str(lap_number)))
+        # 条件補正したデータでは元のタイムを表示し、補正後のタイムは最後の列に表示する
+        self.table.setItem(row, 2, QTableWidgetItem(lap.get('RawLapTime', lap.get('LapTime', lap.get('lap_time', '')))))
+
+        # セクタータイム（動的に処理、ミニセクターの列は隠しているのでセルを作らない）
+        for i in range(1, 0 if self.micro_sector_mode else num_sectors + 1):
+            sector_key = f'sector{i}_time'
+            sector_key_old = f'Sector{i}'
+            if f'Raw{sector_key_old}' in lap:
+                self.table.setItem(row, 2 + i, QTableWidgetItem(lap[f'Raw{sector_key_old}']))
+            elif sector_key in lap:
+                self.table.setItem(row, 2 + i, QTableWidgetItem(lap[sector_key]))
+            elif sector_key_old in lap:
+                self.table.setItem(row, 2 + i, QTableWidgetItem(lap[sector_key_old]))
+
+        # 追加データ
+        offset = 3 + num_sectors
+        self.table.setItem(row, offset, QTableWidgetItem(lap.get('TireType', lap.get('tire_type', ''))))
+        self.table.setItem(row, offset + 1, QTableWidgetItem(lap.get('Weather', lap.get('weather', ''))))
+        self.table.setItem(row, offset + 2, QTableWidgetItem(str(lap.get('TrackTemp', lap.get('track_temperature', '')))))
+        self.table.setItem(row, offset + 3, QTableWidgetItem(lap.get('LapTime', '') if 'RawLapTime' in lap else ''))
+
+    def update_lap_row(self, index, analysis_data=None, leaderboard=None):
+        """1ラップ分の行のみを更新する
+
+        行の表示・非表示が変わる場合（ライダーの変更など）はテーブル全体を更新します。
+        最速/最遅ラップが変わった場合は、変わった行の背景色のみ更新します。
+
+        Args:
+            index: 更新したラップのlap_data内のインデックス
+            analysis_data: 更新後の分析結果
+            leaderboard: 更新後のリーダーボード（強調表示の判定に使用）
+        """
+        try:
+            if analysis_data is not None:
+                self.analysis_data = analysis_data
+            if leaderboard is not None:
+                self.leaderboard = leaderboard
+            lap = self.lap_data[index]
+            rider_name = lap.get('rider_name', lap.get('Rider', ''))
+            item = self.row_items.get(index)
+            filtered_out = self.current_rider and self.current_rider != "All Riders" and rider_name != self.current_rider
+            if item is None and filtered_out:
+                # 表示対象外のライダーのラップ
+                self.set_leaderboard(self.leaderboard)
+                return
+            if item is None or item.data(Qt.UserRole) != index or item.text() != rider_name:
+                self.update_data(self.lap_data, self.analysis_data, self.leaderboard, self.filter_mask)
+                return
+
+            num_sectors = self.config_manager.get_num_sectors() if self.config_manager else 3
+            self.table.setSortingEnabled(False)
+            row = item.row()
+            self.fill_row(row, lap, num_sectors)
+            self.table.item(row, 0).setData(Qt.UserRole, index)
+            self.row_items[index] = self.table.item(row, 0)
+            self.apply_highlight(index)
+            self.set_leaderboard(self.leaderboard)
+            self.table.setSortingEnabled(True)
+        except Exception as e:
+            print(f"Error updating lap data row: {str(e)}")
+            self.update_data(self.lap_data, self.analysis_data, self.leaderboard, self.filter_mask)
+
+    def append_lap(self, laps, leaderboard=None):
+        """末尾に追加されたラップの行のみを追加する
+
+        表示中のデータと異なる場合や、新しいライダーのラップの場合はテーブル全体を更新します。
+
+        Args:
+            laps: ラップを追加した後のラップデータ（表示中のlap_dataと同じリスト）
+            leaderboard: 追加したラップを取り込んだリーダーボード
+        """
+        try:
+            index = len(laps) - 1
+            lap = laps[index] if laps else None
+            rider_name = lap.get('rider_name', lap.get('Rider', '')) if lap else ''
+            if (laps is not self.lap_data or lap is None or index in self.row_items or
+                    self.filter_mask is not None or self.rider_combo.findText(rider_name) < 0):
+                self.update_data(laps, None, leaderboard, self.filter_mask)
+                return
+            self.lap_riders = np.append(self.lap_riders, rider_name)
+
+            # 解析後に追加されたラップなので分析結果は破棄する
+            self.analysis_data = None
+            if not (self.current_rider and self.current_rider != "All Riders" and rider_name != self.current_rider):
+                num_sectors = self.config_manager.get_num_sectors() if self.config_manager else 3
+                self.table.setSortingEnabled(False)
+                row = self.table.rowCount()
+                self.table.insertRow(row)
+                self.fill_row(row, lap, num_sectors)
+                self.table.item(row, 0).setData(Qt.UserRole, index)
+                self.row_items[index] = self.table.item(row, 0)
+                self.table.setSortingEnabled(True)
+            self.set_leaderboard(leaderboard)
+        except Exception as e:
+            print(f"Error appending lap data row: {str(e)}")
+            self.update_data(laps, None, leaderboard, self.filter_mask)
+
+    def show_context_menu(self, pos):
+        """行の右クリックメニューを表示する"""
+        item = self.table.itemAt(pos)
+        if item is None:
+            return
+        index = self.table.item(item.row(), 0).data(Qt.UserRole)
+        if index is None:
+            return
+        menu = QMenu(self)
+        similar_action = menu.addAction("Find Similar Laps")
+        similar_action.triggered.connect(lambda: self.similar_laps_requested.emit(index))
+        menu.exec_(self.table.viewport().mapToGlobal(pos))
+
+    def select_lap(self, index):
+        """ラップデータのインデックスに対応する行を選択して表示する
+
+        Returns:
+            bool: 行が表示されていて選択できた場合はTrue
+        """
+        item = self.row_items.get(index)
+        if item is None or item.data(Qt.UserRole) != index:
+            return False
+        self.table.selectRow(item.row())
+        self.table.scrollToItem(item)
+        return True
+
     def on_rider_selected(self, rider):
         """ライダー選択時の処理"""
         self.current_rider = rider
@@ -8,21 +8,36 @@ from PyQt5.QtCore import Qt
 import pandas as pd
 
 from ui.base_widgets.base_table_widget import BaseTableWidget, TableColorUtils
-from ui.table_items import TimeStatItem, StdDevStatItem
+from ui.table_items import TimeStatItem, StdDevStatItem, ConfidenceIntervalItem, ScoreItem
 from utils.time_converter import TimeConverter
 from utils.export_utils import StatsExporter
 
 
 class StatisticsTableWidget(BaseTableWidget):
     """統計データ表示用テーブルウィジェット"""
+    # 信頼区間の列（統計量, ヘッダー）
+    CONFIDENCE_COLUMNS = [('mean', "Mean CI"), ('median', "Median CI"), ('best', "Best CI")]
+    # 全ラップのパーセンタイルの列（分位点, ヘッダー）
+    PERCENTILE_COLUMNS = [(0.5, "Lap Time P50"), (0.9, "Lap Time P90")]
+    # 安定性のスコアの列（スコアのキー, ヘッダー）
+    CONSISTENCY_COLUMNS = [('consistency', "Consistency"), ('within_best', "Within PB %"),
+                           ('recent_within_best', "Recent Within PB %"), ('best_window_std', "Best Window SD"),
+                           ('sector_rank', "Sector Var Rank")]
+
     def __init__(self, config_manager, parent=None):
         super().__init__(parent)
         self.config_manager = config_manager
         self.time_converter = TimeConverter()
         self.stats_exporter = StatsExporter()
         self.current_stats = {}
+        self.confidence_intervals = None  # ブートストラップによる信頼区間（BootstrapIntervals）
+        self.quantile_sketches = None  # パーセンタイルのスケッチ（LapQuantileSketches）
+        self.consistency_scores = None  # 安定性のスコア（ConsistencyScores）
         self.setup_export_buttons()
         self.configure_columns()
+        if self.config_manager:
+            # 色設定が変更されたら表示中の統計を塗り直す
+            self.config_manager.subscribe(self.on_stats_settings_changed, "stats_table_settings")
         
     def setup_export_buttons(self):
         """エクスポートボタンの設定"""
@@ -41,10 +56,18 @@ class StatisticsTableWidget(BaseTableWidget):
         # BaseTableWidgetのmain_layoutの先頭に追加
         self.main_layout.insertLayout(0, button_layout)
         
+    def displayed_sectors(self):
+        """列を表示するセクター数（ミニセクターモードではセクターの列を表示しない）"""
+        if not self.config_manager:
+            return 3
+        if self.config_manager.is_micro_sector_mode():
+            return 0
+        return self.config_manager.get_num_sectors()
+
     def configure_columns(self):
         """カラム設定"""
         # セクター数を取得
-        num_sectors = self.config_manager.get_num_sectors() if self.config_manager else 3
+        num_sectors = self.displayed_sectors()
         
         # ヘッダーを動的に生成
         headers = ["Rider", "Lap Time", "Lap Time SD"]
@@ -54,12 +77,26 @@ class StatisticsTableWidget(BaseTableWidget):
             headers.append(f"Sector{i}")
             headers.append(f"Sector{i} SD")
         
+        # 信頼区間の列
+        headers.extend(header for _, header in self.CONFIDENCE_COLUMNS)
+        headers.extend(header for _, header in self.PERCENTILE_COLUMNS)
+        headers.extend(header for _, header in self.CONSISTENCY_COLUMNS)
+        
         resizable_columns = [0]  # Rider列のみリサイズ可能
         fixed_width_columns = {i: 100 for i in range(1, len(headers))}  # 残りの列は固定幅
         
         self.configure_header(headers, resizable_columns, fixed_width_columns)
         self.table.setSortingEnabled(True)  # ソート機能を有効化
     
+    def column_count(self, num_sectors):
+        """列数（Rider + Lap Time/SD + Sectors/SD + CI + P50/P90 + 安定性のスコア）"""
+        return (3 + num_sectors * 2 + len(self.CONFIDENCE_COLUMNS) + len(self.PERCENTILE_COLUMNS)
+                + len(self.CONSISTENCY_COLUMNS))
+
+    def consistency_offset(self, num_sectors):
+        """安定性のスコアの最初の列"""
+        return 3 + num_sectors * 2 + len(self.CONFIDENCE_COLUMNS) + len(self.PERCENTILE_COLUMNS)
+
     def update_data(self, stats, config=None):
         """統計データを更新し、テーブルに表示する
         
@@ -86,10 +123,10 @@ class StatisticsTableWidget(BaseTableWidget):
             return
             
         # セクター数を取得
-        num_sectors = self.config_manager.get_num_sectors() if self.config_manager else 3
+        num_sectors = self.displayed_sectors()
         
         # テーブルの列数が変わっていれば再設定
-        total_columns = 3 + num_sectors * 2  # Rider + Lap Time/SD + Sectors/SD
+        total_columns = self.column_count(num_sectors)
         if self.table.columnCount() != total_columns:
             self.configure_columns()
             
@@ -119,6 +156,10 @@ class StatisticsTableWidget(BaseTableWidget):
                 sector_std_key = f'sector{i}_std'
                 if sector_std_key in stats:
                     self.table.setItem(row, col_offset + 1, StdDevStatItem(stats[sector_std_key]))
+            
+            self._fill_confidence_columns(row, rider, 3 + num_sectors * 2)
+            self._fill_percentile_columns(row, rider, 3 + num_sectors * 2 + len(self.CONFIDENCE_COLUMNS))
+            self._fill_consistency_columns(row, rider, self.consistency_offset(num_sectors))
 
         # 最速ライダーと最遅ライダーの行に色を付ける
         if 'fastest_rider' in self.current_stats and 'slowest_rider' in self.current_stats:
@@ -143,10 +184,10 @@ class StatisticsTableWidget(BaseTableWidget):
                 return
             
             # セクター数を取得
-            num_sectors = self.config_manager.get_num_sectors() if self.config_manager else 3
+            num_sectors = self.displayed_sectors()
             
             # テーブルの列数が変わっていれば再設定
-            total_columns = 3 + num_sectors * 2  # Rider + Lap Time/SD + Sectors/SD
+            total_columns = self.column_count(num_sectors)
             if self.table.columnCount() != total_columns:
                 self.configure_columns()
 
@@ -167,6 +208,7 @@ class StatisticsTableWidget(BaseTableWidget):
             
             # 最大/最小値を特定
             extremes = self._find_extreme_values(rider_data)
+            consistency_extremes = self._find_consistency_extremes(rider_data)
             
             # 設定を取得
             settings = self.config_manager.config.get('stats_table_settings', {})
@@ -211,15 +253,126 @@ class StatisticsTableWidget(BaseTableWidget):
                         self._apply_color_to_cell(std_item, sector_stats['std_dev'], 
                                                 extremes, 'std_devs', sector_key, std_settings)
 
+                # 信頼区間・パーセンタイル・安定性のスコア
+                self._fill_confidence_columns(row, rider, 3 + num_sectors * 2)
+                self._fill_percentile_columns(row, rider, 3 + num_sectors * 2 + len(self.CONFIDENCE_COLUMNS))
+                self._fill_consistency_columns(row, rider, self.consistency_offset(num_sectors),
+                                               std_settings, consistency_extremes)
+
             self.table.setSortingEnabled(True)  # ソートを再有効化
 
         except Exception as e:
             print(f"Error updating statistics table: {str(e)}")
     
+    def set_confidence_intervals(self, intervals, refresh=True):
+        """ブートストラップによる信頼区間を設定する
+
+        Args:
+            intervals (BootstrapIntervals): 信頼区間（Noneの場合は列を空にする）
+            refresh (bool): 表示中の統計を再表示するかどうか（直後に統計を更新する場合はFalse）
+        """
+        self.confidence_intervals = intervals
+        if refresh and self.current_stats:
+            self.update_statistics(self.current_stats)
+
+    def _fill_confidence_columns(self, row, rider, offset):
+        """行の信頼区間の列を設定する"""
+        if self.confidence_intervals is None:
+            return
+        for i, (statistic, _) in enumerate(self.CONFIDENCE_COLUMNS):
+            interval = self.confidence_intervals.interval(rider, statistic)
+            if interval is not None:
+                self.table.setItem(row, offset + i,
+                                   ConfidenceIntervalItem(*interval, self.confidence_intervals.confidence))
+
+    def set_quantile_sketches(self, sketches, refresh=True):
+        """パーセンタイルのスケッチを設定する
+
+        Args:
+            sketches (LapQuantileSketches): スケッチ（Noneの場合は列を空にする）
+            refresh (bool): 表示中の統計を再表示するかどうか（直後に統計を更新する場合はFalse）
+        """
+        self.quantile_sketches = sketches
+        if refresh and self.current_stats:
+            self.update_statistics(self.current_stats)
+
+    def _fill_percentile_columns(self, row, rider, offset):
+        """行のパーセンタイルの列を設定する"""
+        if self.quantile_sketches is None:
+            return
+        sketch = self.quantile_sketches.sketch(rider)
+        if sketch is None or not sketch.count:
+            return
+        for i, value in enumerate(sketch.quantiles([q for q, _ in self.PERCENTILE_COLUMNS])):
+            self.table.setItem(row, offset + i, TimeStatItem(float(value)))
+
+    def set_consistency_scores(self, scores, refresh=True):
+        """安定性のスコアを設定する
+
+        Args:
+            scores (ConsistencyScores): スコア（Noneの場合は列を空にする）
+            refresh (bool): 表示中の統計を再表示するかどうか（直後に統計を更新する場合はFalse）
+        """
+        self.consistency_scores = scores
+        if refresh and self.current_stats:
+            self.update_statistics(self.current_stats)
+
+    def _fill_consistency_columns(self, row, rider, offset, settings=None, extremes=None):
+        """行の安定性のスコアの列を設定する（一貫性指数が最も高い・低いライダーのセルに色を付ける）"""
+        if self.consistency_scores is None:
+            return
+        score = self.consistency_scores.score(rider)
+        if score is None:
+            return
+        within = self.consistency_scores.within_percent
+        window = self.consistency_scores.window
+        for i, (key, _) in enumerate(self.CONSISTENCY_COLUMNS):
+            value = score[key]
+            if key == 'best_window_std':
+                # ウィンドウ分のラップがない場合はNaN（"--" を表示し、ソートでは末尾にする）
+                item = ScoreItem(value, "{:.3f}")
+                item.setToolTip(f"Lowest lap time SD over {window} consecutive laps")
+            elif key in ('within_best', 'recent_within_best'):
+                item = ScoreItem(value, "{:.0f}%")
+                laps = f"last {window} laps" if key == 'recent_within_best' else "all laps"
+                item.setToolTip(f"Share of {laps} within {within:g}% of personal best")
+            elif key == 'sector_rank':
+                item = ScoreItem(value)
+                item.setToolTip(", ".join(
+                    f"Sector{j + 1}: #{rank:.0f} (CV {cv:.2f}%)" if rank == rank else f"Sector{j + 1}: --"
+                    for j, (rank, cv) in enumerate(zip(score['sector_ranks'], score['sector_cv']))))
+            else:
+                item = ScoreItem(value)
+                item.setToolTip(f"100 / (1 + CV%), CV {score['lap_time_cv']:.2f}% of laps within 107% of best"
+                                if value == value else "Needs at least 2 laps within 107% of best")
+            self.table.setItem(row, offset + i, item)
+            if key == 'consistency' and extremes and settings and settings.get('enabled', False):
+                # 標準偏差の最小・最大と同じ色を使う
+                if value == extremes['max']:
+                    item.setBackground(QColor(settings.get('lowest', '#c8c8ff')))
+                elif value == extremes['min']:
+                    item.setBackground(QColor(settings.get('highest', '#ffff99')))
+
+    def _find_consistency_extremes(self, rider_data):
+        """表示するライダーの一貫性指数の最大/最小（2人以上のスコアがない場合はNone）"""
+        if self.consistency_scores is None:
+            return None
+        scores = [self.consistency_scores.score(rider) for rider in rider_data]
+        values = [score['consistency'] for score in scores
+                  if score is not None and score['consistency'] == score['consistency']]
+        if len(values) < 2:
+            return None
+        return {'min': min(values), 'max': max(values)}
+
+    def on_stats_settings_changed(self, event):
+        """統計テーブルの設定変更時の処理"""
+        if self.current_stats:
+            self.update_statistics(self.current_stats)
+
     def _find_extreme_values(self, stats_data):
         """最速/最遅タイムと最大/最小標準偏差を特定"""
         # セクター数を取得
-        num_sectors = self.config_manager.get_num_sectors() if self.config_manager else 3
+        num_sectors = self.displayed_sectors()
         
         extremes = {
             'times': {
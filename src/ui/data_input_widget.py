@@ -4,15 +4,21 @@ from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
 from PyQt5.QtCore import pyqtSignal, Qt
 from PyQt5.QtGui import QColor
 from utils.time_converter import TimeConverter
+from app.edit_history import UndoStack, EditCommand, AddLapCommand, DeleteLapsCommand
 
 class DataInputWidget(QWidget):
-    data_changed = pyqtSignal(list)  # データが変更されたときのシグナル
-    analyze_requested = pyqtSignal(list)  # 解析リクエスト用の新しいシグナル
+    # ラップデータはobjectで渡す（listではPyQtが発行のたびにリストとdictを複製し、lap_dataと別のリストになる）
+    data_changed = pyqtSignal(object)  # データが変更されたときのシグナル
+    analyze_requested = pyqtSignal(object)  # 解析リクエスト用の新しいシグナル
+    edit_applied = pyqtSignal(object, list, list)  # セル編集・元に戻す・やり直し時のシグナル (データ, 行, 影響するライダー)
+    lap_appended = pyqtSignal(object)  # 末尾にラップが追加されたときのシグナル（data_changedの代わりに発行）
 
     def __init__(self, parent=None, config_manager=None):
         super().__init__(parent)
         self.lap_data = []
         self.config_manager = config_manager
+        self.journal = None  # 自動保存ジャーナル（EditJournal）
+        self.undo_stack = UndoStack()  # 元に戻す・やり直すための履歴
         self.time_converter = TimeConverter()  # タイム変換・検証用
         self.initUI()
 
@@ -64,19 +70,7 @@ class DataInputWidget(QWidget):
 
         # テーブルウィジェット
         self.table = QTableWidget()
-        # セクター数を取得
-        self.num_sectors = self.config_manager.get_num_sectors() if self.config_manager else 3
-        # 基本の列 (Rider, Lap, Time) + セクター数 + コンディション情報 (タイヤ, 天候, 路面温度)
-        num_columns = 3 + self.num_sectors + 3
-        self.table.setColumnCount(num_columns)
-        
-        # ヘッダーラベルを動的に生成
-        header_labels = ['Rider', 'Lap', 'Time']
-        for i in range(1, self.num_sectors + 1):
-            header_labels.append(f'Sector{i}')
-        header_labels.extend(['タイヤ', '天候', '路面温度'])
-        
-        self.table.setHorizontalHeaderLabels(header_labels)
+        self.configure_columns()
         header = self.table.horizontalHeader()
         header.setSectionResizeMode(QHeaderView.Stretch)
         
@@ -94,6 +88,31 @@ class DataInputWidget(QWidget):
         # 編集中フラグ (cellChangedイベントの再帰呼び出しを防止)
         self.is_editing = False
 
+    def configure_columns(self):
+        """セクター数に応じてテーブルの列を設定する"""
+        # セクター数を取得
+        self.num_sectors = self.config_manager.get_num_sectors() if self.config_manager else 3
+        # 基本の列 (Rider, Lap, Time) + セクター数 + コンディション情報 (タイヤ, 天候, 路面温度)
+        num_columns = 3 + self.num_sectors + 3
+        self.table.setColumnCount(num_columns)
+        
+        # ヘッダーラベルを動的に生成
+        header_labels = ['Rider', 'Lap', 'Time']
+        for i in range(1, self.num_sectors + 1):
+            header_labels.append(f'Sector{i}')
+        header_labels.extend(['タイヤ', '天候', '路面温度'])
+        
+        self.table.setHorizontalHeaderLabels(header_labels)
+        
+        # ミニセクターモードではセクターの列を隠す（セルも作らない）
+        self.micro_sector_mode = self.config_manager.is_micro_sector_mode() if self.config_manager else False
+        for i in range(self.num_sectors):
+            self.table.setColumnHidden(3 + i, self.micro_sector_mode)
+
+    def set_journal(self, journal):
+        """編集操作を記録する自動保存ジャーナルを設定する"""
+        self.journal = journal
+
     def update_riders_combo(self):
         """ライダー選択コンボボックスを更新"""
         if not hasattr(self, 'rider_combo') or not self.config_manager:
@@ -171,6 +190,9 @@ class DataInputWidget(QWidget):
         
         # セクター数を取得
         num_sectors = self.config_manager.get_num_sectors() if self.config_manager else 3
+        if self.micro_sector_mode:
+            # ミニセクターは手入力しない（GPS計測データの読み込みで扱う）
+            num_sectors = 0
         
         # セクターフィールドを動的に生成
         sector_fields = []
@@ -288,7 +310,7 @@ class DataInputWidget(QWidget):
                     sector_total_ms += self.time_converter.time_string_to_milliseconds(sector_field.text().strip())
                 
                 # 許容誤差 (10ミリ秒)
-                if abs(lap_time_ms - sector_total_ms) > 10:
+                if sector_fields and abs(lap_time_ms - sector_total_ms) > 10:
                     discrepancy = abs(lap_time_ms - sector_total_ms) / 1000.0  # 秒単位に変換
                     warning = f"セクタータイムの合計とラップタイムに{discrepancy:.3f}秒の差異があります。\n" \
                             f"それでもこのデータを追加しますか？"
@@ -301,13 +323,16 @@ class DataInputWidget(QWidget):
                         return
                 
                 # ラップデータに追加
-                self.lap_data.append(new_lap)
+                command = AddLapCommand(len(self.lap_data), new_lap)
+                command.apply(self.lap_data)
+                self.undo_stack.push(command)
+                self.record_command(command)
                 
-                # テーブルを更新（解析結果なし）
-                self.update_table()
+                # 追加した行のみテーブルに反映
+                self.apply_command_to_table(command)
                 
-                # データ変更シグナルを発行
-                self.data_changed.emit(self.lap_data)
+                # ラップ追加シグナルを発行（リーダーボードなどは追加したラップのみ反映する）
+                self.lap_appended.emit(self.lap_data)
                 
             except Exception as e:
                 print(f"エラー: {str(e)}")
@@ -338,14 +363,15 @@ class DataInputWidget(QWidget):
 
         if reply == QMessageBox.Yes:
             # 選択された行のデータを特定して削除（逆順で処理して混乱を避ける）
-            rows_to_delete = sorted(selected_rows, reverse=True)
-            for row in rows_to_delete:
-                # テーブルに表示されている順序と実際のデータの順序が一致することを前提としています
-                if row < len(self.lap_data):
-                    del self.lap_data[row]
+            # テーブルに表示されている順序と実際のデータの順序が一致することを前提としています
+            rows_to_delete = [row for row in selected_rows if row < len(self.lap_data)]
+            command = DeleteLapsCommand.from_laps(self.lap_data, rows_to_delete)
+            command.apply(self.lap_data)
+            self.undo_stack.push(command)
+            self.record_command(command)
             
-            # テーブルを更新
-            self.update_table()
+            # 削除した行のみテーブルから取り除く
+            self.apply_command_to_table(command)
             
             # データ変更シグナルを発行
             self.data_changed.emit(self.lap_data)
@@ -355,6 +381,10 @@ class DataInputWidget(QWidget):
     def update_data(self, laps, analysis_results=None):
         """データを更新し、テーブルに表示"""
         self.lap_data = laps
+        # データ全体が置き換わったので編集履歴を破棄し、ジャーナルをスナップショットから始め直す
+        self.undo_stack.clear()
+        if self.journal:
+            self.journal.reset(self.lap_data)
         
         # 編集中フラグを設定
         self.is_editing = True
@@ -372,47 +402,21 @@ class DataInputWidget(QWidget):
             # テーブルの列数を更新（動的にセクター数に対応）
             num_columns = 3 + num_sectors + 3  # 基本列 + セクター + コンディション
             if self.table.columnCount() != num_columns:
-                self.table.setColumnCount(num_columns)
-                
-                # ヘッダーラベルを動的に生成
-                header_labels = ['Rider', 'Lap', 'LapTime']
-                for i in range(1, num_sectors + 1):
-                    header_labels.append(f'Sector{i}')
-                header_labels.extend(['タイヤ', '天候', '路面温度'])
-                
-                self.table.setHorizontalHeaderLabels(header_labels)
-                header = self.table.horizontalHeader()
-                header.setSectionResizeMode(QHeaderView.Stretch)
+                self.configure_columns()
             
             # テーブルの行数を設定
             self.table.setRowCount(len(laps))
 
             # データを表示
             for row, lap in enumerate(laps):
-                # 基本データ
-                self.table.setItem(row, 0, QTableWidgetItem(str(lap.get('Rider', ''))))
-                self.table.setItem(row, 1, QTableWidgetItem(str(lap.get('Lap', ''))))
-                self.table.setItem(row, 2, QTableWidgetItem(str(lap.get('LapTime', ''))))
-                
-                # セクターデータ（動的に生成）
-                for i in range(num_sectors):
-                    sector_key = f'Sector{i+1}'
-                    self.table.setItem(row, 3 + i, QTableWidgetItem(str(lap.get(sector_key, ''))))
-                
-                # コンディション情報
-                condition_offset = 3 + num_sectors
-                self.table.setItem(row, condition_offset, QTableWidgetItem(str(lap.get('TireType', ''))))
-                self.table.setItem(row, condition_offset + 1, QTableWidgetItem(str(lap.get('Weather', ''))))
-                self.table.setItem(row, condition_offset + 2, QTableWidgetItem(str(lap.get('TrackTemp', ''))))
+                self.fill_row(row, lap, num_sectors)
 
                 # 最速/最遅ラップの色付け
                 if analysis_results and 'fastest_lap' in analysis_results and 'slowest_lap' in analysis_results:
                     if lap == analysis_results['fastest_lap']:
-                        for col in range(num_columns):  # 動的な列数に合わせる
-                            self.table.item(row, col).setBackground(QColor(200, 255, 200))
+                        self.set_row_background(row, QColor(200, 255, 200))
                     elif lap == analysis_results['slowest_lap']:
-                        for col in range(num_columns):  # 動的な列数に合わせる
-                            self.table.item(row, col).setBackground(QColor(255, 200, 200))
+                        self.set_row_background(row, QColor(255, 200, 200))
         except Exception as e:
             print(f"Error updating data: {str(e)}")
         finally:
@@ -438,22 +442,7 @@ class DataInputWidget(QWidget):
             # データの挿入
             for i, lap in enumerate(self.lap_data):
                 self.table.insertRow(i)
-                
-                # 基本データ
-                self.table.setItem(i, 0, QTableWidgetItem(str(lap.get('Rider', ''))))
-                self.table.setItem(i, 1, QTableWidgetItem(str(lap.get('Lap', ''))))
-                self.table.setItem(i, 2, QTableWidgetItem(str(lap.get('LapTime', ''))))
-                
-                # セクターデータ（動的に生成）
-                for j in range(num_sectors):
-                    sector_key = f'Sector{j+1}'
-                    self.table.setItem(i, 3 + j, QTableWidgetItem(str(lap.get(sector_key, ''))))
-                
-                # コンディション情報
-                condition_offset = 3 + num_sectors
-                self.table.setItem(i, condition_offset, QTableWidgetItem(str(lap.get('TireType', ''))))
-                self.table.setItem(i, condition_offset + 1, QTableWidgetItem(str(lap.get('Weather', ''))))
-                self.table.setItem(i, condition_offset + 2, QTableWidgetItem(str(lap.get('TrackTemp', ''))))
+                self.fill_row(i, lap, num_sectors)
                 
         except Exception as e:
             print(f"Error updating table: {str(e)}")
@@ -461,6 +450,101 @@ class DataInputWidget(QWidget):
             # 編集中フラグを解除
             self.is_editing = False
 
+    def fill_row(self, row, lap, num_sectors):
+        """テーブルの1行にラップデータを表示する"""
+        for column, field in enumerate(self.column_fields(num_sectors)):
+            if self.micro_sector_mode and 3 <= column < 3 + num_sectors:
+                continue
+            self.table.setItem(row, column, QTableWidgetItem(str(lap.get(field, ''))))
+
+    def set_row_background(self, row, color):
+        """行の背景色を設定する（セルのない隠し列は除く）"""
+        for column in range(self.table.columnCount()):
+            item = self.table.item(row, column)
+            if item is not None:
+                item.setBackground(color)
+
+    def set_cell_value(self, row, field, value):
+        """指定したセルのみを更新する（cellChangedによる再処理は行わない）"""
+        num_sectors = self.config_manager.get_num_sectors() if self.config_manager else 3
+        fields = self.column_fields(num_sectors)
+        if field not in fields or row >= self.table.rowCount():
+            return
+        if self.micro_sector_mode and field.startswith('Sector'):
+            return
+        was_editing = self.is_editing
+        self.is_editing = True
+        try:
+            column = fields.index(field)
+            item = self.table.item(row, column)
+            text = '' if value is None else str(value)
+            if item is None:
+                self.table.setItem(row, column, QTableWidgetItem(text))
+            else:
+                item.setText(text)
+        finally:
+            self.is_editing = was_editing
+
+    def apply_command_to_table(self, command, reverted=False):
+        """コマンドによる変更を該当する行・セルのみテーブルに反映する"""
+        num_sectors = self.config_manager.get_num_sectors() if self.config_manager else 3
+        was_editing = self.is_editing
+        self.is_editing = True
+        try:
+            if isinstance(command, EditCommand):
+                self.set_cell_value(command.row, command.field, self.lap_data[command.row].get(command.field))
+            else:
+                inserted = isinstance(command, AddLapCommand) != reverted
+                rows = [command.row] if isinstance(command, AddLapCommand) else command.rows
+                if inserted:
+                    for row in sorted(rows):
+                        self.table.insertRow(row)
+                        self.fill_row(row, self.lap_data[row], num_sectors)
+                else:
+                    for row in sorted(rows, reverse=True):
+                        self.table.removeRow(row)
+        finally:
+            self.is_editing = was_editing
+
+    def record_command(self, command, reverted=False):
+        """コマンドによる変更を自動保存ジャーナルに記録する"""
+        if not self.journal:
+            return
+        if isinstance(command, EditCommand):
+            self.journal.record_edit(self.lap_data, command.row, command.field)
+            return
+        inserted = isinstance(command, AddLapCommand) != reverted
+        rows = [command.row] if isinstance(command, AddLapCommand) else command.rows
+        if inserted:
+            for row in sorted(rows):
+                self.journal.record_add(self.lap_data, row)
+        else:
+            self.journal.record_delete(self.lap_data, rows)
+
+    def undo(self):
+        """直前の操作を元に戻す"""
+        command = self.undo_stack.undo(self.lap_data)
+        if command is not None:
+            self.after_history_change(command, reverted=True)
+
+    def redo(self):
+        """元に戻した操作をやり直す"""
+        command = self.undo_stack.redo(self.lap_data)
+        if command is not None:
+            self.after_history_change(command, reverted=False)
+
+    def after_history_change(self, command, reverted):
+        """元に戻す・やり直しの後にテーブル・ジャーナル・シグナルを更新する"""
+        self.apply_command_to_table(command, reverted)
+        self.record_command(command, reverted)
+        if isinstance(command, EditCommand):
+            riders = sorted(command.affected_riders(self.lap_data))
+            self.edit_applied.emit(self.lap_data, [command.row], riders)
+        elif isinstance(command, AddLapCommand) and not reverted and command.row == len(self.lap_data) - 1:
+            self.lap_appended.emit(self.lap_data)
+        else:
+            self.data_changed.emit(self.lap_data)
+
     def get_latest_lap_for_rider(self, rider_name):
         """指定されたライダーの最新ラップデータを取得
         
@@ -500,6 +584,16 @@ class DataInputWidget(QWidget):
         # 解析リクエストを発行
         self.analyze_requested.emit(self.lap_data)
 
+    def column_fields(self, num_sectors):
+        """テーブルの列順に対応するラップデータのキーのリスト"""
+        fields = ['Rider', 'Lap', 'LapTime'] + [f'Sector{i + 1}' for i in range(num_sectors)]
+        fields += ['TireType', 'Weather', 'TrackTemp']
+        return fields
+
+    def field_for_column(self, column, num_sectors):
+        """テーブルの列番号に対応するラップデータのキーを取得する"""
+        return self.column_fields(num_sectors)[column]
+
     def on_cell_changed(self, row, column):
         """セルの値が変更されたときの処理"""
         # 編集中の場合は何もしない（再帰呼び出し防止）
@@ -507,6 +601,8 @@ class DataInputWidget(QWidget):
             return
             
         self.is_editing = True
+        field = None
+        old_value = None
         
         try:
             # 変更されたセルの値を取得
@@ -515,6 +611,10 @@ class DataInputWidget(QWidget):
             # セクター数を取得
             num_sectors = self.config_manager.get_num_sectors() if self.config_manager else 3
             
+            # 変更前の値を保持（元に戻す・検証失敗時の復元用）
+            field = self.field_for_column(column, num_sectors)
+            old_value = self.lap_data[row].get(field)
+            
             # 列ごとの検証と処理
             is_valid = True
             error_message = ""
@@ -605,16 +705,26 @@ class DataInputWidget(QWidget):
             # 検証失敗時は元の値に戻す
             if not is_valid:
                 QMessageBox.warning(self, "入力エラー", error_message)
-                # テーブルを更新して元の値に戻す
-                self.update_table()
-            else:
-                # データ変更シグナルを発行
-                self.data_changed.emit(self.lap_data)
+                # 変更されたセルのみ元の値に戻す
+                self.lap_data[row][field] = old_value
+                self.set_cell_value(row, field, old_value)
+            elif self.lap_data[row].get(field) != old_value:
+                command = EditCommand(row, field, old_value, self.lap_data[row].get(field))
+                self.undo_stack.push(command)
+                self.record_command(command)
+                # 編集シグナルを発行（変更された行と再解析が必要なライダーを通知）
+                riders = sorted(command.affected_riders(self.lap_data))
+                self.edit_applied.emit(self.lap_data, [row], riders)
                 
         except Exception as e:
             print(f"セル編集エラー: {e}")
             QMessageBox.warning(self, "エラー", f"データの編集中にエラーが発生しました: {str(e)}")
-            self.update_table()  # エラー時はテーブルを元に戻す
+            # エラー時は変更されたセルのみ元に戻す
+            if field is not None:
+                self.lap_data[row][field] = old_value
+                self.set_cell_value(row, field, old_value)
+            else:
+                self.update_table()
         
         finally:
             self.is_editing = False
\ No newline at end of file
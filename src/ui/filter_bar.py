@@ -0,0 +1,51 @@
+"""
+Filter Bar Module
+ラップを絞り込む条件式の入力欄を提供します。
+"""
+from PyQt5.QtWidgets import QWidget, QHBoxLayout, QLabel, QLineEdit, QPushButton
+from PyQt5.QtCore import pyqtSignal
+
+
+class FilterBar(QWidget):
+    """条件式の入力欄（Enterまたは Apply で適用、Clear で解除）"""
+
+    filter_changed = pyqtSignal(str)  # 適用する条件式（解除した場合は空文字列）
+
+    PLACEHOLDER = 'e.g. Rider in ("A", "B") and TireType == "KR410" and LapTime < 2:26.0 and not outlier'
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.expression = ''  # 適用中の条件式
+        self.init_ui()
+
+    def init_ui(self):
+        """UIの初期化"""
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(QLabel("Filter:"))
+        self.edit = QLineEdit()
+        self.edit.setPlaceholderText(self.PLACEHOLDER)
+        self.edit.returnPressed.connect(self.apply)
+        layout.addWidget(self.edit, 1)
+        apply_button = QPushButton("Apply")
+        apply_button.clicked.connect(self.apply)
+        layout.addWidget(apply_button)
+        clear_button = QPushButton("Clear")
+        clear_button.clicked.connect(self.clear)
+        layout.addWidget(clear_button)
+        self.status_label = QLabel("")
+        layout.addWidget(self.status_label)
+
+    def apply(self):
+        """入力した条件式を適用する"""
+        self.filter_changed.emit(self.edit.text().strip())
+
+    def clear(self):
+        """条件式を解除する"""
+        self.edit.clear()
+        self.filter_changed.emit('')
+
+    def set_status(self, text, error=False):
+        """適用結果（一致したラップ数やエラー）を表示する"""
+        self.status_label.setStyleSheet("color: red;" if error else "")
+        self.status_label.setText(text)
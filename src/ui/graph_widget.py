@@ -1,5 +1,6 @@
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QComboBox, 
                                  QPushButton, QFrame, QFileDialog, QLabel, QSizePolicy)
+from PyQt5.QtCore import QTimer
 from matplotlib import pyplot as plt
 from matplotlib.figure import Figure
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
@@ -8,17 +9,47 @@ from matplotlib.ticker import FuncFormatter
 import seaborn as sns
 import numpy as np
 from app.analyzer import LapTimeAnalyzer
+from app.micro_sectors import lap_loss_matrix
+from app.delta_time import compute_delta_times, lap_trace
+from app.quantile_sketch import KLLSketch
 import pandas as pd
 from utils.time_converter import TimeConverter
 import matplotlib.patches as mpatches
+from matplotlib.colors import to_hex
+from matplotlib.lines import Line2D
 import colorsys
 
+# ライダー色の変更を再描画せずに既存の描画要素へ反映できるグラフ
+# （Sector Time Trendはライダー色から派生した色を使うため再描画する）
+RESTYLABLE_GRAPH_TYPES = {"Lap Time Trend", "Lap Time Histogram", "Sector Time Comparison", "Performance Radar",
+                          "Delta Time"}
+
+# ミニセクターモードでセクターごとの線・棒の代わりにヒートマップで描画するグラフ
+MICRO_SECTOR_GRAPH_TYPES = {"Sector Time Trend", "Sector Time Comparison", "Performance Radar"}
+
 class GraphWidget(QWidget):
     def __init__(self, analyzer: LapTimeAnalyzer, parent=None):
         super().__init__(parent)
         self.analyzer = analyzer
         self.time_converter = TimeConverter()
         self.data = None
+        self.laps = []  # 元のラップデータ（dictのリスト）
+        self.head_to_head = None  # 総当たり比較行列（解析時に計算）
+        self.analysis_results = None
+        self.telemetry_store = None  # デルタタイムの計算に使うテレメトリ
+        
+        # 描画中のライダーと、ライダーごとの描画要素（色変更時に再描画せず色だけ変えるため）
+        self.rider_artists = {}
+        self._plot_ax = None
+        self._plotting_rider = None
+        self._seen_artists = set()
+        self._replot_pending = False
+        
+        # グラフに影響する設定の変更を購読
+        config_manager = self.analyzer.config_manager
+        config_manager.subscribe(self.on_rider_colors_changed, "riders_settings")
+        config_manager.subscribe(self.on_graph_settings_changed, "graph_settings")
+        config_manager.subscribe(self.on_graph_settings_changed, "graph")
         
         # 日本語フォント設定
         plt.rcParams['font.family'] = ['Yu Gothic', 'Meiryo', 'MS Gothic', 'sans-serif']  
@@ -47,15 +78,36 @@ class GraphWidget(QWidget):
         # グラフタイプ選択コンボボックス
         self.graph_type_label = QLabel("Graph Type:")
         self.graph_type_combo = QComboBox()
-        self.graph_type_combo.addItems(["Lap Time Trend", "Sector Time Trend", "Sector Time Comparison", "Lap Time Histogram", "Performance Radar"])
+        self.graph_type_combo.addItems(["Lap Time Trend", "Sector Time Trend", "Sector Time Comparison", "Lap Time Histogram", "Distribution", "Performance Radar", "Head-to-Head Matrix", "Delta Time"])
         self.graph_type_combo.currentIndexChanged.connect(self.update_graph)
         
+        # 比較行列の指標選択コンボボックス（Head-to-Head Matrix選択時のみ表示）
+        self.h2h_metric_label = QLabel("Metric:")
+        self.h2h_metric_combo = QComboBox()
+        self.h2h_metric_combo.currentIndexChanged.connect(self.update_graph)
+        
+        # 分布グラフの系列・表示形式の選択コンボボックス（Distribution選択時のみ表示）
+        self.dist_series_label = QLabel("Series:")
+        self.dist_series_combo = QComboBox()
+        self.dist_series_combo.currentIndexChanged.connect(self.update_graph)
+        self.dist_style_label = QLabel("Style:")
+        self.dist_style_combo = QComboBox()
+        self.dist_style_combo.addItems(["Box", "Violin", "Ridgeline"])
+        self.dist_style_combo.currentIndexChanged.connect(self.update_graph)
+        
         # コントロール部分のレイアウト配置
         control_layout.addWidget(self.rider_label)
         control_layout.addWidget(self.rider_combo)
         control_layout.addWidget(self.graph_type_label)
         control_layout.addWidget(self.graph_type_combo)
+        control_layout.addWidget(self.h2h_metric_label)
+        control_layout.addWidget(self.h2h_metric_combo)
+        control_layout.addWidget(self.dist_series_label)
+        control_layout.addWidget(self.dist_series_combo)
+        control_layout.addWidget(self.dist_style_label)
+        control_layout.addWidget(self.dist_style_combo)
         control_layout.addStretch(1)
+        self._update_metric_selector_visibility()
         
         # グラフ部分の設定
         self.figure = Figure(dpi=100)  # constrained_layoutは使用しない
@@ -98,9 +150,18 @@ class GraphWidget(QWidget):
         """データを更新"""
         try:
             if isinstance(data, list):
+                self.laps = data
                 self.data = pd.DataFrame(data)
             else:
                 self.data = data
+                self.laps = data.to_dict('records') if data is not None else []
+            
+            self.analysis_results = analysis_results
+            
+            # 解析結果がある場合のみ比較行列を計算
+            self.head_to_head = self.analyzer.compare_riders(self.laps) if analysis_results else None
+            self._update_h2h_metric_combo()
+            self._update_dist_series_combo()
 
             # ライダーリストを更新
             if self.data is not None and not self.data.empty:
@@ -126,6 +187,8 @@ class GraphWidget(QWidget):
     def update_graph(self):
         """グラフを更新"""
         try:
+            self._update_metric_selector_visibility()
+            
             if self.data is None or self.data.empty:
                 return
                 
@@ -140,6 +203,7 @@ class GraphWidget(QWidget):
             
             # 軸を追加（右側のスペースを予約）
             ax = self.figure.add_subplot(111)
+            self._begin_rider_tracking(ax)
             
             # グラフ設定を取得
             graph_settings = self.analyzer.config_manager.config.get('graph_settings', {})
@@ -151,7 +215,11 @@ class GraphWidget(QWidget):
             
             # グラフの種類に応じて描画
             graph_type = self.graph_type_combo.currentText()
-            if graph_type == "Lap Time Trend":
+            is_heatmap = graph_type == "Head-to-Head Matrix"
+            if graph_type in MICRO_SECTOR_GRAPH_TYPES and self.analyzer.config_manager.is_micro_sector_mode():
+                self.plot_micro_sector_heatmap(ax, graph_type)
+                is_heatmap = True
+            elif graph_type == "Lap Time Trend":
                 self.plot_lap_time_trend(ax, line_width=1.5, marker_size=marker_size, 
                                        marker_style='o', line_style='-')
                 # 時間軸のフォーマッタを設定
@@ -160,6 +228,8 @@ class GraphWidget(QWidget):
                 self.plot_lap_time_histogram(ax)
                 # ヒストグラムのY軸は頻度を表示
                 ax.yaxis.set_major_formatter(FuncFormatter(lambda x, p: f"{int(x)}"))
+            elif graph_type == "Distribution":
+                self.plot_distribution(ax)
             elif graph_type == "Sector Time Comparison":
                 self.plot_sector_time_comparison(ax, line_width=1.5, marker_size=marker_size, 
                                                marker_style='o')
@@ -173,14 +243,19 @@ class GraphWidget(QWidget):
             elif graph_type == "Performance Radar":
                 self.plot_performance_radar(ax, line_width=1.5, marker_size=marker_size,
                                          marker_style='o', line_style='-')
+            elif graph_type == "Head-to-Head Matrix":
+                self.plot_head_to_head_matrix(ax)
+            elif graph_type == "Delta Time":
+                self.plot_delta_time(ax)
+            self._end_rider_tracking()
             
             # フォントサイズを設定
             ax.title.set_size(title_font_size)
             ax.xaxis.label.set_size(axis_font_size)
             ax.yaxis.label.set_size(axis_font_size)
             
-            # グリッドを設定
-            ax.grid(show_grid)
+            # グリッドを設定（ヒートマップには表示しない）
+            ax.grid(show_grid and not is_heatmap)
             
             # 描画
             self.canvas.draw()
@@ -188,6 +263,114 @@ class GraphWidget(QWidget):
         except Exception as e:
             print(f"Error updating graph: {str(e)}")
 
+    def _rider_color(self, rider):
+        """ライダーの色を取得し、以降に追加される描画要素をそのライダーのものとして記録する"""
+        self._collect_rider_artists()
+        self._plotting_rider = rider
+        return self.analyzer.config_manager.get_rider_color(rider)
+
+    def _begin_rider_tracking(self, ax):
+        self.rider_artists = {}
+        self._plot_ax = ax
+        self._plotting_rider = None
+        self._seen_artists = set()
+
+    def _end_rider_tracking(self):
+        self._collect_rider_artists()
+        self._plot_ax = None
+        self._plotting_rider = None
+
+    def _collect_rider_artists(self):
+        """前回の記録以降に追加された描画要素を描画中のライダーに割り当てる"""
+        ax = self._plot_ax
+        if ax is None:
+            return
+        for artist in list(ax.lines) + list(ax.patches) + list(ax.collections):
+            if id(artist) in self._seen_artists:
+                continue
+            self._seen_artists.add(id(artist))
+            if self._plotting_rider is not None:
+                self.rider_artists.setdefault(self._plotting_rider, []).append(artist)
+
+    def on_rider_colors_changed(self, event):
+        """ライダー設定の変更時に、色が変わったライダーの描画要素のみ色を変更する"""
+        if self.data is None or self.data.empty or not self.rider_artists:
+            return
+        if self.graph_type_combo.currentText() not in RESTYLABLE_GRAPH_TYPES:
+            if self.graph_type_combo.currentText() == "Sector Time Trend":
+                self.schedule_replot()
+            return
+        self.restyle_rider_colors()
+
+    def restyle_rider_colors(self):
+        """描画済みの要素の色を現在のライダー色に合わせる（再描画は行わない）"""
+        try:
+            changed = False
+            legend = self.figure.axes[0].get_legend() if self.figure.axes else None
+            legend_handles = []
+            if legend is not None:
+                # legend_handles は matplotlib 3.7 以降（それより前は legendHandles、3.9で削除）
+                legend_handles = getattr(legend, 'legend_handles', None)
+                if legend_handles is None:
+                    legend_handles = legend.legendHandles
+            for rider, artists in self.rider_artists.items():
+                color = self.analyzer.config_manager.get_rider_color(rider)
+                if not color:
+                    continue
+                old_color = self._artist_color(artists[0])
+                if old_color == to_hex(color):
+                    continue
+                for artist in artists:
+                    self._set_artist_color(artist, old_color, color)
+                # 凡例は変更前の色で対応する要素を判定する
+                for handle in legend_handles:
+                    if handle is not None and self._artist_color(handle) == old_color:
+                        self._set_artist_color(handle, old_color, color)
+                changed = True
+            if changed:
+                self.canvas.draw_idle()
+        except Exception as e:
+            print(f"Error restyling graph: {str(e)}")
+            self.update_graph()
+
+    def _artist_color(self, artist):
+        """描画要素の色（線は線の色、それ以外は塗りつぶしの色）"""
+        if isinstance(artist, Line2D):
+            return to_hex(artist.get_color())
+        facecolor = artist.get_facecolor()
+        if len(np.shape(facecolor)) == 2:
+            facecolor = facecolor[0] if len(facecolor) else (0, 0, 0, 0)
+        return to_hex(facecolor)
+
+    def _set_artist_color(self, artist, old_color, color):
+        if isinstance(artist, Line2D):
+            artist.set_color(color)
+            return
+        artist.set_facecolor(color)
+        # 塗りつぶしと同じ色の枠線も変更する
+        edgecolor = artist.get_edgecolor()
+        if len(np.shape(edgecolor)) == 2:
+            edgecolor = edgecolor[0] if len(edgecolor) else None
+        if edgecolor is not None and len(edgecolor) and to_hex(edgecolor) == old_color:
+            artist.set_edgecolor(color)
+
+    def on_graph_settings_changed(self, event):
+        """グラフ設定の変更時の処理（ライダー色以外は再描画が必要）"""
+        if event.key.startswith("rider_color_"):
+            self.on_rider_colors_changed(event)
+        elif self.data is not None and not self.data.empty:
+            self.schedule_replot()
+
+    def schedule_replot(self):
+        """再描画を予約する（続けて変更された設定は1回の再描画にまとめる）"""
+        if not self._replot_pending:
+            self._replot_pending = True
+            QTimer.singleShot(0, self._replot)
+
+    def _replot(self):
+        self._replot_pending = False
+        self.update_graph()
+
     def _configure_figure_size_and_layout(self):
         """図のサイズと余白を設定する専用メソッド"""
         # constrained_layoutを無効化（subplots_adjustと競合するため）
@@ -222,6 +405,7 @@ class GraphWidget(QWidget):
 
         # 設定から移動平均のウィンドウサイズを取得
         window_size = int(self.analyzer.config_manager.get_setting("graph_settings", "lap_trend_window_size") or 5)
+        change_points = self._get_change_points()
             
         selected_rider = self.rider_combo.currentText()
         is_all_riders = selected_rider == "All Riders"
@@ -234,7 +418,7 @@ class GraphWidget(QWidget):
                     times = [self.time_to_seconds(t) for t in rider_data['LapTime']]
                     
                     # ライダーごとの色を取得
-                    rider_color = self.analyzer.config_manager.get_rider_color(rider)
+                    rider_color = self._rider_color(rider)
                     
                     # 実測値のプロット
                     if rider_color:
@@ -261,6 +445,11 @@ class GraphWidget(QWidget):
                            label=f'{rider} Moving Avg',
                            color=line_color,
                            alpha=0.7)
+                    
+                    # ペースの変化点で区切った区間平均
+                    if change_points is not None:
+                        self._plot_segment_means(ax, change_points.rider_segments(rider), line_color, line_width,
+                                                 f'{rider} Pace Segments')
             # 凡例を外部に配置し、必要に応じて縮小表示
             if len(ax.get_lines()) > 0:  # プロット要素があるか確認
                 ax.legend(loc='upper right', fontsize='small', frameon=True)
@@ -273,7 +462,7 @@ class GraphWidget(QWidget):
                 times = [self.time_to_seconds(t) for t in rider_data['LapTime']]
                 
                 # ライダーごとの色を取得
-                rider_color = self.analyzer.config_manager.get_rider_color(selected_rider)
+                rider_color = self._rider_color(selected_rider)
                 
                 # 実測値のプロット
                 if rider_color:
@@ -300,6 +489,12 @@ class GraphWidget(QWidget):
                        label='Moving Average',
                        color=line_color,
                        alpha=0.7)
+                
+                # ペースの変化点で区切った区間平均と変化点
+                if change_points is not None:
+                    segments = change_points.rider_segments(selected_rider)
+                    self._plot_segment_means(ax, segments, line_color, line_width, 'Pace Segments')
+                    self._plot_change_markers(ax, segments)
 
             # 凡例を適切な位置に配置
             if len(ax.get_lines()) > 0:  # プロット要素があるか確認
@@ -316,6 +511,33 @@ class GraphWidget(QWidget):
         # 凡例設定後に明示的にY軸範囲を再設定（上書き防止）
         ax.yaxis.set_major_formatter(FuncFormatter(self._format_time_ticks))
 
+    def _get_change_points(self):
+        """ペースの変化点の検出結果（解析前や表示しない設定の場合はNone）"""
+        config_manager = self.analyzer.config_manager
+        if not self.analysis_results or config_manager.get_setting("graph_settings", "show_change_points") is False:
+            return None
+        penalty = float(config_manager.get_setting("graph_settings", "change_point_penalty") or 1.0)
+        return self.analyzer.get_change_points(self.laps, penalty)
+
+    def _plot_segment_means(self, ax, segments, color, line_width, label):
+        """区間平均を区間ごとの水平線で描画する（ライダー色の変更で色が変わるよう1本の線にまとめる）"""
+        if len(segments) < 2:
+            # 変化点がない場合は描画しない
+            return
+        x, y = [], []
+        for segment in segments:
+            x.extend([segment.first_lap, segment.last_lap, np.nan])
+            y.extend([segment.mean, segment.mean, np.nan])
+        ax.plot(x, y, linewidth=line_width * 2.0, linestyle='-', marker='None',
+                color=color, alpha=0.5, label=label)
+
+    def _plot_change_markers(self, ax, segments):
+        """変化点（新しい区間の最初のラップ）に縦線を描画する（ライダーの描画要素としては記録しない）"""
+        self._collect_rider_artists()
+        self._plotting_rider = None
+        for segment in segments[1:]:
+            ax.axvline(segment.first_lap - 0.5, color='gray', linestyle=':', linewidth=1)
+
     def _format_time_ticks(self, x, pos):
         """時間を mm:ss.fff 形式にフォーマット"""
         try:
@@ -349,7 +571,7 @@ class GraphWidget(QWidget):
                     lap_times = [self.time_to_seconds(t) for t in rider_data['LapTime']]
                     
                     # ライダーごとの色を取得
-                    rider_color = self.analyzer.config_manager.get_rider_color(rider)
+                    rider_color = self._rider_color(rider)
                     
                     if rider_color:
                         # 設定された色を使用
@@ -368,7 +590,7 @@ class GraphWidget(QWidget):
                 lap_times = [self.time_to_seconds(t) for t in rider_data['LapTime']]
                 
                 # 選択されたライダーの色を取得
-                rider_color = self.analyzer.config_manager.get_rider_color(selected_rider)
+                rider_color = self._rider_color(selected_rider)
                 
                 if rider_color:
                     # 設定された色を使用
@@ -390,6 +612,93 @@ class GraphWidget(QWidget):
         ax.set_ylabel('Frequency')
         ax.grid(True)
 
+    def plot_distribution(self, ax):
+        """ラップタイム・セクタータイムの分布を箱ひげ図・バイオリン図・リッジラインで描画
+
+        分位点と密度は解析ごとに1回計算したものを使い、描画のたびに生のタイムを集計しない。
+        ライダーは中央値の速い順に並べる。
+        """
+        stats = self.analyzer.get_distribution_stats(self.laps) if self.analysis_results else None
+        series = self.dist_series_combo.currentText() or "LapTime"
+        if stats is None or series not in stats.series:
+            ax.text(0.5, 0.5, 'Run analysis to show distributions', ha='center', va='center',
+                    transform=ax.transAxes)
+            return
+
+        distribution = stats.series[series]
+        selected_rider = self.rider_combo.currentText()
+        riders = stats.riders_by_median(series)
+        if selected_rider != "All Riders":
+            riders = [rider for rider in riders if rider == selected_rider]
+        style = self.dist_style_combo.currentText()
+        color_cycle = plt.rcParams['axes.prop_cycle'].by_key()['color']
+        colors = [self._rider_color(rider) or color_cycle[i % len(color_cycle)] for i, rider in enumerate(riders)]
+        rows = [stats.rider_row(rider) for rider in riders]
+        self._plotting_rider = None
+
+        if style == "Ridgeline":
+            # 下から速い順に、密度の最大値が行の間隔の1.8倍になるよう重ねる
+            peak = max((distribution.densities[row].max() for row in rows), default=0.0) or 1.0
+            scale = 1.8 / peak
+            for i, (row, color) in enumerate(zip(rows, colors)):
+                offset = len(rows) - 1 - i
+                density = distribution.densities[row] * scale + offset
+                ax.fill_between(distribution.grid, offset, density, color=color, alpha=0.6, zorder=i)
+                ax.plot(distribution.grid, density, color='black', linewidth=0.5, zorder=i)
+                ax.plot([distribution.quantile(row, 0.5)] * 2,
+                        [offset, offset + np.interp(distribution.quantile(row, 0.5), distribution.grid,
+                                                    distribution.densities[row]) * scale],
+                        color='black', linewidth=1, zorder=i)
+            ax.set_yticks(range(len(rows)))
+            ax.set_yticklabels(riders[::-1], fontsize='small' if len(rows) > 20 else None)
+            # 表示するライダーの密度がある範囲に合わせる
+            support = np.flatnonzero((distribution.densities[rows] > peak * 1e-3).any(axis=0))
+            if support.size:
+                ax.set_xlim(distribution.grid[support[0]], distribution.grid[support[-1]])
+            ax.xaxis.set_major_formatter(FuncFormatter(self._format_time_ticks))
+            ax.set_xlabel(series)
+            ax.set_ylabel('Rider')
+        else:
+            positions = np.arange(len(rows))
+            if style == "Violin":
+                # 幅の最大値が0.8になるよう全ライダー共通の倍率で描く（密度の比較ができるように）
+                peak = max((distribution.densities[row].max() for row in rows), default=0.0) or 1.0
+                for position, row, color in zip(positions, rows, colors):
+                    half_width = distribution.densities[row] / peak * 0.4
+                    visible = half_width > 0.002
+                    ax.fill_betweenx(distribution.grid[visible], position - half_width[visible],
+                                     position + half_width[visible], color=color, alpha=0.6, linewidth=0.5,
+                                     edgecolor='black')
+                    ax.vlines(position, distribution.quantile(row, 0.25), distribution.quantile(row, 0.75),
+                              color='black', linewidth=3)
+                    ax.scatter([position], [distribution.quantile(row, 0.5)], color='white', edgecolor='black',
+                               s=20, zorder=3)
+            else:
+                box_stats = [distribution.box_stats(row, rider) for row, rider in zip(rows, riders)]
+                parts = ax.bxp(box_stats, positions=positions, widths=0.6, patch_artist=True, showfliers=False)
+                for box, color in zip(parts['boxes'], colors):
+                    box.set_facecolor(color)
+                    box.set_alpha(0.7)
+                for median in parts['medians']:
+                    median.set_color('black')
+            rotate = len(rows) > 8
+            ax.set_xticks(positions)
+            ax.set_xticklabels(riders, rotation=90 if rotate else 0,
+                               fontsize='small' if len(rows) > 20 else None)
+            ax.set_xlim(-0.6, len(rows) - 0.4)
+            ax.yaxis.set_major_formatter(FuncFormatter(self._format_time_ticks))
+            ax.set_xlabel('Rider')
+            ax.set_ylabel(series)
+
+        title = f'{series} Distribution'
+        ax.set_title(title if selected_rider == "All Riders" else f'{title} - {selected_rider}')
+
+    def _get_quantile_sketches(self):
+        """パーセンタイルのスケッチ（解析前はNone）"""
+        if not self.analysis_results:
+            return None
+        return self.analyzer.get_quantile_sketches(self.laps)
+
     def plot_sector_time_comparison(self, ax, line_width, marker_size, marker_style):
         """セクタータイムの比較を描画"""
         if self.data is None:
@@ -403,11 +712,15 @@ class GraphWidget(QWidget):
         selected_rider = self.rider_combo.currentText()
         is_all_riders = selected_rider == "All Riders"
         
+        # 解析済みの場合はセクター平均の信頼区間をエラーバーで表示する
+        intervals = self.analyzer.get_bootstrap_intervals(self.laps) if self.analysis_results else None
+        
         # 全ライダーの場合
         if is_all_riders:
             # ライダーごとのデータをグループ化して表示
             riders = self.data['Rider'].unique()
             bar_width = 0.8 / len(riders)  # ライダー数に基づいて棒の幅を調整
+            error_bars = []  # (棒の位置, 平均, 信頼区間) のリスト
             
             # 凡例用のハンドルを保存するリスト
             legend_handles = []
@@ -429,7 +742,10 @@ class GraphWidget(QWidget):
                     bar_positions = np.arange(len(sector_cols)) + (idx - len(riders)/2 + 0.5) * bar_width
                     
                     # ライダーごとの色を取得
-                    rider_color = self.analyzer.config_manager.get_rider_color(rider)
+                    rider_color = self._rider_color(rider)
+                    
+                    if intervals is not None:
+                        error_bars.append((bar_positions, sector_times, intervals.sector_errors(rider)))
                     
                     # 各セクターに棒グラフをプロット
                     for i, (pos, time) in enumerate(zip(bar_positions, sector_times)):
@@ -451,6 +767,8 @@ class GraphWidget(QWidget):
                         legend_handles.append(patch)
                         legend_labels.append(rider)
             
+            self._plot_sector_error_bars(ax, error_bars)
+            
             # 凡例を表示（有効なデータがある場合のみ）
             if legend_handles:
                 ax.legend(handles=legend_handles, labels=legend_labels, 
@@ -477,6 +795,9 @@ class GraphWidget(QWidget):
                     if not np.isnan(sector_times[i]):  # 有効な値のみプロット
                         ax.bar(i, sector_times[i], 0.8, label=sector)
                         has_valid_bars = True
+                if intervals is not None:
+                    self._plot_sector_error_bars(
+                        ax, [(np.arange(len(sector_cols)), sector_times, intervals.sector_errors(selected_rider))])
                 
                 # 凡例を表示（有効なデータがある場合のみ）
                 if has_valid_bars and len(ax.patches) > 0:  # 棒グラフのパッチを確認
@@ -489,6 +810,22 @@ class GraphWidget(QWidget):
         ax.set_xlabel('Sectors')
         ax.set_ylabel('Time')
 
+    def _plot_sector_error_bars(self, ax, error_bars):
+        """セクター平均の信頼区間をエラーバーで描画する
+
+        エラーバーはライダーの色を持たないため、ライダーごとの描画要素として記録しない。
+        """
+        self._collect_rider_artists()
+        self._plotting_rider = None
+        for positions, means, errors in error_bars:
+            if errors is None:
+                continue
+            means = np.asarray(means, dtype=float)
+            finite = np.isfinite(means) & np.isfinite(errors).all(axis=0)
+            if finite.any():
+                ax.errorbar(np.asarray(positions)[finite], means[finite], yerr=errors[:, finite],
+                            fmt='none', ecolor='black', elinewidth=1, capsize=3)
+
     def plot_sector_time_trend(self, ax, line_width, marker_size, marker_style, line_style):
         """セクタータイムの推移を描画"""
         if self.data is None:
@@ -496,6 +833,7 @@ class GraphWidget(QWidget):
             
         # 設定から移動平均のウィンドウサイズを取得
         window_size = int(self.analyzer.config_manager.get_setting("graph_settings", "lap_trend_window_size") or 5)
+        change_points = self._get_change_points()
         
         # セクター数を取得
         num_sectors = self.analyzer.config_manager.get_num_sectors()
@@ -505,16 +843,19 @@ class GraphWidget(QWidget):
         selected_rider = self.rider_combo.currentText()
         is_all_riders = selected_rider == "All Riders"
         
-        # Y軸範囲計算のために事前にすべてのデータを収集
-        # 全データからY軸の範囲を決定（事前計算）
-        all_sector_times = []
-        for rider_name in self.data['Rider'].unique():
-            rider_data = self.data[self.data['Rider'] == rider_name].copy()
-            if not rider_data.empty:
-                for sector in sector_cols:
-                    times = [self.time_to_seconds(t) for t in rider_data[sector] if self._is_valid_time(t)]
-                    valid_times = [t for t in times if t > 0.1]  # 0.1秒未満は無視
-                    all_sector_times.extend(valid_times)
+        # 全データからY軸の範囲を決定（解析済みの場合はスケッチを使い、生のタイムは集めない）
+        sketches = self._get_quantile_sketches()
+        if sketches is not None:
+            all_sector_times = sketches.combined(sector_cols)
+        else:
+            all_sector_times = []
+            for rider_name in self.data['Rider'].unique():
+                rider_data = self.data[self.data['Rider'] == rider_name].copy()
+                if not rider_data.empty:
+                    for sector in sector_cols:
+                        times = [self.time_to_seconds(t) for t in rider_data[sector] if self._is_valid_time(t)]
+                        valid_times = [t for t in times if t > 0.1]  # 0.1秒未満は無視
+                        all_sector_times.extend(valid_times)
                     
         # 適切なY軸範囲を計算
         y_min, y_max = self._calculate_appropriate_y_range(all_sector_times)
@@ -566,7 +907,7 @@ class GraphWidget(QWidget):
                     rider_data = rider_data.sort_values('Lap')
                     
                     # ライダーごとの基本色を取得
-                    base_color = self.analyzer.config_manager.get_rider_color(rider)
+                    base_color = self._rider_color(rider)
                     if not base_color:
                         # 固有の色を決定（カスタム色がない場合）
                         color_cycle = plt.rcParams['axes.prop_cycle'].by_key()['color']
@@ -627,7 +968,7 @@ class GraphWidget(QWidget):
                 rider_data = rider_data.sort_values('Lap')
                 
                 # ライダーの基本色を取得
-                base_color = self.analyzer.config_manager.get_rider_color(selected_rider)
+                base_color = self._rider_color(selected_rider)
                 
                 # セクターごとの色バリエーションを生成
                 if base_color:
@@ -663,6 +1004,11 @@ class GraphWidget(QWidget):
                            label=f'{sector} Moving Avg',
                            color=sector_color,  # セクターごとの色を使用
                            alpha=0.7)
+                    
+                    # ペースの変化点で区切った区間平均
+                    if change_points is not None:
+                        self._plot_segment_means(ax, change_points.rider_segments(selected_rider, sector),
+                                                 sector_color, line_width, f'{sector} Pace Segments')
             
                 # 凡例を適切な場所に配置
                 if len(ax.get_lines()) > 0:
@@ -683,35 +1029,33 @@ class GraphWidget(QWidget):
             ax.grid(True, linestyle='--', alpha=0.7)
 
     def _calculate_appropriate_y_range(self, times_list):
-        """適切なY軸範囲を計算するヘルパーメソッド"""
-        if not times_list:
+        """適切なY軸範囲を計算するヘルパーメソッド
+
+        times_listはタイムのリストまたはKLLSketchで、四分位数と外れ値を除いた範囲はスケッチから求める。
+        """
+        if not isinstance(times_list, KLLSketch):
+            sketch = KLLSketch()
+            sketch.update_many(times_list)
+            times_list = sketch
+        if not times_list.count:
             return None, None  # データがない場合はNoneを返し、自動スケーリングに任せる
             
         try:
-            # データをソート
-            sorted_times = sorted(times_list)
-            num_samples = len(sorted_times)
+            num_samples = times_list.count
             
             if num_samples <= 1:
                 # データが1つの場合、その値を中心に範囲を設定
-                if num_samples == 1:
-                    center = sorted_times[0]
-                    return max(0, center - center * 0.2), center + center * 0.2
-                else:
-                    return None, None  # データがない場合
+                center = times_list.min
+                return max(0, center - center * 0.2), center + center * 0.2
             
             # 四分位数を計算
-            q1_idx = max(0, int(num_samples * 0.25))
-            q3_idx = min(num_samples - 1, int(num_samples * 0.75))
-            
-            q1 = sorted_times[q1_idx]
-            q3 = sorted_times[q3_idx]
+            q1, q3 = times_list.quantiles([0.25, 0.75])
             
             # 四分位範囲（IQR）を計算
             iqr = q3 - q1
             
             if iqr == 0:  # すべての値が同じ場合
-                center = sorted_times[0]
+                center = q1
                 # 値の20%の範囲を設定
                 margin = max(center * 0.2, 0.5)
                 return max(0, center - margin), center + margin
@@ -721,12 +1065,11 @@ class GraphWidget(QWidget):
             upper_bound = q3 + 1.5 * iqr
             
             # 実データの最小値と最大値（外れ値を除く）
-            valid_data = [t for t in sorted_times if lower_bound <= t <= upper_bound]
-            if not valid_data:  # 有効なデータがない場合（極端な外れ値のみの場合）
-                valid_data = sorted_times  # すべてのデータを使用
+            valid_range = times_list.range_within(lower_bound, upper_bound)
+            if valid_range is None:  # 有効なデータがない場合（極端な外れ値のみの場合）
+                valid_range = (times_list.min, times_list.max)  # すべてのデータを使用
             
-            data_min = min(valid_data)
-            data_max = max(valid_data)
+            data_min, data_max = valid_range
             
             # データ範囲を計算
             data_range = data_max - data_min
@@ -789,7 +1132,7 @@ class GraphWidget(QWidget):
                     stats = self._calculate_sector_statistics(rider_data, sector_cols, window_size)
                     
                     # ライダーごとの色を取得
-                    rider_color = self.analyzer.config_manager.get_rider_color(rider)
+                    rider_color = self._rider_color(rider)
                     
                     # 移動平均値のプロット
                     sector_times = [stats[col]['moving_avg'].iloc[-1] for col in sector_cols]
@@ -833,7 +1176,7 @@ class GraphWidget(QWidget):
                 stats = self._calculate_sector_statistics(rider_data, sector_cols, window_size)
                 
                 # ライダーごとの色を取得
-                rider_color = self.analyzer.config_manager.get_rider_color(selected_rider)
+                rider_color = self._rider_color(selected_rider)
                 
                 # 移動平均値のプロット
                 sector_times = [stats[col]['moving_avg'].iloc[-1] for col in sector_cols]
@@ -869,6 +1212,121 @@ class GraphWidget(QWidget):
         ax.set_xticks(angles)
         ax.set_xticklabels(sector_cols)
 
+    def plot_micro_sector_heatmap(self, ax, graph_type):
+        """ミニセクターのタイムロスをヒートマップで描画
+
+        Sector Time Trendはラップ × セクター、それ以外はライダー × セクターで、
+        全体のセクターベストから失ったタイム（秒）を色で表示します。
+        """
+        columns = self.analyzer.get_lap_columns(self.laps)
+        selected_rider = self.rider_combo.currentText()
+        is_all_riders = selected_rider == "All Riders"
+        
+        if graph_type == "Sector Time Trend":
+            mask = columns.valid
+            if not is_all_riders:
+                mask = mask & columns.rider_mask(selected_rider)
+            rows = np.flatnonzero(mask)
+            matrix = lap_loss_matrix(columns, rows)
+            labels = [f"{columns.riders[columns.rider_codes[i]]} L{columns.lap_numbers[i]}" for i in rows]
+            title = f'Micro-Sector Time Loss - {selected_rider}'
+            ylabel = 'Lap'
+        else:
+            stats = self.analyzer.get_micro_sector_stats(self.laps)
+            if stats is None:
+                return
+            matrix = stats.loss_matrix()
+            labels = list(stats.riders)
+            if not is_all_riders and selected_rider in labels:
+                index = labels.index(selected_rider)
+                matrix = matrix[index:index + 1]
+                labels = [selected_rider]
+            title = f'Micro-Sector Average Loss - {selected_rider}'
+            ylabel = 'Rider'
+        
+        if matrix.size == 0:
+            ax.set_title(f'{title} (no valid laps)')
+            ax.set_xticks([])
+            ax.set_yticks([])
+            return
+        
+        # 外れ値で色が潰れないよう上限はパーセンタイルで決める
+        finite = matrix[np.isfinite(matrix)]
+        limit = float(np.percentile(finite, 95)) if finite.size else 1.0
+        num_sectors = matrix.shape[1]
+        image = ax.imshow(matrix, aspect='auto', interpolation='nearest', cmap='RdYlGn_r',
+                          vmin=0.0, vmax=max(limit, 1e-3),
+                          extent=(0.5, num_sectors + 0.5, len(labels) - 0.5, -0.5))
+        colorbar = self.figure.colorbar(image, ax=ax, fraction=0.046, pad=0.04)
+        colorbar.set_label('Time Loss (s)')
+        
+        # 行数が多い場合はラベルを間引く
+        step = max(1, len(labels) // 40)
+        ax.set_yticks(np.arange(0, len(labels), step))
+        ax.set_yticklabels(labels[::step], fontsize='x-small')
+        ax.set_title(title)
+        ax.set_xlabel(f'Micro-Sector (1-{num_sectors})')
+        ax.set_ylabel(ylabel)
+
+    def set_telemetry_store(self, store):
+        """デルタタイムに使うテレメトリを設定する"""
+        self.telemetry_store = store
+        if self.graph_type_combo.currentText() == "Delta Time":
+            self.update_graph()
+
+    def plot_delta_time(self, ax):
+        """基準ラップに対するデルタタイムを距離ごとに描画
+
+        基準は選択ライダーのベストラップ（All Ridersの場合は全体の最速ラップ）で、
+        テレメトリがある同じライダー（All Ridersの場合は全ライダー）の他のラップと比較します。
+        """
+        store = self.telemetry_store
+        if store is None or not self.analysis_results:
+            ax.set_title('Delta Time (load telemetry and run analysis first)')
+            return
+            
+        selected_rider = self.rider_combo.currentText()
+        is_all_riders = selected_rider == "All Riders"
+        if is_all_riders:
+            reference_lap = self.analysis_results.get('fastest_lap')
+        else:
+            reference_lap = self.analysis_results.get('rider_stats', {}).get(selected_rider, {}).get('best_lap')
+        reference = store.get_lap(reference_lap['Rider'], reference_lap['Lap']) if reference_lap else None
+        reference_trace = lap_trace(store, reference) if reference is not None else None
+        if reference_trace is None:
+            ax.set_title('Delta Time (no telemetry for the reference lap)')
+            return
+            
+        # 比較するラップ（ライダーごとにまとめる）
+        riders, traces = [], []
+        for lap in self.laps:
+            rider = lap.get('Rider', '')
+            if not is_all_riders and rider != selected_rider:
+                continue
+            telemetry_lap = store.get_lap(rider, lap.get('Lap'))
+            if telemetry_lap is None or telemetry_lap is reference:
+                continue
+            trace = lap_trace(store, telemetry_lap)
+            if trace is not None:
+                riders.append(rider)
+                traces.append(trace)
+        result = compute_delta_times(reference_trace, traces)
+        
+        ax.axhline(0.0, color='black', linewidth=1.0)
+        legend_handles = []
+        riders = np.asarray(riders, dtype=object)
+        for idx, rider in enumerate(dict.fromkeys(riders)):
+            rows = np.flatnonzero(riders == rider)
+            color = self._rider_color(rider) or plt.cm.tab10(idx % 10)
+            ax.plot(result.distance, result.deltas[rows].T, color=color, linewidth=0.8, alpha=0.6)
+            legend_handles.append(Line2D([0], [0], color=color, label=rider))
+        if legend_handles:
+            ax.legend(handles=legend_handles, loc='upper left', fontsize='small')
+            
+        ax.set_title(f"Delta Time vs {reference_lap['Rider']} Lap {reference_lap['Lap']} ({len(result)} laps)")
+        ax.set_xlabel('Distance (m)')
+        ax.set_ylabel('Delta (s)')
+
     def _is_valid_time(self, time_str):
         """時間文字列が有効かどうかをチェック"""
         if not time_str:
@@ -877,4 +1335,83 @@ class GraphWidget(QWidget):
             time_val = self.time_to_seconds(time_str)
             return time_val > 0
         except:
-            return False
\ No newline at end of file
+            return False
+
+    def _update_metric_selector_visibility(self):
+        """グラフタイプに応じて指標選択コンボボックスの表示を切り替える"""
+        is_h2h = self.graph_type_combo.currentText() == "Head-to-Head Matrix"
+        self.h2h_metric_label.setVisible(is_h2h)
+        self.h2h_metric_combo.setVisible(is_h2h)
+        is_distribution = self.graph_type_combo.currentText() == "Distribution"
+        for widget in (self.dist_series_label, self.dist_series_combo, self.dist_style_label, self.dist_style_combo):
+            widget.setVisible(is_distribution)
+
+    def _update_dist_series_combo(self):
+        """分布グラフの系列の選択肢をセクター数に合わせる（選択中の系列は維持する）"""
+        num_sectors = self.analyzer.config_manager.get_num_sectors()
+        items = ["LapTime"] + [f"Sector{i}" for i in range(1, num_sectors + 1)]
+        if [self.dist_series_combo.itemText(i) for i in range(self.dist_series_combo.count())] == items:
+            return
+        current = self.dist_series_combo.currentText()
+        self.dist_series_combo.blockSignals(True)
+        self.dist_series_combo.clear()
+        self.dist_series_combo.addItems(items)
+        self.dist_series_combo.setCurrentIndex(max(0, self.dist_series_combo.findText(current)))
+        self.dist_series_combo.blockSignals(False)
+
+    def _update_h2h_metric_combo(self):
+        """比較行列の指標リストを更新する"""
+        current = self.h2h_metric_combo.currentText()
+        self.h2h_metric_combo.blockSignals(True)
+        self.h2h_metric_combo.clear()
+        if self.head_to_head is not None:
+            self.h2h_metric_combo.addItems(self.head_to_head.metric_names())
+            index = self.h2h_metric_combo.findText(current)
+            if index >= 0:
+                self.h2h_metric_combo.setCurrentIndex(index)
+        self.h2h_metric_combo.blockSignals(False)
+
+    def plot_head_to_head_matrix(self, ax):
+        """ライダー間の総当たり比較行列をヒートマップで描画"""
+        if self.head_to_head is None:
+            ax.set_title('Head-to-Head Matrix (run analysis first)')
+            ax.set_xticks([])
+            ax.set_yticks([])
+            return
+            
+        metric_name = self.h2h_metric_combo.currentText() or 'Best Lap Delta'
+        matrix = self.head_to_head.get_matrix(metric_name)
+        riders = self.head_to_head.riders
+        if matrix is None or not riders:
+            return
+            
+        is_win_rate = metric_name == 'Win Rate'
+        if is_win_rate:
+            # 勝率は0.5を中心に表示
+            image = ax.imshow(matrix, cmap='RdYlGn', vmin=0.0, vmax=1.0)
+            formatter = lambda v: f"{v:.0%}"
+        else:
+            # デルタは0を中心に対称なカラースケール（負=行ライダーが速い=緑）
+            finite = np.abs(matrix[np.isfinite(matrix)])
+            limit = float(finite.max()) if finite.size else 1.0
+            image = ax.imshow(matrix, cmap='RdYlGn_r', vmin=-limit, vmax=limit)
+            formatter = lambda v: f"{v:+.3f}"
+            
+        colorbar = self.figure.colorbar(image, ax=ax, fraction=0.046, pad=0.04)
+        colorbar.ax.yaxis.set_major_formatter(FuncFormatter(lambda x, p: formatter(x)))
+        
+        # ライダー数が少ない場合のみセルに値を表示
+        num_riders = len(riders)
+        if num_riders <= 15:
+            for (i, j), value in np.ndenumerate(matrix):
+                if np.isfinite(value):
+                    ax.text(j, i, formatter(value), ha='center', va='center', fontsize='x-small')
+        
+        tick_size = 'small' if num_riders <= 20 else 'xx-small'
+        ax.set_xticks(np.arange(num_riders))
+        ax.set_yticks(np.arange(num_riders))
+        ax.set_xticklabels(riders, rotation=90, fontsize=tick_size)
+        ax.set_yticklabels(riders, fontsize=tick_size)
+        ax.set_title(f'Head-to-Head - {metric_name}')
+        ax.set_xlabel('Opponent')
+        ax.set_ylabel('Rider')
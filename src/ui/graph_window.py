@@ -29,6 +29,9 @@ class GraphWindow(QMainWindow):
         self.close_button = QPushButton("閉じる")
         self.close_button.clicked.connect(self.hide)  # ウィンドウを非表示にする
         self.button_layout.addWidget(self.close_button)
+
+        # 非表示の間に更新されたデータ（次に表示するときに反映する）
+        self.pending_data = None
     
     def set_position_from_parent(self):
         """親ウィンドウと同じ位置に配置"""
@@ -40,6 +43,7 @@ class GraphWindow(QMainWindow):
     
     def update_data(self, data, analysis_results=None):
         """データを更新"""
+        self.pending_data = None
         self.graph_widget.update_data(data, analysis_results)
         
         # 解析結果がある場合のみウィンドウを表示する（設定で有効な場合）
@@ -50,6 +54,21 @@ class GraphWindow(QMainWindow):
             self.activateWindow()
             self.raise_()
     
+    def refresh_data(self, data, analysis_results=None):
+        """表示中であればデータを更新し、非表示の場合は次に表示するまで更新しない（セルの編集のたびに再描画しないため）"""
+        if self.isVisible():
+            self.update_data(data, analysis_results)
+        else:
+            self.pending_data = (data, analysis_results)
+
+    def showEvent(self, event):
+        """表示時に非表示の間に更新されたデータを反映する"""
+        if self.pending_data is not None:
+            data, analysis_results = self.pending_data
+            self.pending_data = None
+            self.graph_widget.update_data(data, analysis_results)
+        super().showEvent(event)
+
     def resizeEvent(self, event):
         """ウィンドウリサイズ時にグラフを再描画"""
         super().resizeEvent(event)
@@ -0,0 +1,150 @@
+"""
+Head-to-Head Widget Module
+ライダー間の総当たり比較行列を表示するテーブルモデルとウィジェットを提供します。
+"""
+import numpy as np
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox,
+                             QTableView, QHeaderView, QDialog)
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QVariant
+from PyQt5.QtGui import QColor
+
+from app.head_to_head import HeadToHeadMatrix
+
+
+class HeadToHeadTableModel(QAbstractTableModel):
+    """比較行列をQTableViewに表示するためのモデル
+
+    行の並び替えは行列を直接並べ替えず、行インデックスの順序配列のみを更新します。
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.matrix = None
+        self.values = np.zeros((0, 0))
+        self.riders = []
+        self.is_win_rate = False
+        self.row_order = np.zeros(0, dtype=int)
+
+    def set_matrix(self, matrix: HeadToHeadMatrix, metric_name: str):
+        """表示する比較行列と指標を設定する"""
+        self.beginResetModel()
+        self.matrix = matrix
+        values = matrix.get_matrix(metric_name) if matrix is not None else None
+        self.values = values if values is not None else np.zeros((0, 0))
+        self.riders = list(matrix.riders) if matrix is not None else []
+        self.is_win_rate = metric_name == 'Win Rate'
+        self.row_order = np.arange(len(self.riders))
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.riders)
+
+    def columnCount(self, parent=QModelIndex()):
+        # 先頭列はライダー名
+        return 0 if parent.isValid() else len(self.riders) + 1
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return QVariant()
+        row = int(self.row_order[index.row()])
+        col = index.column()
+        if col == 0:
+            if role == Qt.DisplayRole:
+                return self.riders[row]
+            return QVariant()
+
+        value = self.values[row, col - 1]
+        if role == Qt.DisplayRole:
+            if not np.isfinite(value):
+                return "--"
+            return f"{value:.0%}" if self.is_win_rate else f"{value:+.3f}"
+        if role == Qt.TextAlignmentRole:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        if role == Qt.BackgroundRole and np.isfinite(value) and row != col - 1:
+            # 行ライダーが有利な場合は緑、不利な場合は赤
+            favorable = value > 0.5 if self.is_win_rate else value < 0
+            return QColor(200, 255, 200) if favorable else QColor(255, 200, 200)
+        return QVariant()
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return QVariant()
+        if orientation == Qt.Horizontal:
+            return "Rider" if section == 0 else self.riders[section - 1]
+        return str(section + 1)
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        """指定列の値で行を並べ替える（NaNは常に末尾）"""
+        if not self.riders:
+            return
+        self.layoutAboutToBeChanged.emit()
+        if column == 0:
+            keys = np.argsort(np.array(self.riders, dtype=object))
+            self.row_order = keys if order == Qt.AscendingOrder else keys[::-1]
+        else:
+            column_values = self.values[:, column - 1]
+            finite = np.isfinite(column_values)
+            signed = column_values if order == Qt.AscendingOrder else -column_values
+            self.row_order = np.lexsort((np.where(finite, signed, 0.0), ~finite))
+        self.layoutChanged.emit()
+
+
+class HeadToHeadWidget(QWidget):
+    """比較行列を指標ごとに表示するウィジェット"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.matrix = None
+        self.init_ui()
+
+    def init_ui(self):
+        """UIの初期化"""
+        layout = QVBoxLayout(self)
+
+        # 指標選択
+        control_layout = QHBoxLayout()
+        control_layout.addWidget(QLabel("Metric:"))
+        self.metric_combo = QComboBox()
+        self.metric_combo.currentTextChanged.connect(self.on_metric_changed)
+        control_layout.addWidget(self.metric_combo)
+        control_layout.addStretch()
+        layout.addLayout(control_layout)
+
+        # 比較テーブル
+        self.model = HeadToHeadTableModel(self)
+        self.table_view = QTableView()
+        self.table_view.setModel(self.model)
+        self.table_view.setSortingEnabled(True)
+        self.table_view.verticalHeader().setVisible(False)
+        self.table_view.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        layout.addWidget(self.table_view)
+
+    def set_matrix(self, matrix: HeadToHeadMatrix):
+        """比較行列を設定する"""
+        self.matrix = matrix
+        current = self.metric_combo.currentText()
+        self.metric_combo.blockSignals(True)
+        self.metric_combo.clear()
+        if matrix is not None:
+            self.metric_combo.addItems(matrix.metric_names())
+            index = self.metric_combo.findText(current)
+            self.metric_combo.setCurrentIndex(max(index, 0))
+        self.metric_combo.blockSignals(False)
+        self.on_metric_changed(self.metric_combo.currentText())
+
+    def on_metric_changed(self, metric_name):
+        """指標が変更されたときの処理"""
+        self.model.set_matrix(self.matrix, metric_name)
+
+
+class HeadToHeadDialog(QDialog):
+    """比較行列を表示するダイアログ"""
+
+    def __init__(self, matrix: HeadToHeadMatrix, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Head-to-Head Comparison")
+        self.resize(900, 600)
+        layout = QVBoxLayout(self)
+        self.head_to_head_widget = HeadToHeadWidget(self)
+        self.head_to_head_widget.set_matrix(matrix)
+        layout.addWidget(self.head_to_head_widget)
@@ -0,0 +1,95 @@
+"""
+Lap Store Dialog Module
+ラップストアを条件検索し、結果を読み込むためのダイアログを提供します。
+"""
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QFormLayout, QHBoxLayout, QComboBox,
+                             QLineEdit, QLabel, QPushButton, QDialogButtonBox)
+
+from app.lap_store import LapStore
+
+
+class LapStoreQueryDialog(QDialog):
+    """ライダー・トラック・タイヤ・セッションタイプ・期間でラップを検索するダイアログ"""
+
+    ANY = "(Any)"
+
+    def __init__(self, lap_store: LapStore, parent=None):
+        super().__init__(parent)
+        self.lap_store = lap_store
+        self.result_columns = None
+        self.setWindowTitle("Query Lap Store")
+        self.init_ui()
+
+    def init_ui(self):
+        """UIの初期化"""
+        layout = QVBoxLayout(self)
+        form = QFormLayout()
+
+        self.combos = {}
+        for field, label in (('rider', 'Rider'), ('track', 'Track'),
+                             ('tire', 'Tire'), ('session_type', 'Session Type')):
+            combo = QComboBox()
+            combo.addItem(self.ANY)
+            combo.addItems(self.lap_store.distinct_values(field))
+            self.combos[field] = combo
+            form.addRow(f"{label}:", combo)
+
+        self.date_from_edit = QLineEdit()
+        self.date_from_edit.setPlaceholderText("YYYY-MM-DD")
+        self.date_to_edit = QLineEdit()
+        self.date_to_edit.setPlaceholderText("YYYY-MM-DD")
+        form.addRow("Date From:", self.date_from_edit)
+        form.addRow("Date To:", self.date_to_edit)
+        layout.addLayout(form)
+
+        # 検索結果の概要
+        search_layout = QHBoxLayout()
+        search_button = QPushButton("Search")
+        search_button.clicked.connect(self.run_query)
+        search_layout.addWidget(search_button)
+        self.summary_label = QLabel("")
+        search_layout.addWidget(self.summary_label, 1)
+        layout.addLayout(search_layout)
+
+        self.button_box = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        self.button_box.button(QDialogButtonBox.Ok).setText("Load")
+        self.button_box.accepted.connect(self.accept_query)
+        self.button_box.rejected.connect(self.reject)
+        layout.addWidget(self.button_box)
+
+    def get_filters(self):
+        """入力された検索条件を取得する"""
+        filters = {}
+        for field, combo in self.combos.items():
+            if combo.currentText() != self.ANY:
+                filters[field] = combo.currentText()
+        if self.date_from_edit.text().strip():
+            filters['date_from'] = self.date_from_edit.text().strip()
+        if self.date_to_edit.text().strip():
+            filters['date_to'] = self.date_to_edit.text().strip()
+        return filters
+
+    def run_query(self):
+        """検索を実行して概要を表示する"""
+        filters = self.get_filters()
+        try:
+            self.result_columns = self.lap_store.query_laps(**filters)
+        except Exception as e:
+            print(f"Error querying lap store: {e}")
+            self.summary_label.setText(f"Query failed: {e}")
+            self.result_columns = None
+            return
+
+        text = f"{len(self.result_columns)} laps"
+        if self.result_columns.num_sectors:
+            best = self.lap_store.best_sector_time(1, **filters)
+            if best:
+                text += f" / Best Sector1: {best['time']:.3f} ({best['rider']}, {best['track']} {best['date']})"
+        self.summary_label.setText(text)
+
+    def accept_query(self):
+        """検索結果を確定してダイアログを閉じる"""
+        if self.result_columns is None:
+            self.run_query()
+        if self.result_columns is not None:
+            self.accept()
@@ -0,0 +1,88 @@
+"""
+Leaderboard Widget Module
+全体・ライダー別・タイヤ別・セクター別の速いラップ上位K件を表示するパネルを提供します。
+"""
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox,
+                             QTableWidget, QTableWidgetItem, QHeaderView)
+from PyQt5.QtCore import Qt, pyqtSignal
+
+from app.lap_columns import format_seconds
+from app.leaderboard import LeaderboardIndex, OVERALL
+from utils.time_converter import TimeConverter
+
+
+class LeaderboardWidget(QWidget):
+    """リーダーボードのパネル"""
+
+    lap_selected = pyqtSignal(int)  # 行をダブルクリックしたとき（ラップデータのインデックス）
+
+    HEADERS = ["Pos", "Rider", "Lap", "Time", "Gap"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.leaderboard = None
+        self.laps = []
+        self.board_keys = []  # コンボボックスの項目ごとのリーダーボードのキー (種類, 名前)
+        self.time_converter = TimeConverter()
+        self.init_ui()
+
+    def init_ui(self):
+        """UIの初期化"""
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        control_layout = QHBoxLayout()
+        control_layout.addWidget(QLabel("Leaderboard:"))
+        self.board_combo = QComboBox()
+        self.board_combo.currentIndexChanged.connect(self.refresh)
+        control_layout.addWidget(self.board_combo)
+        control_layout.addStretch()
+        layout.addLayout(control_layout)
+
+        self.table = QTableWidget(0, len(self.HEADERS))
+        self.table.setHorizontalHeaderLabels(self.HEADERS)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.table.verticalHeader().setVisible(False)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.table.cellDoubleClicked.connect(self.on_cell_double_clicked)
+        layout.addWidget(self.table)
+
+    def set_leaderboard(self, leaderboard: LeaderboardIndex, laps):
+        """表示するリーダーボードとラップデータを設定する（選択中のリーダーボードは維持する）"""
+        self.leaderboard = leaderboard
+        self.laps = laps or []
+        current = self.board_combo.currentText()
+        self.board_combo.blockSignals(True)
+        self.board_combo.clear()
+        self.board_keys = leaderboard.keys() if leaderboard is not None else []
+        for kind, name in self.board_keys:
+            self.board_combo.addItem(kind if kind == OVERALL else f"{kind}: {name}")
+        self.board_combo.setCurrentIndex(max(self.board_combo.findText(current), 0))
+        self.board_combo.blockSignals(False)
+        self.refresh()
+
+    def refresh(self):
+        """選択中のリーダーボードを表示する"""
+        self.table.setRowCount(0)
+        position = self.board_combo.currentIndex()
+        if self.leaderboard is None or not 0 <= position < len(self.board_keys):
+            return
+        entries = [(seconds, index) for seconds, index in self.leaderboard.top(*self.board_keys[position])
+                   if index < len(self.laps)]
+        self.table.setRowCount(len(entries))
+        best = entries[0][0] if entries else 0.0
+        for row, (seconds, index) in enumerate(entries):
+            lap = self.laps[index]
+            values = [str(row + 1), lap.get('Rider', ''), str(lap.get('Lap', '')),
+                      format_seconds(seconds, self.time_converter),
+                      f"+{seconds - best:.3f}" if row else ""]
+            for col, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if col == 0:
+                    item.setData(Qt.UserRole, int(index))
+                self.table.setItem(row, col, item)
+
+    def on_cell_double_clicked(self, row, column):
+        """行をダブルクリックしたときの処理"""
+        self.lap_selected.emit(self.table.item(row, 0).data(Qt.UserRole))
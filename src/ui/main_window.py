@@ -1,16 +1,34 @@
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
-                           QFileDialog, QMessageBox, QSplitter)
-from PyQt5.QtCore import Qt
+                           QFileDialog, QMessageBox, QSplitter, QApplication)
+from PyQt5.QtCore import Qt, QTimer
 from ui.data_input_widget import DataInputWidget
 from ui.graph_widget import GraphWidget
 from ui.graph_window import GraphWindow
 from ui.base_widgets.lap_data_table_widget import LapDataTableWidget
 from ui.base_widgets.statistics_table_widget import StatisticsTableWidget
 from ui.settings_dialog import SettingsDialog
+from ui.head_to_head_widget import HeadToHeadDialog
+from ui.similar_laps_dialog import SimilarLapsDialog
+from ui.race_simulator_dialog import RaceSimulatorDialog
+from ui.lap_store_dialog import LapStoreQueryDialog
+from ui.session_browser_dialog import SessionBrowserDialog
+from ui.leaderboard_widget import LeaderboardWidget
+from ui.filter_bar import FilterBar
+from ui.pivot_dialog import PivotDialog
+from ui.save_worker import SaveWorker, start_save_worker
+from ui.telemetry_import_worker import TelemetryImportWorker
 from app.analyzer import LapTimeAnalyzer
 from app.data_loader import DataLoader
 from app.config_manager import ConfigManager
+from app.lap_store import LapStore
+from app.session_catalog import SessionCatalog
+from app.session_writer import SessionWriter
+from app.edit_journal import EditJournal
+from app.telemetry_store import TelemetryStore
+from app.race_simulator import fit_race_model
+from app.lap_filter import compile_filter
 import json
+import os
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -30,12 +48,46 @@ class MainWindow(QMainWindow):
         self.analyzer = LapTimeAnalyzer(self.data_loader, self.config_manager)
         
         self.lap_data = None
+        self.analysis_results = None  # 直近の解析結果（編集時の差分再解析に使用）
+        self.moving_stats = None
+        self.confidence_intervals = None  # ブートストラップによる信頼区間（編集時の差分再計算に使用）
+        self.consistency = None  # 安定性のスコア（解析後、ラップ追加時は差分で更新する）
+        self.leaderboard = None  # 表示中のラップデータのリーダーボード（ラップ追加時の差分更新に使用）
+        self.leaderboard_laps = None  # leaderboardを作成したラップデータ（同じリストに追加された場合のみ差分で更新する）
+        self.filter_expression = ''  # 適用中の絞り込みの条件式（表・グラフ・統計・エクスポートに共通）
+        self.current_file_path = None
+        self.session_info = None
+        self.lap_store = None
+        self.session_catalog = None
+        self.telemetry_store = None
+        self.save_thread = None
+        self.save_worker = None
+        self.telemetry_thread = None
+        self.telemetry_worker = None
+        self.save_journal_seq = None  # 保存中のデータに含まれるジャーナルの操作の連番（エクスポート時はNone）
         self.graph_window = GraphWindow(self.analyzer, self)
         self.initUI()
         
         # ライダーとタイヤ情報の更新
         self.update_riders_and_tires()
         
+        # 設定変更の通知を購読（変更された設定に関係する部分のみ更新する）
+        self.config_manager.subscribe(self.on_num_sectors_changed, "app_settings", "num_sectors")
+        self.config_manager.subscribe(self.on_num_sectors_changed, "app_settings", "micro_sector_threshold")
+        self.config_manager.subscribe(self.on_item_settings_changed, "riders_settings")
+        self.config_manager.subscribe(self.on_item_settings_changed, "tires_settings")
+        self.config_manager.subscribe(self.on_normalization_changed, "app_settings", "normalize_conditions")
+        
+        # 自動保存ジャーナルの初期化（前回異常終了していた場合は復元を確認）
+        self.journal = EditJournal(self.config_manager.get_journal_path())
+        self.recover_from_journal()
+        self.data_input.set_journal(self.journal)
+        
+        # 未同期のジャーナルを定期的にディスクへ書き込む
+        self.journal_timer = QTimer(self)
+        self.journal_timer.timeout.connect(self.journal.sync)
+        self.journal_timer.start(1000)
+        
     def initUI(self):
         """UIの初期化"""
         self.setWindowTitle('RiderAnalyzer')
@@ -50,9 +102,16 @@ class MainWindow(QMainWindow):
         self.data_input = DataInputWidget(config_manager=self.config_manager)
         self.data_input.data_changed.connect(self.on_data_changed)
         self.data_input.analyze_requested.connect(self.on_analyze_requested)  # 新しい接続
+        self.data_input.edit_applied.connect(self.on_edit_applied)
+        self.data_input.lap_appended.connect(self.on_lap_appended)
         
         layout.addWidget(self.data_input)
         
+        # 絞り込みの条件式
+        self.filter_bar = FilterBar(self)
+        self.filter_bar.filter_changed.connect(self.on_filter_changed)
+        layout.addWidget(self.filter_bar)
+        
         # スプリッター（3つのウィジェットを垂直に分割）
         splitter = QSplitter(Qt.Vertical)
         
@@ -60,9 +119,16 @@ class MainWindow(QMainWindow):
         self.stats_table = StatisticsTableWidget(self.config_manager, parent=self)
         splitter.addWidget(self.stats_table)
         
-        # テーブルウィジェット
+        # テーブルウィジェットとリーダーボード（水平に分割）
+        lap_splitter = QSplitter(Qt.Horizontal)
         self.table_widget = LapDataTableWidget(parent=self)
-        splitter.addWidget(self.table_widget)
+        self.table_widget.similar_laps_requested.connect(self.show_similar_laps)
+        lap_splitter.addWidget(self.table_widget)
+        self.leaderboard_widget = LeaderboardWidget(self)
+        self.leaderboard_widget.lap_selected.connect(self.table_widget.select_lap)
+        lap_splitter.addWidget(self.leaderboard_widget)
+        lap_splitter.setSizes([800, 300])
+        splitter.addWidget(lap_splitter)
         
         # スプリッターの初期サイズ比を設定（グラフ:統計:テーブル = 4:2:4）
         splitter.setSizes([200, 400])
@@ -92,20 +158,68 @@ class MainWindow(QMainWindow):
         open_csv_action = file_menu.addAction('Open CSV')
         open_csv_action.triggered.connect(self.open_csv_file)
         
+        # セッションブラウザ
+        browser_action = file_menu.addAction('Session Browser...')
+        browser_action.triggered.connect(self.open_session_browser)
+        browser_action.setShortcut('Ctrl+O')
+        
+        # テレメトリ
+        self.import_telemetry_action = file_menu.addAction('Import Telemetry CSV...')
+        self.import_telemetry_action.triggered.connect(self.import_telemetry)
+        open_telemetry_action = file_menu.addAction('Open Telemetry...')
+        open_telemetry_action.triggered.connect(self.open_telemetry)
+        
         # ファイルを保存
         save_action = file_menu.addAction('Save')
-        save_action.triggered.connect(self.save_data_file)
+        self.save_action = save_action
+        save_action.triggered.connect(lambda: self.save_data_file())
         save_action.setShortcut('Ctrl+S')
         
+        # 絞り込んだラップをエクスポート
+        self.export_filtered_action = file_menu.addAction('Export Filtered Laps...')
+        self.export_filtered_action.triggered.connect(self.export_filtered_laps)
+        
         # 終了
         exit_action = file_menu.addAction('Exit')
         exit_action.triggered.connect(self.close)
         
+        # 編集メニュー
+        edit_menu = menubar.addMenu('Edit')
+        self.undo_action = edit_menu.addAction('Undo')
+        self.undo_action.triggered.connect(self.data_input.undo)
+        self.undo_action.setShortcut('Ctrl+Z')
+        self.redo_action = edit_menu.addAction('Redo')
+        self.redo_action.triggered.connect(self.data_input.redo)
+        self.redo_action.setShortcut('Ctrl+Y')
+        edit_menu.aboutToShow.connect(self.update_edit_actions)
+        
         # 設定メニュー
         settings_menu = menubar.addMenu('Settings')
         session_settings_action = settings_menu.addAction('Session Settings')
         session_settings_action.triggered.connect(self.open_settings_dialog)
         
+        # 解析メニュー
+        analysis_menu = menubar.addMenu('Analysis')
+        head_to_head_action = analysis_menu.addAction('Head-to-Head Comparison')
+        head_to_head_action.triggered.connect(self.show_head_to_head)
+        race_simulator_action = analysis_menu.addAction('Race Strategy Simulator...')
+        race_simulator_action.triggered.connect(self.show_race_simulator)
+        pivot_action = analysis_menu.addAction('Pivot Table...')
+        pivot_action.triggered.connect(self.show_pivot_table)
+        analysis_menu.addSeparator()
+        self.normalize_action = analysis_menu.addAction('Normalize Lap Times for Conditions')
+        self.normalize_action.setCheckable(True)
+        self.normalize_action.setChecked(bool(self.config_manager.get_setting("app_settings", "normalize_conditions")))
+        self.normalize_action.toggled.connect(
+            lambda checked: self.config_manager.update_setting("app_settings", "normalize_conditions", checked))
+        
+        # データベースメニュー
+        database_menu = menubar.addMenu('Database')
+        import_store_action = database_menu.addAction('Import Current Data to Lap Store')
+        import_store_action.triggered.connect(self.import_to_lap_store)
+        query_store_action = database_menu.addAction('Query Lap Store...')
+        query_store_action.triggered.connect(self.query_lap_store)
+        
         # ヘルプメニュー
         help_menu = menubar.addMenu('Help')
         
@@ -121,9 +235,10 @@ class MainWindow(QMainWindow):
             file_path, _ = QFileDialog.getOpenFileName(self, 'Open JSON file', '', 'JSON files (*.json)')
             if file_path:
                 try:
-                    data = self.data_loader.load_json(file_path)
+                    data = self.load_json_data(file_path)
                     if data and 'lap_data' in data:
                         self.on_data_loaded(data)
+                        self.current_file_path = file_path
                     else:
                         QMessageBox.warning(self, "Warning", "Invalid data format in JSON file")
                 except Exception as e:
@@ -141,6 +256,7 @@ class MainWindow(QMainWindow):
                     data = self.data_loader.load_csv(file_path)
                     if data and 'lap_data' in data:
                         self.on_data_loaded(data)
+                        self.current_file_path = file_path
                     else:
                         QMessageBox.warning(self, "Warning", "Invalid data format in CSV file")
                 except Exception as e:
@@ -148,6 +264,118 @@ class MainWindow(QMainWindow):
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Unexpected error: {str(e)}")
 
+    def open_session_browser(self):
+        """セッションブラウザを開く"""
+        try:
+            data_directory = self.config_manager.get_data_directory()
+            if self.session_catalog is None:
+                self.session_catalog = SessionCatalog(self.config_manager.get_session_catalog_path())
+                # 初回はインデックスを更新（変更のないファイルは再解析されない）
+                self.session_catalog.refresh([data_directory])
+        except Exception as e:
+            print(f"Error opening session catalog: {str(e)}")
+            QMessageBox.critical(self, "Error", f"Failed to open session catalog: {str(e)}")
+            return
+            
+        dialog = SessionBrowserDialog(self.session_catalog, data_directory, self)
+        dialog.open_requested.connect(self.open_session_file)
+        dialog.analyze_requested.connect(self.analyze_session_files)
+        dialog.exec_()
+
+    def load_json_data(self, file_path):
+        """JSONファイルを列指向データとしてストリーミングで読み込み、ラップデータに変換する
+
+        読み込み中のラップdictはバッチ単位でのみ保持します。作成した列指向データは
+        解析用に登録するため、解析時にラップデータから再変換しません。
+        """
+        result = self.data_loader.load_json_columnar(file_path)
+        laps = result['columns'].to_laps(self.analyzer.time_converter)
+        self.analyzer.set_lap_columns(laps, result['columns'])
+        return {'session_info': result['session_info'], 'lap_data': laps}
+
+    def load_session_file(self, file_path):
+        """拡張子に応じてJSONまたはCSVファイルを読み込む"""
+        if file_path.lower().endswith('.csv'):
+            return self.data_loader.load_csv(file_path)
+        return self.load_json_data(file_path)
+
+    def open_session_file(self, file_path):
+        """セッションブラウザで選択されたファイルを開く"""
+        try:
+            data = self.load_session_file(file_path)
+            if data and 'lap_data' in data:
+                self.on_data_loaded(data)
+                self.current_file_path = file_path
+            else:
+                QMessageBox.warning(self, "Warning", "Invalid data format in session file")
+        except Exception as e:
+            print(f"Error loading session file: {e}")
+            QMessageBox.critical(self, "Error", f"Failed to load session file: {str(e)}")
+
+    def analyze_session_files(self, file_paths):
+        """複数のセッションファイルを読み込み、まとめて解析する"""
+        # 以前のデータセットのキャッシュを破棄する（各セッションの読み込み時に登録する列指向データは残す）
+        self.analyzer.clear_cache()
+        lap_data = []
+        sessions = []
+        failed = []
+        for file_path in file_paths:
+            try:
+                data = self.load_session_file(file_path)
+                sessions.append(data.get('lap_data', []))
+                lap_data.extend(sessions[-1])
+            except Exception as e:
+                print(f"Error loading session file {file_path}: {e}")
+                failed.append(os.path.basename(file_path))
+                
+        if failed:
+            QMessageBox.warning(self, "Warning", "Failed to load:\n" + "\n".join(failed))
+        if not lap_data:
+            return
+            
+        self.current_file_path = None
+        self.session_info = None
+        # パーセンタイルのスケッチはセッションごとに作成してマージする
+        self.analyzer.merge_session_sketches(sessions, lap_data)
+        self.data_input.update_data(lap_data, None)
+        self.on_analyze_requested(lap_data)
+
+    def recover_from_journal(self):
+        """前回の自動保存ジャーナルからデータを復元する"""
+        if not self.journal.has_recovery():
+            return
+            
+        try:
+            laps = self.journal.recover()
+        except Exception as e:
+            print(f"Error recovering from journal: {str(e)}")
+            self.journal.close(discard=True)
+            return
+            
+        if not laps:
+            self.journal.close(discard=True)
+            return
+            
+        reply = QMessageBox.question(
+            self, 'データの復元',
+            f'前回のセッションが正常に終了しませんでした。\n'
+            f'保存されていない {len(laps)} 件のラップデータを復元しますか？',
+            QMessageBox.Yes | QMessageBox.No, QMessageBox.Yes
+        )
+        if reply == QMessageBox.Yes:
+            self.analyzer.start_dataset(laps)
+            self.data_input.update_data(laps, None)
+            self.show_laps(laps)
+            # 復元したデータはファイルに保存されていないため、すぐにスナップショットとして保存し直す
+            self.journal.checkpoint(laps)
+        else:
+            self.journal.close(discard=True)
+
+    def update_edit_actions(self):
+        """元に戻す・やり直しメニューの有効状態を更新する"""
+        self.undo_action.setEnabled(self.data_input.undo_stack.can_undo())
+        self.redo_action.setEnabled(self.data_input.undo_stack.can_redo())
+
     def open_settings_dialog(self):
         """セッション設定ダイアログを開く"""
         dialog = SettingsDialog(self)
@@ -160,12 +388,21 @@ class MainWindow(QMainWindow):
             if not data or 'lap_data' not in data:
                 return
 
+            # 以前のデータセットのキャッシュと、ラップデータのリストへの参照を破棄する
+            self.analyzer.start_dataset(data['lap_data'])
+
             # 解析モードをリセット
             self.analysis_mode = False
+            self.analysis_results = None
+            self.moving_stats = None
+            self.confidence_intervals = None
+            self.consistency = None
+            self.current_file_path = None
+            self.session_info = data.get('session_info') or None
 
             # 解析なしで各ウィジェットを更新
             self.data_input.update_data(data['lap_data'], None)
-            self.table_widget.update_data(data['lap_data'], None)
+            self.show_laps(data['lap_data'])
             # グラフ更新は行わない
             
             # 解析が必要な旨を通知
@@ -174,17 +411,30 @@ class MainWindow(QMainWindow):
             print(f"Error processing data: {str(e)}")
             QMessageBox.critical(self, "Error", f"Failed to process data: {str(e)}")
 
-    def on_data_changed(self, data):
-        """データが変更されたときの処理"""
+    def on_data_changed(self, data, appended=False):
+        """データが変更されたときの処理
+
+        Args:
+            data: 変更後のラップデータ
+            appended: 末尾にラップが追加されただけの場合はTrue（リーダーボードとテーブルは差分で更新する）
+        """
         try:
             if not data:
                 return
             
+            # ラップデータはその場で変更されるため、以前の内容に対するキャッシュを使わないようにする
+            self.analyzer.mark_modified(data)
+            
             # データが変更されたら解析モードをOFFに
             self.analysis_mode = False
+            self.analysis_results = None
+            self.moving_stats = None
+            self.confidence_intervals = None
             
-            # 解析なしでテーブルデータのみ更新
-            self.table_widget.update_data(data, None)
+            # 解析なしでリーダーボードとテーブルデータ、安定性のスコアのみ更新
+            self.show_laps(data, appended)
+            self.refresh_quantile_sketches(data, appended)
+            self.refresh_consistency(data, appended)
             # グラフは更新しない
             
             # 解析が必要であることを通知
@@ -193,65 +443,400 @@ class MainWindow(QMainWindow):
             print(f"Error updating data: {str(e)}")
             QMessageBox.critical(self, "Error", f"Failed to update data: {str(e)}")
 
+    def on_lap_appended(self, data):
+        """ラップが末尾に追加されたときの処理（ライブ計測など）"""
+        self.on_data_changed(data, appended=True)
+
+    def show_laps(self, data, appended=False):
+        """解析なしでリーダーボードとテーブルを更新する
+
+        絞り込み中でなければ、末尾に追加されたラップはテーブルに1行追加するだけで反映します。
+        """
+        self.refresh_leaderboard(data, appended)
+        if appended and not self.filter_expression:
+            self.table_widget.append_lap(data, self.leaderboard)
+        else:
+            self.table_widget.update_data(data, None, self.leaderboard, self.get_filter_mask(data))
+        self.update_filter_status(data)
+
+    def refresh_leaderboard(self, data, appended=False, rows=None):
+        """リーダーボードを更新してパネルに反映する
+
+        前回と同じラップデータの末尾にラップが追加された場合は、追加されたラップのみを取り込みます。
+        セルが編集された場合は、rowsに編集された行を指定するとその行のみを置き換えます。
+        絞り込み中は条件に一致するラップのみで作成します。
+        """
+        if appended and data is self.leaderboard_laps:
+            self.leaderboard = self.analyzer.append_to_leaderboard(
+                data, self.leaderboard, self.filter_expression)
+        elif rows is not None and data is self.leaderboard_laps and not self.filter_expression:
+            self.leaderboard = self.analyzer.update_leaderboard(data, self.leaderboard, rows)
+        else:
+            self.leaderboard = self.analyzer.get_leaderboard(data, self.filter_expression) if data else None
+        self.leaderboard_laps = data
+        self.leaderboard_widget.set_leaderboard(self.leaderboard, data)
+
+    def analysis_laps(self, data):
+        """解析に使うラップデータ（条件補正と絞り込みを適用したもの）"""
+        return self.analyzer.filter_laps(self.analyzer.prepare_laps(data), self.filter_expression)
+
+    def refresh_consistency(self, data, appended=False, riders=None):
+        """安定性のスコアを更新して統計テーブルに反映する（解析後のみ）
+
+        末尾にラップが追加された場合は、追加されたラップのみを取り込みます。セルが編集された場合は、
+        ridersに変更されたライダーを指定するとそのライダーのみ計算し直します。条件補正や絞り込みでは
+        他のラップの結果が変わりうるため作り直します。
+        """
+        if self.consistency is None or not data:
+            return
+        incremental = not self.filter_expression and \
+            not self.config_manager.get_setting("app_settings", "normalize_conditions")
+        if appended and incremental:
+            self.consistency = self.analyzer.append_to_consistency(data, self.consistency)
+        elif riders is not None and incremental:
+            self.consistency = self.analyzer.update_consistency(data, self.consistency, riders)
+        else:
+            self.consistency = self.analyzer.get_consistency_scores(self.analysis_laps(data))
+        self.stats_table.set_consistency_scores(self.consistency)
+
+    def refresh_quantile_sketches(self, data, appended=False, riders=None):
+        """パーセンタイルのスケッチを更新する（解析後のみ）
+
+        更新の仕方は refresh_consistency と同じで、追加されたラップは1件ずつスケッチに取り込みます。
+        統計テーブルの再表示は、続けて呼び出す refresh_consistency 等で行います。
+        """
+        sketches = self.stats_table.quantile_sketches
+        if sketches is None or not data:
+            return
+        incremental = not self.filter_expression and \
+            not self.config_manager.get_setting("app_settings", "normalize_conditions")
+        if appended and incremental:
+            sketches = self.analyzer.append_to_quantile_sketches(data, sketches)
+        elif riders is not None and incremental:
+            sketches = self.analyzer.update_quantile_sketches(data, sketches, riders)
+        else:
+            sketches = self.analyzer.get_quantile_sketches(self.analysis_laps(data))
+        self.stats_table.set_quantile_sketches(sketches, refresh=False)
+
+    def get_filter_mask(self, data):
+        """絞り込みの条件に一致するラップのマスク（絞り込み中でない場合はNone）"""
+        if not self.filter_expression or not data:
+            return None
+        return self.analyzer.get_filter_mask(data, self.filter_expression)
+
+    def update_filter_status(self, data):
+        """条件に一致したラップ数を表示する"""
+        mask = self.get_filter_mask(data)
+        if mask is None:
+            self.filter_bar.set_status("")
+        else:
+            self.filter_bar.set_status(f"{int(mask.sum())} / {len(mask)} laps")
+
+    def on_filter_changed(self, expression):
+        """絞り込みの条件式が適用・解除されたときの処理（解析モード中は絞り込んだラップで再解析する）"""
+        data = self.data_input.lap_data
+        try:
+            # 構文や項目名の誤りは適用前に検出し、直前の条件式を維持する
+            compile_filter(expression)
+            if data:
+                self.analyzer.get_filter_mask(data, expression)
+        except ValueError as e:
+            self.filter_bar.set_status(str(e), error=True)
+            return
+
+        self.filter_expression = expression
+        try:
+            if self.analysis_mode and data:
+                self.run_analysis(data)
+            else:
+                self.show_laps(data or [])
+        except Exception as e:
+            print(f"Error applying filter: {str(e)}")
+            QMessageBox.critical(self, "Error", f"Failed to apply filter: {str(e)}")
+
     def on_analyze_requested(self, data):
         """データ解析リクエスト時の処理"""
         if not data:
             return
         
         try:
-            # 解析モードをONに
-            self.analysis_mode = True
-            
-            # 分析結果を取得
-            analysis_results = self.analyzer.analyze_laps(data)
-            
-            # 各ウィジェットに分析結果を反映
-            self.table_widget.update_data(data, analysis_results)
-            self.graph_window.update_data(data, analysis_results)
+            self.run_analysis(data)
             self.graph_window.show()  # グラフウィンドウを表示
             
-            # 移動平均統計の計算
-            moving_stats = self.analyzer.calculate_moving_statistics(data)
-            self.stats_table.update_statistics(moving_stats)
-            
             QMessageBox.information(self, "Information", "Analysis completed successfully.")
         except Exception as e:
             print(f"Error analyzing data: {str(e)}")
             QMessageBox.critical(self, "Error", f"Failed to analyze data: {str(e)}")
 
-    def on_settings_updated(self, settings):
-        """設定が更新されたときの処理"""
-        # 設定変更前のセクター数を取得
-        old_num_sectors = getattr(self, '_cached_num_sectors', None)
-        if old_num_sectors is None:
-            # 初回実行時はキャッシュがないので現在の値を使用
-            old_num_sectors = self.config_manager.get_num_sectors()
-            self._cached_num_sectors = old_num_sectors
-            
-        # 現在のセクター数を取得
-        current_num_sectors = self.config_manager.get_num_sectors()
+    def run_analysis(self, data):
+        """データを解析して各ウィジェットに反映する"""
+        # 解析モードをONに
+        self.analysis_mode = True
         
-        # 設定変更を保存
-        self.config_manager.save_config()
+        # 条件補正が有効な場合は補正後のタイムで解析する
+        data = self.analyzer.prepare_laps(data)
+        # 絞り込み中は条件に一致するラップのみで解析する（テーブルは全ラップをマスクで絞り込んで表示する）
+        filtered = self.analyzer.filter_laps(data, self.filter_expression)
         
-        # ライダーとタイヤ情報の更新
-        self.update_riders_and_tires()
+        # 分析結果を取得
+        analysis_results = self.analyzer.analyze_laps(filtered)
+        self.analysis_results = analysis_results
         
-        # グラフウィンドウが存在する場合は更新
-        if self.graph_window:
-            self.graph_window.graph_widget.update_graph()
+        # 各ウィジェットに分析結果を反映
+        self.refresh_leaderboard(data)
+        self.table_widget.update_data(data, analysis_results, self.leaderboard, self.get_filter_mask(data))
+        self.update_filter_status(data)
+        self.graph_window.update_data(filtered, analysis_results)
         
-        # セクター数が変更された場合はメッセージを表示
-        if old_num_sectors != current_num_sectors:
-            QMessageBox.information(
-                self,
-                "セクター数の変更",
-                f"セクター数が{old_num_sectors}から{current_num_sectors}に変更されました。\n"
-                "この変更を完全に適用するには、アプリケーションの再起動が必要です。\n"
-                "再起動後、テーブルやグラフに新しいセクター数が正しく反映されます。"
-            )
-            # 新しいセクター数をキャッシュ
-            self._cached_num_sectors = current_num_sectors
+        # 移動平均統計の計算
+        moving_stats = self.analyzer.calculate_moving_statistics(filtered)
+        self.moving_stats = moving_stats
+        self.confidence_intervals = self.analyzer.get_bootstrap_intervals(filtered)
+        self.stats_table.set_confidence_intervals(self.confidence_intervals, refresh=False)
+        self.stats_table.set_quantile_sketches(self.analyzer.get_quantile_sketches(filtered), refresh=False)
+        self.consistency = self.analyzer.get_consistency_scores(filtered)
+        self.stats_table.set_consistency_scores(self.consistency, refresh=False)
+        self.stats_table.update_statistics(moving_stats)
+
+    def on_edit_applied(self, data, rows, riders):
+        """セルの編集（元に戻す・やり直しを含む）が行われたときの処理
+
+        解析モード中は変更されたライダーのみ再解析し、列指向データ・リーダーボード・スコアは変更された行と
+        ライダーの分のみ更新します。テーブルは変更された行のみ更新します。
+        """
+        try:
+            self.analyzer.mark_modified(data, rows)
+            if self.analysis_mode and (self.filter_expression or
+                                       self.config_manager.get_setting("app_settings", "normalize_conditions")):
+                # 条件の効果は全ラップから推定し直し、絞り込みの結果も編集で変わりうるため、全体を再解析する
+                self.run_analysis(data)
+                self.statusBar().showMessage("編集内容を解析結果に反映しました。", 3000)
+            elif self.analysis_mode and self.analysis_results is not None:
+                self.analysis_results = self.analyzer.update_analysis(data, self.analysis_results, riders)
+                self.moving_stats = self.analyzer.update_moving_statistics(data, self.moving_stats, riders)
+                # 信頼区間はグラフの更新より先に差分で計算し直す（グラフはキャッシュから取得する）
+                self.confidence_intervals = self.analyzer.update_bootstrap_intervals(
+                    data, self.confidence_intervals, riders)
+                self.refresh_leaderboard(data, rows=rows)
+                for row in rows:
+                    self.table_widget.update_lap_row(row, self.analysis_results, self.leaderboard)
+                # グラフは表示中のみ描画し直す（非表示の場合は次に表示するときに反映する）
+                self.graph_window.refresh_data(data, self.analysis_results)
+                self.stats_table.set_confidence_intervals(self.confidence_intervals, refresh=False)
+                self.refresh_quantile_sketches(data, riders=riders)
+                self.consistency = self.analyzer.update_consistency(data, self.consistency, riders)
+                self.stats_table.set_consistency_scores(self.consistency, refresh=False)
+                self.stats_table.update_statistics(self.moving_stats)
+                self.statusBar().showMessage("編集内容を解析結果に反映しました。", 3000)
+            elif self.filter_expression:
+                # 編集で条件に一致するラップが変わりうるため、テーブルは絞り込み直す
+                self.show_laps(data)
+                self.refresh_quantile_sketches(data)
+                self.refresh_consistency(data)
+                self.statusBar().showMessage("データが変更されました。解析するには'Analyze Data'ボタンをクリックしてください。", 5000)
+            else:
+                self.refresh_leaderboard(data, rows=rows)
+                for row in rows:
+                    self.table_widget.update_lap_row(row, leaderboard=self.leaderboard)
+                self.refresh_quantile_sketches(data, riders=riders)
+                self.refresh_consistency(data, riders=riders)
+                self.statusBar().showMessage("データが変更されました。解析するには'Analyze Data'ボタンをクリックしてください。", 5000)
+        except Exception as e:
+            print(f"Error applying edit: {str(e)}")
+            QMessageBox.critical(self, "Error", f"Failed to apply edit: {str(e)}")
+
+    def on_settings_updated(self, settings):
+        """設定が更新されたときの処理
+
+        各ウィジェットへの反映は設定の変更通知で行うため、ここでは保存のみ行います。
+        """
+        self.config_manager.save_config()
+
+    def on_num_sectors_changed(self, event):
+        """セクター数・ミニセクターの閾値が変更されたときの処理（再起動せずに列と解析結果を作り直す）"""
+        try:
+            data = self.data_input.lap_data
+            self.data_input.configure_columns()
+            self.data_input.update_table()
+            self.table_widget.configure_columns()
+            self.stats_table.configure_columns()
+            if self.analysis_mode and data:
+                self.run_analysis(data)
+            else:
+                self.show_laps(data or [])
+            if event.key == "num_sectors":
+                self.statusBar().showMessage(
+                    f"セクター数を{event.old_value}から{event.new_value}に変更しました。", 5000)
+        except Exception as e:
+            print(f"Error applying sector count: {str(e)}")
+            QMessageBox.critical(self, "Error", f"Failed to apply sector count: {str(e)}")
+
+    def on_normalization_changed(self, event):
+        """条件補正の有効・無効が切り替えられたときの処理（解析モード中は再解析する）"""
+        try:
+            if self.normalize_action.isChecked() != bool(event.new_value):
+                self.normalize_action.setChecked(bool(event.new_value))
+            data = self.data_input.lap_data
+            if not (self.analysis_mode and data):
+                return
+            self.run_analysis(data)
+            model = self.analyzer.get_condition_model(data) if event.new_value else None
+            if model is not None:
+                effects = ", ".join(f"{name} {effect:+.3f}s" for name, effect in model.summary())
+                self.statusBar().showMessage(f"条件補正: {effects or '補正する条件がありません'}", 10000)
+            else:
+                self.statusBar().showMessage("補正前のタイムで再解析しました。", 5000)
+        except Exception as e:
+            print(f"Error applying condition normalization: {str(e)}")
+            QMessageBox.critical(self, "Error", f"Failed to apply condition normalization: {str(e)}")
+
+    def on_item_settings_changed(self, event):
+        """ライダー・タイヤの設定が変更されたときの処理"""
+        self.update_riders_and_tires()
+
+    def show_head_to_head(self):
+        """ライダー間の総当たり比較ダイアログを表示"""
+        data = self.data_input.lap_data
+        if not data:
+            QMessageBox.warning(self, "Warning", "No data to compare.")
+            return
+            
+        matrix = self.analyzer.compare_riders(self.analysis_laps(data))
+        if matrix is None:
+            QMessageBox.warning(self, "Warning", "Failed to build comparison matrix.")
+            return
+            
+        dialog = HeadToHeadDialog(matrix, self)
+        dialog.exec_()
+
+    def show_race_simulator(self):
+        """読み込んだラップからタイヤ戦略のシミュレーションダイアログを表示"""
+        data = self.data_input.lap_data
+        if not data:
+            QMessageBox.warning(self, "Warning", "No data to simulate.")
+            return
+
+        columns = self.analyzer.get_lap_columns(self.analyzer.filter_laps(data, self.filter_expression))
+        model = fit_race_model(columns)
+        if not model.riders:
+            QMessageBox.warning(self, "Warning", "Not enough valid laps to build a lap-time model.")
+            return
+
+        # 既定のレース周回数は読み込んだラップの最大ラップ番号
+        race_laps = int(columns.lap_numbers.max()) if len(columns) else 20
+        dialog = RaceSimulatorDialog(model, race_laps, self)
+        dialog.exec_()
+
+    def show_pivot_table(self):
+        """ライダー・タイヤ・条件などの組み合わせごとの集計ダイアログを表示"""
+        data = self.data_input.lap_data
+        if not data:
+            QMessageBox.warning(self, "Warning", "No data to aggregate.")
+            return
+
+        dialog = PivotDialog(self.analyzer, self.analysis_laps(data), self)
+        dialog.exec_()
+
+    def show_similar_laps(self, lap_index):
+        """選択したラップに似たラップの検索ダイアログを表示"""
+        data = self.table_widget.lap_data
+        if not data or not 0 <= lap_index < len(data):
+            return
+        try:
+            dialog = SimilarLapsDialog(self.analyzer, data, lap_index, self)
+            dialog.lap_selected.connect(self.table_widget.select_lap)
+            dialog.exec_()
+        except Exception as e:
+            print(f"Error searching similar laps: {e}")
+            QMessageBox.critical(self, "Error", f"Failed to search similar laps: {str(e)}")
+
+    def get_lap_store(self):
+        """ラップストアを取得する（初回アクセス時に開く）"""
+        if self.lap_store is None:
+            self.lap_store = LapStore(self.config_manager.get_lap_store_path())
+        return self.lap_store
+
+    def import_to_lap_store(self):
+        """現在のデータをラップストアに取り込む"""
+        data = self.data_input.lap_data
+        if not data:
+            QMessageBox.warning(self, "Warning", "No data to import.")
+            return
+            
+        try:
+            session_info = self.session_info or self.config_manager.get_session_settings()
+            columns = self.analyzer.get_lap_columns(data)
+            session_id = self.get_lap_store().import_session(session_info, columns, self.current_file_path)
+            self.statusBar().showMessage(
+                f"Imported {int(columns.valid.sum())} laps into lap store (session {session_id}).", 5000)
+        except Exception as e:
+            print(f"Error importing to lap store: {str(e)}")
+            QMessageBox.critical(self, "Error", f"Failed to import data: {str(e)}")
+
+    def query_lap_store(self):
+        """ラップストアを検索して結果を読み込む"""
+        try:
+            dialog = LapStoreQueryDialog(self.get_lap_store(), self)
+        except Exception as e:
+            print(f"Error opening lap store: {str(e)}")
+            QMessageBox.critical(self, "Error", f"Failed to open lap store: {str(e)}")
+            return
+            
+        if dialog.exec_() and dialog.result_columns is not None:
+            self.on_data_loaded({'session_info': {}, 'lap_data': dialog.result_columns.to_laps()})
+
+    def import_telemetry(self):
+        """データロガーのCSVログをテレメトリストアに取り込んで開く"""
+        file_path, _ = QFileDialog.getOpenFileName(self, "Import Telemetry CSV", "", "CSV Files (*.csv)")
+        if not file_path:
+            return
+            
+        name = os.path.splitext(os.path.basename(file_path))[0]
+        store_path = os.path.join(self.config_manager.get_telemetry_directory(), f"{name}.telemetry")
+        sample_rate = self.config_manager.get_setting("app_settings", "telemetry_sample_rate") or 100
+        self.statusBar().showMessage("テレメトリを取り込んでいます...")
+        # 取り込みはCSVを2回読むため、GUIスレッドをブロックしないようにバックグラウンドで行う
+        self.telemetry_worker = TelemetryImportWorker(file_path, store_path, float(sample_rate))
+        self.telemetry_worker.finished.connect(self.on_telemetry_imported)
+        self.telemetry_thread = start_save_worker(self.telemetry_worker, self)
+        self.import_telemetry_action.setEnabled(False)
+
+    def on_telemetry_imported(self, store, error):
+        """テレメトリの取り込みが完了したときの処理（GUIスレッドで呼ばれる）"""
+        self.telemetry_thread = None
+        self.telemetry_worker = None
+        self.import_telemetry_action.setEnabled(True)
+        if store is None:
+            QMessageBox.critical(self, "Error", f"Failed to import telemetry: {error}")
+            self.statusBar().clearMessage()
+            return
+        self.set_telemetry_store(store)
+
+    def open_telemetry(self):
+        """取り込み済みのテレメトリストアを開く"""
+        store_path = QFileDialog.getExistingDirectory(
+            self, "Open Telemetry", self.config_manager.get_telemetry_directory())
+        if not store_path:
+            return
+            
+        try:
+            store = TelemetryStore(store_path)
+        except Exception as e:
+            print(f"Error opening telemetry: {str(e)}")
+            QMessageBox.critical(self, "Error", f"Failed to open telemetry: {str(e)}")
+            return
+        self.set_telemetry_store(store)
+
+    def set_telemetry_store(self, store):
+        """テレメトリストアを切り替え、読み込み中のラップとの対応付けを表示する"""
+        if self.telemetry_store is not None:
+            self.telemetry_store.close()
+        self.telemetry_store = store
+        self.graph_window.graph_widget.set_telemetry_store(store)
+        linked = len(store.link_laps(self.data_input.lap_data or []))
+        self.statusBar().showMessage(
+            f"Telemetry: {len(store.laps)} laps, {len(store.channels)} channels "
+            f"({store.duration / 60:.1f} min), {linked} laps linked to lap data.", 5000)
 
     def update_riders_and_tires(self):
         """ライダーとタイヤの情報を更新する"""
@@ -315,10 +900,24 @@ class MainWindow(QMainWindow):
             '</ul>'
         )
 
-    def save_data_file(self):
-        """ファイルを保存する"""
+    def export_filtered_laps(self):
+        """絞り込みの条件に一致するラップのみを保存する"""
+        self.save_data_file(filtered=True)
+
+    def save_data_file(self, filtered=False):
+        """ファイルを保存する
+
+        Args:
+            filtered: Trueの場合は絞り込みの条件に一致するラップのみを保存する
+        """
         # データ入力ウィジェットからデータを取得
         data = self.data_input.lap_data
+        if filtered and data:
+            try:
+                data = self.analyzer.filter_laps(data, self.filter_expression)
+            except ValueError as e:
+                QMessageBox.critical(self, "エラー", f"絞り込みの条件式が正しくありません: {str(e)}")
+                return
         
         if not data:
             QMessageBox.warning(self, "警告", "保存するデータがありません。")
@@ -326,7 +925,7 @@ class MainWindow(QMainWindow):
             
         # 保存ファイル名を取得
         file_path, _ = QFileDialog.getSaveFileName(
-            self, 'ファイルを保存', '', 'データファイル (*)'
+            self, '絞り込んだラップをエクスポート' if filtered else 'ファイルを保存', '', 'データファイル (*)'
         )
         
         if not file_path:
@@ -344,11 +943,10 @@ class MainWindow(QMainWindow):
             raw_session_data = self.config_manager.get_setting("session", "settings")
             print(f"Debug - MainWindow - Raw session data: {raw_session_data}")
             
-            # JSONファイルとして保存
+            # JSONファイルのパス
             json_file_path = file_base + '.json'
-            json_saved = self.save_as_json(data, json_file_path, session_info)
             
-            # CSVファイルとして保存 - 設定から直接トラック名と日付を取得
+            # CSVファイルのパス - 設定から直接トラック名と日付を取得
             track = ""
             date = ""
             
@@ -374,57 +972,100 @@ class MainWindow(QMainWindow):
                 print(f"Debug - MainWindow - Using base filename (no track/date)")
                 
             print(f"Debug - MainWindow - CSV Filename: {csv_file_name}")
-            csv_saved = self.save_as_csv(data, csv_file_name)
             
-            if json_saved and csv_saved:
-                QMessageBox.information(
-                    self, 
-                    "情報", 
-                    f"データを保存しました。\nJSON: {json_file_path}\nCSV: {csv_file_name}"
-                )
-            elif json_saved:
-                QMessageBox.information(
-                    self, 
-                    "情報", 
-                    f"JSONデータのみ保存しました。\nJSON: {json_file_path}"
-                )
-            elif csv_saved:
-                QMessageBox.information(
-                    self, 
-                    "情報", 
-                    f"CSVデータのみ保存しました。\nCSV: {csv_file_name}"
-                )
+            # JSONとCSVをバックグラウンドで並行して保存（保存中の編集の影響を受けないようにコピーする）
+            # 列指向データは元のラップデータに対するキャッシュを使う（編集時は新しい列指向データに置き換わる）
+            columns = self.analyzer.get_lap_columns(data)
+            laps = [dict(lap) for lap in data]
+            writer = SessionWriter(self.config_manager.get_num_sectors())
+            self.save_worker = SaveWorker(writer, laps, columns, session_info, json_file_path, csv_file_name)
+            self.save_worker.progress.connect(self.on_save_progress)
+            self.save_worker.finished.connect(self.on_save_finished)
+            self.save_action.setEnabled(False)
+            self.export_filtered_action.setEnabled(False)
+            self.save_journal_seq = None if filtered else self.journal.seq
+            self.save_thread = start_save_worker(self.save_worker, self)
         except Exception as e:
             print(f"Error saving data: {str(e)}")
             QMessageBox.critical(self, "エラー", f"データの保存に失敗しました: {str(e)}")
             
-    def save_as_json(self, data, file_path, session_info=None):
-        """データをJSON形式で保存"""
-        try:
-            # データをDataLoaderを使って保存
-            formatted_data = {
-                "session_info": session_info or {},
-                "lap_data": self.data_loader._format_data_for_json(data)
-            }
-            
-            # ファイルに保存
-            self.data_loader.save_json(file_path, formatted_data)
-            return True
-        except ValueError as e:
-            QMessageBox.critical(self, "エラー", f"JSONファイルの保存に失敗しました: {str(e)}")
-            return False
+    def on_save_progress(self, percent, message):
+        """保存の進捗を表示する"""
+        self.statusBar().showMessage(f"保存中... {message} ({percent}%)")
         
-    def save_as_csv(self, data, file_path):
-        """データをCSV形式で保存"""
-        try:
-            # データをCSV形式に整形
-            formatted_data = {
-                'lap_data': data  # データローダーがこの形式を期待
-            }
+    def on_save_finished(self, result):
+        """保存完了時の処理"""
+        self.save_thread = None
+        self.save_worker = None
+        self.save_action.setEnabled(True)
+        self.export_filtered_action.setEnabled(True)
+        self.statusBar().clearMessage()
+        
+        errors = result.get('errors', {})
+        if result.get('json') and self.save_journal_seq is not None:
+            # 保存開始までの編集はファイルに保存された
+            self.journal.mark_saved(self.save_journal_seq)
+        self.save_journal_seq = None
+        if 'json' in errors:
+            QMessageBox.critical(self, "エラー", f"JSONファイルの保存に失敗しました: {errors['json']}")
+        if 'csv' in errors:
+            QMessageBox.critical(self, "エラー", f"CSVファイルの保存に失敗しました: {errors['csv']}")
+        if 'save' in errors:
+            QMessageBox.critical(self, "エラー", f"データの保存に失敗しました: {errors['save']}")
             
-            # ファイルに保存
-            self.data_loader.save_csv(file_path, formatted_data)
-        except ValueError as e:
-            QMessageBox.critical(self, "エラー", f"CSVファイルの保存に失敗しました: {str(e)}")
-            return False
-        return True
\ No newline at end of file
+        json_file_path = result.get('json')
+        csv_file_name = result.get('csv')
+        if json_file_path and csv_file_name:
+            QMessageBox.information(
+                self, 
+                "情報", 
+                f"データを保存しました。\nJSON: {json_file_path}\nCSV: {csv_file_name}"
+            )
+        elif json_file_path:
+            QMessageBox.information(
+                self, 
+                "情報", 
+                f"JSONデータのみ保存しました。\nJSON: {json_file_path}"
+            )
+        elif csv_file_name:
+            QMessageBox.information(
+                self, 
+                "情報", 
+                f"CSVデータのみ保存しました。\nCSV: {csv_file_name}"
+            )
+            
+    def closeEvent(self, event):
+        """ウィンドウを閉じる前に実行中の保存・テレメトリの取り込みの完了を待ち、未保存の設定を書き出す
+
+        保存されていない編集がある場合は、破棄してよいか確認します。
+        """
+        if self.save_thread is not None:
+            self.statusBar().showMessage("保存の完了を待っています...")
+            self.save_thread.wait()
+            # 完了通知（on_save_finished）を処理し、保存された編集を反映する
+            QApplication.processEvents()
+        if self.telemetry_thread is not None:
+            # 取り込み中のストアの一時ファイルを書き終えてから閉じる
+            self.statusBar().showMessage("テレメトリの取り込みの完了を待っています...")
+            self.telemetry_thread.wait()
+            QApplication.processEvents()
+        if self.journal.has_unsaved_edits():
+            reply = QMessageBox.question(
+                self, '未保存の編集',
+                '保存されていない編集があります。保存しますか？',
+                QMessageBox.Save | QMessageBox.Discard | QMessageBox.Cancel, QMessageBox.Save
+            )
+            if reply == QMessageBox.Save:
+                # 保存はバックグラウンドで行うため、完了後に改めて閉じてもらう
+                self.save_data_file()
+                event.ignore()
+                return
+            if reply != QMessageBox.Discard:
+                event.ignore()
+                return
+        # 正常終了時は自動保存ジャーナルを破棄する
+        self.journal_timer.stop()
+        self.journal.close(discard=True)
+        # 保存待ちの設定変更を書き出す
+        self.config_manager.flush()
+        super().closeEvent(event)
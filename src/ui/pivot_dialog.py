@@ -0,0 +1,135 @@
+"""
+Pivot Dialog Module
+ライダー・タイヤ・天候・路面温度帯・セッション・スティントの組み合わせごとに
+ラップタイムを集計したピボットテーブルを表示するダイアログを提供します。
+"""
+import time
+
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QCheckBox, QDoubleSpinBox,
+                             QTableWidget, QTableWidgetItem, QHeaderView)
+from PyQt5.QtCore import Qt
+
+from app.pivot import (GROUP_KEYS, AGGREGATIONS, DEFAULT_TEMP_BIN, RIDER, TIRE, TEMP_BIN,
+                       STD, COUNT)
+from ui.table_items import TimeStatItem, StdDevStatItem
+
+
+class PivotDialog(QDialog):
+    """項目の組み合わせごとのラップタイムの集計を表示するダイアログ"""
+
+    KEY_LABELS = {'Rider': 'Rider', 'TireType': 'Tire', 'Weather': 'Weather',
+                  'TrackTemp': 'Track Temp', 'Session': 'Session', 'Stint': 'Stint'}
+    AGGREGATION_LABELS = {'min': 'Best', 'mean': 'Mean', 'median': 'Median', 'std': 'Std Dev',
+                          'count': 'Laps', 'ideal': 'Ideal Lap'}
+
+    # テーブルに表示するグループの最大数（集計は全グループに対して行う）
+    MAX_ROWS = 5000
+
+    def __init__(self, analyzer, laps, parent=None):
+        super().__init__(parent)
+        self.analyzer = analyzer
+        self.laps = laps
+        self.setWindowTitle("Pivot Table")
+        self.resize(800, 500)
+        self.init_ui()
+        self.refresh()
+
+    def init_ui(self):
+        """UIの初期化"""
+        layout = QVBoxLayout(self)
+
+        key_layout = QHBoxLayout()
+        key_layout.addWidget(QLabel("Group by:"))
+        self.key_checks = {}
+        for key in GROUP_KEYS:
+            check = QCheckBox(self.KEY_LABELS[key])
+            check.setChecked(key in (RIDER, TIRE))
+            check.toggled.connect(self.refresh)
+            key_layout.addWidget(check)
+            self.key_checks[key] = check
+        key_layout.addWidget(QLabel("Temp bin (°C):"))
+        self.temp_bin_spin = QDoubleSpinBox()
+        self.temp_bin_spin.setRange(0.5, 50.0)
+        self.temp_bin_spin.setSingleStep(0.5)
+        self.temp_bin_spin.setValue(DEFAULT_TEMP_BIN)
+        self.temp_bin_spin.valueChanged.connect(self.refresh)
+        key_layout.addWidget(self.temp_bin_spin)
+        key_layout.addStretch()
+        layout.addLayout(key_layout)
+
+        aggregation_layout = QHBoxLayout()
+        aggregation_layout.addWidget(QLabel("Show:"))
+        self.aggregation_checks = {}
+        for aggregation in AGGREGATIONS:
+            check = QCheckBox(self.AGGREGATION_LABELS[aggregation])
+            check.setChecked(True)
+            check.toggled.connect(self.refresh)
+            aggregation_layout.addWidget(check)
+            self.aggregation_checks[aggregation] = check
+        aggregation_layout.addStretch()
+        layout.addLayout(aggregation_layout)
+
+        self.table = QTableWidget(0, 0)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.table.verticalHeader().setVisible(False)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        layout.addWidget(self.table)
+
+        self.summary_label = QLabel("")
+        layout.addWidget(self.summary_label)
+
+    def selected_keys(self):
+        """選択中のグループ化の項目（GROUP_KEYSの順）"""
+        return [key for key in GROUP_KEYS if self.key_checks[key].isChecked()]
+
+    def selected_aggregations(self):
+        """選択中の集計の種類"""
+        return [aggregation for aggregation in AGGREGATIONS if self.aggregation_checks[aggregation].isChecked()]
+
+    def refresh(self):
+        """選択中の項目で集計して表示する"""
+        keys = self.selected_keys()
+        aggregations = self.selected_aggregations()
+        self.temp_bin_spin.setEnabled(TEMP_BIN in keys)
+
+        start = time.perf_counter()
+        pivot = self.analyzer.get_pivot(self.laps, keys, self.temp_bin_spin.value())
+        elapsed = (time.perf_counter() - start) * 1000
+
+        self.table.setSortingEnabled(False)
+        self.table.clear()
+        headers = [self.KEY_LABELS[key] for key in keys] + [self.AGGREGATION_LABELS[a] for a in aggregations]
+        self.table.setColumnCount(len(headers))
+        self.table.setHorizontalHeaderLabels(headers)
+        if pivot is None:
+            self.table.setRowCount(0)
+            self.summary_label.setText("No laps to aggregate.")
+            return
+
+        rows = min(len(pivot), self.MAX_ROWS)
+        self.table.setRowCount(rows)
+        for row in range(rows):
+            for col, label in enumerate(pivot.labels[row]):
+                self.table.setItem(row, col, QTableWidgetItem(label))
+            for col, aggregation in enumerate(aggregations, len(keys)):
+                self.table.setItem(row, col, self._value_item(aggregation, pivot.values[aggregation][row]))
+        self.table.setSortingEnabled(True)
+
+        message = f"{len(pivot)} groups from {len(self.laps)} laps in {elapsed:.1f} ms"
+        if len(pivot) > rows:
+            message += f" (showing first {rows})"
+        self.summary_label.setText(message)
+
+    @staticmethod
+    def _value_item(aggregation, value):
+        """集計値のテーブルアイテム（値がない場合は "--"）"""
+        if aggregation == COUNT:
+            item = QTableWidgetItem()
+            item.setData(Qt.DisplayRole, int(value))
+            item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+            return item
+        value = float(value) if value == value else 0.0
+        if aggregation == STD:
+            return StdDevStatItem(value)
+        return TimeStatItem(value)
@@ -0,0 +1,247 @@
+"""
+Race Simulator Dialog Module
+タイヤ戦略ごとのレースシミュレーションを設定・実行し、結果を表示するダイアログを提供します。
+"""
+import os
+
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QFormLayout, QLabel, QSpinBox,
+                             QDoubleSpinBox, QComboBox, QPushButton, QTableWidget, QTableWidgetItem,
+                             QHeaderView, QProgressBar, QMessageBox)
+from PyQt5.QtCore import QObject, QThread, Qt, pyqtSignal, pyqtSlot
+
+from app.race_simulator import RaceModel, Strategy, simulate_race
+
+
+class RaceSimulationWorker(QObject):
+    """simulate_raceをQThread上で実行するワーカー"""
+
+    # 進捗率(0-100), メッセージ
+    progress = pyqtSignal(int, str)
+    # 戦略ごとの結果のリスト（失敗した場合はNone）, エラーメッセージ
+    finished = pyqtSignal(object, str)
+
+    def __init__(self, model: RaceModel, strategies, options):
+        super().__init__()
+        self.model = model
+        self.strategies = strategies
+        self.options = options
+
+    @pyqtSlot()
+    def run(self):
+        """シミュレーションを実行する"""
+        try:
+            results = simulate_race(self.model, self.strategies, progress=self.progress.emit, **self.options)
+            self.finished.emit(results, "")
+        except Exception as e:
+            print(f"Error simulating race: {str(e)}")
+            self.finished.emit(None, str(e))
+
+
+class RaceSimulatorDialog(QDialog):
+    """タイヤ戦略のモンテカルロシミュレーションを行うダイアログ"""
+
+    ALL_RIDERS = "(All Riders)"
+    STRATEGY_HEADERS = ["Name", "Stints (TIRE:LAPS, ...)", "Pit Loss (s)"]
+    RESULT_HEADERS = ["Strategy", "Rider", "Mean Time", "P5", "Median", "P95",
+                      "Avg Pos", "Win %", "Podium %"]
+
+    def __init__(self, model: RaceModel, race_laps: int = 20, parent=None):
+        super().__init__(parent)
+        self.model = model
+        self.race_laps = max(2, race_laps)
+        self.thread = None
+        self.worker = None
+        self.setWindowTitle("Race Strategy Simulator")
+        self.resize(900, 650)
+        self.init_ui()
+
+    def init_ui(self):
+        """UIの初期化"""
+        layout = QVBoxLayout(self)
+
+        # 戦略（1行1戦略、既定では無交換と1回交換）
+        layout.addWidget(QLabel("Strategies:"))
+        self.strategy_table = QTableWidget(0, len(self.STRATEGY_HEADERS))
+        self.strategy_table.setHorizontalHeaderLabels(self.STRATEGY_HEADERS)
+        self.strategy_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
+        self.strategy_table.verticalHeader().setVisible(False)
+        tire = self.model.tires[0] if self.model.tires else "Default"
+        half = self.race_laps // 2
+        self.add_strategy(Strategy("No stop", [(tire, self.race_laps)]))
+        self.add_strategy(Strategy("One stop", [(tire, half), (tire, self.race_laps - half)]))
+        layout.addWidget(self.strategy_table)
+
+        strategy_buttons = QHBoxLayout()
+        add_button = QPushButton("Add Strategy")
+        add_button.clicked.connect(lambda: self.add_strategy(Strategy(f"Strategy {self.strategy_table.rowCount() + 1}",
+                                                                      [(tire, self.race_laps)])))
+        strategy_buttons.addWidget(add_button)
+        remove_button = QPushButton("Remove Strategy")
+        remove_button.clicked.connect(self.remove_strategy)
+        strategy_buttons.addWidget(remove_button)
+        strategy_buttons.addStretch()
+        layout.addLayout(strategy_buttons)
+
+        # シミュレーション条件
+        form = QFormLayout()
+        self.simulations_spin = QSpinBox()
+        self.simulations_spin.setRange(1000, 10000000)
+        self.simulations_spin.setSingleStep(100000)
+        self.simulations_spin.setValue(100000)
+        form.addRow("Simulations:", self.simulations_spin)
+        self.seed_spin = QSpinBox()
+        self.seed_spin.setRange(0, 2 ** 31 - 1)
+        self.seed_spin.setValue(1)
+        form.addRow("Seed:", self.seed_spin)
+        self.workers_spin = QSpinBox()
+        self.workers_spin.setRange(1, max(1, os.cpu_count() or 1))
+        self.workers_spin.setValue(self.workers_spin.maximum())
+        form.addRow("Worker Processes:", self.workers_spin)
+        self.focus_combo = QComboBox()
+        self.focus_combo.addItem(self.ALL_RIDERS)
+        self.focus_combo.addItems(self.model.riders)
+        form.addRow("Compare For Rider:", self.focus_combo)
+        self.baseline_combo = QComboBox()
+        form.addRow("Other Riders Use:", self.baseline_combo)
+        self.strategy_table.itemChanged.connect(self.update_baseline_choices)
+        self.update_baseline_choices()
+        layout.addLayout(form)
+
+        run_layout = QHBoxLayout()
+        self.run_button = QPushButton("Run Simulation")
+        self.run_button.clicked.connect(self.run_simulation)
+        run_layout.addWidget(self.run_button)
+        self.progress_bar = QProgressBar()
+        run_layout.addWidget(self.progress_bar, 1)
+        layout.addLayout(run_layout)
+
+        # 結果
+        self.result_table = QTableWidget(0, len(self.RESULT_HEADERS))
+        self.result_table.setHorizontalHeaderLabels(self.RESULT_HEADERS)
+        self.result_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.result_table.verticalHeader().setVisible(False)
+        self.result_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        layout.addWidget(self.result_table, 1)
+
+    def add_strategy(self, strategy: Strategy):
+        """戦略の行を追加する"""
+        row = self.strategy_table.rowCount()
+        self.strategy_table.insertRow(row)
+        self.strategy_table.setItem(row, 0, QTableWidgetItem(strategy.name))
+        self.strategy_table.setItem(row, 1, QTableWidgetItem(strategy.to_text()))
+        self.strategy_table.setItem(row, 2, QTableWidgetItem(f"{strategy.pit_loss:g}"))
+
+    def remove_strategy(self):
+        """選択中の戦略の行を削除する"""
+        row = self.strategy_table.currentRow()
+        if row >= 0 and self.strategy_table.rowCount() > 1:
+            self.strategy_table.removeRow(row)
+            self.update_baseline_choices()
+
+    def update_baseline_choices(self, *args):
+        """他のライダーが取る戦略の選択肢を戦略名に合わせる"""
+        if not hasattr(self, 'baseline_combo'):
+            return
+        current = self.baseline_combo.currentIndex()
+        self.baseline_combo.blockSignals(True)
+        self.baseline_combo.clear()
+        for row in range(self.strategy_table.rowCount()):
+            item = self.strategy_table.item(row, 0)
+            self.baseline_combo.addItem(item.text() if item else f"Strategy {row + 1}")
+        self.baseline_combo.setCurrentIndex(max(0, min(current, self.baseline_combo.count() - 1)))
+        self.baseline_combo.blockSignals(False)
+
+    def get_strategies(self):
+        """入力された戦略を取得する
+
+        Raises:
+            ValueError: 入力が正しくない場合
+        """
+        strategies = []
+        for row in range(self.strategy_table.rowCount()):
+            name = self.strategy_table.item(row, 0).text().strip() or f"Strategy {row + 1}"
+            try:
+                pit_loss = float(self.strategy_table.item(row, 2).text())
+            except ValueError:
+                raise ValueError(f"Invalid pit loss for '{name}'")
+            strategies.append(Strategy.parse(name, self.strategy_table.item(row, 1).text(), pit_loss))
+        return strategies
+
+    def run_simulation(self):
+        """シミュレーションをバックグラウンドで開始する"""
+        if self.thread is not None:
+            return
+        try:
+            strategies = self.get_strategies()
+        except ValueError as e:
+            QMessageBox.warning(self, "Warning", str(e))
+            return
+        if len({strategy.race_laps for strategy in strategies}) > 1:
+            QMessageBox.warning(self, "Warning", "All strategies must cover the same number of laps.")
+            return
+
+        focus = self.focus_combo.currentText()
+        options = {
+            'num_simulations': self.simulations_spin.value(),
+            'seed': self.seed_spin.value(),
+            'workers': self.workers_spin.value(),
+            'focus_rider': None if focus == self.ALL_RIDERS else focus,
+            'baseline': self.baseline_combo.currentIndex(),
+        }
+        self.run_button.setEnabled(False)
+        self.progress_bar.setValue(0)
+        self.worker = RaceSimulationWorker(self.model, strategies, options)
+        self.thread = QThread(self)
+        self.worker.moveToThread(self.thread)
+        self.thread.started.connect(self.worker.run)
+        self.worker.progress.connect(self.on_progress)
+        self.worker.finished.connect(self.on_finished)
+        self.worker.finished.connect(self.thread.quit)
+        self.worker.finished.connect(self.worker.deleteLater)
+        self.thread.finished.connect(self.thread.deleteLater)
+        self.thread.start()
+
+    def on_progress(self, percent, message):
+        """進捗を表示する"""
+        self.progress_bar.setValue(percent)
+        self.progress_bar.setFormat(message)
+
+    def on_finished(self, results, error):
+        """シミュレーション完了時の処理"""
+        self.thread = None
+        self.worker = None
+        self.run_button.setEnabled(True)
+        if results is None:
+            QMessageBox.critical(self, "Error", f"Simulation failed: {error}")
+            return
+        self.show_results(results)
+
+    def show_results(self, results):
+        """戦略 × ライダーごとの総タイムと順位の分布を表示する"""
+        focus = self.focus_combo.currentText()
+        self.result_table.setRowCount(0)
+        for result in results:
+            percentiles = result.time_percentiles((5, 50, 95))
+            positions = result.position_distribution()
+            means = result.mean_times()
+            expected = result.expected_positions()
+            for r, rider in enumerate(result.riders):
+                if focus != self.ALL_RIDERS and rider != focus:
+                    continue
+                values = [result.strategy.name, rider, f"{means[r]:.2f}",
+                          *(f"{value:.2f}" for value in percentiles[r]),
+                          f"{expected[r]:.2f}", f"{positions[r, 0]:.1%}", f"{positions[r, :3].sum():.1%}"]
+                row = self.result_table.rowCount()
+                self.result_table.insertRow(row)
+                for col, value in enumerate(values):
+                    item = QTableWidgetItem(value)
+                    if col >= 2:
+                        item.setTextAlignment(int(Qt.AlignRight | Qt.AlignVCenter))
+                    self.result_table.setItem(row, col, item)
+
+    def reject(self):
+        """実行中は閉じない"""
+        if self.thread is not None:
+            QMessageBox.information(self, "Information", "Simulation is still running.")
+            return
+        super().reject()
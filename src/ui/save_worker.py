@@ -0,0 +1,58 @@
+"""
+Save Worker Module
+ラップデータの保存をバックグラウンドスレッドで実行するワーカーを提供します。
+"""
+from PyQt5.QtCore import QObject, QThread, pyqtSignal, pyqtSlot
+
+from app.session_writer import SessionWriter
+
+
+class SaveWorker(QObject):
+    """SessionWriterによる保存をQThread上で実行するワーカー
+
+    進捗と完了はシグナルで通知するため、GUIスレッドはブロックされません。
+    """
+
+    # 進捗率(0-100), メッセージ
+    progress = pyqtSignal(int, str)
+    # SessionWriter.saveの戻り値
+    finished = pyqtSignal(dict)
+
+    def __init__(self, writer: SessionWriter, laps, columns, session_info, json_path, csv_path):
+        super().__init__()
+        self.writer = writer
+        self.laps = laps
+        self.columns = columns
+        self.session_info = session_info
+        self.json_path = json_path
+        self.csv_path = csv_path
+
+    @pyqtSlot()
+    def run(self):
+        """保存を実行する"""
+        try:
+            result = self.writer.save(self.laps, self.columns, self.session_info,
+                                      self.json_path, self.csv_path, self.progress.emit)
+        except Exception as e:
+            print(f"Error saving data: {str(e)}")
+            result = {'json': None, 'csv': None, 'errors': {'save': str(e)}}
+        self.finished.emit(result)
+
+
+def start_save_worker(worker: QObject, parent=None) -> QThread:
+    """ワーカーを新しいスレッドで開始する
+
+    runスロットとfinishedシグナルを持つワーカー（SaveWorker・TelemetryImportWorker）に使用します。
+    完了時にスレッドは終了し、ワーカーとスレッドは自動的に破棄されます。
+
+    Returns:
+        QThread: 開始したスレッド
+    """
+    thread = QThread(parent)
+    worker.moveToThread(thread)
+    thread.started.connect(worker.run)
+    worker.finished.connect(thread.quit)
+    worker.finished.connect(worker.deleteLater)
+    thread.finished.connect(thread.deleteLater)
+    thread.start()
+    return thread
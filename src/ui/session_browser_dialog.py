@@ -0,0 +1,136 @@
+"""
+Session Browser Dialog Module
+セッションカタログを検索し、セッションを開く・まとめて解析するためのダイアログを提供します。
+"""
+import os
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLineEdit, QLabel, QPushButton,
+                             QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView,
+                             QApplication, QMessageBox)
+from PyQt5.QtCore import Qt, pyqtSignal
+
+from app.session_catalog import SessionCatalog
+from utils.time_converter import TimeConverter
+
+
+class SessionBrowserDialog(QDialog):
+    """セッションカタログのブラウザ"""
+
+    # 開くファイルのパス
+    open_requested = pyqtSignal(str)
+    # まとめて解析するファイルのパスのリスト
+    analyze_requested = pyqtSignal(list)
+
+    COLUMNS = ['Date', 'Track', 'Session', 'Weather', 'Riders', 'Laps', 'Best Lap', 'File']
+
+    def __init__(self, catalog: SessionCatalog, data_directory: str, parent=None):
+        super().__init__(parent)
+        self.catalog = catalog
+        self.data_directory = data_directory
+        self.time_converter = TimeConverter()
+        self.entries = []
+        self.refresh_message = ""
+        self.setWindowTitle("Session Browser")
+        self.resize(1000, 600)
+        self.init_ui()
+        self.update_table()
+
+    def init_ui(self):
+        """UIの初期化"""
+        layout = QVBoxLayout(self)
+
+        # 検索バー
+        search_layout = QHBoxLayout()
+        search_layout.addWidget(QLabel("Search:"))
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("track, date, rider, weather ...")
+        self.search_edit.textChanged.connect(self.update_table)
+        search_layout.addWidget(self.search_edit)
+        self.refresh_button = QPushButton("Refresh")
+        self.refresh_button.clicked.connect(self.refresh_catalog)
+        search_layout.addWidget(self.refresh_button)
+        layout.addLayout(search_layout)
+
+        # セッション一覧
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.verticalHeader().setVisible(False)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.doubleClicked.connect(self.open_selected)
+        layout.addWidget(self.table)
+
+        # ボタン
+        button_layout = QHBoxLayout()
+        self.status_label = QLabel("")
+        button_layout.addWidget(self.status_label, 1)
+        open_button = QPushButton("Open")
+        open_button.clicked.connect(self.open_selected)
+        button_layout.addWidget(open_button)
+        analyze_button = QPushButton("Analyze Selected")
+        analyze_button.clicked.connect(self.analyze_selected)
+        button_layout.addWidget(analyze_button)
+        close_button = QPushButton("Close")
+        close_button.clicked.connect(self.reject)
+        button_layout.addWidget(close_button)
+        layout.addLayout(button_layout)
+
+    def refresh_catalog(self):
+        """データディレクトリを走査してカタログを更新する"""
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            updated, removed = self.catalog.refresh([self.data_directory])
+            self.refresh_message = f"updated {updated}, removed {removed}"
+        except Exception as e:
+            print(f"Error refreshing session catalog: {e}")
+            QMessageBox.critical(self, "Error", f"Failed to refresh catalog: {str(e)}")
+        finally:
+            QApplication.restoreOverrideCursor()
+        self.update_table()
+
+    def update_table(self):
+        """検索条件に一致するセッションでテーブルを更新する"""
+        self.entries = self.catalog.search(self.search_edit.text())
+        self.table.setSortingEnabled(False)
+        self.table.setRowCount(len(self.entries))
+        for row, entry in enumerate(self.entries):
+            best = entry.get('best_lap_time')
+            best_text = (f"{self.time_converter.seconds_to_string(best)} ({entry['best_lap_rider']})"
+                         if best is not None else "")
+            values = [entry['date'], entry['track'], entry['session_type'], entry['weather'],
+                      ', '.join(entry['riders']), str(entry['lap_count']), best_text,
+                      os.path.basename(entry['path'])]
+            for col, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                # 並べ替え後も元のエントリを参照できるようにパスを保持
+                item.setData(Qt.UserRole, entry['path'])
+                self.table.setItem(row, col, item)
+        self.table.setSortingEnabled(True)
+        message = f"{len(self.entries)} / {len(self.catalog)} sessions"
+        if self.refresh_message:
+            message += f" ({self.refresh_message})"
+        self.status_label.setText(message)
+
+    def selected_paths(self):
+        """選択されている行のファイルパスを取得する"""
+        rows = sorted(set(index.row() for index in self.table.selectedIndexes()))
+        return [self.table.item(row, 0).data(Qt.UserRole) for row in rows]
+
+    def open_selected(self):
+        """選択されたセッションを開く"""
+        paths = self.selected_paths()
+        if not paths:
+            return
+        self.open_requested.emit(paths[0])
+        self.accept()
+
+    def analyze_selected(self):
+        """選択されたセッションをまとめて解析する"""
+        paths = self.selected_paths()
+        if not paths:
+            QMessageBox.warning(self, "Warning", "Select one or more sessions to analyze.")
+            return
+        self.analyze_requested.emit(paths)
+        self.accept()
@@ -32,11 +32,35 @@ class GraphSettingsWidget(BaseSettingsWidget):
         # セクター数設定を追加
         graph_display_layout.addWidget(QLabel("セクター数:"), 2, 0)
         self.num_sectors_spinbox = QSpinBox()
-        self.num_sectors_spinbox.setRange(1, 10)  # 1〜10のセクターをサポート
+        self.num_sectors_spinbox.setRange(1, 500)  # GPS計測のミニセクター（最大500）までサポート
         self.num_sectors_spinbox.setValue(self.config_manager.get_num_sectors())
-        self.num_sectors_spinbox.setToolTip("トラック上のセクター数を設定します（変更後は再起動が必要です）")
+        self.num_sectors_spinbox.setToolTip("トラック上のセクター数を設定します")
         graph_display_layout.addWidget(self.num_sectors_spinbox, 2, 1)
         
+        # ミニセクターモードの閾値
+        graph_display_layout.addWidget(QLabel("ミニセクター表示の閾値:"), 3, 0)
+        self.micro_sector_threshold_spinbox = QSpinBox()
+        self.micro_sector_threshold_spinbox.setRange(1, 500)
+        self.micro_sector_threshold_spinbox.setValue(self.config_manager.get_micro_sector_threshold())
+        self.micro_sector_threshold_spinbox.setToolTip(
+            "セクター数がこの値を超えると、セクターの列を隠してヒートマップで表示します")
+        graph_display_layout.addWidget(self.micro_sector_threshold_spinbox, 3, 1)
+        
+        # ペースの変化点の表示
+        self.show_change_points_checkbox = QCheckBox("トレンドグラフにペースの変化点を表示")
+        show_change_points = self.config_manager.get_setting("graph_settings", "show_change_points")
+        self.show_change_points_checkbox.setChecked(show_change_points is not False)
+        graph_display_layout.addWidget(self.show_change_points_checkbox, 4, 0, 1, 2)
+        
+        graph_display_layout.addWidget(QLabel("変化点検出の感度（ペナルティ倍率）:"), 5, 0)
+        self.change_point_penalty_spinbox = QDoubleSpinBox()
+        self.change_point_penalty_spinbox.setRange(0.1, 20.0)
+        self.change_point_penalty_spinbox.setSingleStep(0.5)
+        self.change_point_penalty_spinbox.setValue(
+            float(self.config_manager.get_setting("graph_settings", "change_point_penalty") or 1.0))
+        self.change_point_penalty_spinbox.setToolTip("値を大きくすると、より大きなペースの変化のみを検出します")
+        graph_display_layout.addWidget(self.change_point_penalty_spinbox, 5, 1)
+        
         graph_display_group.setLayout(graph_display_layout)
         layout.addWidget(graph_display_group)
         
@@ -159,6 +183,12 @@ class GraphSettingsWidget(BaseSettingsWidget):
         # グラフウィンドウの表示/非表示設定を保存
         self.config_manager.update_setting("app_settings", "show_graph_window", self.show_graph_window_checkbox.isChecked())
         
+        # ペースの変化点の設定を保存
+        self.config_manager.update_setting("graph_settings", "show_change_points",
+                                           self.show_change_points_checkbox.isChecked())
+        self.config_manager.update_setting("graph_settings", "change_point_penalty",
+                                           self.change_point_penalty_spinbox.value())
+        
         # ラップタイムトレンド設定の保存
         self.config_manager.set_setting("graph", "lap_trend_window_size", str(self.lap_trend_window_size.value()))
         
@@ -170,5 +200,7 @@ class GraphSettingsWidget(BaseSettingsWidget):
         for rider, color_button in self.rider_colors.items():
             self.config_manager.set_setting("graph", f"rider_color_{rider}", color_button.get_color())
         
-        # セクター数設定を保存
+        # セクター数設定を保存（閾値を先に保存し、セクター数の変更通知で新しい閾値が使われるようにする）
+        self.config_manager.update_setting("app_settings", "micro_sector_threshold",
+                                           self.micro_sector_threshold_spinbox.value())
         self.config_manager.set_num_sectors(self.num_sectors_spinbox.value())
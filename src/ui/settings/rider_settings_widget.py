@@ -23,7 +23,8 @@ class RiderSettingsWidget(BaseSettingsWidget):
         try:
             # RiderManagerWidgetから情報を取得
             riders_data = self.rider_manager.get_items_dict()
-            for rider_id, rider_data in riders_data.items():
-                self.config_manager.update_rider(rider_id, rider_data)
+            with self.config_manager.batch_update():
+                for rider_id, rider_data in riders_data.items():
+                    self.config_manager.update_rider(rider_id, rider_data)
         except Exception as e:
             print(f"Error saving rider settings: {e}")
@@ -23,7 +23,8 @@ class TireSettingsWidget(BaseSettingsWidget):
         try:
             # TireManagerWidgetから情報を取得
             tires_data = self.tire_manager.get_items_dict()
-            for tire_id, tire_data in tires_data.items():
-                self.config_manager.update_tire(tire_id, tire_data)
+            with self.config_manager.batch_update():
+                for tire_id, tire_data in tires_data.items():
+                    self.config_manager.update_tire(tire_id, tire_data)
         except Exception as e:
             print(f"Error saving tire settings: {e}")
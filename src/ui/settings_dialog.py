@@ -66,13 +66,15 @@ class SettingsDialog(QDialog):
     
     def save_settings(self):
         """全ての設定を保存"""
-        self.csv_settings.save_settings()
-        self.graph_settings.save_settings()
-        self.color_settings.save_settings()
-        self.session_settings.save_settings()
-        self.stats_color_settings.save_settings()
-        self.rider_settings.save_settings()
-        self.tire_settings.save_settings()
+        # 変更通知は全ての設定を反映してからまとめて行う
+        with self.config_manager.batch_update():
+            self.csv_settings.save_settings()
+            self.graph_settings.save_settings()
+            self.color_settings.save_settings()
+            self.session_settings.save_settings()
+            self.stats_color_settings.save_settings()
+            self.rider_settings.save_settings()
+            self.tire_settings.save_settings()
         
         # 設定の保存と更新通知
         self.config_manager.save_config()
@@ -0,0 +1,85 @@
+"""
+Similar Laps Dialog Module
+選択したラップに似たラップの検索結果を表示するダイアログを提供します。
+"""
+import time
+
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QSpinBox, QCheckBox,
+                             QTableWidget, QTableWidgetItem, QHeaderView)
+from PyQt5.QtCore import Qt, pyqtSignal
+
+
+class SimilarLapsDialog(QDialog):
+    """似たラップの検索結果（距離の近い順）を表示するダイアログ"""
+
+    lap_selected = pyqtSignal(int)  # 結果の行をダブルクリックしたとき（ラップデータのインデックス）
+
+    HEADERS = ["Rider", "Lap", "Lap Time", "Tire", "Weather", "Distance"]
+
+    def __init__(self, analyzer, laps, lap_index, parent=None):
+        super().__init__(parent)
+        self.analyzer = analyzer
+        self.laps = laps
+        self.lap_index = lap_index
+        lap = laps[lap_index]
+        self.setWindowTitle(f"Laps Similar to {lap.get('Rider', '')} Lap {lap.get('Lap', '')}")
+        self.resize(600, 400)
+        self.init_ui()
+        self.run_query()
+
+    def init_ui(self):
+        """UIの初期化"""
+        layout = QVBoxLayout(self)
+
+        control_layout = QHBoxLayout()
+        control_layout.addWidget(QLabel("Results:"))
+        self.count_spin = QSpinBox()
+        self.count_spin.setRange(1, 1000)
+        self.count_spin.setValue(10)
+        self.count_spin.valueChanged.connect(self.run_query)
+        control_layout.addWidget(self.count_spin)
+        self.conditions_check = QCheckBox("Include conditions (track temp, tire, weather)")
+        self.conditions_check.toggled.connect(self.run_query)
+        control_layout.addWidget(self.conditions_check)
+        control_layout.addStretch()
+        layout.addLayout(control_layout)
+
+        self.table = QTableWidget(0, len(self.HEADERS))
+        self.table.setHorizontalHeaderLabels(self.HEADERS)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.table.verticalHeader().setVisible(False)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.table.cellDoubleClicked.connect(self.on_cell_double_clicked)
+        layout.addWidget(self.table)
+
+        self.summary_label = QLabel("")
+        layout.addWidget(self.summary_label)
+
+    def run_query(self):
+        """検索を実行して結果を表示する"""
+        self.table.setRowCount(0)
+        index = self.analyzer.get_similarity_index(self.laps, self.conditions_check.isChecked())
+        if index is None or not index.contains(self.lap_index):
+            self.summary_label.setText("This lap has incomplete sector times and cannot be compared.")
+            return
+
+        start = time.perf_counter()
+        indices, distances = index.query(self.lap_index, self.count_spin.value())
+        elapsed = (time.perf_counter() - start) * 1000
+
+        self.table.setRowCount(len(indices))
+        for row, (lap_index, distance) in enumerate(zip(indices, distances)):
+            lap = self.laps[lap_index]
+            values = [lap.get('Rider', ''), str(lap.get('Lap', '')), lap.get('LapTime', ''),
+                      lap.get('TireType', ''), lap.get('Weather', ''), f"{distance:.3f}"]
+            for col, value in enumerate(values):
+                item = QTableWidgetItem(str(value))
+                if col == 0:
+                    item.setData(Qt.UserRole, int(lap_index))
+                self.table.setItem(row, col, item)
+        self.summary_label.setText(f"Searched {len(index)} laps in {elapsed:.1f} ms")
+
+    def on_cell_double_clicked(self, row, column):
+        """結果の行をダブルクリックしたときの処理"""
+        self.lap_selected.emit(self.table.item(row, 0).data(Qt.UserRole))
@@ -43,3 +43,41 @@ class StdDevStatItem(QTableWidgetItem):
         except Exception as e:
             print(f"Error formatting standard deviation: {str(e)}")
             return "--"
+
+class ConfidenceIntervalItem(QTableWidgetItem):
+    """信頼区間用のテーブルアイテム（幅の半分を±で表示し、ツールチップに区間を表示）"""
+    def __init__(self, estimate: float, low: float, high: float, confidence: float = 0.95):
+        super().__init__()
+        self.half_width = (high - low) / 2 if high == high and low == low else float('nan')
+        self.setText(self._format_half_width(self.half_width))
+        self.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+        if self.half_width == self.half_width:
+            self.setToolTip(f"{confidence:.0%} CI: {low:.3f} - {high:.3f} (estimate {estimate:.3f})")
+        # ソート用のデータを設定（区間がない場合は末尾）
+        self.setData(Qt.UserRole, self.half_width if self.half_width == self.half_width else float('inf'))
+
+    def _format_half_width(self, value: float) -> str:
+        """区間の幅の半分を文字列にフォーマット（±x.xxx）"""
+        if value != value:
+            return "--"
+        return f"±{value:.3f}"
+
+    def __lt__(self, other):
+        if isinstance(other, ConfidenceIntervalItem):
+            return self.data(Qt.UserRole) < other.data(Qt.UserRole)
+        return super().__lt__(other)
+
+class ScoreItem(QTableWidgetItem):
+    """スコア・割合・順位用のテーブルアイテム（数値でソートし、値がない場合は末尾）"""
+    def __init__(self, value: float, text_format: str = "{:.1f}"):
+        super().__init__()
+        self.value = value
+        self.setText(text_format.format(value) if value == value else "--")
+        self.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+        # ソート用のデータを設定
+        self.setData(Qt.UserRole, value if value == value else float('inf'))
+
+    def __lt__(self, other):
+        if isinstance(other, ScoreItem):
+            return self.data(Qt.UserRole) < other.data(Qt.UserRole)
+        return super().__lt__(other)
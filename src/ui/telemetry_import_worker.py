@@ -0,0 +1,35 @@
+"""
+Telemetry Import Worker Module
+データロガーのCSVログのテレメトリストアへの取り込みをバックグラウンドスレッドで実行するワーカーを提供します。
+"""
+from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot
+
+from app.telemetry_store import TelemetryStore
+
+
+class TelemetryImportWorker(QObject):
+    """TelemetryStore.import_csvによる取り込みをQThread上で実行するワーカー
+
+    CSVの読み込みとストアの書き込みはGUIスレッドの外で行い、完了はシグナルで通知します。
+    スレッドの開始には ui.save_worker.start_save_worker を使います。
+    """
+
+    # 作成したストア（失敗した場合はNone）, エラーメッセージ（成功した場合は空文字列）
+    finished = pyqtSignal(object, str)
+
+    def __init__(self, csv_path: str, store_path: str, sample_rate: float):
+        super().__init__()
+        self.csv_path = csv_path
+        self.store_path = store_path
+        self.sample_rate = sample_rate
+
+    @pyqtSlot()
+    def run(self):
+        """取り込みを実行する"""
+        try:
+            store = TelemetryStore.import_csv(self.csv_path, self.store_path, sample_rate=self.sample_rate)
+        except Exception as e:
+            print(f"Error importing telemetry: {str(e)}")
+            self.finished.emit(None, str(e))
+            return
+        self.finished.emit(store, '')
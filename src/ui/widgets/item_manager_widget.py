@@ -262,33 +262,35 @@ class ItemManagerWidget(QWidget):
                 "default": self.default_checkbox.isChecked()
             }
         
-        # デフォルトチェックボックスがONの場合、他のアイテムのデフォルト設定をOFFにする
-        if self.item_type == "rider" and item_data["default"]:
-            # 現在のライダーリストを取得
-            get_list_func = getattr(self.config_manager, self.get_items_method)
-            items_list = get_list_func()
+        # 複数の変更を1回の保存にまとめる
+        with self.config_manager.batch_update():
+            # デフォルトチェックボックスがONの場合、他のアイテムのデフォルト設定をOFFにする
+            if self.item_type == "rider" and item_data["default"]:
+                # 現在のライダーリストを取得
+                get_list_func = getattr(self.config_manager, self.get_items_method)
+                items_list = get_list_func()
             
-            # 現在編集中のアイテムID以外のアイテムで、デフォルト設定がONのものをOFFにする
-            for item in items_list:
-                item_id = item.get("id")
-                # 現在編集中のアイテム以外で、かつデフォルト設定がONの場合
-                if (self.current_edit_id is None or item_id != self.current_edit_id) and item.get("default", False):
-                    # デフォルト設定をOFFにする
-                    item_data_copy = item.copy()
-                    item_data_copy["default"] = False
+                # 現在編集中のアイテムID以外のアイテムで、デフォルト設定がONのものをOFFにする
+                for item in items_list:
+                    item_id = item.get("id")
+                    # 現在編集中のアイテム以外で、かつデフォルト設定がONの場合
+                    if (self.current_edit_id is None or item_id != self.current_edit_id) and item.get("default", False):
+                        # デフォルト設定をOFFにする
+                        item_data_copy = item.copy()
+                        item_data_copy["default"] = False
                     
-                    # 設定を更新
-                    update_func = getattr(self.config_manager, self.update_item_method)
-                    update_func(item_id, item_data_copy)
-        
-        if self.current_edit_id:
-            # 更新処理
-            update_func = getattr(self.config_manager, self.update_item_method)
-            update_func(self.current_edit_id, item_data)
-        else:
-            # 新規追加処理
-            add_func = getattr(self.config_manager, self.add_item_method)
-            add_func(item_data)
+                        # 設定を更新
+                        update_func = getattr(self.config_manager, self.update_item_method)
+                        update_func(item_id, item_data_copy)
+        
+            if self.current_edit_id:
+                # 更新処理
+                update_func = getattr(self.config_manager, self.update_item_method)
+                update_func(self.current_edit_id, item_data)
+            else:
+                # 新規追加処理
+                add_func = getattr(self.config_manager, self.add_item_method)
+                add_func(item_data)
         
         # 表示を更新
         self.populate_items_list()
@@ -365,43 +367,44 @@ class ItemManagerWidget(QWidget):
                 row = item.row()
                 changed_item_id = self.table.item(row, 0).data(Qt.UserRole)
                 
-                # 他のアイテムのデフォルト設定をOFFにする
+                # 他のアイテムのデフォルト設定をOFFにする（複数の変更を1回の保存にまとめる）
                 self.is_updating_table = True  # 更新中フラグをON
                 try:
-                    # 現在のデータを取得
-                    get_list_func = getattr(self.config_manager, self.get_items_method)
-                    items_list = get_list_func()
+                    with self.config_manager.batch_update():
+                        # 現在のデータを取得
+                        get_list_func = getattr(self.config_manager, self.get_items_method)
+                        items_list = get_list_func()
                     
-                    # 変更されたアイテム以外のデフォルト設定をOFFにする
-                    for item_data in items_list:
-                        item_id = item_data.get("id")
-                        if item_id != changed_item_id and item_data.get("default", False):
-                            # デフォルト設定をOFFにする
-                            item_data_copy = item_data.copy()
-                            item_data_copy["default"] = False
+                        # 変更されたアイテム以外のデフォルト設定をOFFにする
+                        for item_data in items_list:
+                            item_id = item_data.get("id")
+                            if item_id != changed_item_id and item_data.get("default", False):
+                                # デフォルト設定をOFFにする
+                                item_data_copy = item_data.copy()
+                                item_data_copy["default"] = False
                             
-                            # 設定を更新
-                            update_func = getattr(self.config_manager, self.update_item_method)
-                            update_func(item_id, item_data_copy)
+                                # 設定を更新
+                                update_func = getattr(self.config_manager, self.update_item_method)
+                                update_func(item_id, item_data_copy)
                             
-                            # テーブル上の表示も更新
-                            item_row = self.item_rows.get(item_id)
-                            if item_row is not None:
-                                default_item = self.table.item(item_row, 3)
-                                if default_item:
-                                    default_item.setCheckState(Qt.Unchecked)
+                                # テーブル上の表示も更新
+                                item_row = self.item_rows.get(item_id)
+                                if item_row is not None:
+                                    default_item = self.table.item(item_row, 3)
+                                    if default_item:
+                                        default_item.setCheckState(Qt.Unchecked)
                     
-                    # 変更されたアイテムのデフォルト設定をONにする
-                    for item_data in items_list:
-                        if item_data.get("id") == changed_item_id:
-                            # デフォルト設定をONにする
-                            item_data_copy = item_data.copy()
-                            item_data_copy["default"] = True
+                        # 変更されたアイテムのデフォルト設定をONにする
+                        for item_data in items_list:
+                            if item_data.get("id") == changed_item_id:
+                                # デフォルト設定をONにする
+                                item_data_copy = item_data.copy()
+                                item_data_copy["default"] = True
                             
-                            # 設定を更新
-                            update_func = getattr(self.config_manager, self.update_item_method)
-                            update_func(changed_item_id, item_data_copy)
-                            break
+                                # 設定を更新
+                                update_func = getattr(self.config_manager, self.update_item_method)
+                                update_func(changed_item_id, item_data_copy)
+                                break
                             
                 finally:
                     self.is_updating_table = False  # 更新中フラグをOFF
@@ -0,0 +1,34 @@
+import os
+import threading
+
+
+def atomic_write_text(file_path: str, text: str, encoding: str = 'utf-8', newline: str = None) -> None:
+    """テキストを一時ファイルに書き込んでから置き換える
+
+    同じディレクトリに一時ファイルを作成し、書き込みとfsyncが完了してから
+    os.replaceで置き換えるため、書き込み途中でエラーやクラッシュが起きても
+    元のファイルが中途半端な状態になることはありません。
+
+    Args:
+        file_path: 書き込み先のパス
+        text: 書き込む内容
+        encoding: 文字コード
+        newline: open()に渡す改行の扱い（CSVの場合は''を指定）
+
+    Raises:
+        OSError: 書き込みに失敗した場合（一時ファイルは削除されます）
+    """
+    # 同じファイルへ複数スレッドから書き込んでも衝突しない一時ファイル名
+    temp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(temp_path, 'w', encoding=encoding, newline=newline) as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, file_path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,133 @@
+import json
+from typing import Any, Dict, Iterator, TextIO
+
+_WHITESPACE = ' \t\n\r'
+# 数値の続きになりうる文字
+_NUMBER_CHARS = '0123456789.eE+-'
+
+
+class JsonArrayStream:
+    """トップレベルのJSONオブジェクト内の配列を要素ごとに読み込むストリーム
+
+    ファイルをチャンク単位で読み込み、json.JSONDecoder.raw_decodeで
+    配列の要素を1つずつデコードします。ファイル全体のオブジェクトツリーを
+    作らないため、巨大なファイルでもメモリ使用量はチャンクサイズと
+    要素1つ分に抑えられます。
+
+    配列以外のトップレベルの値（session_infoなど）は通常どおりデコードし、
+    fieldsに格納します。配列より後ろにある値は、items()を最後まで
+    読み進めた時点でfieldsに揃います。
+
+    Example:
+        with open(path, 'r', encoding='utf-8') as f:
+            stream = JsonArrayStream(f, 'lap_data')
+            for lap in stream.items():
+                ...
+            session_info = stream.fields.get('session_info', {})
+    """
+
+    def __init__(self, file: TextIO, array_key: str, chunk_size: int = 1 << 20):
+        self.file = file
+        self.array_key = array_key
+        self.chunk_size = chunk_size
+        self.fields: Dict[str, Any] = {}
+        self.found_array = False
+        self._decoder = json.JSONDecoder()
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+
+    def items(self) -> Iterator[Any]:
+        """配列の要素を順に返す
+
+        Raises:
+            json.JSONDecodeError: JSONの形式が不正な場合
+        """
+        self._expect('{')
+        if self._peek() == '}':
+            self._pos += 1
+            return
+        while True:
+            key = self._decode_value()
+            if not isinstance(key, str):
+                self._error("Expecting property name")
+            self._expect(':')
+            if key == self.array_key and self._peek() == '[':
+                self.found_array = True
+                yield from self._array_items()
+            else:
+                self.fields[key] = self._decode_value()
+            if self._peek() == ',':
+                self._pos += 1
+                continue
+            self._expect('}')
+            return
+
+    def _array_items(self) -> Iterator[Any]:
+        """'[' の位置から配列の要素を順に返す"""
+        self._expect('[')
+        if self._peek() == ']':
+            self._pos += 1
+            return
+        while True:
+            yield self._decode_value()
+            if self._peek() == ',':
+                self._pos += 1
+                continue
+            self._expect(']')
+            return
+
+    def _fill(self) -> bool:
+        """バッファにデータを追加する（EOFの場合はFalse）"""
+        if self._eof:
+            return False
+        chunk = self.file.read(self.chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        # 読み終えた部分は捨てる
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def _peek(self) -> str:
+        """空白を読み飛ばし、次の文字を返す（EOFの場合は空文字）"""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ''
+
+    def _expect(self, char: str) -> None:
+        """次の文字が指定の文字であることを確認して読み進める"""
+        if self._peek() != char:
+            self._error(f"Expecting '{char}'")
+        self._pos += 1
+
+    def _decode_value(self) -> Any:
+        """次の値を1つデコードする
+
+        値がバッファの途中で切れている場合は、追加で読み込んでから再試行します。
+        数値は終端記号を持たないため、バッファの残りが空か数値の文字のみの場合
+        （"12." のように小数点や指数の途中で切れている場合を含む）も、続きがある
+        可能性があるため追加で読み込みます。
+        """
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # _fillでバッファ先頭が詰められるため、追加で読み込んだ場合は再デコードする
+            if (isinstance(value, (int, float)) and not isinstance(value, bool)
+                    and not self._buffer[end:].strip(_NUMBER_CHARS) and self._fill()):
+                continue
+            self._pos = end
+            return value
+
+    def _error(self, message: str) -> None:
+        raise json.JSONDecodeError(message, self._buffer, self._pos)
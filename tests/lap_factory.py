@@ -0,0 +1,70 @@
+"""
+テスト用のラップデータを作成するヘルパー
+"""
+import os
+import sys
+import unittest
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from app.lap_columns import LapColumns
+
+
+def lap_entry(rider: str, lap: int, sectors: Sequence[float] = (), lap_time: Optional[float] = None,
+              **fields) -> Dict:
+    """1ラップ分のラップデータを作成する
+
+    Args:
+        rider: ライダー名
+        lap: ラップ番号
+        sectors: セクタータイム（秒）
+        lap_time: ラップタイム（秒、省略時はセクタータイムの合計）
+        **fields: その他の項目（'TireType' など）
+
+    Returns:
+        Dict: ラップデータ（タイムは "ss.fff" 形式の文字列）
+    """
+    if lap_time is None:
+        lap_time = float(np.sum(sectors))
+    entry = {'Rider': rider, 'Lap': lap, 'LapTime': f"{lap_time:.3f}"}
+    entry.update({f'Sector{i + 1}': f"{value:.3f}" for i, value in enumerate(sectors)})
+    entry.update(fields)
+    return entry
+
+
+def random_laps(riders: Dict[str, Tuple[Sequence[float], float]], num_laps: int, seed: int = 0) -> List[Dict]:
+    """ライダーごとに正規分布のセクタータイムを持つラップデータを作成する
+
+    Args:
+        riders: ライダー名 -> (各セクタータイムの平均, 標準偏差)
+        num_laps: ライダーごとのラップ数
+        seed: 乱数のシード
+
+    Returns:
+        List[Dict]: ライダーごとに1周目から順に並べたラップデータ
+    """
+    rng = np.random.default_rng(seed)
+    return [lap_entry(rider, lap, rng.normal(means, spread))
+            for rider, (means, spread) in riders.items() for lap in range(1, num_laps + 1)]
+
+
+class LapDataTestCase(unittest.TestCase):
+    """ラップデータ（self.laps）と列指向データ（self.columns）を用意するテストケース
+
+    make_laps をオーバーライドして使います。
+    """
+
+    num_sectors = 2
+
+    def make_laps(self) -> List[Dict]:
+        raise NotImplementedError
+
+    def setUp(self):
+        self.laps = self.make_laps()
+        self.columns = self.to_columns(self.laps)
+
+    def to_columns(self, laps: List[Dict]) -> LapColumns:
+        """テストのセクター数でラップデータを列指向データに変換する"""
+        return LapColumns.from_laps(laps, self.num_sectors)
@@ -0,0 +1,169 @@
+"""
+解析結果キャッシュのユニットテスト
+"""
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from app.analysis_cache import AnalysisCache, LapDataVersions
+from app.analyzer import LapTimeAnalyzer
+from app.lap_columns import LapColumns
+
+
+class MockConfigManager:
+    """テスト用の設定マネージャーモック"""
+    def __init__(self, num_sectors=2):
+        self.num_sectors = num_sectors
+
+    def get_num_sectors(self):
+        return self.num_sectors
+
+    def get_setting(self, section, key):
+        return None
+
+    def is_micro_sector_mode(self):
+        return False
+
+    def subscribe(self, callback, section=None, key=None):
+        return None
+
+
+class TestAnalysisCache(unittest.TestCase):
+    """AnalysisCacheと解析器のキャッシュ連携のテストケース"""
+
+    def setUp(self):
+        self.laps = [
+            {'Rider': 'A', 'Lap': 1, 'LapTime': '1:30.000', 'Sector1': '30.000', 'Sector2': '60.000'},
+            {'Rider': 'A', 'Lap': 2, 'LapTime': '1:29.000', 'Sector1': '29.500', 'Sector2': '59.500'},
+        ]
+        self.config_manager = MockConfigManager()
+        self.analyzer = LapTimeAnalyzer(None, self.config_manager)
+
+    def test_lru_eviction(self):
+        """上限を超えると最も古いエントリが破棄されるか"""
+        cache = AnalysisCache(max_entries=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(len(cache), 2)
+
+    def test_version_changes_on_edit(self):
+        """変更を記録するとキーが変わり、別のリストは同じ内容でも別のキーになるか"""
+        versions = LapDataVersions()
+        before = versions.key(self.laps)
+        self.assertEqual(versions.key(self.laps), before)
+        self.laps[1]['LapTime'] = '1:28.000'
+        versions.mark_modified(self.laps)
+        self.assertNotEqual(versions.key(self.laps), before)
+        self.assertNotEqual(versions.key(list(self.laps)), versions.key(self.laps))
+
+    def test_edit_is_recomputed_after_mark_modified(self):
+        """その場で編集したラップデータは変更を記録すると再解析されるか"""
+        self.assertEqual(self.analyzer.analyze_laps(self.laps)['fastest_lap']['LapTime'], '1:29.000')
+        self.laps[0]['LapTime'] = '1:28.000'
+        self.analyzer.mark_modified(self.laps)
+        self.assertEqual(self.analyzer.analyze_laps(self.laps)['fastest_lap']['LapTime'], '1:28.000')
+
+    def test_edited_rows_patch_cached_columns(self):
+        """編集した行を指定すると列指向データを全ラップから作り直さずに更新し、作り直した結果と一致するか"""
+        self.analyzer.get_lap_columns(self.laps)
+        self.laps[1] = dict(self.laps[1], Rider='B', LapTime='1:28.000')
+        with patch('app.analyzer.LapColumns.from_laps', wraps=LapColumns.from_laps) as from_laps:
+            self.analyzer.mark_modified(self.laps, [1])
+            columns = self.analyzer.get_lap_columns(self.laps)
+            self.assertEqual([len(call.args[0]) for call in from_laps.call_args_list], [1])
+        rebuilt = LapColumns.from_laps(self.laps, 2)
+        self.assertEqual(columns.riders, rebuilt.riders)
+        self.assertEqual(columns.rider_codes.tolist(), rebuilt.rider_codes.tolist())
+        self.assertEqual(columns.lap_times.tolist(), rebuilt.lap_times.tolist())
+
+    def test_appended_laps_update_quantile_sketches(self):
+        """追加したラップのみをスケッチに取り込み、作り直した結果と一致するか"""
+        previous = self.analyzer.get_quantile_sketches(self.laps)
+        self.laps.append({'Rider': 'B', 'Lap': 1, 'LapTime': '1:31.000', 'Sector1': '31.000', 'Sector2': '60.000'})
+        self.analyzer.mark_modified(self.laps)
+        sketches = self.analyzer.append_to_quantile_sketches(self.laps, previous)
+        rebuilt = self.analyzer.get_quantile_sketches(self.laps)
+        self.assertEqual(sketches.num_laps, 3)
+        self.assertEqual(previous.riders, ['A'])
+        for rider in rebuilt.riders:
+            for series in rebuilt.series:
+                self.assertEqual(sketches.sketch(rider, series).count, rebuilt.sketch(rider, series).count)
+                self.assertEqual(sketches.quantile(rider, 0.5, series), rebuilt.quantile(rider, 0.5, series))
+
+    def test_start_dataset_releases_previous_laps(self):
+        """新しいデータセットを読み込むと以前のリストへの参照を外し、読み込んだ列指向データは残るか"""
+        self.analyzer.analyze_laps(self.laps)
+        self.analyzer.analyze_laps([dict(lap) for lap in self.laps])
+        loaded = [dict(lap, Rider='B') for lap in self.laps]
+        columns = LapColumns.from_laps(loaded, 2)
+        self.analyzer.set_lap_columns(loaded, columns)
+        self.analyzer.start_dataset(loaded)
+        self.assertEqual([entry[0] for entry in self.analyzer.versions._entries.values()], [loaded])
+        self.assertEqual(len(self.analyzer.cache), 1)
+        self.assertIs(self.analyzer.get_lap_columns(loaded), columns)
+
+    def test_version_table_is_capped_at_cache_size(self):
+        """登録するリストの数が解析結果のキャッシュの上限を超えないか"""
+        analyzer = LapTimeAnalyzer(None, self.config_manager)
+        for _ in range(40):
+            analyzer.get_lap_columns([dict(lap) for lap in self.laps])
+        self.assertEqual(len(analyzer.versions._entries), analyzer.cache.max_entries)
+
+    def test_filtered_laps_reuse_columns(self):
+        """絞り込んだラップの列指向データを時間文字列から作り直さず、作り直した結果と一致するか"""
+        self.laps.append({'Rider': 'B', 'Lap': 1, 'LapTime': '1:31.000', 'Sector1': '31.000', 'Sector2': '60.000',
+                          'TireType': 'Soft'})
+        self.analyzer.get_lap_columns(self.laps)
+        with patch('app.analyzer.LapColumns.from_laps', wraps=LapColumns.from_laps) as from_laps:
+            filtered = self.analyzer.filter_laps(self.laps, 'LapTime > 89.5')
+            columns = self.analyzer.get_lap_columns(filtered)
+            self.assertEqual(from_laps.call_count, 0)
+        rebuilt = LapColumns.from_laps(filtered, 2)
+        self.assertEqual([lap['Lap'] for lap in filtered], [1, 1])
+        for name in ('riders', 'tires', 'weathers'):
+            self.assertEqual(getattr(columns, name), getattr(rebuilt, name))
+        for name in ('rider_codes', 'tire_codes', 'weather_codes', 'lap_numbers', 'lap_times', 'sector_times'):
+            np.testing.assert_array_equal(getattr(columns, name), getattr(rebuilt, name))
+
+    def test_repeated_analysis_is_cache_hit(self):
+        """同じデータの再解析やライダー統計の取得でキャッシュが使われるか"""
+        with patch.object(self.analyzer, '_analyze_laps', wraps=self.analyzer._analyze_laps) as analyze:
+            first = self.analyzer.analyze_laps(self.laps)
+            self.analyzer.analyze_laps(self.laps)
+            stats = self.analyzer.get_rider_stats('A', self.laps)
+            self.assertEqual(analyze.call_count, 1)
+        self.assertEqual(first['total_laps'], 2)
+        self.assertEqual(stats['lap_count'], 2)
+
+    def test_settings_are_part_of_key(self):
+        """セクター数やウィンドウサイズが変わると再計算されるか"""
+        with patch.object(self.analyzer, '_calculate_moving_statistics',
+                          wraps=self.analyzer._calculate_moving_statistics) as moving:
+            self.analyzer.calculate_moving_statistics(self.laps)
+            self.analyzer.set_window_size(2)
+            self.analyzer.calculate_moving_statistics(self.laps)
+            self.config_manager.num_sectors = 1
+            self.analyzer.calculate_moving_statistics(self.laps)
+            self.assertEqual(moving.call_count, 3)
+
+    def test_returned_result_does_not_modify_cache(self):
+        """返却された結果を変更してもキャッシュが汚れないか"""
+        result = self.analyzer.calculate_moving_statistics(self.laps)
+        result['fastest_rider'] = 'A'
+        self.assertNotIn('fastest_rider', self.analyzer.calculate_moving_statistics(self.laps))
+        # 入れ子の統計を変更してもキャッシュは変わらない
+        analysis = self.analyzer.analyze_laps(self.laps)
+        analysis['rider_stats']['A']['lap_count'] = 0
+        self.assertEqual(self.analyzer.analyze_laps(self.laps)['rider_stats']['A']['lap_count'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
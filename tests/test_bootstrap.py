@@ -0,0 +1,85 @@
+"""
+ブートストラップによる信頼区間（bootstrap）のユニットテスト
+"""
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from app.lap_columns import LapColumns
+from app.bootstrap import bootstrap_intervals, ESTIMATE, LOW, HIGH
+import app.bootstrap as bootstrap
+from lap_factory import LapDataTestCase, random_laps
+
+
+class TestBootstrapIntervals(LapDataTestCase):
+    """ブートストラップ信頼区間のテストケース"""
+
+    num_sectors = 3
+
+    def make_laps(self):
+        """ばらつきの異なる3人分のラップ（Cはばらつきが大きい）"""
+        return random_laps({'A': ([20.0, 30.0, 30.0], 0.1), 'B': ([20.0, 30.0, 30.1], 0.1),
+                            'C': ([20.0, 30.0, 31.0], 0.5)}, 40)
+
+    def test_intervals_contain_estimates(self):
+        """区間が推定値を含み、推定値が通常の統計量と一致するか"""
+        intervals = bootstrap_intervals(self.columns, resamples=500)
+        times = self.columns.lap_times[self.columns.rider_mask('A')]
+        estimate, low, high = intervals.interval('A', 'mean')
+        self.assertAlmostEqual(estimate, times.mean())
+        self.assertLess(low, estimate)
+        self.assertGreater(high, estimate)
+        self.assertAlmostEqual(intervals.interval('A', 'best')[ESTIMATE], times.min())
+        sectors = intervals.sector_means[intervals.riders.index('B')]
+        self.assertTrue((sectors[:, LOW] <= sectors[:, ESTIMATE]).all())
+        self.assertTrue((sectors[:, HIGH] >= sectors[:, ESTIMATE]).all())
+        self.assertEqual(intervals.sector_errors('B').shape, (2, 3))
+
+    def test_width_reflects_spread(self):
+        """ばらつきの大きいライダーほど区間が広く、平均の区間幅が標準誤差に近いか"""
+        intervals = bootstrap_intervals(self.columns, resamples=2000)
+        width = intervals.mean[:, HIGH] - intervals.mean[:, LOW]
+        self.assertGreater(width[2], width[0] * 2)
+        times = self.columns.lap_times[self.columns.rider_mask('C')]
+        standard_error = times.std() / np.sqrt(times.size)
+        self.assertAlmostEqual(width[2] / 2, 1.96 * standard_error, delta=standard_error * 0.3)
+
+    def test_reproducible_and_independent_of_chunking(self):
+        """同じシードなら、チャンクの大きさやスレッド数に関係なく同じ結果になるか"""
+        first = bootstrap_intervals(self.columns, resamples=300, workers=1)
+        original = bootstrap._CHUNK_ELEMENTS
+        bootstrap._CHUNK_ELEMENTS = 1000
+        try:
+            chunked = bootstrap_intervals(self.columns, resamples=300, workers=3)
+        finally:
+            bootstrap._CHUNK_ELEMENTS = original
+        np.testing.assert_allclose(first.mean, chunked.mean)
+        np.testing.assert_allclose(first.sector_means, chunked.sector_means)
+
+    def test_replace_riders_matches_full_recalculation(self):
+        """変更したライダーのみ計算し直した結果が全体の再計算と一致するか"""
+        previous = bootstrap_intervals(self.columns, resamples=200)
+        self.columns.lap_times[0] = 70.0
+        full = bootstrap_intervals(self.columns, resamples=200)
+        partial = bootstrap_intervals(self.columns, resamples=200, riders=['A'])
+        self.assertTrue(np.isnan(partial.interval('B', 'mean')[LOW]))
+        merged = previous.replace_riders(partial, ['A'])
+        self.assertEqual(merged.riders, ['A', 'B', 'C'])
+        np.testing.assert_allclose(merged.best, full.best)
+        np.testing.assert_allclose(merged.median, full.median)
+
+    def test_single_lap_has_no_interval(self):
+        """ラップが1周しかないライダーは推定値のみで区間がNaNになるか"""
+        columns = LapColumns.from_laps([{'Rider': 'A', 'Lap': 1, 'LapTime': '80.0'}], 0)
+        intervals = bootstrap_intervals(columns, resamples=100)
+        estimate, low, high = intervals.interval('A', 'median')
+        self.assertEqual(estimate, 80.0)
+        self.assertTrue(np.isnan(low) and np.isnan(high))
+        self.assertIsNone(intervals.interval('Z', 'mean'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+"""
+ペースの変化点検出（change_points）のユニットテスト
+"""
+import os
+import sys
+import time
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from app.lap_columns import LapColumns
+from app.change_points import binary_segmentation, series_segments, detect_change_points
+from lap_factory import lap_entry
+
+
+def make_laps(rider, paces, laps_per_pace=20, noise=0.1, seed=0):
+    """ペースが段階的に変わる1人分のラップ（セクター1のみペースに連動）"""
+    rng = np.random.default_rng(seed)
+    laps = []
+    lap = 1
+    for pace in paces:
+        for _ in range(laps_per_pace):
+            sector1 = pace - 50.0 + rng.normal(0, noise)
+            sector2 = 50.0 + rng.normal(0, noise)
+            laps.append(lap_entry(rider, lap, [sector1, sector2]))
+            lap += 1
+    return laps
+
+
+class TestBinarySegmentation(unittest.TestCase):
+    """二分割法のテストケース"""
+
+    def test_finds_known_shifts(self):
+        """既知の位置の段差を検出するか"""
+        rng = np.random.default_rng(1)
+        values = np.concatenate([np.full(30, 80.0), np.full(25, 81.0), np.full(40, 79.5)]) + rng.normal(0, 0.1, 95)
+        self.assertEqual(binary_segmentation(values, penalty=2 * 0.01 * np.log(95)), [30, 55])
+
+    def test_stationary_noise_has_no_change(self):
+        """ペースが一定なら変化点を検出しないか"""
+        values = np.random.default_rng(2).normal(80.0, 0.3, 500)
+        segments = series_segments(np.arange(1, 501), values)
+        self.assertEqual(len(segments), 1)
+        self.assertEqual((segments[0].first_lap, segments[0].last_lap, segments[0].count), (1, 500, 500))
+
+    def test_min_size(self):
+        """1周だけの外れ値があっても区間が最小ラップ数より短くならないか"""
+        values = np.random.default_rng(3).normal(80.0, 0.1, 60)
+        values[30] = 95.0
+        for min_size in (1, 3, 5):
+            bounds = [0] + binary_segmentation(values, penalty=1.0, min_size=min_size) + [60]
+            self.assertGreaterEqual(min(np.diff(bounds)), min_size)
+        self.assertEqual(binary_segmentation(values, penalty=1.0, min_size=1)[:2], [30, 31])
+        self.assertEqual(binary_segmentation(values[:5], penalty=0.0), [])
+
+    def test_nan_laps_are_skipped(self):
+        """NaNのラップを除外して検出し、区間の範囲がラップ番号で表されるか"""
+        values = np.concatenate([np.full(10, 80.0), np.full(10, 82.0)])
+        values[[3, 15]] = np.nan
+        segments = series_segments(np.arange(1, 21), values)
+        self.assertEqual([(s.first_lap, s.last_lap, s.count) for s in segments], [(1, 10, 9), (11, 20, 9)])
+        self.assertAlmostEqual(segments[1].mean, 82.0)
+        self.assertEqual(series_segments(np.arange(3), np.full(3, np.nan)), [])
+
+
+class TestDetectChangePoints(unittest.TestCase):
+    """全ライダーの変化点検出のテストケース"""
+
+    def test_per_rider_and_series(self):
+        """ライダー・系列ごとに区間と区間平均が求まるか"""
+        laps = make_laps('A', [80.0, 81.5, 80.5]) + make_laps('B', [82.0], seed=1)
+        # 入力の順序に依存しないこと
+        columns = LapColumns.from_laps(laps[::-1], 2)
+        result = detect_change_points(columns)
+        self.assertEqual(result.riders, ['A', 'B'])
+        self.assertEqual(result.change_laps('A'), [21, 41])
+        self.assertEqual(result.change_laps('A', 'Sector1'), [21, 41])
+        self.assertEqual(result.change_laps('A', 'Sector2'), [])
+        np.testing.assert_allclose(result.segment_means('A'), [80.0, 81.5, 80.5], atol=0.1)
+        self.assertEqual(result.change_laps('B'), [])
+        self.assertEqual(result.rider_segments('Z'), [])
+
+        # ペナルティを大きくすると変化点が減る
+        strict = detect_change_points(columns, penalty_scale=1e6, series=['LapTime'])
+        self.assertEqual(strict.change_laps('A'), [])
+        self.assertEqual(strict.rider_segments('A', 'Sector1'), [])
+
+    def test_large_season_is_fast(self):
+        """多数のラップでも短時間で終わるか"""
+        rng = np.random.default_rng(4)
+        num_laps = 200000
+        per_rider = num_laps // 20
+        columns = LapColumns([f'R{i}' for i in range(20)], np.repeat(np.arange(20), per_rider),
+                             np.tile(np.arange(1, per_rider + 1), 20), 80.0 + rng.normal(0, 0.3, num_laps),
+                             40.0 + rng.normal(0, 0.2, (num_laps, 2)))
+        start = time.perf_counter()
+        result = detect_change_points(columns)
+        self.assertLess(time.perf_counter() - start, 10.0)
+        self.assertEqual(len(result.riders), 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+"""
+条件補正（condition_normalization）のユニットテスト
+"""
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from app.lap_columns import LapColumns
+from app.condition_normalization import fit_condition_model, normalize_laps, _normal_equations
+
+
+def make_columns(num_laps=3000, seed=0, outliers=0.0):
+    """路面温度 0.05秒/℃、Wet +3秒、タイヤB +0.4秒、C -0.3秒 の影響を持つラップ"""
+    rng = np.random.default_rng(seed)
+    riders = rng.integers(0, 4, num_laps)
+    tires = rng.choice(3, num_laps, p=[0.5, 0.3, 0.2])
+    weathers = rng.choice(2, num_laps, p=[0.7, 0.3])
+    temps = rng.uniform(20, 45, num_laps)
+    temps[rng.random(num_laps) < 0.05] = np.nan
+    lap_times = (np.array([80.0, 80.5, 81.0, 79.8])[riders] + np.array([0.0, 0.4, -0.3])[tires]
+                 + np.array([0.0, 3.0])[weathers] + 0.05 * np.nan_to_num(temps - 30.0)
+                 + rng.normal(0, 0.2, num_laps))
+    lap_times[rng.random(num_laps) < outliers] += 40.0
+    sectors = np.column_stack((lap_times * 0.4, lap_times * 0.6))
+    return LapColumns(['A', 'B', 'C', 'D'], riders, np.arange(num_laps), lap_times, sectors,
+                      ['A', 'B', 'C'], tires, ['Dry', 'Wet'], weathers, temps)
+
+
+class TestConditionModel(unittest.TestCase):
+    """条件の効果の推定のテストケース"""
+
+    def test_recovers_effects(self):
+        """各条件の効果とライダーの速さが推定されるか"""
+        model = fit_condition_model(make_columns())
+        self.assertAlmostEqual(model.temp_coefficient, 0.05, delta=0.005)
+        self.assertEqual((model.reference_tire, model.reference_weather), ('A', 'Dry'))
+        self.assertAlmostEqual(model.tire_effects['B'], 0.4, delta=0.05)
+        self.assertAlmostEqual(model.tire_effects['C'], -0.3, delta=0.05)
+        self.assertAlmostEqual(model.weather_effects['Wet'], 3.0, delta=0.05)
+        self.assertEqual(model.tire_effects['A'], 0.0)
+        self.assertLess(model.residual_std, 0.25)
+        self.assertEqual([name for name, _ in model.summary()][1:], ['Weather: Wet', 'Tire: B', 'Tire: C'])
+
+    def test_outliers_are_excluded(self):
+        """外れ値のラップがあっても効果の推定が崩れないか"""
+        model = fit_condition_model(make_columns(outliers=0.03))
+        self.assertAlmostEqual(model.weather_effects['Wet'], 3.0, delta=0.05)
+        self.assertLess(model.num_laps, 3000)
+        unfiltered = fit_condition_model(make_columns(outliers=0.03), outlier_sigma=None)
+        self.assertEqual(unfiltered.num_laps, 3000)
+
+    def test_normal_equations_match_design_matrix(self):
+        """bincountで求めた正規方程式が計画行列から求めたものと一致するか"""
+        rng = np.random.default_rng(1)
+        a, b = rng.integers(0, 3, 50), rng.integers(0, 4, 50)
+        continuous = rng.normal(size=(50, 2))
+        y = rng.normal(size=50)
+        xtx, xty = _normal_equations([(a, 3), (b, 4)], continuous, y)
+        design = np.hstack((np.eye(3)[a], np.eye(4)[b], continuous))
+        np.testing.assert_allclose(xtx, design.T @ design)
+        np.testing.assert_allclose(xty, design.T @ y)
+
+    def test_corrected_times_remove_conditions(self):
+        """補正後のタイムに条件の影響が残らず、セクターの合計がラップタイムと一致するか"""
+        columns = make_columns()
+        model = fit_condition_model(columns)
+        corrected = model.corrected_times(columns)
+        wet = columns.weather_codes == 1
+        rider = columns.rider_codes == 0
+        self.assertAlmostEqual(corrected[wet & rider].mean(), corrected[~wet & rider].mean(), delta=0.05)
+        known = np.isfinite(columns.track_temps)
+        slope = np.polyfit(columns.track_temps[known & rider], corrected[known & rider], 1)[0]
+        self.assertAlmostEqual(slope, 0.0, delta=0.005)
+        np.testing.assert_allclose(model.corrected_sector_times(columns).sum(axis=1), corrected)
+
+    def test_no_conditions(self):
+        """条件の情報がないデータでは補正しないか"""
+        laps = [{'Rider': 'A', 'Lap': i, 'LapTime': '80.000'} for i in range(1, 4)]
+        columns = LapColumns.from_laps(laps, 0)
+        model = fit_condition_model(columns)
+        np.testing.assert_allclose(model.corrected_times(columns), 80.0)
+        self.assertEqual(model.summary(), [])
+        self.assertIsNone(fit_condition_model(LapColumns.from_laps([{'Rider': 'A', 'LapTime': ''}], 0)))
+
+
+class TestNormalizeLaps(unittest.TestCase):
+    """補正後のラップデータ作成のテストケース"""
+
+    def test_normalize_laps(self):
+        """補正後のタイムで置き換え、元のタイムを残すか"""
+        laps = [
+            {'Rider': 'A', 'Lap': 1, 'LapTime': '1:20.000', 'Sector1': '40.000', 'Sector2': '40.000',
+             'Weather': 'Dry', 'TrackTemp': '30'},
+            {'Rider': 'A', 'Lap': 2, 'LapTime': '1:20.500', 'Sector1': '40.250', 'Sector2': '40.250',
+             'Weather': 'Dry', 'TrackTemp': '40'},
+            {'Rider': 'A', 'Lap': 3, 'LapTime': '1:21.000', 'Sector1': '40.500', 'Sector2': '40.500',
+             'Weather': 'Dry', 'TrackTemp': '50'},
+            {'Rider': 'A', 'Lap': 4, 'LapTime': '', 'Sector1': '', 'Sector2': '', 'Weather': 'Dry'},
+        ]
+        columns = LapColumns.from_laps(laps, 2)
+        model = fit_condition_model(columns, reference_temp=30.0)
+        self.assertAlmostEqual(model.temp_coefficient, 0.05)
+        normalized, normalized_columns = normalize_laps(laps, columns, model)
+        self.assertEqual([lap['LapTime'] for lap in normalized[:3]], ['1:20.000'] * 3)
+        self.assertEqual(normalized[2]['Sector1'], '40.000')
+        self.assertEqual(normalized[2]['RawLapTime'], '1:21.000')
+        self.assertEqual(normalized[2]['RawSector2'], '40.500')
+        self.assertNotIn('RawLapTime', normalized[3])
+        self.assertEqual(laps[2]['LapTime'], '1:21.000')
+        # 列指向データは補正後のラップデータを変換した場合と一致する
+        rebuilt = LapColumns.from_laps(normalized, 2)
+        np.testing.assert_allclose(normalized_columns.lap_times, rebuilt.lap_times)
+        np.testing.assert_allclose(normalized_columns.sector_times, rebuilt.sector_times)
+        self.assertEqual(normalized_columns.riders, rebuilt.riders)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+"""
+設定の変更通知（ConfigChangeEvent）のユニットテスト
+"""
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from app.config_manager import ConfigManager
+from app.analyzer import LapTimeAnalyzer
+
+
+class TestConfigEvents(unittest.TestCase):
+    """設定の変更通知のテストケース"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.config_manager = ConfigManager(os.path.join(self.temp_dir, 'config.json'))
+        self.events = []
+
+    def tearDown(self):
+        self.config_manager.flush()
+        shutil.rmtree(self.temp_dir)
+
+    def test_subscribe_filters_by_section_and_key(self):
+        """購読したセクション・キーの変更のみ通知されるか"""
+        self.config_manager.subscribe(self.events.append, "app_settings", "num_sectors")
+        self.config_manager.update_setting("app_settings", "num_sectors", 5)
+        self.config_manager.update_setting("graph_settings", "line_width", 3)
+        self.assertEqual(len(self.events), 1)
+        self.assertEqual(self.events[0].old_value, 3)
+        self.assertEqual(self.events[0].new_value, 5)
+
+    def test_unchanged_value_is_not_notified(self):
+        """値が変わらない場合は通知されないか"""
+        self.config_manager.subscribe(self.events.append)
+        self.config_manager.update_setting("app_settings", "num_sectors", 3)
+        self.assertEqual(self.events, [])
+
+    def test_batch_update_coalesces_events(self):
+        """batch_update中の変更がブロックを抜けたときにまとめて通知されるか"""
+        self.config_manager.subscribe(self.events.append, "app_settings")
+        with self.config_manager.batch_update():
+            self.config_manager.update_setting("app_settings", "num_sectors", 4)
+            self.config_manager.update_setting("app_settings", "num_sectors", 6)
+            self.assertEqual(self.events, [])
+        self.assertEqual(len(self.events), 1)
+        self.assertEqual((self.events[0].old_value, self.events[0].new_value), (3, 6))
+
+    def test_rider_update_carries_item_id(self):
+        """ライダーの更新通知に対象のIDが含まれるか"""
+        rider_id = self.config_manager.add_rider({"name": "A", "color": "#111111"})
+        self.config_manager.subscribe(self.events.append, "riders_settings")
+        self.config_manager.update_rider(rider_id, {"name": "A", "color": "#222222"})
+        self.config_manager.update_rider(rider_id, {"name": "A", "color": "#222222"})
+        self.assertEqual(len(self.events), 1)
+        self.assertEqual(self.events[0].item_id, rider_id)
+        self.assertEqual(self.events[0].old_value["color"], "#111111")
+        self.assertEqual(self.events[0].new_value["color"], "#222222")
+
+    def test_unsubscribe(self):
+        """購読を解除すると通知されなくなるか"""
+        handle = self.config_manager.subscribe(self.events.append)
+        self.config_manager.unsubscribe(handle)
+        self.config_manager.update_setting("app_settings", "num_sectors", 4)
+        self.assertEqual(self.events, [])
+
+    def test_callback_error_does_not_stop_dispatch(self):
+        """コールバックの例外で他の購読者への通知が止まらないか"""
+        def failing(event):
+            raise RuntimeError("failure")
+        self.config_manager.subscribe(failing)
+        self.config_manager.subscribe(self.events.append)
+        self.config_manager.update_setting("app_settings", "num_sectors", 4)
+        self.assertEqual(len(self.events), 1)
+
+    def test_num_sectors_change_clears_analysis_cache(self):
+        """セクター数の変更でアナライザーのキャッシュが破棄されるか"""
+        analyzer = LapTimeAnalyzer(None, self.config_manager)
+        laps = [{'Rider': 'A', 'Lap': 1, 'LapTime': '1:30.000',
+                 'Sector1': '30.000', 'Sector2': '30.000', 'Sector3': '30.000'}]
+        analyzer.analyze_laps(laps)
+        self.assertGreater(len(analyzer.cache), 0)
+        self.config_manager.update_setting("app_settings", "num_sectors", 2)
+        self.assertEqual(len(analyzer.cache), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
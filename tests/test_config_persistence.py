@@ -0,0 +1,89 @@
+"""
+設定ファイルの保存（遅延・集約・アトミック書き込み）のユニットテスト
+"""
+import gc
+import json
+import os
+import sys
+import shutil
+import tempfile
+import time
+import unittest
+import weakref
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from app.config_manager import ConfigManager, _flush_live_managers
+
+
+class TestConfigPersistence(unittest.TestCase):
+    """ConfigManagerの保存処理のテストケース"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.config_file = os.path.join(self.temp_dir, 'config.json')
+        self.managers = []
+
+    def tearDown(self):
+        # 終了時の保存が削除済みのディレクトリに行われないように書き出しておく
+        for config_manager in self.managers:
+            config_manager.flush()
+        shutil.rmtree(self.temp_dir)
+
+    def create_manager(self, save_delay):
+        config_manager = ConfigManager(self.config_file, save_delay=save_delay)
+        self.managers.append(config_manager)
+        return config_manager
+
+    def load_saved(self):
+        with open(self.config_file) as f:
+            return json.load(f)
+
+    def test_changes_are_coalesced(self):
+        """短時間の複数の変更が1回の書き込みにまとめられるか"""
+        config_manager = self.create_manager(0.05)
+        with patch('app.config_manager.atomic_write_text') as write:
+            for i in range(20):
+                config_manager.add_rider({"name": f"R{i}", "color": "#000000"})
+            self.assertEqual(write.call_count, 0)
+            time.sleep(0.3)
+            self.assertEqual(write.call_count, 1)
+        self.assertFalse(config_manager.is_dirty())
+
+    def test_batch_update_defers_until_exit(self):
+        """batch_update中は保存が予約されず、flushで全ての変更が保存されるか"""
+        config_manager = self.create_manager(60)
+        with config_manager.batch_update():
+            config_manager.add_tire({"name": "ウェット"})
+            config_manager.delete_tire("tire1")
+            self.assertIsNone(config_manager._save_timer)
+        self.assertTrue(config_manager.is_dirty())
+        self.assertFalse(os.path.exists(self.config_file))
+        config_manager.flush()
+        names = [tire["name"] for tire in self.load_saved()["tires_settings"]["tires_list"]]
+        self.assertEqual(names, ["ミディアム", "ハード", "ウェット"])
+
+    def test_exit_flush_does_not_keep_managers_alive(self):
+        """終了時の保存の登録で破棄されたインスタンスが残らず、残っているインスタンスは保存されるか"""
+        discarded = weakref.ref(ConfigManager(self.config_file, save_delay=60))
+        gc.collect()
+        self.assertIsNone(discarded())
+        config_manager = self.create_manager(60)
+        config_manager.add_rider({"name": "New", "color": "#123456"})
+        _flush_live_managers()
+        self.assertIn("New", [r["name"] for r in self.load_saved()["riders_settings"]["riders_list"]])
+
+    def test_failed_write_keeps_previous_file(self):
+        """書き込みに失敗しても以前の設定ファイルが壊れないか"""
+        config_manager = self.create_manager(60)
+        self.assertTrue(config_manager.save_config())
+        config_manager.add_rider({"name": "New", "color": "#123456"})
+        with patch('utils.atomic_io.os.replace', side_effect=OSError('disk full')):
+            self.assertFalse(config_manager.flush())
+        self.assertTrue(config_manager.is_dirty())
+        self.assertNotIn("New", [r["name"] for r in self.load_saved()["riders_settings"]["riders_list"]])
+        self.assertEqual(os.listdir(self.temp_dir), ['config.json'])
+
+
+if __name__ == '__main__':
+    unittest.main()
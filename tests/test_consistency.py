@@ -0,0 +1,94 @@
+"""
+安定性のスコア（consistency）のユニットテスト
+"""
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from app.consistency import build_consistency_scores, consistency_index, window_stds, CLEAN_RATIO
+from lap_factory import LapDataTestCase, random_laps
+
+
+class TestConsistency(LapDataTestCase):
+    """安定性のスコアのテストケース"""
+
+    def make_laps(self):
+        """安定したライダーAとばらつきの大きいライダーB（Aの4周目はピットイン）"""
+        laps = random_laps({'A': ([30.0, 30.0], 0.1), 'B': ([30.0, 30.0], 0.6)}, 15)
+        laps[3]['LapTime'] = '95.000'
+        return laps
+
+    def test_scores_match_direct_computation(self):
+        """一貫性指数・ベスト付近の割合・ウィンドウの標準偏差が直接の計算と一致するか"""
+        scores = build_consistency_scores(self.columns, window=4, within_percent=1.0)
+        for rider in ('A', 'B'):
+            times = np.array([float(lap['LapTime']) for lap in self.laps if lap['Rider'] == rider])
+            best = times.min()
+            clean = times[times <= best * CLEAN_RATIO]
+            cv = 100.0 * clean.std() / clean.mean()
+            score = scores.score(rider)
+            self.assertAlmostEqual(score['lap_time_cv'], cv)
+            self.assertAlmostEqual(score['consistency'], consistency_index(cv))
+            self.assertAlmostEqual(score['within_best'], 100.0 * np.mean(times <= best * 1.01))
+            self.assertAlmostEqual(score['recent_within_best'], 100.0 * np.mean(times[-4:] <= best * 1.01))
+            self.assertAlmostEqual(score['recent_std'], times[-4:].std())
+            self.assertAlmostEqual(score['best_window_std'],
+                                   min(times[i:i + 4].std() for i in range(len(times) - 3)))
+        # ピットインのラップは一貫性の計算から除かれる
+        self.assertGreater(scores.score('A')['consistency'], scores.score('B')['consistency'])
+
+    def test_sector_ranks(self):
+        """セクターごとの変動係数の小さい順の順位"""
+        scores = build_consistency_scores(self.columns)
+        self.assertEqual(scores.score('A')['sector_ranks'], [1.0, 1.0])
+        self.assertEqual(scores.score('B')['sector_ranks'], [2.0, 2.0])
+        self.assertEqual(scores.score('B')['sector_rank'], 2.0)
+        self.assertIsNone(scores.score('C'))
+
+    def test_appended_laps_match_rebuild(self):
+        """ラップを1つずつ追加した結果が全体から作り直した結果と一致し、コピー元は変わらないか"""
+        scores = build_consistency_scores(self.to_columns(self.laps[:3]), window=3)
+        first = scores
+        for lap in self.laps[3:]:
+            scores = scores.copy()
+            scores.add_columns(self.to_columns([lap]))
+        rebuilt = build_consistency_scores(self.columns, window=3)
+        self.assertEqual(scores.num_laps, len(self.laps))
+        for rider in ('A', 'B'):
+            for key, value in rebuilt.score(rider).items():
+                np.testing.assert_allclose(scores.score(rider)[key], value, err_msg=key)
+        self.assertEqual(first.lap_times['A'].count, 3)
+
+    def test_replaced_riders_match_rebuild(self):
+        """編集で変更されたライダーのみ作り直した結果が全体から作り直した結果と一致し、コピー元は変わらないか"""
+        scores = build_consistency_scores(self.columns, window=3)
+        self.laps[5] = dict(self.laps[5], LapTime='50.000')
+        self.laps[20] = dict(self.laps[20], Rider='C')
+        columns = self.columns.replace_rows([5, 20], self.to_columns([self.laps[5], self.laps[20]]))
+        updated = scores.copy()
+        updated.replace_riders(columns, ['A', 'B', 'C'])
+        rebuilt = build_consistency_scores(self.to_columns(self.laps), window=3)
+        for rider in ('A', 'B', 'C'):
+            for key, value in rebuilt.score(rider).items():
+                np.testing.assert_allclose(updated.score(rider)[key], value, err_msg=key)
+        self.assertIsNone(scores.score('C'))
+
+    def test_edge_cases(self):
+        """ラップが少ない場合・タイムがない場合"""
+        laps = [{'Rider': 'A', 'Lap': 1, 'LapTime': '60.0', 'Sector1': '', 'Sector2': ''},
+                {'Rider': 'B', 'Lap': 1, 'LapTime': '', 'Sector1': '30.0', 'Sector2': '30.0'}]
+        scores = build_consistency_scores(self.to_columns(laps))
+        score = scores.score('A')
+        self.assertTrue(np.isnan(score['consistency']) and np.isnan(score['best_window_std']))
+        self.assertEqual((score['within_best'], score['recent_std']), (100.0, 0.0))
+        self.assertTrue(np.isnan(score['sector_rank']))
+        self.assertIsNone(scores.score('B'))
+        self.assertEqual(window_stds([1.0, 2.0], 3).size, 0)
+        np.testing.assert_allclose(window_stds([1.0, 3.0, 5.0], 2), [1.0, 1.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+"""
+デルタタイム計算（delta_time）のユニットテスト
+"""
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from app.telemetry_store import TelemetryStore, TelemetryLap
+from app.delta_time import compute_delta_times, lap_trace
+
+
+class TestDeltaTime(unittest.TestCase):
+    """デルタタイム計算のテストケース"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write_store(self, speeds, with_distance):
+        """一定速度（km/h）のラップを並べたストアを作成する（サンプリング周波数10Hz）"""
+        channels = {'Speed': [], 'Distance': []}
+        laps, position = [], 0
+        for lap, speed in enumerate(speeds, start=1):
+            samples = int(round(1000 / (speed / 3.6) * 10)) + 1  # 1000mを走る分のサンプル
+            channels['Speed'].append(np.full(samples, speed))
+            channels['Distance'].append(np.arange(samples) * speed / 3.6 / 10)
+            laps.append(TelemetryLap('A', lap, position, position + samples))
+            position += samples
+        channels = {name: np.concatenate(values) for name, values in channels.items()}
+        if not with_distance:
+            del channels['Distance']
+        return TelemetryStore.write(os.path.join(self.temp_dir, 'laps.telemetry'), channels, laps, 10.0)
+
+    def test_constant_speed_delta(self):
+        """一定速度のラップ同士のデルタが距離に比例し、最後に所要時間の差になるか"""
+        for with_distance in (True, False):
+            store = self.write_store([100.0, 90.0, 120.0], with_distance)
+            traces = [lap_trace(store, lap) for lap in store.laps]
+            result = compute_delta_times(traces[0], traces[1:], num_points=101)
+            self.assertEqual(result.deltas.shape, (2, 101))
+            np.testing.assert_allclose(result.deltas[:, 0], 0.0, atol=1e-6)
+            expected = [1000 / (90 / 3.6) - 36.0, 1000 / (120 / 3.6) - 36.0]
+            np.testing.assert_allclose(result.deltas[:, 50], np.array(expected) / 2, atol=0.05)
+            np.testing.assert_allclose(result.final_deltas, expected, atol=0.1)
+
+    def test_shorter_lap_is_nan_beyond_its_distance(self):
+        """基準より短い距離で終わるラップは、その先がNaNになるか"""
+        reference = (np.linspace(0, 100, 11), np.linspace(0, 10, 11))
+        short = (np.linspace(0, 50, 6), np.linspace(0, 6, 6))
+        result = compute_delta_times(reference, [short], num_points=11)
+        self.assertTrue(np.isnan(result.deltas[0, 6:]).all())
+        self.assertAlmostEqual(result.final_deltas[0], 1.0)
+
+    def test_many_laps(self):
+        """多数のラップをまとめて比較できるか"""
+        distance = np.linspace(0, 4000, 10000)
+        reference = (distance, distance / 40.0)
+        rng = np.random.default_rng(1)
+        traces = [(distance, distance / 40.0 * factor) for factor in rng.uniform(1.0, 1.05, 500)]
+        result = compute_delta_times(reference, traces)
+        self.assertEqual(len(result), 500)
+        self.assertTrue((result.final_deltas >= 0).all())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+"""
+ラップタイム分布（distribution_stats）のユニットテスト
+"""
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from app.lap_columns import LapColumns
+from app.distribution_stats import QUANTILES, compute_distribution_stats, series_distribution
+
+
+class TestSeriesDistribution(unittest.TestCase):
+    """1系列の分布のテストケース"""
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.codes = rng.integers(0, 3, 3000)
+        self.values = np.array([80.0, 82.0, 85.0])[self.codes] + rng.gamma(2.0, 0.5, 3000)
+        self.values[:5] = [np.nan, 0.0, -1.0, 300.0, np.nan]
+        # ライダー3はラップなし
+        self.distribution = series_distribution('LapTime', self.codes, self.values, 4)
+
+    def rider_values(self, row):
+        values = self.values[self.codes == row]
+        return values[np.isfinite(values) & (values > 0)]
+
+    def test_quantiles_match_numpy(self):
+        """ライダーごとの分位点・平均・ラップ数がNumPyの計算と一致するか"""
+        for row in range(3):
+            values = self.rider_values(row)
+            np.testing.assert_allclose(self.distribution.quantiles[row], np.quantile(values, QUANTILES))
+            self.assertAlmostEqual(self.distribution.means[row], values.mean())
+            self.assertEqual(self.distribution.counts[row], values.size)
+        self.assertTrue(np.isnan(self.distribution.quantiles[3]).all())
+        self.assertEqual(self.distribution.counts[3], 0)
+
+    def test_whiskers(self):
+        """ひげの端が四分位範囲の1.5倍以内にある実際の値か"""
+        for row in range(3):
+            values = self.rider_values(row)
+            q1, q3 = np.quantile(values, [0.25, 0.75])
+            inside = values[(values >= q1 - 1.5 * (q3 - q1)) & (values <= q3 + 1.5 * (q3 - q1))]
+            self.assertEqual(tuple(self.distribution.whiskers[row]), (inside.min(), inside.max()))
+        stats = self.distribution.box_stats(0, 'A')
+        self.assertEqual(stats['label'], 'A')
+        self.assertLessEqual(stats['whislo'], stats['q1'])
+        self.assertLessEqual(stats['q3'], stats['whishi'])
+        self.assertIsNone(self.distribution.box_stats(3, 'D'))
+
+    def test_densities(self):
+        """密度の積分が1で、ヒストグラムに近いか"""
+        grid, densities = self.distribution.grid, self.distribution.densities
+        step = grid[1] - grid[0]
+        np.testing.assert_allclose(densities[:3].sum(axis=1) * step, 1.0)
+        self.assertFalse(densities[3].any())
+        values = self.rider_values(1)
+        edges = np.linspace(82.0, 86.0, 9)
+        histogram, _ = np.histogram(values, bins=edges)
+        centers = (edges[:-1] + edges[1:]) / 2
+        expected = histogram / (values.size * (edges[1] - edges[0]))
+        np.testing.assert_allclose(np.interp(centers, grid, densities[1]), expected, atol=0.1)
+        # 極端な外れ値（300秒）で格子が広がらない
+        self.assertLess(grid[-1], 120.0)
+
+
+class TestDistributionStats(unittest.TestCase):
+    """全系列の分布のテストケース"""
+
+    def test_compute_from_columns(self):
+        """LapColumnsから各系列の分布を求め、中央値順にライダーを並べるか"""
+        laps = [{'Rider': rider, 'Lap': lap, 'LapTime': f"{base + lap * 0.1:.3f}",
+                 'Sector1': f"{(base + lap * 0.1) / 2:.3f}", 'Sector2': f"{(base + lap * 0.1) / 2:.3f}"}
+                for rider, base in (('A', 90.0), ('B', 80.0)) for lap in range(1, 11)]
+        laps.append({'Rider': 'C', 'Lap': 1, 'LapTime': '', 'Sector1': '', 'Sector2': ''})
+        stats = compute_distribution_stats(LapColumns.from_laps(laps, 2))
+        self.assertEqual(list(stats.series), ['LapTime', 'Sector1', 'Sector2'])
+        self.assertEqual(stats.riders_by_median(), ['B', 'A'])
+        row = stats.rider_row('A')
+        self.assertAlmostEqual(stats.series['LapTime'].quantile(row, 0.5), 90.55)
+        self.assertAlmostEqual(stats.series['Sector2'].quantile(row, 0.5), 45.275)
+        self.assertIsNone(stats.rider_row('Z'))
+        only = compute_distribution_stats(LapColumns.from_laps(laps, 2), series=['Sector1', 'Unknown'])
+        self.assertEqual(list(only.series), ['Sector1'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+"""
+編集履歴（元に戻す・やり直し）と差分再解析のユニットテスト
+"""
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from app.edit_history import UndoStack, EditCommand, AddLapCommand, DeleteLapsCommand
+from app.analyzer import LapTimeAnalyzer
+
+
+def make_lap(rider, lap, lap_time, sector1='30.000'):
+    return {'Rider': rider, 'Lap': lap, 'LapTime': lap_time, 'Sector1': sector1, 'Sector2': '60.000'}
+
+
+class TestUndoStack(unittest.TestCase):
+    """UndoStackと各コマンドのテストケース"""
+
+    def setUp(self):
+        self.laps = [make_lap('A', 1, '1:30.000'), make_lap('A', 2, '1:31.000'), make_lap('B', 1, '1:29.000')]
+        self.original = [dict(lap) for lap in self.laps]
+        self.stack = UndoStack()
+
+    def execute(self, command):
+        command.apply(self.laps)
+        self.stack.push(command)
+
+    def test_edit_undo_redo(self):
+        """セル編集を元に戻し、やり直せるか"""
+        self.execute(EditCommand(1, 'LapTime', '1:31.000', '1:30.500'))
+        self.assertEqual(self.laps[1]['LapTime'], '1:30.500')
+        self.stack.undo(self.laps)
+        self.assertEqual(self.laps, self.original)
+        self.assertTrue(self.stack.can_redo())
+        self.stack.redo(self.laps)
+        self.assertEqual(self.laps[1]['LapTime'], '1:30.500')
+
+    def test_add_and_delete_are_reversible(self):
+        """追加・削除を順に元に戻すと元のデータに戻るか"""
+        self.execute(AddLapCommand(3, make_lap('B', 2, '1:28.000')))
+        self.execute(DeleteLapsCommand.from_laps(self.laps, [3, 0]))
+        self.assertEqual([lap['LapTime'] for lap in self.laps], ['1:31.000', '1:29.000'])
+        self.stack.undo(self.laps)
+        self.stack.undo(self.laps)
+        self.assertEqual(self.laps, self.original)
+        self.assertIsNone(self.stack.undo(self.laps))
+
+    def test_push_discards_redo(self):
+        """新しい操作で、やり直し可能な操作が破棄されるか"""
+        self.execute(EditCommand(0, 'Lap', 1, 5))
+        self.stack.undo(self.laps)
+        self.execute(EditCommand(0, 'Lap', 1, 6))
+        self.assertFalse(self.stack.can_redo())
+
+    def test_limit(self):
+        """履歴数の上限を超えると古い操作から破棄されるか"""
+        stack = UndoStack(limit=2)
+        for value in (2, 3, 4):
+            stack.push(EditCommand(0, 'Lap', value - 1, value))
+        self.assertIsNotNone(stack.undo(self.laps))
+        self.assertIsNotNone(stack.undo(self.laps))
+        self.assertFalse(stack.can_undo())
+
+    def test_rider_change_affects_both_riders(self):
+        """ライダー名の変更では変更前後の両方が再解析対象になるか"""
+        command = EditCommand(0, 'Rider', 'A', 'C')
+        command.apply(self.laps)
+        self.assertEqual(command.affected_riders(self.laps), {'A', 'C'})
+
+
+class TestIncrementalAnalysis(unittest.TestCase):
+    """差分再解析のテストケース"""
+
+    def setUp(self):
+        config_manager = MagicMock()
+        config_manager.get_num_sectors.return_value = 2
+        config_manager.get_setting.return_value = 8
+        config_manager.is_micro_sector_mode.return_value = False
+        self.analyzer = LapTimeAnalyzer(None, config_manager)
+        self.laps = [make_lap('A', i + 1, f'1:3{i}.000') for i in range(4)]
+        self.laps += [make_lap('B', i + 1, f'1:2{i + 5}.500') for i in range(4)]
+
+    def assert_same_analysis(self, incremental, full):
+        self.assertEqual(incremental['fastest_lap'], full['fastest_lap'])
+        self.assertEqual(incremental['slowest_lap'], full['slowest_lap'])
+        self.assertEqual(incremental['total_laps'], full['total_laps'])
+        self.assertEqual(incremental['rider_stats'].keys(), full['rider_stats'].keys())
+        for rider, stats in full['rider_stats'].items():
+            self.assertAlmostEqual(incremental['rider_stats'][rider]['avg_time'], stats['avg_time'])
+        self.assertEqual(incremental['sector_stats'], full['sector_stats'])
+
+    def test_edit_matches_full_analysis(self):
+        """1ラップの編集後の差分再解析が全体の再解析と一致するか"""
+        previous = self.analyzer.analyze_laps(self.laps)
+        previous_moving = self.analyzer.calculate_moving_statistics(self.laps)
+        EditCommand(5, 'LapTime', self.laps[5]['LapTime'], '1:24.000').apply(self.laps)
+        EditCommand(5, 'Sector1', self.laps[5]['Sector1'], '29.000').apply(self.laps)
+
+        incremental = self.analyzer.update_analysis(self.laps, previous, ['B'])
+        moving = self.analyzer.update_moving_statistics(self.laps, previous_moving, ['B'])
+        self.analyzer.clear_cache()
+        self.assert_same_analysis(incremental, self.analyzer.analyze_laps(self.laps))
+        self.assertEqual(moving, self.analyzer.calculate_moving_statistics(self.laps))
+
+    def test_rider_rename_removes_old_rider(self):
+        """ライダー名を変更して旧ライダーのラップがなくなった場合に統計から消えるか"""
+        laps = self.laps[:5]
+        previous = self.analyzer.analyze_laps(laps)
+        EditCommand(4, 'Rider', 'B', 'A').apply(laps)
+        incremental = self.analyzer.update_analysis(laps, previous, ['A', 'B'])
+        self.assertNotIn('B', incremental['rider_stats'])
+        self.analyzer.clear_cache()
+        self.assert_same_analysis(incremental, self.analyzer.analyze_laps(laps))
+
+
+if __name__ == '__main__':
+    unittest.main()
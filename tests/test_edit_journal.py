@@ -0,0 +1,118 @@
+"""
+自動保存ジャーナルのユニットテスト
+"""
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from app.edit_journal import EditJournal
+
+
+def make_lap(rider, lap, lap_time='1:30.000'):
+    return {'Rider': rider, 'Lap': lap, 'LapTime': lap_time, 'Sector1': '30.000', 'Sector2': '60.000'}
+
+
+class TestEditJournal(unittest.TestCase):
+    """EditJournalのテストケース"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'autosave.jsonl')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def simulate_session(self, journal):
+        """ラップの読み込み・追加・編集・削除を行い、最終的なデータを返す"""
+        laps = [make_lap('A', 1), make_lap('A', 2)]
+        journal.reset(laps)
+        laps.append(make_lap('B', 1))
+        journal.record_add(laps, 2)
+        laps[0]['LapTime'] = '1:29.000'
+        journal.record_edit(laps, 0, 'LapTime')
+        del laps[1]
+        journal.record_delete(laps, [1])
+        return laps
+
+    def test_recover_replays_operations(self):
+        """異常終了後にスナップショットと操作から復元できるか"""
+        journal = EditJournal(self.path)
+        laps = self.simulate_session(journal)
+        # closeせずに別インスタンスから復元（異常終了を想定）
+        recovered = EditJournal(self.path)
+        self.assertTrue(recovered.has_recovery())
+        self.assertEqual(recovered.recover(), laps)
+
+    def test_compaction_bounds_journal(self):
+        """操作数が閾値を超えるとスナップショットに集約されるか"""
+        journal = EditJournal(self.path, compact_threshold=3)
+        laps = []
+        for i in range(10):
+            laps.append(make_lap('A', i + 1))
+            journal.record_add(laps, i)
+        with open(self.path, encoding='utf-8') as f:
+            self.assertLess(len(f.readlines()), 10)
+        self.assertEqual(EditJournal(self.path).recover(), laps)
+
+    def test_operations_in_snapshot_are_not_replayed_twice(self):
+        """スナップショット後にジャーナルを空にする前に終了しても二重適用されないか"""
+        journal = EditJournal(self.path, compact_threshold=1000)
+        laps = [make_lap('A', 1)]
+        journal.checkpoint(laps)
+        laps.append(make_lap('A', 2))
+        journal.record_add(laps, 1)
+        with open(self.path, encoding='utf-8') as f:
+            pending = f.read()
+        journal.checkpoint(laps)
+        # スナップショットに含まれる操作がジャーナルに残った状態を再現
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write(pending)
+        self.assertEqual(EditJournal(self.path).recover(), laps)
+
+    def test_incomplete_last_line_is_ignored(self):
+        """書き込み途中の最後の行が無視されるか"""
+        journal = EditJournal(self.path)
+        laps = self.simulate_session(journal)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write('{"op": "add", "row": 5, "la')
+        self.assertEqual(EditJournal(self.path).recover(), laps)
+
+    def test_fsync_is_batched(self):
+        """fsyncが操作ごとではなくまとめて行われるか"""
+        journal = EditJournal(self.path, sync_every=10, sync_interval=3600)
+        laps = []
+        with patch('app.edit_journal.os.fsync') as fsync:
+            for i in range(25):
+                laps.append(make_lap('A', i + 1))
+                journal.record_add(laps, i)
+            self.assertEqual(fsync.call_count, 2)
+
+    def test_reset_defers_snapshot_until_first_edit(self):
+        """データの置き換えではスナップショットを書き出さず、最初の編集で書き出すか"""
+        journal = EditJournal(self.path)
+        self.simulate_session(journal)
+        laps = [make_lap('C', 1)]
+        journal.reset(laps)
+        self.assertFalse(journal.has_recovery())
+        self.assertFalse(journal.has_unsaved_edits())
+        laps[0]['LapTime'] = '1:28.000'
+        journal.record_edit(laps, 0, 'LapTime')
+        self.assertTrue(journal.has_unsaved_edits())
+        self.assertEqual(EditJournal(self.path).recover(), laps)
+        journal.mark_saved()
+        self.assertFalse(journal.has_unsaved_edits())
+
+    def test_close_with_discard(self):
+        """正常終了時にジャーナルが削除されるか"""
+        journal = EditJournal(self.path)
+        self.simulate_session(journal)
+        journal.close(discard=True)
+        self.assertFalse(EditJournal(self.path).has_recovery())
+
+
+if __name__ == '__main__':
+    unittest.main()
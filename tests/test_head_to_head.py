@@ -0,0 +1,67 @@
+"""
+総当たり比較行列のユニットテスト
+"""
+import os
+import sys
+import unittest
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from app.lap_columns import LapColumns
+from app.head_to_head import build_head_to_head
+
+
+class TestHeadToHead(unittest.TestCase):
+    """HeadToHeadMatrixのテストケース"""
+
+    def setUp(self):
+        self.laps = [
+            {'Rider': 'A', 'Lap': 1, 'LapTime': '1:30.000', 'Sector1': '30.000', 'Sector2': '60.000'},
+            {'Rider': 'A', 'Lap': 2, 'LapTime': '1:29.000', 'Sector1': '29.500', 'Sector2': '59.500'},
+            {'Rider': 'A', 'Lap': 3, 'LapTime': '1:31.000', 'Sector1': '30.500', 'Sector2': '60.500'},
+            {'Rider': 'B', 'Lap': 1, 'LapTime': '1:29.500', 'Sector1': '29.000', 'Sector2': '60.500'},
+            {'Rider': 'B', 'Lap': 2, 'LapTime': '1:30.000', 'Sector1': '29.200', 'Sector2': '60.800'},
+            {'Rider': 'B', 'Lap': 4, 'LapTime': 'invalid', 'Sector1': '29.200', 'Sector2': '60.800'},
+        ]
+        self.columns = LapColumns.from_laps(self.laps, num_sectors=2)
+
+    def test_columns_parse_times(self):
+        """時間文字列が秒に変換され、無効なラップがマスクされるか"""
+        self.assertEqual(self.columns.riders, ['A', 'B'])
+        self.assertAlmostEqual(self.columns.lap_times[0], 90.0)
+        self.assertEqual(self.columns.sector_times.shape, (6, 2))
+        self.assertFalse(self.columns.valid[5])
+
+    def test_best_and_median_delta(self):
+        """ベストラップ差と中央値差が正しいか"""
+        matrix = build_head_to_head(self.columns)
+        self.assertAlmostEqual(matrix.best_delta[0, 1], 89.0 - 89.5)
+        self.assertAlmostEqual(matrix.best_delta[1, 0], 0.5)
+        self.assertAlmostEqual(matrix.median_delta[0, 1], 90.0 - 89.75)
+        self.assertTrue(np.allclose(np.diag(matrix.best_delta), 0.0))
+
+    def test_sector_best_delta(self):
+        """セクターベスト差が (セクター, 行, 列) で計算されるか"""
+        matrix = build_head_to_head(self.columns)
+        self.assertEqual(matrix.sector_best_delta.shape, (2, 2, 2))
+        self.assertAlmostEqual(matrix.sector_best_delta[0, 0, 1], 29.5 - 29.0)
+        self.assertAlmostEqual(matrix.sector_best_delta[1, 0, 1], 59.5 - 60.5)
+
+    def test_win_rate_on_matched_laps(self):
+        """同じラップ番号のみで勝率が計算されるか"""
+        matrix = build_head_to_head(self.columns)
+        # ラップ1: B勝ち, ラップ2: A勝ち, ラップ3/4は相手なし
+        self.assertEqual(matrix.matched_laps[0, 1], 2)
+        self.assertAlmostEqual(matrix.win_rate[0, 1], 0.5)
+        self.assertAlmostEqual(matrix.win_rate[0, 1] + matrix.win_rate[1, 0], 1.0)
+
+    def test_get_matrix_by_metric_name(self):
+        """表示名から行列を取得できるか"""
+        matrix = build_head_to_head(self.columns)
+        self.assertIn('Sector2 Best Delta', matrix.metric_names())
+        self.assertIs(matrix.get_matrix('Win Rate'), matrix.win_rate)
+        self.assertIsNone(matrix.get_matrix('Unknown'))
+
+
+if __name__ == '__main__':
+    unittest.main()
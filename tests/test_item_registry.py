@@ -0,0 +1,109 @@
+"""
+登録項目の索引（ItemRegistry）とConfigManagerのライダー・タイヤ管理のユニットテスト
+"""
+import json
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from app.item_registry import ItemRegistry
+from app.config_manager import ConfigManager
+
+
+class TestItemRegistry(unittest.TestCase):
+    """ItemRegistryのテストケース"""
+
+    def setUp(self):
+        self.registry = ItemRegistry("rider", [
+            {"id": "rider1", "name": "A", "color": "#111111"},
+            {"id": "rider3", "name": "B", "color": "#333333"},
+        ])
+
+    def test_lookup_by_id_and_name(self):
+        """IDと名前で検索できるか"""
+        self.assertEqual(self.registry.get("rider3")["name"], "B")
+        self.assertEqual(self.registry.find_by_name("A")["id"], "rider1")
+        self.assertIsNone(self.registry.find_by_name("C"))
+
+    def test_next_id_does_not_collide(self):
+        """払い出されるIDが既存のIDと重複せず、削除された項目のIDは再利用されないか"""
+        self.assertEqual(self.registry.add({"name": "C"}), "rider4")
+        self.registry.remove("rider4")
+        self.assertEqual(self.registry.add({"name": "D"}), "rider5")
+        self.registry.remove("rider1")
+        self.assertEqual(self.registry.add({"name": "E"}), "rider6")
+
+    def test_items_without_id_get_numbers_after_loaded_ids(self):
+        """IDのない項目には、後ろにある項目も含めた最大の番号の次から払い出されるか"""
+        registry = ItemRegistry("rider", [{"name": "A"}, {"id": "rider7", "name": "B"}, {"id": "x", "name": "C"}])
+        self.assertEqual([item["id"] for item in registry.to_list()], ["rider8", "rider7", "x"])
+        self.assertEqual(registry.add({"name": "D"}), "rider9")
+
+    def test_update_keeps_order_and_reindexes_name(self):
+        """更新で位置が変わらず、名前の索引が更新されるか"""
+        self.registry.update("rider1", {"name": "A2"})
+        self.assertEqual([item["id"] for item in self.registry.to_list()], ["rider1", "rider3"])
+        self.assertIsNone(self.registry.find_by_name("A"))
+        self.assertEqual(self.registry.find_by_name("A2")["id"], "rider1")
+        self.assertIsNone(self.registry.update("rider9", {"name": "X"}))
+
+    def test_duplicate_names_resolve_to_first(self):
+        """同名の項目は先に登録されたものが返り、削除後は次のものが返るか"""
+        self.registry.add({"name": "A", "color": "#444444"})
+        self.assertEqual(self.registry.find_by_name("A")["id"], "rider1")
+        self.registry.remove("rider1")
+        self.assertEqual(self.registry.find_by_name("A")["id"], "rider4")
+
+
+class TestConfigManagerRegistry(unittest.TestCase):
+    """ConfigManagerのライダー・タイヤ管理のテストケース"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.config_file = os.path.join(self.temp_dir, 'config.json')
+        with open(self.config_file, 'w') as f:
+            json.dump({"graph": {"rider_color_Legacy": "#abcdef"}}, f)
+        self.config_manager = ConfigManager(self.config_file)
+
+    def tearDown(self):
+        self.config_manager.flush()
+        shutil.rmtree(self.temp_dir)
+
+    def test_rider_color_lookup(self):
+        """新旧両方の設定から色を取得できるか"""
+        rider_id = self.config_manager.add_rider({"name": "New", "color": "#123456"})
+        self.assertEqual(self.config_manager.get_rider_color("New"), "#123456")
+        self.assertEqual(self.config_manager.get_rider_color("Legacy"), "#abcdef")
+        self.config_manager.update_rider(rider_id, {"name": "Renamed", "color": "#654321"})
+        self.assertEqual(self.config_manager.get_rider_color("Renamed"), "#654321")
+        self.assertIsNone(self.config_manager.get_rider_color("New"))
+
+    def test_changes_are_saved(self):
+        """追加・削除が設定ファイルに保存されるか"""
+        tire_id = self.config_manager.add_tire({"name": "ウェット"})
+        self.config_manager.delete_tire("tire1")
+        self.config_manager.flush()
+        reloaded = ConfigManager(self.config_file)
+        names = [tire["name"] for tire in reloaded.get_tires_list()]
+        self.assertEqual(names, ["ミディアム", "ハード", "ウェット"])
+        self.assertEqual(reloaded.get_tire(tire_id)["name"], "ウェット")
+
+    def test_returned_list_is_a_copy(self):
+        """取得したリストを変更しても登録内容が変わらないか"""
+        riders = self.config_manager.get_riders_list()
+        riders.append({"id": "rider99", "name": "X"})
+        self.assertNotIn("rider99", [rider["id"] for rider in self.config_manager.get_riders_list()])
+        self.assertIsNone(self.config_manager.find_rider_by_name("X"))
+
+    def test_update_setting_rebuilds_index(self):
+        """リスト全体を設定し直した場合に索引が作り直されるか"""
+        self.config_manager.update_setting("riders_settings", "riders_list", [{"id": "rider7", "name": "X"}])
+        self.assertEqual(self.config_manager.find_rider_by_name("X")["id"], "rider7")
+        self.assertIsNone(self.config_manager.find_rider_by_name("Default Rider"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+"""
+ストリーミングJSON読み込みのユニットテスト
+"""
+import io
+import json
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from utils.json_stream import JsonArrayStream
+from app.data_loader import DataLoader
+from app.lap_columns import LapColumns
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+
+
+class MockConfigManager:
+    """テスト用の設定マネージャーモック"""
+    def __init__(self, num_sectors=4):
+        self.num_sectors = num_sectors
+
+    def get_num_sectors(self):
+        return self.num_sectors
+
+
+class TestJsonArrayStream(unittest.TestCase):
+    """JsonArrayStreamのテストケース"""
+
+    def test_chunk_boundaries(self):
+        """チャンクの境界で要素や数値が分断されても正しく読み込めるか"""
+        data = {'session_info': {'track': 'もてぎ'},
+                'lap_data': [{'Lap': i, 'LapTime': 12345.678 + i, 'tags': ['a', None, True]}
+                             for i in range(50)],
+                'count': 1234567}
+        text = json.dumps(data, ensure_ascii=False, indent=2)
+        for chunk_size in (1, 3, 7, 64, 1 << 20):
+            stream = JsonArrayStream(io.StringIO(text), 'lap_data', chunk_size=chunk_size)
+            self.assertEqual(list(stream.items()), data['lap_data'])
+            self.assertEqual(stream.fields, {'session_info': {'track': 'もてぎ'}, 'count': 1234567})
+
+    def test_numbers_split_at_every_chunk_size(self):
+        """小数点や指数の直後でチャンクが切れても数値を正しく読み込めるか"""
+        for text in ('{"version": 2.0, "lap_data": []}', '{"lap_data": [1.5, 2, -3e-2, 4E+1]}',
+                     '{"lap_data": [{"a": 1}], "temp": 12.5}'):
+            data = json.loads(text)
+            for chunk_size in range(1, len(text) + 1):
+                stream = JsonArrayStream(io.StringIO(text), 'lap_data', chunk_size=chunk_size)
+                self.assertEqual(list(stream.items()), data['lap_data'], chunk_size)
+                self.assertEqual(stream.fields, {k: v for k, v in data.items() if k != 'lap_data'}, chunk_size)
+
+    def test_empty_and_missing_array(self):
+        """空の配列や配列がない場合"""
+        stream = JsonArrayStream(io.StringIO('{"lap_data": []}'), 'lap_data')
+        self.assertEqual(list(stream.items()), [])
+        self.assertTrue(stream.found_array)
+        stream = JsonArrayStream(io.StringIO('{"other": 1}'), 'lap_data')
+        self.assertEqual(list(stream.items()), [])
+        self.assertFalse(stream.found_array)
+
+    def test_malformed_json(self):
+        """不正なJSONでJSONDecodeErrorになるか"""
+        for text in ('[1, 2]', '{"lap_data": [{"a": 1} {"b": 2}]}', '{"lap_data": [{"a": 1}'):
+            with self.assertRaises(json.JSONDecodeError):
+                list(JsonArrayStream(io.StringIO(text), 'lap_data', chunk_size=4).items())
+
+
+class TestStreamingDataLoader(unittest.TestCase):
+    """DataLoaderのストリーミング読み込みのテストケース"""
+
+    def setUp(self):
+        self.loader = DataLoader(MockConfigManager())
+        self.file_path = os.path.join(DATA_DIR, 'motegi_0314.json')
+
+    def test_load_json_matches_in_memory_processing(self):
+        """ストリーミング読み込みの結果が従来の処理と一致するか"""
+        with open(self.file_path, 'r', encoding='utf-8') as f:
+            raw = json.load(f)
+        laps = (self.loader._process_json_lap(lap, i, 4) for i, lap in enumerate(raw['lap_data']))
+        expected = {'session_info': raw['session_info'], 'lap_data': [lap for lap in laps if lap is not None]}
+        self.assertEqual(self.loader.load_json(self.file_path), expected)
+
+    def test_load_json_columnar_in_batches(self):
+        """バッチ単位で変換した列指向データが一括変換と一致するか"""
+        laps = self.loader.load_json(self.file_path)['lap_data']
+        expected = LapColumns.from_laps(laps, 4)
+        result = self.loader.load_json_columnar(self.file_path, batch_size=7)
+        columns = result['columns']
+        self.assertEqual(result['session_info']['track'], 'もてぎ')
+        self.assertEqual(columns.riders, expected.riders)
+        self.assertTrue(np.array_equal(columns.rider_codes, expected.rider_codes))
+        self.assertTrue(np.allclose(columns.sector_times, expected.sector_times))
+        self.assertEqual(columns.to_laps(), expected.to_laps())
+
+    def test_session_info_after_lap_data(self):
+        """session_infoがlap_dataより後ろにあっても取得できるか"""
+        temp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(temp_dir, 'reordered.json')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write('{"lap_data": [{"Rider": "A", "Lap": 1, "LapTime": "1:30.000", "Sector1": "20.0", '
+                        '"Sector2": "20.0", "Sector3": "20.0", "Sector4": "30.0"}], '
+                        '"session_info": {"track": "Sugo"}}')
+            data = self.loader.load_json(path)
+            self.assertEqual(data['session_info'], {'track': 'Sugo'})
+            self.assertEqual(len(data['lap_data']), 1)
+        finally:
+            shutil.rmtree(temp_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+"""
+ラップの絞り込み条件式（lap_filter）のユニットテスト
+"""
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from app.lap_filter import compile_filter
+from lap_factory import LapDataTestCase
+
+
+class TestLapFilter(LapDataTestCase):
+    """条件式の解析とマスクのテストケース"""
+
+    def make_laps(self):
+        """3人分のラップ（鈴木のラップはタイムが欠けている）"""
+        return [
+            {'Rider': '藤田', 'Lap': 1, 'LapTime': '2:25.500', 'Sector1': '60.0', 'Sector2': '85.5',
+             'TireType': 'KR410', 'Weather': 'Sunny', 'TrackTemp': '30'},
+            {'Rider': '藤田', 'Lap': 2, 'LapTime': '2:40.000', 'Sector1': '70.0', 'Sector2': '90.0',
+             'TireType': 'KR410', 'Weather': 'Sunny', 'TrackTemp': '32'},
+            {'Rider': '佐藤', 'Lap': 1, 'LapTime': '2:26.500', 'Sector1': '61.0', 'Sector2': '85.5',
+             'TireType': 'KR410', 'Weather': 'Cloudy', 'TrackTemp': '28'},
+            {'Rider': '佐藤', 'Lap': 2, 'LapTime': '2:24.000', 'Sector1': '59.0', 'Sector2': '85.0',
+             'TireType': 'KR133', 'Weather': 'Cloudy', 'TrackTemp': '29'},
+            {'Rider': '鈴木', 'Lap': 1, 'LapTime': '', 'Sector1': '62.0', 'Sector2': '',
+             'TireType': 'KR410', 'Weather': 'Sunny', 'TrackTemp': '31'},
+        ]
+
+    def mask(self, expression):
+        return compile_filter(expression).mask(self.columns).astype(int).tolist()
+
+    def test_example_expression(self):
+        """ライダー・タイヤ・タイム・outlierを組み合わせた条件式"""
+        expression = 'Rider in ("藤田", "佐藤") and TireType == "KR410" and LapTime < 2:26.0 and not outlier'
+        self.assertEqual(self.mask(expression), [1, 0, 0, 0, 0])
+
+    def test_comparisons_and_logic(self):
+        """比較演算子・not in・or・括弧・数値の項目"""
+        self.assertEqual(self.mask('Rider not in (藤田, 佐藤)'), [0, 0, 0, 0, 1])
+        self.assertEqual(self.mask("Weather != 'Sunny' or Lap >= 2"), [0, 1, 1, 1, 0])
+        self.assertEqual(self.mask('(Tire = KR133 or TrackTemp > 31) and not Lap = 1'), [0, 1, 0, 1, 0])
+        self.assertEqual(self.mask('Sector1 <= 60 AND Sector2 < 85.5'), [0, 0, 0, 1, 0])
+        self.assertEqual(self.mask('LapTime in ("2:24.000", 145.5)'), [1, 0, 0, 1, 0])
+        # タイムのないラップはどの比較にも一致しない
+        self.assertEqual(self.mask('LapTime > 0 or LapTime <= 0'), [1, 1, 1, 1, 0])
+        self.assertEqual(self.mask(''), [1, 1, 1, 1, 1])
+        self.assertTrue(compile_filter('  ').is_empty)
+
+    def test_flags(self):
+        """outlier（ライダーのベストの107%より遅い）と valid"""
+        self.assertEqual(self.mask('outlier'), [0, 1, 0, 0, 1])
+        self.assertEqual(self.mask('valid'), [1, 1, 1, 1, 0])
+
+    def test_errors(self):
+        """誤った条件式はValueErrorになるか"""
+        for expression in ('Rider ==', 'Driver == "A"', 'Rider < "A"', 'LapTime < fast',
+                           '(Rider == A', 'Rider == A B', 'Rider in A', 'LapTime ~ 1'):
+            with self.assertRaises(ValueError, msg=expression):
+                compile_filter(expression)
+        # セクター数を超える項目は評価時に検出する
+        with self.assertRaises(ValueError):
+            compile_filter('Sector3 < 30').mask(self.columns)
+
+    def test_compiled_cache(self):
+        """同じ条件式はコンパイル結果を再利用するか"""
+        self.assertIs(compile_filter('Lap > 1'), compile_filter(' Lap > 1 '))
+
+    def test_large_columns(self):
+        """多数のラップでもマスクがラップ数の長さになるか"""
+        laps = self.make_laps() * 2000
+        columns = self.to_columns(laps)
+        mask = compile_filter('Rider == 佐藤 and not outlier').mask(columns)
+        self.assertEqual(mask.shape, (len(laps),))
+        self.assertEqual(int(mask.sum()), 4000)
+        np.testing.assert_array_equal(mask[:5], [False, False, True, True, False])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+"""
+ラップの近傍探索インデックス（lap_similarity）のユニットテスト
+"""
+import os
+import sys
+import time
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from app.lap_columns import LapColumns
+from app.lap_similarity import LapSimilarityIndex
+import app.lap_similarity as lap_similarity
+
+
+def make_columns(num_laps, num_sectors=4, seed=0):
+    rng = np.random.default_rng(seed)
+    sectors = rng.uniform(20.0, 30.0, (num_laps, num_sectors))
+    return LapColumns(['A', 'B'], rng.integers(0, 2, num_laps), np.arange(num_laps),
+                      sectors.sum(axis=1), sectors,
+                      tires=['Soft', 'Hard'], tire_codes=rng.integers(0, 2, num_laps),
+                      track_temps=rng.uniform(20.0, 40.0, num_laps))
+
+
+def naive_distances(index, lap_index):
+    vectors = index.vectors.astype(np.float64)
+    return np.sqrt(((vectors - vectors[lap_index]) ** 2).sum(axis=1))
+
+
+class TestLapSimilarityIndex(unittest.TestCase):
+    """LapSimilarityIndexのテストケース"""
+
+    def test_knn_matches_naive_search(self):
+        """k近傍の結果が総当たりの距離計算と一致し、自身を含まないか"""
+        index = LapSimilarityIndex(make_columns(2000))
+        indices, distances = index.query(7, k=5)
+        expected = naive_distances(index, 7)
+        order = np.argsort(expected)[1:6]
+        np.testing.assert_array_equal(indices, order)
+        np.testing.assert_allclose(distances, expected[order], atol=1e-3)
+        self.assertNotIn(7, indices)
+
+    def test_blocks_are_merged(self):
+        """ブロックをまたいでも上位k件が正しく選ばれるか"""
+        columns = make_columns(1000, seed=1)
+        original = lap_similarity._BLOCK_SIZE
+        lap_similarity._BLOCK_SIZE = 64
+        try:
+            blocked = LapSimilarityIndex(columns).query(3, k=20)
+        finally:
+            lap_similarity._BLOCK_SIZE = original
+        whole = LapSimilarityIndex(columns).query(3, k=20)
+        np.testing.assert_array_equal(blocked[0], whole[0])
+
+    def test_radius_query(self):
+        """半径検索が指定距離以内のラップのみを距離の昇順で返すか"""
+        index = LapSimilarityIndex(make_columns(2000))
+        indices, distances = index.radius(0, 1.0)
+        expected = naive_distances(index, 0)
+        self.assertEqual(set(indices), set(np.flatnonzero(expected <= 1.0)) - {0})
+        self.assertTrue((np.diff(distances) >= 0).all())
+
+    def test_invalid_laps_are_excluded(self):
+        """セクタータイムが欠けたラップがインデックスに含まれず、元のインデックスで結果が返るか"""
+        columns = make_columns(100)
+        columns.sector_times[10, 2] = np.nan
+        index = LapSimilarityIndex(columns)
+        self.assertEqual(len(index), 99)
+        self.assertFalse(index.contains(10))
+        with self.assertRaises(KeyError):
+            index.query(10)
+        indices, _ = index.query(50, k=98)
+        self.assertEqual(sorted(indices), [i for i in range(100) if i not in (10, 50)])
+
+    def test_conditions_add_features(self):
+        """条件を含めると路面温度とタイヤ・天候の列が追加されるか"""
+        columns = make_columns(100)
+        self.assertEqual(LapSimilarityIndex(columns).dimensions, 5)
+        self.assertEqual(LapSimilarityIndex(columns, include_conditions=True).dimensions, 5 + 1 + 2 + 1)
+
+    def test_query_is_fast_on_large_data(self):
+        """20万ラップでも1回の検索がすぐに終わるか"""
+        index = LapSimilarityIndex(make_columns(200000))
+        start = time.perf_counter()
+        indices, _ = index.query(0, k=10)
+        self.assertEqual(len(indices), 10)
+        self.assertLess(time.perf_counter() - start, 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
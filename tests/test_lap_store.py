@@ -0,0 +1,93 @@
+"""
+ラップストアのユニットテスト
+"""
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from app.lap_columns import LapColumns
+from app.lap_store import LapStore, normalize_date
+
+
+class TestLapStore(unittest.TestCase):
+    """LapStoreのテストケース"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.store = LapStore(os.path.join(self.temp_dir, 'laps.sqlite'))
+        motegi = [
+            {'Rider': 'A', 'Lap': 1, 'LapTime': '1:30.000', 'Sector1': '30.000', 'Sector2': '60.000',
+             'TireType': 'KR410', 'Weather': 'Dry', 'TrackTemp': '35'},
+            {'Rider': 'B', 'Lap': 1, 'LapTime': '1:29.500', 'Sector1': '29.000', 'Sector2': '60.500',
+             'TireType': 'KR133', 'Weather': 'Dry', 'TrackTemp': ''},
+            {'Rider': 'B', 'Lap': 2, 'LapTime': 'invalid', 'Sector1': '29.200', 'Sector2': '60.800',
+             'TireType': 'KR133', 'Weather': 'Dry', 'TrackTemp': ''},
+        ]
+        suzuka = [
+            {'Rider': 'A', 'Lap': 1, 'LapTime': '2:05.000', 'Sector1': '28.500', 'Sector2': '96.500',
+             'TireType': 'KR410', 'Weather': 'Wet', 'TrackTemp': '20'},
+        ]
+        self.store.import_session({'track': 'Motegi', 'date': '20250314', 'session_type': 'Practice'},
+                                  LapColumns.from_laps(motegi, 2), source='motegi.json')
+        self.store.import_session({'track': 'Suzuka', 'date': '2025-05-01', 'session_type': 'Race'},
+                                  LapColumns.from_laps(suzuka, 2), source='suzuka.json')
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_normalize_date(self):
+        """日付がYYYY-MM-DD形式に揃うか"""
+        self.assertEqual(normalize_date('20250314'), '2025-03-14')
+        self.assertEqual(normalize_date('2025/03/14'), '2025-03-14')
+
+    def test_invalid_laps_are_skipped(self):
+        """無効なタイムのラップが登録されないか"""
+        sessions = self.store.list_sessions()
+        self.assertEqual([s['lap_count'] for s in sessions], [2, 1])
+
+    def test_query_by_rider_and_date(self):
+        """ライダーと期間で絞り込めるか"""
+        columns = self.store.query_laps(rider='A', date_from='2025-04-01')
+        self.assertEqual(len(columns), 1)
+        self.assertEqual(columns.riders, ['A'])
+        self.assertAlmostEqual(columns.lap_times[0], 125.0)
+        self.assertTrue(np.allclose(columns.sector_times[0], [28.5, 96.5]))
+
+    def test_query_round_trips_conditions(self):
+        """タイヤ・天候・路面温度が復元されるか"""
+        laps = self.store.query_laps(track='motegi').to_laps()
+        self.assertEqual([lap['TireType'] for lap in laps], ['KR410', 'KR133'])
+        self.assertEqual(laps[0]['TrackTemp'], '35')
+        self.assertEqual(laps[1]['TrackTemp'], '')
+        self.assertEqual(laps[1]['LapTime'], '1:29.500')
+
+    def test_best_sector_time_across_sessions(self):
+        """セッションを横断してベストセクターを検索できるか"""
+        best = self.store.best_sector_time(1, tire='KR410')
+        self.assertEqual(best['track'], 'Suzuka')
+        self.assertAlmostEqual(best['time'], 28.5)
+        self.assertIsNone(self.store.best_sector_time(1, rider='Nobody'))
+
+    def test_best_sector_time_uses_index(self):
+        """ベストセクターの検索が (sector, time_ms) のインデックスを使うか"""
+        plan = self.store.connection.execute(
+            "EXPLAIN QUERY PLAN SELECT MIN(time_ms) FROM lap_sectors WHERE sector = 1").fetchall()
+        self.assertIn('idx_lap_sectors_sector_time', ' '.join(row[-1] for row in plan))
+        self.assertAlmostEqual(self.store.best_sector_time(2)['time'], 60.0)
+
+    def test_reimport_replaces_session(self):
+        """同じ取り込み元を再登録すると置き換えられるか"""
+        laps = [{'Rider': 'C', 'Lap': 1, 'LapTime': '1:31.000', 'Sector1': '31.000', 'Sector2': '60.000'}]
+        self.store.import_session({'track': 'Suzuka', 'date': '20250501', 'session_type': 'Race'},
+                                  LapColumns.from_laps(laps, 2), source='suzuka.json')
+        self.assertEqual(len(self.store.list_sessions()), 2)
+        self.assertEqual(self.store.query_laps(track='Suzuka').riders, ['C'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+"""
+リーダーボード（leaderboard）のユニットテスト
+"""
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from app.leaderboard import TopK, build_leaderboard, OVERALL, RIDER, TIRE, SECTOR
+from lap_factory import LapDataTestCase, lap_entry
+
+
+class TestTopK(unittest.TestCase):
+    """上位K件のヒープのテストケース"""
+
+    def test_from_arrays_matches_sort(self):
+        """argpartitionで選んだ上位K件がソートした結果と一致し、同じ値は先のラップが上位になるか"""
+        values = np.random.default_rng(0).integers(0, 50, 1000).astype(float)
+        values[::7] = np.nan
+        indices = np.arange(values.size)
+        top = TopK.from_arrays(values, indices, 10)
+        valid = np.flatnonzero(np.isfinite(values))
+        expected = sorted((values[i], i) for i in valid)[:10]
+        self.assertEqual(top.entries(), expected)
+        self.assertEqual(top.best(), expected[0][1])
+
+    def test_push_keeps_k_best(self):
+        """1件ずつの追加で上位K件が保たれるか"""
+        rng = np.random.default_rng(1)
+        values = rng.normal(80.0, 1.0, 500)
+        top = TopK(5)
+        for index, value in enumerate(values):
+            top.push(value, index)
+        self.assertFalse(top.push(np.nan, 500))
+        self.assertFalse(top.push(1000.0, 501))
+        self.assertTrue(top.push(0.0, 502))
+        expected = sorted(zip(np.append(values, 0.0), list(range(500)) + [502]))[:5]
+        self.assertEqual(top.entries(), [(float(v), i) for v, i in expected])
+        self.assertEqual(len(top), 5)
+        self.assertIsNone(TopK(3).best())
+
+
+class TestLeaderboardIndex(LapDataTestCase):
+    """リーダーボードのテストケース"""
+
+    def make_laps(self):
+        """3人 × 8周（ラップタイムの順序が周回順とずれる）とタイムのないラップ"""
+        laps = []
+        for rider, base in (('A', 80.0), ('B', 79.0), ('C', 81.0)):
+            for lap in range(1, 9):
+                time = base + (lap * 37 % 11) * 0.1
+                laps.append(lap_entry(rider, lap, [time * 0.4, time * 0.6], time,
+                                      TireType='Soft' if lap % 2 else 'Hard'))
+        laps.append({'Rider': 'C', 'Lap': 9, 'LapTime': '', 'Sector1': '', 'Sector2': '', 'TireType': ''})
+        return laps
+
+    def test_build(self):
+        """全体・ライダー・タイヤ・セクターのリーダーボードと最速/最遅ラップ"""
+        board = build_leaderboard(self.columns, k=3)
+        times = self.columns.lap_times
+        order = [int(i) for i in np.argsort(np.where(np.isfinite(times), times, np.inf), kind='stable')]
+        self.assertEqual([index for _, index in board.top()], order[:3])
+        self.assertEqual(board.fastest(), order[0])
+        self.assertEqual(board.slowest_lap(), int(np.nanargmax(times)))
+        rider_a = [i for i in order if self.laps[i]['Rider'] == 'A']
+        self.assertEqual([index for _, index in board.top(RIDER, 'A')], rider_a[:3])
+        self.assertEqual(board.fastest('A'), rider_a[0])
+        self.assertEqual(board.slowest_lap('A'), rider_a[-1])
+        hard = [i for i in order if self.laps[i]['TireType'] == 'Hard']
+        self.assertEqual([index for _, index in board.top(TIRE, 'Hard')], hard[:3])
+        self.assertAlmostEqual(board.top(SECTOR, 'Sector2')[0][0], times[order[0]] * 0.6, places=3)
+        self.assertEqual(board.keys()[0], (OVERALL, ''))
+        self.assertNotIn((TIRE, ''), board.keys())
+        self.assertEqual(board.num_laps, len(self.laps))
+
+    def test_appended_laps_match_rebuild(self):
+        """ラップを1つずつ追加した結果が全体から作り直した結果と一致するか"""
+        board = build_leaderboard(self.to_columns(self.laps[:10]), k=4)
+        for index in range(10, len(self.laps)):
+            board.add_columns(self.to_columns([self.laps[index]]), index)
+        rebuilt = build_leaderboard(self.columns, k=4)
+        self.assertEqual(board.keys(), rebuilt.keys())
+        for key in rebuilt.keys():
+            self.assertEqual(board.top(*key), rebuilt.top(*key))
+        for rider in ('A', 'B', 'C', None):
+            self.assertEqual(board.slowest_lap(rider), rebuilt.slowest_lap(rider))
+        self.assertEqual(board.num_laps, rebuilt.num_laps)
+
+    def test_add_lap_reports_changes(self):
+        """上位に入らないラップの追加では変更なしと判定され、コピー元は変わらないか"""
+        board = build_leaderboard(self.columns, k=3)
+        copy = board.copy()
+        self.assertTrue(copy.add_lap(len(self.laps), 'A', 'Soft', 70.0, np.array([28.0, 42.0])))
+        self.assertEqual(copy.fastest(), len(self.laps))
+        self.assertNotEqual(board.fastest(), len(self.laps))
+        # 全体・ライダー・タイヤ・セクターのいずれの上位にも入らず、最遅でもないラップ
+        self.assertFalse(copy.add_lap(len(self.laps) + 1, 'B', 'Hard', 80.0, np.array([50.0, 50.0])))
+
+    def test_replaced_laps_match_rebuild(self):
+        """編集したラップの置き換え（上位から外れる・ライダーやタイヤが変わる）が作り直した結果と一致するか"""
+        board = build_leaderboard(self.columns, k=3)
+        fastest = board.fastest()
+        self.laps[fastest] = dict(self.laps[fastest], LapTime='99.000', Sector1='50.000')
+        self.laps[5] = dict(self.laps[5], Rider='D', TireType='Medium', LapTime='70.000')
+        rows = [fastest, 5]
+        columns = self.columns.replace_rows(rows, self.to_columns([self.laps[i] for i in rows]))
+        copy = board.copy()
+        copy.replace_laps(columns, rows)
+        rebuilt = build_leaderboard(self.to_columns(self.laps), k=3)
+        self.assertEqual(copy.keys(), rebuilt.keys())
+        for key in rebuilt.keys():
+            self.assertEqual(copy.top(*key), rebuilt.top(*key))
+        for rider in ('A', 'B', 'C', 'D', None):
+            self.assertEqual(copy.slowest_lap(rider), rebuilt.slowest_lap(rider))
+        self.assertEqual(board.fastest(), fastest)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+"""
+ミニセクターの統計計算（micro_sectors）のユニットテスト
+"""
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from app.micro_sectors import compute_micro_sector_stats, lap_loss_matrix
+from app.analyzer import LapTimeAnalyzer
+from lap_factory import LapDataTestCase, random_laps
+
+
+class MockConfigManager:
+    """テスト用の設定マネージャーモック"""
+    def __init__(self, num_sectors, threshold):
+        self.num_sectors = num_sectors
+        self.threshold = threshold
+
+    def get_num_sectors(self):
+        return self.num_sectors
+
+    def is_micro_sector_mode(self):
+        return self.num_sectors > self.threshold
+
+    def get_setting(self, section, key):
+        return None
+
+    def subscribe(self, callback, section=None, key=None):
+        return None
+
+
+def make_micro_laps(num_sectors):
+    """3人 × 12周、各ミニセクター約0.5秒のラップデータ"""
+    return random_laps({rider: ([0.5] * num_sectors, 0.03) for rider in ('A', 'B', 'C')}, 12)
+
+
+class TestMicroSectorStats(LapDataTestCase):
+    """ミニセクター統計のテストケース"""
+
+    num_sectors = 60
+
+    def make_laps(self):
+        return make_micro_laps(self.num_sectors)
+
+    def test_matches_per_sector_statistics(self):
+        """配列の集約による統計がセクターごとの計算と一致するか"""
+        stats = compute_micro_sector_stats(self.columns)
+        row = stats.riders.index('B')
+        times = self.columns.sector_times[self.columns.rider_mask('B')]
+        np.testing.assert_allclose(stats.best[row], times.min(axis=0))
+        np.testing.assert_allclose(stats.worst[row], times.max(axis=0))
+        np.testing.assert_allclose(stats.avg[row], times.mean(axis=0))
+        np.testing.assert_allclose(stats.std_dev[row], times.std(axis=0))
+        np.testing.assert_allclose(stats.overall_best, self.columns.sector_times.min(axis=0))
+        self.assertTrue((stats.loss_matrix() >= 0).all())
+
+    def test_lap_loss_matrix(self):
+        """各ラップのタイムロスがセクターベストとの差になるか"""
+        rows = np.arange(3)
+        loss = lap_loss_matrix(self.columns, rows)
+        self.assertEqual(loss.shape, (3, self.num_sectors))
+        expected = self.columns.sector_times[:3] - self.columns.sector_times.min(axis=0)
+        np.testing.assert_allclose(loss, expected)
+
+    def test_invalid_laps_are_excluded(self):
+        """セクタータイムが欠けたラップが集計から除外されるか"""
+        laps = [dict(lap) for lap in self.laps]
+        laps[0]['Sector5'] = ''
+        stats = compute_micro_sector_stats(self.to_columns(laps))
+        self.assertEqual(stats.counts[stats.riders.index('A')], 11)
+
+
+class TestMicroSectorAnalysis(unittest.TestCase):
+    """ミニセクターモードの解析のテストケース"""
+
+    def setUp(self):
+        self.num_sectors = 30
+        self.laps = make_micro_laps(self.num_sectors)
+        self.micro = LapTimeAnalyzer(None, MockConfigManager(self.num_sectors, threshold=20))
+        self.regular = LapTimeAnalyzer(None, MockConfigManager(self.num_sectors, threshold=100))
+
+    def test_analysis_matches_regular_mode(self):
+        """ミニセクターモードの解析結果が通常の解析結果と一致するか"""
+        micro = self.micro.analyze_laps(self.laps)
+        regular = self.regular.analyze_laps(self.laps)
+        self.assertIn('micro_sectors', micro)
+        self.assertEqual(micro['total_laps'], regular['total_laps'])
+        self.assertEqual(micro['fastest_lap']['Lap'], regular['fastest_lap']['Lap'])
+        self.assertEqual(micro['fastest_lap']['Rider'], regular['fastest_lap']['Rider'])
+        for rider, stats in regular['rider_stats'].items():
+            self.assertAlmostEqual(micro['rider_stats'][rider]['avg_time'], stats['avg_time'])
+        for rider, sectors in regular['sector_stats'].items():
+            for key, values in sectors.items():
+                for name, value in values.items():
+                    self.assertAlmostEqual(micro['sector_stats'][rider][key][name], value)
+
+    def test_moving_statistics_match_regular_mode(self):
+        """ミニセクターモードの移動統計が通常の計算結果と一致するか"""
+        micro = self.micro.calculate_moving_statistics(self.laps)
+        regular = self.regular.calculate_moving_statistics(self.laps)
+        self.assertEqual(micro.keys(), regular.keys())
+        for rider, stats in regular.items():
+            self.assertAlmostEqual(micro[rider]['lap_time']['moving_avg'], stats['lap_time']['moving_avg'])
+            for key, values in stats['sectors'].items():
+                self.assertAlmostEqual(micro[rider]['sectors'][key]['std_dev'], values['std_dev'])
+
+    def test_incremental_update_replaces_rider_rows(self):
+        """差分再解析で変更したライダーの統計行列のみが更新されるか"""
+        previous = self.micro.analyze_laps(self.laps)
+        laps = [dict(lap) for lap in self.laps]
+        laps[0]['Sector1'] = '0.100'
+        updated = self.micro.update_analysis(laps, previous, ['A'])
+        stats = updated['micro_sectors']
+        self.assertEqual(stats.riders, ['A', 'B', 'C'])
+        self.assertAlmostEqual(stats.best[0, 0], 0.1)
+        np.testing.assert_allclose(stats.avg[1:], previous['micro_sectors'].avg[1:])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+"""
+ピボット集計（pivot）のユニットテスト
+"""
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from app.pivot import (build_pivot, session_stint_numbers, RIDER, TIRE, WEATHER, TEMP_BIN, SESSION,
+                       STINT, MIN, MEAN, MEDIAN, STD, COUNT, IDEAL)
+from lap_factory import LapDataTestCase, lap_entry
+
+
+class TestPivot(LapDataTestCase):
+    """ピボット集計のテストケース"""
+
+    def make_laps(self):
+        """2セッション × 2ライダー、各セッションでタイヤを1回交換するラップデータ"""
+        laps = []
+        rng = np.random.default_rng(0)
+        for session in range(2):
+            for rider in ('A', 'B'):
+                for lap in range(1, 9):
+                    laps.append(lap_entry(rider, lap, rng.normal(40.0, 0.5, 2) + session,
+                                          TireType='Soft' if lap <= 4 else 'Hard',
+                                          Weather='Sunny' if session == 0 else 'Cloudy',
+                                          TrackTemp=str(22 + session * 6 + lap % 2)))
+        laps[5]['LapTime'] = ''
+        return laps
+
+    def test_session_and_stint_numbers(self):
+        """ラップ番号が戻った位置でセッション、タイヤ交換でスティントが変わるか"""
+        sessions, stints = session_stint_numbers(self.columns)
+        expected_sessions = [1] * 16 + [2] * 16
+        expected_stints = ([1] * 4 + [2] * 4) * 4
+        self.assertEqual(sessions.tolist(), expected_sessions)
+        self.assertEqual(stints.tolist(), expected_stints)
+
+    def test_matches_brute_force(self):
+        """ライダー × タイヤの集計が素朴な計算と一致するか"""
+        pivot = build_pivot(self.columns, [RIDER, TIRE])
+        self.assertEqual(pivot.labels, [('A', 'Hard'), ('A', 'Soft'), ('B', 'Hard'), ('B', 'Soft')])
+        times = self.columns.lap_times
+        for index, (rider, tire) in enumerate(pivot.labels):
+            selected = np.array([lap['Rider'] == rider and lap['TireType'] == tire for lap in self.laps])
+            group_times = times[selected & np.isfinite(times)]
+            row = pivot.row(index)
+            self.assertEqual(row[COUNT], group_times.size)
+            self.assertAlmostEqual(row[MIN], group_times.min())
+            self.assertAlmostEqual(row[MEAN], group_times.mean())
+            self.assertAlmostEqual(row[MEDIAN], np.median(group_times))
+            self.assertAlmostEqual(row[STD], group_times.std())
+            sectors = self.columns.sector_times[selected]
+            self.assertAlmostEqual(row[IDEAL], sectors.min(axis=0).sum())
+
+    def test_condition_keys(self):
+        """天候・路面温度帯・セッション・スティントでのグループ化"""
+        pivot = build_pivot(self.columns, [WEATHER, TEMP_BIN], temp_bin=5.0)
+        self.assertEqual(pivot.labels, [('Cloudy', '25-30'), ('Sunny', '20-25')])
+        pivot = build_pivot(self.columns, [SESSION, STINT])
+        self.assertEqual(pivot.labels, [('1', '1'), ('1', '2'), ('2', '1'), ('2', '2')])
+        self.assertEqual(pivot.values[COUNT].tolist(), [8, 7, 8, 8])
+        self.assertEqual(pivot.find('1', '2'), 1)
+        self.assertEqual(pivot.find('3', '1'), -1)
+        # 項目を指定しない場合は全ラップを1グループにする
+        total = build_pivot(self.columns, [])
+        self.assertEqual(total.labels, [()])
+        self.assertEqual(int(total.values[COUNT][0]), len(self.laps) - 1)
+
+    def test_single_and_missing_times(self):
+        """ラップが1つのグループのstdは0、タイムのないグループはNaN"""
+        laps = [{'Rider': 'A', 'Lap': 1, 'LapTime': '80.0', 'Sector1': '40.0', 'Sector2': ''},
+                {'Rider': 'B', 'Lap': 1, 'LapTime': '', 'Sector1': '41.0', 'Sector2': '39.0'}]
+        pivot = build_pivot(self.to_columns(laps), [RIDER])
+        a, b = pivot.row(0), pivot.row(1)
+        self.assertEqual((a[COUNT], a[STD], a[MEDIAN]), (1, 0.0, 80.0))
+        self.assertTrue(np.isnan(a[IDEAL]))
+        self.assertEqual(b[COUNT], 0)
+        self.assertTrue(np.isnan(b[MIN]) and np.isnan(b[STD]))
+        self.assertAlmostEqual(b[IDEAL], 80.0)
+        self.assertEqual(len(build_pivot(self.to_columns([]), [RIDER])), 0)
+
+    def test_errors(self):
+        """不明な項目・重複した項目・不正な温度帯の幅"""
+        with self.assertRaises(ValueError):
+            build_pivot(self.columns, ['Track'])
+        with self.assertRaises(ValueError):
+            build_pivot(self.columns, [RIDER, RIDER])
+        with self.assertRaises(ValueError):
+            build_pivot(self.columns, [TEMP_BIN], temp_bin=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+"""
+パーセンタイルのスケッチ（quantile_sketch）のユニットテスト
+"""
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from app.lap_columns import LapColumns
+from app.quantile_sketch import KLLSketch, LapQuantileSketches, build_quantile_sketches
+
+
+class TestKLLSketch(unittest.TestCase):
+    """KLLスケッチのテストケース"""
+
+    def assert_rank_error(self, sketch, values, tolerance=0.02):
+        """スケッチの分位点の真の順位が誤差の範囲内にあるか"""
+        qs = np.linspace(0.05, 0.95, 19)
+        ranks = np.searchsorted(np.sort(values), sketch.quantiles(qs), side='right') / values.size
+        self.assertLess(np.abs(ranks - qs).max(), tolerance)
+
+    def test_small_input_is_exact(self):
+        """容量以下の値ではソートした値と一致するか"""
+        sketch = KLLSketch(seed=0)
+        values = np.arange(1.0, 101.0)
+        sketch.update_many(values[::-1])
+        self.assertEqual(sketch.quantile(0.5), 50.0)
+        self.assertEqual(sketch.quantiles([0.0, 1.0]).tolist(), [1.0, 100.0])
+        self.assertAlmostEqual(sketch.rank(25.0), 0.25)
+        self.assertTrue(np.isnan(KLLSketch().quantile(0.5)))
+
+    def test_large_stream_is_bounded_and_accurate(self):
+        """多数の値でも保持する値の数が小さく、順位の誤差が小さいか"""
+        values = np.random.default_rng(0).gamma(2.0, 1.0, 200000) + 80.0
+        sketch = KLLSketch(seed=1)
+        for chunk in np.array_split(values, 50):
+            sketch.update_many(chunk)
+        self.assertEqual(sketch.count, values.size)
+        self.assertLess(sum(level.size for level in sketch.levels), 1000)
+        self.assertEqual((sketch.min, sketch.max), (values.min(), values.max()))
+        self.assert_rank_error(sketch, values)
+
+    def test_single_updates(self):
+        """1値ずつの追加とNaNの無視"""
+        values = np.random.default_rng(2).normal(80.0, 1.0, 20000)
+        sketch = KLLSketch(seed=3)
+        for value in values:
+            sketch.update(value)
+        sketch.update(np.nan)
+        self.assertEqual(sketch.count, values.size)
+        self.assert_rank_error(sketch, values)
+
+    def test_merge(self):
+        """別々に作ったスケッチをマージできるか"""
+        rng = np.random.default_rng(4)
+        first, second = rng.normal(80.0, 1.0, 30000), rng.normal(83.0, 1.0, 10000)
+        a, b = KLLSketch(seed=5), KLLSketch(seed=6)
+        a.update_many(first)
+        b.update_many(second)
+        a.merge(b)
+        self.assertEqual(a.count, 40000)
+        self.assert_rank_error(a, np.concatenate((first, second)))
+
+    def test_lowest_level_has_minimum_capacity(self):
+        """段が多くなっても最下段の容量が下限を下回らないか"""
+        sketch = KLLSketch(seed=0)
+        sketch.update_many(np.arange(200000, dtype=np.float64))
+        self.assertGreater(len(sketch.levels), 8)
+        self.assertEqual(sketch._capacity(0), 16)
+        self.assertEqual(KLLSketch(k=8)._capacity(0), 8)
+
+    def test_range_within(self):
+        """範囲内の最小・最大が外れ値を除いて求まるか"""
+        sketch = KLLSketch(seed=0)
+        sketch.update_many([80.0, 81.0, 82.0, 120.0])
+        self.assertEqual(sketch.range_within(79.0, 90.0), (80.0, 82.0))
+        self.assertIsNone(sketch.range_within(90.0, 100.0))
+
+
+class TestLapQuantileSketches(unittest.TestCase):
+    """ライダー × 系列ごとのスケッチのテストケース"""
+
+    def setUp(self):
+        laps = [{'Rider': rider, 'Lap': lap, 'LapTime': f"{base + lap * 0.1:.3f}",
+                 'Sector1': f"{(base + lap * 0.1) / 2:.3f}", 'Sector2': f"{(base + lap * 0.1) / 2:.3f}"}
+                for rider, base in (('A', 80.0), ('B', 90.0)) for lap in range(1, 11)]
+        laps.append({'Rider': 'B', 'Lap': 11, 'LapTime': '', 'Sector1': '0', 'Sector2': ''})
+        self.columns = LapColumns.from_laps(laps, 2)
+
+    def test_build_and_query(self):
+        """ライダー・系列ごとの分位点"""
+        sketches = build_quantile_sketches(self.columns)
+        self.assertEqual(sketches.riders, ['A', 'B'])
+        self.assertEqual(sketches.series, ['LapTime', 'Sector1', 'Sector2'])
+        self.assertAlmostEqual(sketches.quantile('A', 0.5), 80.5)
+        self.assertAlmostEqual(sketches.quantile('B', 1.0, 'Sector1'), 45.5)
+        self.assertEqual(sketches.sketch('B').count, 10)
+        self.assertTrue(np.isnan(sketches.quantile('Z', 0.5)))
+        self.assertEqual(sketches.combined(['Sector1', 'Sector2']).count, 40)
+
+    def test_add_lap_and_merge_sessions(self):
+        """ラップの追加とセッションのマージ"""
+        sketches = build_quantile_sketches(self.columns)
+        sketches.add_lap('C', {'LapTime': 70.0, 'Sector1': 35.0, 'Unknown': 1.0})
+        self.assertEqual(sketches.quantile('C', 0.5), 70.0)
+        other = LapQuantileSketches(sketches.series)
+        other.add_lap('A', {'LapTime': 60.0})
+        sketches.merge(other)
+        self.assertEqual(sketches.sketch('A').count, 11)
+        self.assertEqual(sketches.num_laps, 23)
+        self.assertEqual(sketches.quantile('A', 0.0), 60.0)
+
+    def test_replace_riders(self):
+        """編集で変更されたライダーのスケッチのみ作り直され、コピー元は変わらないか"""
+        sketches = build_quantile_sketches(self.columns)
+        laps = self.columns.to_laps()
+        laps[0]['LapTime'] = '70.000'
+        laps[1]['Rider'] = 'C'
+        columns = self.columns.replace_rows([0, 1], LapColumns.from_laps(laps[:2], 2))
+        updated = sketches.copy()
+        updated.replace_riders(columns, ['A', 'C'])
+        self.assertEqual(updated.sketch('A').count, 9)
+        self.assertEqual(updated.quantile('A', 0.0), 70.0)
+        self.assertEqual(updated.sketch('C').count, 1)
+        self.assertEqual(updated.sketch('B').count, 10)
+        self.assertEqual(sketches.sketch('A').count, 10)
+        self.assertIsNone(sketches.sketch('C'))
+
+
+if __name__ == '__main__':
+    unittest.main()
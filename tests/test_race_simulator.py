@@ -0,0 +1,114 @@
+"""
+レース戦略シミュレーター（race_simulator）のユニットテスト
+"""
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from app.lap_columns import LapColumns
+from app.race_simulator import Strategy, fit_race_model, simulate_race, tire_ages
+from lap_factory import lap_entry
+
+
+def make_columns(seed=0):
+    """2種類のタイヤで15周ずつ走った3人分のラップ（KR410の方が劣化が大きい）"""
+    rng = np.random.default_rng(seed)
+    laps = []
+    for rider, pace in (('A', 80.0), ('B', 80.3), ('C', 81.0)):
+        for tire, degradation, first_lap in (('KR410', 0.08, 1), ('KR310', 0.02, 16)):
+            for age in range(15):
+                lap_time = pace + degradation * age + rng.normal(0, 0.2)
+                laps.append(lap_entry(rider, first_lap + age, lap_time=lap_time, TireType=tire))
+    return LapColumns.from_laps(laps, 0)
+
+
+class TestRaceModel(unittest.TestCase):
+    """ラップタイムモデル推定のテストケース"""
+
+    def test_tire_ages(self):
+        """タイヤ交換とラップ番号の欠けでスティントが分かれるか"""
+        laps = [{'Rider': 'A', 'Lap': lap, 'LapTime': '80.0', 'TireType': tire}
+                for lap, tire in ((1, 'S'), (2, 'S'), (3, 'H'), (4, 'H'), (6, 'H'))]
+        laps.append({'Rider': 'B', 'Lap': 1, 'LapTime': '80.0', 'TireType': 'H'})
+        columns = LapColumns.from_laps(laps[::-1], 0)
+        np.testing.assert_array_equal(tire_ages(columns), [0, 0, 1, 0, 1, 0])
+
+    def test_fit_recovers_degradation(self):
+        """タイヤごとの劣化率とペースが推定されるか"""
+        model = fit_race_model(make_columns())
+        self.assertEqual(model.riders, ['A', 'B', 'C'])
+        self.assertEqual(model.tires, ['KR310', 'KR410'])
+        self.assertAlmostEqual(model.tire_model('A', 'KR410').slope, 0.08, delta=0.03)
+        self.assertAlmostEqual(model.tire_model('C', 'KR310').intercept, 81.0, delta=0.3)
+        # ラップのないタイヤは全ラップのモデルで代用する
+        self.assertIs(model.tire_model('A', 'Unknown'), model.models[('A', None)])
+
+    def test_parse_strategy(self):
+        """戦略の文字列を読み込めるか"""
+        strategy = Strategy.parse('One stop', 'KR410:10, KR310:12', 20)
+        self.assertEqual(strategy.stints, [('KR410', 10), ('KR310', 12)])
+        self.assertEqual((strategy.race_laps, strategy.num_stops), (22, 1))
+        self.assertEqual(Strategy.parse('x', strategy.to_text()).stints, strategy.stints)
+        for text in ('', 'KR410', 'KR410:0', ':10'):
+            with self.assertRaises(ValueError):
+                Strategy.parse('bad', text)
+
+
+class TestSimulateRace(unittest.TestCase):
+    """レースシミュレーションのテストケース"""
+
+    def setUp(self):
+        self.model = fit_race_model(make_columns())
+        self.strategies = [Strategy('No stop', [('KR410', 30)]),
+                           Strategy('One stop', [('KR410', 15), ('KR410', 15)], pit_loss=2.0)]
+
+    def test_reproducible_by_seed(self):
+        """同じシードなら同じ結果に、異なるシードなら異なる結果になるか"""
+        first = simulate_race(self.model, self.strategies, 5000, seed=3, workers=1, chunk_size=1000)
+        second = simulate_race(self.model, self.strategies, 5000, seed=3, workers=1, chunk_size=1000)
+        other = simulate_race(self.model, self.strategies, 5000, seed=4, workers=1, chunk_size=1000)
+        np.testing.assert_array_equal(first[1].time_sums, second[1].time_sums)
+        np.testing.assert_array_equal(first[1].position_counts, second[1].position_counts)
+        np.testing.assert_array_equal(first[1].time_percentiles(), second[1].time_percentiles())
+        self.assertFalse(np.array_equal(first[1].time_sums, other[1].time_sums))
+
+    def test_process_pool_matches_single_process(self):
+        """プロセスプールで実行しても1プロセスと同じ結果になるか"""
+        single = simulate_race(self.model, self.strategies, 4000, seed=7, workers=1, chunk_size=1000)
+        pooled = simulate_race(self.model, self.strategies, 4000, seed=7, workers=2, chunk_size=1000)
+        for a, b in zip(single, pooled):
+            np.testing.assert_array_equal(a.time_sums, b.time_sums)
+            np.testing.assert_array_equal(a.position_counts, b.position_counts)
+            np.testing.assert_array_equal(a.time_percentiles(), b.time_percentiles())
+
+    def test_distributions(self):
+        """総タイムの期待値がモデルと一致し、順位の分布が確率になっているか"""
+        results = simulate_race(self.model, self.strategies, 20000, seed=1, workers=1)
+        no_stop = results[0]
+        expected = self.model.tire_model('A', 'KR410').expected_times(np.arange(30)).sum()
+        self.assertAlmostEqual(no_stop.mean_times()[0], expected, delta=0.1)
+        distribution = no_stop.position_distribution()
+        np.testing.assert_allclose(distribution.sum(axis=1), 1.0)
+        np.testing.assert_allclose(distribution.sum(axis=0), 1.0)
+        self.assertEqual(no_stop.num_simulations, 20000)
+        np.testing.assert_allclose(no_stop.expected_positions().sum(), 6.0)
+        # 総タイムのパーセンタイルはチャンクごとのスケッチをマージした近似値
+        p5, median, p95 = no_stop.time_percentiles()[0]
+        self.assertLess(p5, median)
+        self.assertLess(median, p95)
+        self.assertAlmostEqual(median, expected, delta=0.3)
+        # 劣化の大きいタイヤでは、ピットロスが小さければ1回交換の方が速い
+        self.assertLess(results[1].mean_times()[0], no_stop.mean_times()[0])
+
+    def test_focus_rider_against_baseline(self):
+        """比較対象のライダー以外は基準の戦略で走るか"""
+        results = simulate_race(self.model, self.strategies, 2000, seed=1, focus_rider='B', workers=1)
+        np.testing.assert_array_equal(results[1].time_sums[[0, 2]], results[0].time_sums[[0, 2]])
+        self.assertFalse(np.array_equal(results[1].time_sums[1], results[0].time_sums[1]))
+
+
+if __name__ == '__main__':
+    unittest.main()
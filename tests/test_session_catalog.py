@@ -0,0 +1,117 @@
+"""
+セッションカタログのユニットテスト
+"""
+import json
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from app import session_catalog
+from app.session_catalog import SessionCatalog
+
+
+def write_json_session(path, track, date, laps):
+    data = {
+        'session_info': {'track': track, 'date': date, 'session_type': 'Practice', 'Weather': 'Dry'},
+        'lap_data': [{'Rider': rider, 'Lap': i + 1, 'LapTime': lap_time,
+                      'Sector1': '30.000', 'Sector2': '60.000'}
+                     for i, (rider, lap_time) in enumerate(laps)],
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+
+
+class TestSessionCatalog(unittest.TestCase):
+    """SessionCatalogのテストケース"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.data_dir = os.path.join(self.temp_dir, 'data')
+        os.makedirs(os.path.join(self.data_dir, '2025'))
+        write_json_session(os.path.join(self.data_dir, 'motegi_0314.json'), 'もてぎ', '20250314',
+                           [('A', '1:30.000'), ('A', '1:29.000'), ('B', '1:29.500')])
+        write_json_session(os.path.join(self.data_dir, '2025', 'suzuka.json'), 'Suzuka', '2025-05-01',
+                           [('B', '2:05.000')])
+        with open(os.path.join(self.data_dir, 'run_Sugo_20250601.csv'), 'w', encoding='utf-8') as f:
+            f.write("Rider,Lap,LapTime,Sector1,Sector2,TireType,Weather,TrackTemp\n"
+                    "C,1,1:35.000,30.000,65.000,KR410,Wet,21.5\n")
+        with open(os.path.join(self.data_dir, 'notes.json'), 'w', encoding='utf-8') as f:
+            f.write('{"memo": "not a session"}')
+        self.index_path = os.path.join(self.temp_dir, 'catalog.json')
+        self.catalog = SessionCatalog(self.index_path)
+        self.catalog.refresh([self.data_dir])
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_summary_fields(self):
+        """セッション情報・ライダー・ラップ数・ベストタイムが抽出されるか"""
+        entry = self.catalog.get_entry(os.path.join(self.data_dir, 'motegi_0314.json'))
+        self.assertEqual(entry['date'], '2025-03-14')
+        self.assertEqual(entry['riders'], ['A', 'B'])
+        self.assertEqual(entry['lap_count'], 3)
+        self.assertEqual(entry['best_lap_rider'], 'A')
+        self.assertAlmostEqual(entry['best_lap_time'], 89.0)
+
+    def test_csv_track_and_date_from_file_name(self):
+        """CSVのトラックと日付がファイル名から推定されるか"""
+        entry = self.catalog.get_entry(os.path.join(self.data_dir, 'run_Sugo_20250601.csv'))
+        self.assertEqual(entry['track'], 'Sugo')
+        self.assertEqual(entry['date'], '2025-06-01')
+        self.assertEqual(entry['weather'], 'Wet')
+
+    def test_search(self):
+        """キーワードと条件で検索できるか（読み込めないファイルは除外）"""
+        self.assertEqual(len(self.catalog.search()), 3)
+        self.assertEqual([e['track'] for e in self.catalog.search(rider='B')], ['もてぎ', 'Suzuka'])
+        self.assertEqual(len(self.catalog.search('suzuka b')), 1)
+        self.assertEqual(len(self.catalog.search(date_from='2025-05-01')), 2)
+        self.assertEqual(len(self.catalog.search(include_errors=True)), 4)
+
+    def test_index_is_persistent_and_incremental(self):
+        """インデックスが保存され、変更されたファイルのみ再解析されるか"""
+        reloaded = SessionCatalog(self.index_path)
+        self.assertEqual(len(reloaded), 4)
+        with patch.object(session_catalog, 'summarize_session_file',
+                          wraps=session_catalog.summarize_session_file) as summarize:
+            self.assertEqual(reloaded.refresh([self.data_dir]), (0, 0))
+            path = os.path.join(self.data_dir, '2025', 'suzuka.json')
+            write_json_session(path, 'Suzuka', '2025-05-01', [('B', '2:05.000'), ('D', '2:04.000')])
+            os.remove(os.path.join(self.data_dir, 'notes.json'))
+            self.assertEqual(reloaded.refresh([self.data_dir]), (1, 1))
+            self.assertEqual(summarize.call_count, 1)
+        self.assertEqual(reloaded.get_entry(path)['best_lap_rider'], 'D')
+
+    def test_file_removed_during_refresh(self):
+        """走査後に削除されたファイルで更新全体が止まらず、エラーとして記録されるか"""
+        path = os.path.join(self.data_dir, 'gone.json')
+        write_json_session(path, 'Gone', '20250801', [('G', '1:40.000')])
+        summarize = session_catalog.summarize_session_file
+
+        def summarize_after_remove(file_path):
+            if file_path == path:
+                os.remove(path)
+            return summarize(file_path)
+
+        with patch.object(session_catalog, 'summarize_session_file', side_effect=summarize_after_remove):
+            self.assertEqual(self.catalog.refresh([self.data_dir]), (1, 0))
+        entry = self.catalog.get_entry(path)
+        self.assertTrue(entry['error'])
+        self.assertIsNone(entry['mtime'])
+        self.assertEqual(self.catalog.refresh([self.data_dir]), (0, 1))
+
+    def test_parallel_refresh(self):
+        """閾値を超えるファイル数では並列に解析されるか"""
+        for i in range(6):
+            write_json_session(os.path.join(self.data_dir, f'extra_{i}.json'), 'Extra', '20250701',
+                               [('E', f'1:3{i}.000')])
+        self.assertEqual(self.catalog.refresh([self.data_dir], max_workers=2), (6, 0))
+        self.assertEqual(len(self.catalog.search(track='extra')), 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
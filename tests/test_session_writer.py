@@ -0,0 +1,80 @@
+"""
+セッション保存のユニットテスト
+"""
+import json
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from app.lap_columns import LapColumns
+from app.session_writer import SessionWriter
+from utils.atomic_io import atomic_write_text
+
+
+class TestSessionWriter(unittest.TestCase):
+    """SessionWriterのテストケース"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.laps = [
+            {'Rider': '藤田', 'Lap': 1, 'LapTime': '1:30.000', 'Sector1': '30.000', 'Sector2': '60.000',
+             'TireType': 'KR410', 'Weather': 'Dry', 'TrackTemp': '39.3'},
+            {'Rider': '長田', 'Lap': 1, 'LapTime': 'bad', 'Sector1': '29.000', 'Sector2': '60.500',
+             'TireType': 'KR410', 'Weather': 'Dry', 'TrackTemp': '39.3'},
+            {'Rider': '長田', 'Lap': 2, 'LapTime': '1:29.500', 'Sector1': '29.000', 'Sector2': '60.500',
+             'TireType': 'KR133', 'Weather': 'Wet', 'TrackTemp': ''},
+        ]
+        self.columns = LapColumns.from_laps(self.laps, 2)
+        self.writer = SessionWriter(2)
+        self.json_path = os.path.join(self.temp_dir, 'session.json')
+        self.csv_path = os.path.join(self.temp_dir, 'session.csv')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_writes_both_formats(self):
+        """JSONには有効なラップのみ、CSVには全ラップが保存されるか"""
+        progress = []
+        result = self.writer.save(self.laps, self.columns, {'track': 'もてぎ'}, self.json_path, self.csv_path,
+                                  lambda percent, message: progress.append(percent))
+        self.assertEqual(result, {'json': self.json_path, 'csv': self.csv_path, 'errors': {}})
+        self.assertEqual(progress[0], 0)
+        self.assertEqual(progress[-1], 100)
+
+        with open(self.json_path, encoding='utf-8') as f:
+            data = json.load(f)
+        self.assertEqual(data['session_info'], {'track': 'もてぎ'})
+        self.assertEqual([lap['Lap'] for lap in data['lap_data']], [1, 2])
+        self.assertEqual(data['lap_data'][1]['conditions'], {'tire': 'KR133', 'weather': 'Wet', 'track_temp': ''})
+
+        expected_csv = pd.DataFrame(self.laps).to_csv(index=False)
+        with open(self.csv_path, encoding='utf-8', newline='') as f:
+            self.assertEqual(f.read(), expected_csv)
+
+    def test_error_in_one_format_does_not_stop_the_other(self):
+        """片方の形式で失敗してももう片方は保存されるか"""
+        bad_laps = [dict(self.laps[1])]
+        result = self.writer.save(bad_laps, LapColumns.from_laps(bad_laps, 2), {}, self.json_path, self.csv_path)
+        self.assertIsNone(result['json'])
+        self.assertIn('json', result['errors'])
+        self.assertEqual(result['csv'], self.csv_path)
+        self.assertFalse(os.path.exists(self.json_path))
+
+    def test_atomic_write_keeps_original_on_failure(self):
+        """置き換えに失敗した場合に元のファイルと一時ファイルが残らないか"""
+        atomic_write_text(self.csv_path, 'original')
+        with patch('utils.atomic_io.os.replace', side_effect=OSError('disk full')):
+            with self.assertRaises(OSError):
+                atomic_write_text(self.csv_path, 'partial')
+        with open(self.csv_path, encoding='utf-8') as f:
+            self.assertEqual(f.read(), 'original')
+        self.assertEqual(os.listdir(self.temp_dir), ['session.csv'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+"""
+テレメトリストア（TelemetryStore）のユニットテスト
+"""
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from app.telemetry_store import TelemetryStore, TelemetryLap
+
+
+class TestTelemetryStore(unittest.TestCase):
+    """TelemetryStoreのテストケース"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.store_path = os.path.join(self.temp_dir, 'session.telemetry')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write_csv(self, lines):
+        csv_path = os.path.join(self.temp_dir, 'log.csv')
+        with open(csv_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        return csv_path
+
+    def test_import_csv_detects_lap_boundaries(self):
+        """ラップ番号の変化からラップ境界が作られ、ラップ番号のない区間が除外されるか"""
+        csv_path = self.write_csv([
+            'Rider,Lap,Speed,RPM',
+            'A,1,100,8000', 'A,1,110,8500', 'A,1,120,9000',
+            'A,,50,4000',
+            'A,2,105,8100', 'A,2,,8200',
+            'B,1,90,7000',
+        ])
+        store = TelemetryStore.import_csv(csv_path, self.store_path, sample_rate=10.0)
+        self.assertEqual(store.channels, ['Speed', 'RPM'])
+        self.assertEqual(len(store), 7)
+        self.assertEqual([(lap.rider, lap.lap, lap.start, lap.stop) for lap in store.laps],
+                         [('A', 1, 0, 3), ('A', 2, 4, 6), ('B', 1, 6, 7)])
+        lap = store.get_lap('A', '2')
+        speed = store.lap_channel(lap, 'Speed')
+        self.assertEqual(speed[0], 105)
+        self.assertTrue(np.isnan(speed[1]))
+        np.testing.assert_allclose(store.lap_time_axis(lap), [0.0, 0.1])
+
+    def test_import_csv_skips_truncated_rows(self):
+        """ラップ番号の列まで値のない行を読み飛ばし、チャンネルが欠けた行はNaNで取り込むか"""
+        csv_path = self.write_csv([
+            'Speed,Rider,Lap,RPM',
+            '100,A,1,8000', '110', '120,A,1', '130,A',
+            '105,A,2,8100',
+        ])
+        store = TelemetryStore.import_csv(csv_path, self.store_path)
+        self.assertEqual(len(store), 3)
+        self.assertEqual([(lap.rider, lap.lap, lap.start, lap.stop) for lap in store.laps],
+                         [('A', 1, 0, 2), ('A', 2, 2, 3)])
+        rpm = store.lap_channel(store.get_lap('A', 1), 'RPM')
+        self.assertEqual(rpm[0], 8000)
+        self.assertTrue(np.isnan(rpm[1]))
+        np.testing.assert_array_equal(store.lap_channel(store.get_lap('A', 2), 'Speed'), [105])
+
+    def test_reopen_is_memory_mapped_view(self):
+        """開き直したストアがメモリマップされ、ラップの取り出しがコピーにならないか"""
+        speed = np.arange(1000, dtype=np.float32)
+        laps = [TelemetryLap('A', 1, 0, 400), TelemetryLap('A', 2, 400, 1000)]
+        TelemetryStore.write(self.store_path, {'Speed': speed, 'Throttle': speed / 10}, laps, 100.0)
+
+        store = TelemetryStore(self.store_path)
+        self.assertIsInstance(store.data, np.memmap)
+        view = store.lap_channel(store.get_lap('A', 2), 'Throttle')
+        self.assertTrue(np.shares_memory(view, store.data))
+        np.testing.assert_allclose(view, speed[400:] / 10)
+        self.assertAlmostEqual(store.duration, 10.0)
+
+    def test_link_laps(self):
+        """ラップデータの行とテレメトリのラップが対応付けられるか"""
+        laps = [TelemetryLap('A', 1, 0, 5), TelemetryLap('B', 3, 5, 10)]
+        store = TelemetryStore.write(self.store_path, {'Speed': np.zeros(10)}, laps, 100.0)
+        lap_data = [{'Rider': 'B', 'Lap': 3}, {'Rider': 'A', 'Lap': 2}, {'Rider': 'A', 'Lap': 1}]
+        links = store.link_laps(lap_data)
+        self.assertEqual(sorted(links), [0, 2])
+        self.assertEqual(links[0].start, 5)
+
+    def test_missing_lap_column(self):
+        """ラップ番号の列がない場合にエラーになり、ストアが作られないか"""
+        csv_path = self.write_csv(['Speed,RPM', '100,8000'])
+        with self.assertRaises(ValueError):
+            TelemetryStore.import_csv(csv_path, self.store_path)
+        self.assertFalse(os.path.exists(os.path.join(self.store_path, TelemetryStore.INDEX_FILE)))
+
+
+if __name__ == '__main__':
+    unittest.main()